@@ -17,6 +17,8 @@ from app.schemas.response import SuccessResponse, ErrorResponse, ErrorDetail
 from app.services.chat_service import ChatService
 from app.core.decorators import api_error_handler, log_execution
 from app.core.dependencies import get_service, ServiceDepends
+from app.core.config import settings
+from app.utils.stream_events import encode_stream
 
 # 变量：创建路由实例
 router = APIRouter()
@@ -43,10 +45,10 @@ async def chat_completions(
     """
     # 内部逻辑：判断是否启用流式返回
     if request.stream:
-        # 内部逻辑：流式返回保持原有格式,使用SSE
+        # 内部逻辑：流式返回保持原有格式,使用SSE（服务内部传递结构化事件，在此处编码）
         # 内部变量：添加关键响应头，禁用Nginx缓冲，支持流式传输
         return StreamingResponse(
-            chat_service.stream_chat_completion(db, request),
+            encode_stream(chat_service.stream_chat_events(db, request)),
             media_type="text/event-stream",
             headers={
                 # 内部变量：禁用缓存
@@ -157,3 +159,21 @@ async def compare_documents(
         data=result,
         message="文档对比成功"
     )
+
+@router.get("/cache/stats", response_model=SuccessResponse[dict])
+async def get_answer_cache_stats():
+    """
+    函数级注释：查询语义答案缓存统计
+    内部逻辑：返回缓存条目数、命中率、节省的 Token 数与失效次数
+    返回值：SuccessResponse[dict] - 统一格式响应
+    """
+    from app.services.chat.answer_cache import get_answer_cache
+
+    stats = {"enabled": settings.ENABLE_ANSWER_CACHE, **get_answer_cache().get_stats()}
+
+    # 内部逻辑：返回统一格式的成功响应
+    return SuccessResponse[dict](
+        success=True,
+        data=stats,
+        message="查询答案缓存统计成功"
+    )
@@ -22,6 +22,7 @@ from app.schemas.conversation import (
 )
 from app.schemas.response import SuccessResponse, ErrorResponse, ErrorDetail
 from app.services.conversation_service import ConversationService
+from app.utils.stream_events import encode_stream
 
 # 变量：创建路由实例
 router = APIRouter()
@@ -305,7 +306,7 @@ async def send_message_stream(
     返回值：StreamingResponse
     """
     return StreamingResponse(
-        ConversationService.send_message_stream(db, conversation_id, request),
+        encode_stream(ConversationService.send_message_events(db, conversation_id, request)),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
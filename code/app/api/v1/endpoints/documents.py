@@ -8,8 +8,10 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
-from app.schemas.document import DocumentListResponse
+from app.core.config import settings
+from app.schemas.document import DocumentListResponse, InsightRegenerateResponse
 from app.schemas.response import SuccessResponse
+from app.services.document_insight_service import DocumentInsightService, document_insight_queue
 from app.services.ingest_service import IngestService
 
 # 变量：创建路由实例
@@ -42,6 +44,31 @@ async def list_documents(
         message="查询文档列表成功"
     )
 
+@router.post("/insights/regenerate", response_model=SuccessResponse[InsightRegenerateResponse])
+async def regenerate_insights(
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    函数级注释：重新生成文档的摘要、简介与关键词
+    内部逻辑：查询没有预生成结果或结果由其他模型生成的文档，加入后台低优先级队列
+    参数：
+        db: 数据库异步会话
+    返回值：SuccessResponse[InsightRegenerateResponse] - 统一格式响应
+    """
+    # 内部逻辑：Guard Clause - 未启用预生成
+    if not settings.ENABLE_DOCUMENT_INSIGHTS:
+        raise HTTPException(status_code=400, detail="未启用文档预生成（ENABLE_DOCUMENT_INSIGHTS）")
+
+    doc_ids = await DocumentInsightService.find_stale(db)
+    for doc_id in doc_ids:
+        document_insight_queue.enqueue(doc_id)
+
+    return SuccessResponse[InsightRegenerateResponse](
+        success=True,
+        data=InsightRegenerateResponse(queued=len(doc_ids)),
+        message=f"已将 {len(doc_ids)} 个文档加入预生成队列"
+    )
+
 @router.delete("/{doc_id}", response_model=SuccessResponse[dict])
 async def delete_document(
     doc_id: int,
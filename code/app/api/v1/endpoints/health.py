@@ -68,3 +68,69 @@ async def check_system_health():
         },
         message="系统运行正常"
     )
+
+
+@router.get("/coalescing", response_model=SuccessResponse[dict])
+async def get_coalescing_stats():
+    """
+    函数级注释：查询请求合并统计
+    内部逻辑：返回各类请求（查询向量、语义搜索、问答）的实际执行次数与被合并次数
+    返回值：SuccessResponse[dict] - 统一格式响应
+    """
+    from app.core.config import settings
+    from app.utils.singleflight import get_singleflight_stats
+
+    return SuccessResponse[dict](
+        success=True,
+        data={"enabled": settings.ENABLE_REQUEST_COALESCING, "flights": get_singleflight_stats()},
+        message="查询请求合并统计成功"
+    )
+
+
+@router.get("/http-pool", response_model=SuccessResponse[dict])
+async def get_http_pool_stats():
+    """
+    函数级注释：查询模型提供商HTTP连接池统计
+    内部逻辑：返回每个模型端点的请求数、新建连接数与连接复用率
+    返回值：SuccessResponse[dict] - 统一格式响应
+    """
+    from app.core.http_pool import http_client_pool
+
+    return SuccessResponse[dict](
+        success=True,
+        data={"http2": http_client_pool.http2_enabled(), "endpoints": http_client_pool.get_stats()},
+        message="查询HTTP连接池统计成功"
+    )
+
+
+@router.get("/model-instances", response_model=SuccessResponse[dict])
+async def get_model_instance_stats():
+    """
+    函数级注释：查询模型实例缓存统计
+    内部逻辑：返回 LLM 与 Embedding 工厂各自的缓存数量、命中与构建次数
+    返回值：SuccessResponse[dict] - 统一格式响应
+    """
+    from app.utils.llm_factory import LLMFactory
+    from app.utils.embedding_factory import EmbeddingFactory
+
+    return SuccessResponse[dict](
+        success=True,
+        data={"llm": LLMFactory.get_cache_stats(), "embedding": EmbeddingFactory.get_cache_stats()},
+        message="查询模型实例缓存统计成功"
+    )
+
+
+@router.get("/config-cache", response_model=SuccessResponse[dict])
+async def get_config_cache_stats():
+    """
+    函数级注释：查询模型配置缓存统计
+    内部逻辑：返回配置缓存的命中、未命中与失效次数，以及跨进程版本检查状态
+    返回值：SuccessResponse[dict] - 统一格式响应
+    """
+    from app.core.config_cache import config_cache
+
+    return SuccessResponse[dict](
+        success=True,
+        data=config_cache.get_stats(),
+        message="查询模型配置缓存统计成功"
+    )
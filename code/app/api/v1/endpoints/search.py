@@ -5,10 +5,10 @@
 内部逻辑：提供纯向量检索接口，不调用大模型生成回答
 """
 
-from fastapi import APIRouter, Body, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, Body, HTTPException, Depends, Query
+from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.schemas.search import SearchResult
+from app.schemas.search import SearchResult, SimilarDocumentResult
 from app.schemas.response import SuccessResponse
 from app.services.search_service import SearchService
 from app.db.session import get_db
@@ -20,6 +20,8 @@ router = APIRouter()
 async def semantic_search(
     query: str = Body(..., embed=True),
     top_k: int = Body(5, embed=True),
+    use_mmr: Optional[bool] = Body(None, embed=True),
+    mmr_lambda: Optional[float] = Body(None, embed=True, ge=0, le=1),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -28,6 +30,8 @@ async def semantic_search(
     参数：
         query: 搜索关键词字符串
         top_k: 需要返回的最相关结果数量
+        use_mmr: 是否启用 MMR 多样化（可选，默认使用全局配置）
+        mmr_lambda: MMR 权衡系数（可选，默认使用全局配置）
         db: 数据库会话（用于查询文件名）
     返回值：SuccessResponse[List[SearchResult]] - 统一格式响应
     """
@@ -36,7 +40,13 @@ async def semantic_search(
 
     try:
         # 内部逻辑：调用搜索服务获取结果（包含文件名）
-        results = await SearchService.semantic_search(search_query, top_k, db=db)
+        results = await SearchService.semantic_search(
+            search_query,
+            top_k,
+            db=db,
+            use_mmr=use_mmr,
+            mmr_lambda=mmr_lambda
+        )
 
         # 内部逻辑：返回统一格式的成功响应
         return SuccessResponse[List[SearchResult]](
@@ -50,3 +60,43 @@ async def semantic_search(
             status_code=500,
             detail=f"搜索失败: {str(e)}"
         )
+
+
+@router.get("/similar/{doc_id}", response_model=SuccessResponse[List[SimilarDocumentResult]])
+async def similar_documents(
+    doc_id: int,
+    top_k: int = Query(5, ge=1, le=50),
+    centroids: int = Query(1, ge=1, le=10),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    函数级注释：查找与指定文档相似的其他文档（More Like This）
+    内部逻辑：使用源文档已存储的片段向量检索，不重新向量化，结果按文档聚合
+    参数：
+        doc_id: 源文档ID
+        top_k: 返回的相似文档数量
+        centroids: 代表向量数量（1 表示片段均值，大于 1 时使用多个质心）
+        db: 数据库会话（用于查询文件名）
+    返回值：SuccessResponse[List[SimilarDocumentResult]] - 统一格式响应
+    """
+    try:
+        results = await SearchService.similar_documents(
+            doc_id,
+            top_k=top_k,
+            n_centroids=centroids,
+            db=db
+        )
+        return SuccessResponse[List[SimilarDocumentResult]](
+            success=True,
+            data=results,
+            message="相似文档检索成功"
+        )
+    except ValueError as e:
+        # 内部逻辑：源文档不存在或没有向量
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        # 内部逻辑：错误处理
+        raise HTTPException(
+            status_code=500,
+            detail=f"相似文档检索失败: {str(e)}"
+        )
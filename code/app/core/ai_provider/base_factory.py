@@ -178,6 +178,29 @@ class BaseAIProviderFactory(AIProviderFactory):
         """
         return params
 
+    @staticmethod
+    def _add_pooled_http_clients(params: Dict[str, Any], client_class: type, default_base_url: str) -> Dict[str, Any]:
+        """
+        函数级注释：为 OpenAI 兼容客户端注入端点共享的 HTTP 客户端（钩子方法中调用）
+        内部逻辑：langchain_openai 的客户端可分别传入同步与异步 httpx 客户端时注入连接池的客户端；
+                 旧版客户端只接受一个同时用于同步与异步调用的客户端，保持由其自行管理连接
+        参数：
+            params - 已构建的参数字典
+            client_class - LLM 或 Embedding 类
+            default_base_url - 未配置 base_url 时使用的默认地址
+        返回值：注入后的参数字典
+        """
+        fields = getattr(client_class, "__fields__", None)
+        if not isinstance(fields, dict) or "http_async_client" not in fields:
+            return params
+
+        from app.core.http_pool import http_client_pool
+
+        base_url = params.get("base_url") or default_base_url
+        params.setdefault("http_client", http_client_pool.get_client(base_url))
+        params.setdefault("http_async_client", http_client_pool.get_async_client(base_url))
+        return params
+
     def _get_default_llm_model(self) -> str:
         """
         函数级注释：获取默认LLM模型名称
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：使用共享连接池的模型客户端模块
+内部逻辑：langchain_community 中的 ChatOllama、OllamaEmbeddings 与 ChatZhipuAI 每次调用都新建
+         requests / aiohttp / httpx 连接，本模块的子类只替换发送请求的部分，改为使用 http_client_pool 的共享客户端，
+         请求参数、响应解析与错误信息与原实现保持一致
+设计模式：适配器模式
+设计原则：开闭原则（只覆盖发送请求的方法）
+
+实现说明：
+    - OpenAI 兼容接口（OpenAI、DeepSeek、月之暗面）的客户端支持直接传入 http_client，无需子类，
+      由 BaseAIProviderFactory._add_pooled_http_clients 注入
+"""
+
+import json
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+from httpx_sse import EventSource
+from langchain_community.chat_models import ChatOllama, ChatZhipuAI
+from langchain_community.chat_models.zhipuai import (
+    _convert_delta_to_message_chunk,
+    _get_jwt_token,
+    _truncate_params,
+)
+from langchain_community.embeddings import OllamaEmbeddings
+from langchain_community.llms.ollama import OllamaEndpointNotFoundError
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import agenerate_from_stream, generate_from_stream
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from app.core.http_pool import http_client_pool
+
+
+def _request_timeout(timeout: Optional[float]) -> Any:
+    """
+    函数级注释：转换模型实例的超时配置
+    参数：
+        timeout - 模型实例配置的超时（None 表示使用连接池默认超时）
+    返回值：httpx 请求超时参数
+    """
+    return httpx.USE_CLIENT_DEFAULT if timeout is None else timeout
+
+
+class PooledChatOllama(ChatOllama):
+    """
+    类级注释：使用共享连接池的 ChatOllama
+    内部逻辑：覆盖 _create_stream / _acreate_stream，其余对话与流式逻辑沿用 ChatOllama
+    """
+
+    def _build_request(self, payload: Any, stop: Optional[List[str]], **kwargs: Any) -> Tuple[Dict, Dict]:
+        """
+        函数级注释：构建请求体与请求头（与 ChatOllama 原实现一致）
+        参数：
+            payload - messages 或 prompt 载荷
+            stop - 停止词
+            **kwargs - 调用参数
+        返回值：Tuple[Dict, Dict] - (请求体, 请求头)
+        """
+        if self.stop is not None and stop is not None:
+            raise ValueError("`stop` found in both the input and default params.")
+        elif self.stop is not None:
+            stop = self.stop
+
+        params = self._default_params
+        for key in self._default_params:
+            if key in kwargs:
+                params[key] = kwargs[key]
+
+        if "options" in kwargs:
+            params["options"] = kwargs["options"]
+        else:
+            params["options"] = {
+                **params["options"],
+                "stop": stop,
+                **{k: v for k, v in kwargs.items() if k not in self._default_params},
+            }
+
+        if payload.get("messages"):
+            request_payload = {"messages": payload.get("messages", []), **params}
+        else:
+            request_payload = {
+                "prompt": payload.get("prompt"),
+                "images": payload.get("images", []),
+                **params,
+            }
+
+        headers = {
+            "Content-Type": "application/json",
+            **(self.headers if isinstance(self.headers, dict) else {}),
+        }
+        return request_payload, headers
+
+    @staticmethod
+    def _check_status(status_code: int, detail: str) -> None:
+        """
+        函数级注释：检查响应状态码
+        异常：OllamaEndpointNotFoundError - 模型不存在；ValueError - 其他错误
+        """
+        if status_code == 404:
+            raise OllamaEndpointNotFoundError(
+                "Ollama call failed with status code 404. "
+                "Maybe your model is not found and you should pull the model with `ollama pull`."
+            )
+        if status_code != 200:
+            raise ValueError(f"Ollama call failed with status code {status_code}. Details: {detail}")
+
+    def _create_stream(
+        self,
+        api_url: str,
+        payload: Any,
+        stop: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> Iterator[str]:
+        """
+        函数级注释：通过共享连接发送流式请求
+        生成值：响应的每一行
+        """
+        request_payload, headers = self._build_request(payload, stop, **kwargs)
+        client = http_client_pool.get_client(api_url)
+        with client.stream(
+            "POST", api_url, json=request_payload, headers=headers, timeout=_request_timeout(self.timeout)
+        ) as response:
+            if response.status_code != 200:
+                self._check_status(response.status_code, response.read().decode("utf-8", "replace"))
+            yield from response.iter_lines()
+
+    async def _acreate_stream(
+        self,
+        api_url: str,
+        payload: Any,
+        stop: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        """
+        函数级注释：通过共享连接发送异步流式请求
+        生成值：响应的每一行
+        """
+        request_payload, headers = self._build_request(payload, stop, **kwargs)
+        client = http_client_pool.get_async_client(api_url)
+        async with client.stream(
+            "POST", api_url, json=request_payload, headers=headers, timeout=_request_timeout(self.timeout)
+        ) as response:
+            if response.status_code != 200:
+                self._check_status(response.status_code, (await response.aread()).decode("utf-8", "replace"))
+            async for line in response.aiter_lines():
+                yield line
+
+
+class PooledOllamaEmbeddings(OllamaEmbeddings):
+    """
+    类级注释：使用共享连接池的 OllamaEmbeddings
+    """
+
+    def _process_emb_response(self, input: str) -> List[float]:
+        """
+        函数级注释：通过共享连接计算单个文本的向量
+        参数：
+            input - 文本
+        返回值：List[float] - 向量
+        """
+        url = f"{self.base_url}/api/embeddings"
+        headers = {"Content-Type": "application/json", **(self.headers or {})}
+        try:
+            response = http_client_pool.get_client(url).post(
+                url,
+                headers=headers,
+                json={"model": self.model, "prompt": input, **self._default_params},
+            )
+        except httpx.HTTPError as e:
+            raise ValueError(f"Error raised by inference endpoint: {e}")
+
+        if response.status_code != 200:
+            raise ValueError(
+                f"Error raised by inference API HTTP code: {response.status_code}, {response.text}"
+            )
+        try:
+            return response.json()["embedding"]
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Error raised by inference API: {e}.\nResponse: {response.text}")
+
+
+class PooledChatZhipuAI(ChatZhipuAI):
+    """
+    类级注释：使用共享连接池的 ChatZhipuAI
+    内部逻辑：覆盖发送请求的四个方法，请求构建与流式数据块转换在辅助方法中共享
+    """
+
+    def _build_request(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]],
+        stream: bool,
+        **kwargs: Any,
+    ) -> Tuple[Dict, Dict]:
+        """
+        函数级注释：构建请求体与请求头（与 ChatZhipuAI 原实现一致）
+        返回值：Tuple[Dict, Dict] - (请求体, 请求头)
+        """
+        if self.zhipuai_api_key is None:
+            raise ValueError("Did not find zhipuai_api_key.")
+        if self.zhipuai_api_base is None:
+            raise ValueError("Did not find zhipu_api_base.")
+
+        message_dicts, params = self._create_message_dicts(messages, stop)
+        payload = {**params, **kwargs, "messages": message_dicts, "stream": stream}
+        _truncate_params(payload)
+        headers = {
+            "Authorization": _get_jwt_token(self.zhipuai_api_key),
+            "Accept": "application/json",
+        }
+        return payload, headers
+
+    @staticmethod
+    def _to_chunk(data: str) -> Tuple[Optional[ChatGenerationChunk], bool]:
+        """
+        函数级注释：将一条 SSE 数据转换为数据块
+        参数：
+            data - SSE 数据
+        返回值：Tuple[Optional[ChatGenerationChunk], bool] - (数据块（无候选时为 None）, 是否结束)
+        """
+        chunk = json.loads(data)
+        if len(chunk["choices"]) == 0:
+            return None, False
+
+        choice = chunk["choices"][0]
+        message = _convert_delta_to_message_chunk(choice["delta"], AIMessageChunk)
+        finish_reason = choice.get("finish_reason", None)
+        generation_info = {"finish_reason": finish_reason} if finish_reason is not None else None
+        return ChatGenerationChunk(message=message, generation_info=generation_info), finish_reason is not None
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        stream: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """
+        函数级注释：通过共享连接生成回答
+        """
+        should_stream = stream if stream is not None else self.streaming
+        if should_stream:
+            return generate_from_stream(self._stream(messages, stop=stop, run_manager=run_manager, **kwargs))
+
+        payload, headers = self._build_request(messages, stop, False, **kwargs)
+        client = http_client_pool.get_client(self.zhipuai_api_base)
+        response = client.post(self.zhipuai_api_base, json=payload, headers=headers, timeout=60)
+        response.raise_for_status()
+        return self._create_chat_result(response.json())
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """
+        函数级注释：通过共享连接流式生成回答
+        """
+        payload, headers = self._build_request(messages, stop, True, **kwargs)
+        client = http_client_pool.get_client(self.zhipuai_api_base)
+        with client.stream("POST", self.zhipuai_api_base, json=payload, headers=headers, timeout=60) as response:
+            for sse in EventSource(response).iter_sse():
+                chunk, finished = self._to_chunk(sse.data)
+                if chunk is None:
+                    continue
+                yield chunk
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                if finished:
+                    break
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        stream: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """
+        函数级注释：通过共享连接异步生成回答
+        """
+        should_stream = stream if stream is not None else self.streaming
+        if should_stream:
+            return await agenerate_from_stream(
+                self._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            )
+
+        payload, headers = self._build_request(messages, stop, False, **kwargs)
+        client = http_client_pool.get_async_client(self.zhipuai_api_base)
+        response = await client.post(self.zhipuai_api_base, json=payload, headers=headers, timeout=60)
+        response.raise_for_status()
+        return self._create_chat_result(response.json())
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        """
+        函数级注释：通过共享连接异步流式生成回答
+        """
+        payload, headers = self._build_request(messages, stop, True, **kwargs)
+        client = http_client_pool.get_async_client(self.zhipuai_api_base)
+        async with client.stream(
+            "POST", self.zhipuai_api_base, json=payload, headers=headers, timeout=60
+        ) as response:
+            async for sse in EventSource(response).aiter_sse():
+                chunk, finished = self._to_chunk(sse.data)
+                if chunk is None:
+                    continue
+                yield chunk
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                if finished:
+                    break
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'PooledChatOllama',
+    'PooledOllamaEmbeddings',
+    'PooledChatZhipuAI',
+]
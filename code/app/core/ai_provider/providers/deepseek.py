@@ -54,16 +54,16 @@ class DeepSeekProviderFactory(BaseAIProviderFactory):
         return OpenAIEmbeddings
 
     def _customize_llm_params(self, params: dict, config: AIProviderConfig) -> dict:
-        """函数级注释：自定义LLM参数"""
+        """函数级注释：自定义LLM参数（复用端点共享连接）"""
         if "base_url" not in params:
             params["base_url"] = config.base_url or self.DEFAULT_BASE_URL
-        return params
+        return self._add_pooled_http_clients(params, self._get_llm_class(), self.DEFAULT_BASE_URL)
 
     def _customize_embedding_params(self, params: dict, config: AIProviderConfig) -> dict:
-        """函数级注释：自定义Embedding参数"""
+        """函数级注释：自定义Embedding参数（复用端点共享连接）"""
         if "base_url" not in params:
             params["base_url"] = config.base_url or self.DEFAULT_BASE_URL
-        return params
+        return self._add_pooled_http_clients(params, self._get_embedding_class(), self.DEFAULT_BASE_URL)
 
     def supports_component(self, component_type: AIComponentType) -> bool:
         """
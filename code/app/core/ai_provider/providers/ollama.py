@@ -39,26 +39,18 @@ class OllamaProviderFactory(BaseAIProviderFactory):
     def _get_llm_class(self) -> type:
         """
         函数级注释：获取Ollama LLM类
-        返回值：ChatOllama类
+        返回值：使用共享连接池的ChatOllama类
         """
-        try:
-            from langchain_community.chat_models import ChatOllama
-        except ImportError:
-            from langchain_community.chat_models import ChatOllama as ChatOllamaImport
-            ChatOllama = ChatOllamaImport
-        return ChatOllama
+        from app.core.ai_provider.pooled_clients import PooledChatOllama
+        return PooledChatOllama
 
     def _get_embedding_class(self) -> type:
         """
         函数级注释：获取Ollama Embedding类
-        返回值：OllamaEmbeddings类
+        返回值：使用共享连接池的OllamaEmbeddings类
         """
-        try:
-            from langchain_community.embeddings import OllamaEmbeddings
-        except ImportError:
-            from langchain_community.embeddings import OllamaEmbeddings as OllamaEmbeddingsImport
-            OllamaEmbeddings = OllamaEmbeddingsImport
-        return OllamaEmbeddings
+        from app.core.ai_provider.pooled_clients import PooledOllamaEmbeddings
+        return PooledOllamaEmbeddings
 
     def _customize_llm_params(self, params: dict, config: AIProviderConfig) -> dict:
         """
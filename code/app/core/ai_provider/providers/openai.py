@@ -34,6 +34,9 @@ class OpenAIProviderFactory(BaseAIProviderFactory):
     # 内部变量：OpenAI需要api_key
     REQUIRES_API_KEY = True
 
+    # 内部变量：默认base_url
+    DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
     def _get_llm_class(self) -> type:
         """函数级注释：获取OpenAI LLM类"""
         try:
@@ -50,5 +53,13 @@ class OpenAIProviderFactory(BaseAIProviderFactory):
             from langchain.embeddings import OpenAIEmbeddings
         return OpenAIEmbeddings
 
+    def _customize_llm_params(self, params: dict, config: AIProviderConfig) -> dict:
+        """函数级注释：自定义LLM参数（复用端点共享连接）"""
+        return self._add_pooled_http_clients(params, self._get_llm_class(), self.DEFAULT_BASE_URL)
+
+    def _customize_embedding_params(self, params: dict, config: AIProviderConfig) -> dict:
+        """函数级注释：自定义Embedding参数（复用端点共享连接）"""
+        return self._add_pooled_http_clients(params, self._get_embedding_class(), self.DEFAULT_BASE_URL)
+
 
 __all__ = ['OpenAIProviderFactory']
@@ -38,11 +38,11 @@ class ZhipuAIProviderFactory(BaseAIProviderFactory):
     def _get_llm_class(self) -> type:
         """
         函数级注释：获取智谱AI LLM类
-        返回值：ChatZhipuAI类或ZhipuAI类
+        返回值：使用共享连接池的ChatZhipuAI类或ZhipuAI类
         """
         try:
-            from langchain_community.chat_models import ChatZhipuAI
-            return ChatZhipuAI
+            from app.core.ai_provider.pooled_clients import PooledChatZhipuAI
+            return PooledChatZhipuAI
         except ImportError:
             # 内部逻辑：返回备用的ZhipuAI类（用于直接创建）
             from zhipuai import ZhipuAI
@@ -93,20 +93,20 @@ class ZhipuAIProviderFactory(BaseAIProviderFactory):
     def create_llm(self, config: AIProviderConfig) -> Any:
         """
         函数级注释：创建智谱AI LLM实例（覆盖基类方法）
-        内部逻辑：智谱AI有特殊的导入处理逻辑
+        内部逻辑：智谱AI有特殊的导入处理逻辑，优先使用共享连接池的 ChatZhipuAI
         参数：
             config - 提供商配置
         返回值：LLM实例
         """
         try:
-            from langchain_community.chat_models import ChatZhipuAI
+            from app.core.ai_provider.pooled_clients import PooledChatZhipuAI
         except ImportError:
             from zhipuai import ZhipuAI
             return ZhipuAI(api_key=config.api_key, model=config.model or "glm-4")
 
         # 内部逻辑：使用模板方法构建参数
         params = self._build_llm_params(config)
-        return ChatZhipuAI(**params)
+        return PooledChatZhipuAI(**params)
 
 
 __all__ = ['ZhipuAIProviderFactory']
@@ -7,15 +7,144 @@
 设计模式：模板方法模式、单例模式（实例缓存）、泛型设计
 设计原则：DRY（不重复）、开闭原则（对扩展开放）、SOLID（依赖倒置）
 参考项目：easy-dataset-file
+
+实现说明：
+    - 每个工厂子类拥有独立的实例缓存，容量由 MODEL_INSTANCE_CACHE_SIZE 限制，超出后淘汰最久未使用的实例
+    - 流式与非流式实例分别缓存（流式实例的键带 #streaming 后缀）
+    - 运行时配置变化时只失效旧配置对应的实例，配置未变化（如每次请求重复注入）时保留缓存
 """
 
+import threading
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, TypeVar, Generic, Set
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Dict, Any, Callable, Iterator, Optional, TypeVar, Generic, Set
 from loguru import logger
 
 # 内部变量：泛型类型 T，表示 LLM 或 Embedding 实例类型
 T = TypeVar('T')
 
+# 内部变量：流式实例缓存键后缀
+STREAMING_KEY_SUFFIX = "#streaming"
+
+
+class InstanceCache(MutableMapping):
+    """
+    类级注释：有界、线程安全的实例缓存（最近最少使用淘汰）
+    内部逻辑：兼容字典接口，并记录命中、构建、淘汰与失效次数
+    """
+
+    def __init__(self, owner: str, max_size: Optional[int] = None):
+        """
+        函数级注释：初始化实例缓存
+        参数：
+            owner - 所属工厂名称（用于日志）
+            max_size - 最大容量（None 表示读取 MODEL_INSTANCE_CACHE_SIZE 配置）
+        """
+        self.owner = owner
+        self._max_size = max_size
+        self._items: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.constructions = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def max_size(self) -> int:
+        """
+        函数级注释：获取最大容量
+        """
+        if self._max_size is not None:
+            return self._max_size
+        from app.core.config import settings
+        return settings.MODEL_INSTANCE_CACHE_SIZE
+
+    @property
+    def lock(self) -> threading.RLock:
+        """
+        函数级注释：获取缓存锁（构建实例时持有，避免并发重复构建）
+        """
+        return self._lock
+
+    def __getitem__(self, key: str) -> Any:
+        with self._lock:
+            value = self._items[key]
+            self._items.move_to_end(key)
+            return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                evicted, _ = self._items.popitem(last=False)
+                self.evictions += 1
+                logger.debug(f"{self.owner}实例缓存已满，淘汰: {evicted}")
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock:
+            del self._items[key]
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._items))
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._items
+
+    def get_or_create(self, key: str, builder: Callable[[], Any]) -> Any:
+        """
+        函数级注释：获取缓存实例，不存在时构建并缓存
+        内部逻辑：持有锁构建，并发的相同请求只构建一次
+        参数：
+            key - 缓存键
+            builder - 构建实例的无参函数
+        返回值：实例
+        """
+        with self._lock:
+            if key in self._items:
+                self.hits += 1
+                return self[key]
+
+            instance = builder()
+            self.constructions += 1
+            self[key] = instance
+            return instance
+
+    def discard(self, *keys: str) -> int:
+        """
+        函数级注释：移除指定的缓存项（不存在的键忽略）
+        参数：
+            *keys - 缓存键
+        返回值：int - 移除的数量
+        """
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._items.pop(key, None) is not None:
+                    removed += 1
+            self.invalidations += removed
+            return removed
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        函数级注释：获取缓存统计
+        返回值：Dict[str, int] - 当前数量、容量、命中、构建、淘汰与失效次数
+        """
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "constructions": self.constructions,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
 
 class BaseFactory(ABC, Generic[T]):
     """
@@ -42,25 +171,36 @@ class BaseFactory(ABC, Generic[T]):
     # 内部类变量：运行时配置缓存（支持热切换）
     _runtime_config: Optional[Dict[str, Any]] = None
 
-    # 内部类变量：实例缓存（避免重复创建，单例模式的变体）
-    _instance_cache: Dict[str, T] = {}
+    # 内部类变量：实例缓存（避免重复创建，单例模式的变体；每个子类独立一份）
+    _instance_cache: InstanceCache = InstanceCache("BaseFactory")
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        函数级注释：为每个工厂子类创建独立的实例缓存
+        """
+        super().__init_subclass__(**kwargs)
+        cls._instance_cache = InstanceCache(cls.__name__)
 
     @classmethod
     def set_runtime_config(cls, config: Dict[str, Any]) -> None:
         """
-        函数级注释：设置运行时配置并清除实例缓存
+        函数级注释：设置运行时配置并失效旧配置的实例
 
         配置优先级说明：
             运行时配置（数据库注入）是最高优先级配置来源。
             通过此方法设置的配置将覆盖所有其他配置来源。
 
-        内部逻辑：更新配置 -> 清除所有缓存的实例 -> 记录日志
+        内部逻辑：配置未变化时直接返回（保留缓存） -> 失效旧配置对应的实例 -> 更新配置 -> 记录日志
         参数：
             config: 配置字典，包含 provider、model、endpoint、api_key 等
                    来源：数据库模型配置（ModelConfig 或 EmbeddingConfig）
         """
-        cls._runtime_config = config
-        cls._instance_cache.clear()
+        # Guard Clause：配置未变化（如每次请求都从数据库注入相同配置）
+        if cls._runtime_config == config:
+            return
+
+        cls.invalidate(cls._resolve_config())
+        cls._runtime_config = dict(config)
         provider = config.get('provider', 'unknown')
         # 内部逻辑：添加诊断日志 - 记录完整的运行时配置
         logger.info(f"[配置优先级] 运行时配置已更新（优先级: ★★★★★ 数据库模型配置）")
@@ -155,6 +295,48 @@ class BaseFactory(ABC, Generic[T]):
         model = config.get("model", "unknown")
         return f"{provider}_{model}"
 
+    @classmethod
+    def current_cache_key(cls) -> str:
+        """
+        函数级注释：获取当前生效配置的缓存键
+        内部逻辑：依赖本工厂实例的对象可据此判断配置是否已切换
+        返回值：缓存键字符串
+        """
+        return cls._get_cache_key(cls._resolve_config())
+
+    @classmethod
+    def _get_or_create(cls, cache_key: str, builder: Callable[[], T]) -> T:
+        """
+        函数级注释：从本工厂的缓存获取实例，不存在时构建并缓存
+        参数：
+            cache_key: 缓存键
+            builder: 构建实例的无参函数
+        返回值：实例
+        """
+        return cls._instance_cache.get_or_create(cache_key, builder)
+
+    @classmethod
+    def invalidate(cls, config: Optional[Dict[str, Any]] = None) -> int:
+        """
+        函数级注释：失效指定配置的缓存实例（包括流式与非流式实例）
+        参数：
+            config: 配置字典（None 表示当前生效的配置）
+        返回值：int - 失效的实例数量
+        """
+        cache_key = cls._get_cache_key(config if config is not None else cls._resolve_config())
+        removed = cls._instance_cache.discard(cache_key, cache_key + STREAMING_KEY_SUFFIX)
+        if removed:
+            logger.info(f"{cls.__name__}已失效 {removed} 个缓存实例: {cache_key}")
+        return removed
+
+    @classmethod
+    def get_cache_stats(cls) -> Dict[str, int]:
+        """
+        函数级注释：获取本工厂的实例缓存统计（构建次数可用于确认缓存是否生效）
+        返回值：Dict[str, int] - 当前数量、容量、命中、构建、淘汰与失效次数
+        """
+        return cls._instance_cache.get_stats()
+
     @classmethod
     def _is_supported_provider(cls, provider: str) -> bool:
         """
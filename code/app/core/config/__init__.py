@@ -16,6 +16,8 @@ from app.core.config.llm_config import LLMConfig
 from app.core.config.db_config import DatabaseConfig
 from app.core.config.storage_config import StorageConfig
 from app.core.config.security_config import SecurityConfig
+from app.core.config.retrieval_config import RetrievalConfig
+from app.core.config.task_config import TaskConfig
 from app.core.config.validators import (
     DatabaseProviderValidator,
     LLMProviderValidator,
@@ -36,6 +38,8 @@ __all__ = [
     'DatabaseConfig',
     'StorageConfig',
     'SecurityConfig',
+    'RetrievalConfig',
+    'TaskConfig',
     # 验证器
     'DatabaseProviderValidator',
     'LLMProviderValidator',
@@ -42,6 +42,10 @@ class APIConfig(BaseSettings):
     V1_STR: str = "/api/v1"
     # 服务运行端口
     PORT: int = 8010
+    # 流式回答帧合并时间窗口（毫秒，0 表示逐片段发送）
+    SSE_COALESCE_WINDOW_MS: int = 8
+    # 流式回答帧合并字节数阈值（累积达到后立即发送）
+    SSE_COALESCE_MAX_BYTES: int = 512
 
     @field_validator("ENV")
     @classmethod
@@ -56,6 +60,18 @@ class APIConfig(BaseSettings):
             raise ValueError(f"无效的运行环境: {v}. 支持: {valid_envs}")
         return v
 
+    @field_validator("SSE_COALESCE_WINDOW_MS", "SSE_COALESCE_MAX_BYTES")
+    @classmethod
+    def validate_sse_coalesce(cls, v: int) -> int:
+        """
+        函数级注释：验证流式回答帧合并参数
+        参数：v - 参数值
+        返回值：验证后的值
+        """
+        if v < 0:
+            raise ValueError(f"流式帧合并参数不能为负数: {v}")
+        return v
+
 
 # 内部变量：导出所有公共接口
 __all__ = ['APIConfig']
@@ -18,6 +18,8 @@ from app.core.config.llm_config import LLMConfig
 from app.core.config.db_config import DatabaseConfig
 from app.core.config.storage_config import StorageConfig
 from app.core.config.security_config import SecurityConfig
+from app.core.config.retrieval_config import RetrievalConfig
+from app.core.config.task_config import TaskConfig
 
 
 class Settings(BaseSettings):
@@ -64,6 +66,12 @@ class Settings(BaseSettings):
     # 安全配置（敏感信息过滤）
     security_config: SecurityConfig = SecurityConfig()
 
+    # 检索配置（MMR多样化等）
+    retrieval_config: RetrievalConfig = RetrievalConfig()
+
+    # 任务调度配置（文档预生成、请求合并等）
+    task_config: TaskConfig = TaskConfig()
+
     # 调试与Mock配置
     USE_MOCK: bool = False
 
@@ -101,6 +109,16 @@ class Settings(BaseSettings):
         """获取服务端口"""
         return self.app_config.PORT
 
+    @property
+    def SSE_COALESCE_WINDOW_MS(self) -> int:
+        """获取流式回答帧合并时间窗口（毫秒）"""
+        return self.app_config.SSE_COALESCE_WINDOW_MS
+
+    @property
+    def SSE_COALESCE_MAX_BYTES(self) -> int:
+        """获取流式回答帧合并字节数阈值"""
+        return self.app_config.SSE_COALESCE_MAX_BYTES
+
     @property
     def BACKEND_CORS_ORIGINS(self) -> List[AnyHttpUrl]:
         """获取跨域来源列表"""
@@ -132,6 +150,26 @@ class Settings(BaseSettings):
         """获取向量数据库集合名称"""
         return self.storage_config.CHROMA_COLLECTION_NAME
 
+    @property
+    def CHROMA_HNSW_SPACE(self) -> str:
+        """获取HNSW距离度量"""
+        return self.storage_config.CHROMA_HNSW_SPACE
+
+    @property
+    def CHROMA_HNSW_M(self) -> int:
+        """获取HNSW最大连接数"""
+        return self.storage_config.CHROMA_HNSW_M
+
+    @property
+    def CHROMA_HNSW_CONSTRUCTION_EF(self) -> int:
+        """获取HNSW建索引候选队列大小"""
+        return self.storage_config.CHROMA_HNSW_CONSTRUCTION_EF
+
+    @property
+    def CHROMA_HNSW_SEARCH_EF(self) -> int:
+        """获取HNSW查询候选队列大小"""
+        return self.storage_config.CHROMA_HNSW_SEARCH_EF
+
     @property
     def UPLOAD_FILES_PATH(self) -> str:
         """获取文件上传路径"""
@@ -163,6 +201,228 @@ class Settings(BaseSettings):
         """获取是否过滤邮箱"""
         return self.security_config.FILTER_EMAIL
 
+    @property
+    def FILTER_ID_CARD(self) -> bool:
+        """获取是否过滤身份证号"""
+        return self.security_config.FILTER_ID_CARD
+
+    @property
+    def FILTER_BANK_CARD(self) -> bool:
+        """获取是否过滤银行卡号"""
+        return self.security_config.FILTER_BANK_CARD
+
+    # 检索配置属性访问器
+    @property
+    def ENABLE_MMR(self) -> bool:
+        """获取是否默认启用MMR多样化"""
+        return self.retrieval_config.ENABLE_MMR
+
+    @property
+    def MMR_LAMBDA(self) -> float:
+        """获取MMR权衡系数"""
+        return self.retrieval_config.MMR_LAMBDA
+
+    @property
+    def MMR_FETCH_K(self) -> int:
+        """获取MMR候选集大小"""
+        return self.retrieval_config.MMR_FETCH_K
+
+    @property
+    def RERANKER_MODEL_PATH(self) -> str:
+        """获取交叉编码器重排序模型目录"""
+        return self.retrieval_config.RERANKER_MODEL_PATH
+
+    @property
+    def RERANKER_BACKEND(self) -> str:
+        """获取重排序推理后端"""
+        return self.retrieval_config.RERANKER_BACKEND
+
+    @property
+    def RERANKER_ONNX_FILE(self) -> str:
+        """获取重排序ONNX模型文件名"""
+        return self.retrieval_config.RERANKER_ONNX_FILE
+
+    @property
+    def RERANKER_MAX_LENGTH(self) -> int:
+        """获取重排序最大序列长度"""
+        return self.retrieval_config.RERANKER_MAX_LENGTH
+
+    @property
+    def RERANKER_TIMEOUT_MS(self) -> int:
+        """获取重排序超时时间（毫秒）"""
+        return self.retrieval_config.RERANKER_TIMEOUT_MS
+
+    @property
+    def RERANKER_CACHE_SIZE(self) -> int:
+        """获取重排序分数缓存条目数"""
+        return self.retrieval_config.RERANKER_CACHE_SIZE
+
+    @property
+    def RERANKER_NUM_THREADS(self) -> int:
+        """获取重排序推理线程数"""
+        return self.retrieval_config.RERANKER_NUM_THREADS
+
+    @property
+    def ENABLE_TWO_STAGE_RETRIEVAL(self) -> bool:
+        """获取是否启用两阶段检索"""
+        return self.retrieval_config.ENABLE_TWO_STAGE_RETRIEVAL
+
+    @property
+    def TWO_STAGE_TOP_DOCS(self) -> int:
+        """获取两阶段检索第一阶段文档数"""
+        return self.retrieval_config.TWO_STAGE_TOP_DOCS
+
+    @property
+    def CONTEXT_TOKEN_BUDGET(self) -> int:
+        """获取提示词上下文默认Token预算"""
+        return self.retrieval_config.CONTEXT_TOKEN_BUDGET
+
+    @property
+    def CONTEXT_MODEL_BUDGETS(self) -> str:
+        """获取按模型覆盖的Token预算"""
+        return self.retrieval_config.CONTEXT_MODEL_BUDGETS
+
+    @property
+    def CONTEXT_HISTORY_RATIO(self) -> float:
+        """获取对话历史最多占用的预算比例"""
+        return self.retrieval_config.CONTEXT_HISTORY_RATIO
+
+    @property
+    def CONTEXT_CANDIDATE_K(self) -> int:
+        """获取参与上下文打包的候选片段数"""
+        return self.retrieval_config.CONTEXT_CANDIDATE_K
+
+    @property
+    def ENABLE_CONTEXT_COMPRESSION(self) -> bool:
+        """获取是否默认启用参考资料抽取式压缩"""
+        return self.retrieval_config.ENABLE_CONTEXT_COMPRESSION
+
+    @property
+    def CONTEXT_COMPRESSION_RATIO(self) -> float:
+        """获取参考资料压缩后每个片段保留的 Token 比例"""
+        return self.retrieval_config.CONTEXT_COMPRESSION_RATIO
+
+    @property
+    def CONTEXT_COMPRESSION_MIN_TOKENS(self) -> int:
+        """获取不参与压缩的片段 Token 数上限"""
+        return self.retrieval_config.CONTEXT_COMPRESSION_MIN_TOKENS
+
+    @property
+    def TOKENIZER_PATH(self) -> str:
+        """获取Token计数使用的本地分词器路径"""
+        return self.retrieval_config.TOKENIZER_PATH
+
+    @property
+    def ENABLE_ANSWER_CACHE(self) -> bool:
+        """获取是否启用语义答案缓存"""
+        return self.retrieval_config.ENABLE_ANSWER_CACHE
+
+    @property
+    def ANSWER_CACHE_THRESHOLD(self) -> float:
+        """获取语义答案缓存相似度阈值"""
+        return self.retrieval_config.ANSWER_CACHE_THRESHOLD
+
+    @property
+    def ANSWER_CACHE_SIZE(self) -> int:
+        """获取语义答案缓存最大条目数"""
+        return self.retrieval_config.ANSWER_CACHE_SIZE
+
+    @property
+    def ANSWER_CACHE_TTL(self) -> int:
+        """获取语义答案缓存条目有效期（秒）"""
+        return self.retrieval_config.ANSWER_CACHE_TTL
+
+    @property
+    def ENABLE_PARENT_CHILD_CHUNKING(self) -> bool:
+        """获取是否启用父子片段入库"""
+        return self.retrieval_config.ENABLE_PARENT_CHILD_CHUNKING
+
+    @property
+    def PARENT_CHUNK_SIZE(self) -> int:
+        """获取父片段长度"""
+        return self.retrieval_config.PARENT_CHUNK_SIZE
+
+    @property
+    def CHILD_CHUNK_SIZE(self) -> int:
+        """获取子片段长度"""
+        return self.retrieval_config.CHILD_CHUNK_SIZE
+
+    @property
+    def CHILD_CHUNK_OVERLAP(self) -> int:
+        """获取相邻子片段重叠长度"""
+        return self.retrieval_config.CHILD_CHUNK_OVERLAP
+
+    @property
+    def ENABLE_MULTI_QUERY(self) -> bool:
+        """获取是否默认启用多查询检索"""
+        return self.retrieval_config.ENABLE_MULTI_QUERY
+
+    @property
+    def MULTI_QUERY_MODE(self) -> str:
+        """获取查询变体生成方式"""
+        return self.retrieval_config.MULTI_QUERY_MODE
+
+    @property
+    def MULTI_QUERY_VARIANTS(self) -> int:
+        """获取查询变体数"""
+        return self.retrieval_config.MULTI_QUERY_VARIANTS
+
+    @property
+    def MULTI_QUERY_BUDGET_MS(self) -> int:
+        """获取多查询检索延迟预算（毫秒）"""
+        return self.retrieval_config.MULTI_QUERY_BUDGET_MS
+
+    @property
+    def MULTI_QUERY_RRF_K(self) -> int:
+        """获取倒数排名融合平滑常数"""
+        return self.retrieval_config.MULTI_QUERY_RRF_K
+
+    @property
+    def ENABLE_CONVERSATION_CACHE(self) -> bool:
+        """获取是否启用会话检索工作集"""
+        return self.retrieval_config.ENABLE_CONVERSATION_CACHE
+
+    @property
+    def CONVERSATION_CACHE_THRESHOLD(self) -> float:
+        """获取会话工作集相似度阈值"""
+        return self.retrieval_config.CONVERSATION_CACHE_THRESHOLD
+
+    @property
+    def CONVERSATION_CACHE_MAX_CHUNKS(self) -> int:
+        """获取每个会话工作集最多保存的片段数"""
+        return self.retrieval_config.CONVERSATION_CACHE_MAX_CHUNKS
+
+    @property
+    def CONVERSATION_CACHE_MAX_CONVERSATIONS(self) -> int:
+        """获取最多保存工作集的会话数"""
+        return self.retrieval_config.CONVERSATION_CACHE_MAX_CONVERSATIONS
+
+    @property
+    def CONVERSATION_CACHE_TTL(self) -> int:
+        """获取会话工作集有效期（秒）"""
+        return self.retrieval_config.CONVERSATION_CACHE_TTL
+
+    # 任务调度配置属性访问器
+    @property
+    def ENABLE_DOCUMENT_INSIGHTS(self) -> bool:
+        """获取是否在入库后预生成文档摘要、关键词与简介"""
+        return self.task_config.ENABLE_DOCUMENT_INSIGHTS
+
+    @property
+    def INSIGHT_THROTTLE_SECONDS(self) -> float:
+        """获取后台预生成相邻文档之间的最小间隔（秒）"""
+        return self.task_config.INSIGHT_THROTTLE_SECONDS
+
+    @property
+    def INSIGHT_IDLE_SECONDS(self) -> float:
+        """获取后台预生成前要求的对话空闲时间（秒）"""
+        return self.task_config.INSIGHT_IDLE_SECONDS
+
+    @property
+    def ENABLE_REQUEST_COALESCING(self) -> bool:
+        """获取是否合并进行中的相同请求"""
+        return self.task_config.ENABLE_REQUEST_COALESCING
+
     # LLM配置属性访问器（向后兼容）
     @property
     def OLLAMA_BASE_URL(self) -> str:
@@ -299,6 +559,56 @@ class Settings(BaseSettings):
         """获取重排序模型"""
         return self.llm_config.RERANKING_MODEL
 
+    @property
+    def HTTP_POOL_MAX_CONNECTIONS(self) -> int:
+        """获取每个模型端点的最大连接数"""
+        return self.llm_config.HTTP_POOL_MAX_CONNECTIONS
+
+    @property
+    def HTTP_POOL_MAX_KEEPALIVE(self) -> int:
+        """获取每个模型端点保持的最大空闲连接数"""
+        return self.llm_config.HTTP_POOL_MAX_KEEPALIVE
+
+    @property
+    def HTTP_POOL_KEEPALIVE_EXPIRY(self) -> float:
+        """获取空闲连接保持时间（秒）"""
+        return self.llm_config.HTTP_POOL_KEEPALIVE_EXPIRY
+
+    @property
+    def HTTP_POOL_TIMEOUT(self) -> float:
+        """获取模型请求默认超时时间（秒）"""
+        return self.llm_config.HTTP_POOL_TIMEOUT
+
+    @property
+    def HTTP_POOL_HTTP2(self) -> bool:
+        """获取是否对支持的端点启用HTTP/2"""
+        return self.llm_config.HTTP_POOL_HTTP2
+
+    @property
+    def MODEL_INSTANCE_CACHE_SIZE(self) -> int:
+        """获取每个工厂最多缓存的模型实例数"""
+        return self.llm_config.MODEL_INSTANCE_CACHE_SIZE
+
+    @property
+    def AGENT_TOOL_TIMEOUT(self) -> float:
+        """获取 Agent 单个工具调用超时（秒）"""
+        return self.llm_config.AGENT_TOOL_TIMEOUT
+
+    @property
+    def SUMMARY_GROUP_CHARS(self) -> int:
+        """获取文档总结片段组的最大字符数"""
+        return self.llm_config.SUMMARY_GROUP_CHARS
+
+    @property
+    def SUMMARY_MAX_CONCURRENCY(self) -> int:
+        """获取文档总结的最大并发数"""
+        return self.llm_config.SUMMARY_MAX_CONCURRENCY
+
+    @property
+    def CONFIG_CACHE_SYNC_SECONDS(self) -> float:
+        """获取多进程部署时检查配置版本的间隔（秒）"""
+        return self.llm_config.CONFIG_CACHE_SYNC_SECONDS
+
     # 数据库配置属性访问器（向后兼容）
     @property
     def DB_HOST(self) -> str:
@@ -81,6 +81,28 @@ class LLMConfig(BaseSettings):
     ENABLE_RERANKING: bool = True
     RERANKING_MODEL: str = "BAAI/bge-reranker-large"
 
+    # 模型提供商HTTP连接池配置（同一端点的所有模型实例共享连接）
+    HTTP_POOL_MAX_CONNECTIONS: int = 100
+    HTTP_POOL_MAX_KEEPALIVE: int = 20
+    HTTP_POOL_KEEPALIVE_EXPIRY: float = 60.0
+    HTTP_POOL_TIMEOUT: float = 120.0
+    HTTP_POOL_HTTP2: bool = False
+
+    # 每个工厂（LLM / Embedding）最多缓存的模型实例数（流式与非流式分别计数）
+    MODEL_INSTANCE_CACHE_SIZE: int = 8
+
+    # Agent 单个工具调用超时（秒），同一步的多个工具调用并发执行
+    AGENT_TOOL_TIMEOUT: float = 30.0
+
+    # 文档总结时每个片段组的最大字符数（片段组并行总结后逐层归并）
+    SUMMARY_GROUP_CHARS: int = 4000
+
+    # 文档总结时并发调用大模型的最大数量
+    SUMMARY_MAX_CONCURRENCY: int = 4
+
+    # 多进程部署时检查模型配置版本的间隔（秒，0 表示不检查，仅本进程写入配置时失效缓存）
+    CONFIG_CACHE_SYNC_SECONDS: float = 0.0
+
     @field_validator("provider")
     @classmethod
     def validate_provider(cls, v: str) -> str:
@@ -106,6 +128,67 @@ class LLMConfig(BaseSettings):
             raise ValueError(f"GPU内存利用率必须在0-1之间: {v}")
         return v
 
+    @field_validator("HTTP_POOL_MAX_CONNECTIONS", "HTTP_POOL_MAX_KEEPALIVE",
+                     "HTTP_POOL_KEEPALIVE_EXPIRY", "HTTP_POOL_TIMEOUT")
+    @classmethod
+    def validate_http_pool(cls, v: Union[int, float]) -> Union[int, float]:
+        """
+        函数级注释：验证HTTP连接池参数
+        参数：v - 参数值
+        返回值：验证后的值
+        """
+        if v <= 0:
+            raise ValueError(f"HTTP连接池参数必须为正数: {v}")
+        return v
+
+    @field_validator("MODEL_INSTANCE_CACHE_SIZE")
+    @classmethod
+    def validate_instance_cache_size(cls, v: int) -> int:
+        """
+        函数级注释：验证模型实例缓存容量
+        参数：v - 缓存容量
+        返回值：验证后的值
+        """
+        if v <= 0:
+            raise ValueError(f"模型实例缓存容量必须为正整数: {v}")
+        return v
+
+    @field_validator("AGENT_TOOL_TIMEOUT")
+    @classmethod
+    def validate_agent_tool_timeout(cls, v: float) -> float:
+        """
+        函数级注释：验证 Agent 工具调用超时
+        参数：v - 超时秒数
+        返回值：验证后的值
+        """
+        if v <= 0:
+            raise ValueError(f"Agent 工具调用超时必须大于 0: {v}")
+        return v
+
+    @field_validator("SUMMARY_GROUP_CHARS", "SUMMARY_MAX_CONCURRENCY")
+    @classmethod
+    def validate_summary_positive(cls, v: int) -> int:
+        """
+        函数级注释：验证文档总结参数
+        参数：v - 参数值
+        返回值：验证后的值
+        """
+        if v <= 0:
+            raise ValueError(f"文档总结参数必须为正整数: {v}")
+        return v
+
+    @field_validator("CONFIG_CACHE_SYNC_SECONDS")
+    @classmethod
+    def validate_config_cache_sync(cls, v: float) -> float:
+        """
+        函数级注释：验证配置版本检查间隔
+        参数：v - 秒数
+        返回值：验证后的值
+        """
+        if v < 0:
+            raise ValueError(f"配置版本检查间隔不能为负数: {v}")
+        return v
+
     # ========================================================================
     # 智谱AI配置计算属性（实现配置分离与回退逻辑）
     # ========================================================================
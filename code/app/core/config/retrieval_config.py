@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：检索配置模块
+内部逻辑：管理向量检索阶段的相关配置（MMR多样化、交叉编码器重排序、两阶段检索、上下文打包等）
+设计模式：建造者模式
+设计原则：单一职责原则
+"""
+
+from pydantic import field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class RetrievalConfig(BaseSettings):
+    """
+    类级注释：检索配置类
+
+    配置优先级（从高到低）：
+        1. 请求参数：单次请求中显式传入的检索参数
+        2. 环境变量：系统环境变量或 docker run -e 注入
+        3. 配置文件：.env.prod（生产）或 .env（开发）
+        4. 代码默认值：本类属性定义的默认值
+
+    职责：
+        1. 管理最大边际相关性（MMR）多样化开关
+        2. 管理 MMR 的相关性/多样性权衡系数与候选集大小
+        3. 管理本地交叉编码器重排序模型、序列长度、超时与缓存
+        4. 管理基于文档质心的两阶段检索
+        5. 管理提示词上下文的 Token 预算与参考资料压缩
+        6. 管理多查询检索的变体生成方式、变体数与延迟预算
+        7. 管理会话检索工作集的阈值与容量
+    """
+
+    # 内部逻辑：配置Settings，从环境变量读取配置
+    model_config = SettingsConfigDict(case_sensitive=True, extra="ignore")
+
+    # 是否默认启用 MMR 多样化（请求未指定时使用）
+    ENABLE_MMR: bool = False
+
+    # MMR 权衡系数（1=只看相关性，0=只看多样性）
+    MMR_LAMBDA: float = 0.5
+
+    # MMR 候选集大小（从向量库取回的候选片段数）
+    MMR_FETCH_K: int = 20
+
+    # 交叉编码器重排序模型的本地目录（为空时使用 embedding 轻量级重排序）
+    RERANKER_MODEL_PATH: str = ""
+
+    # 推理后端：auto（优先 ONNX）/ onnx / torch
+    # ONNX 后端需安装 rerank 可选依赖（onnxruntime + tokenizers），torch 后端需安装 local-emb
+    RERANKER_BACKEND: str = "auto"
+
+    # ONNX 模型文件名（相对模型目录，int8 量化导出可指定为 model_int8.onnx 等）
+    RERANKER_ONNX_FILE: str = "model.onnx"
+
+    # (查询, 片段) 拼接后的最大 token 数
+    RERANKER_MAX_LENGTH: int = 256
+
+    # 重排序超时时间（毫秒，只约束推理，不含模型加载），超时回退到向量检索顺序
+    RERANKER_TIMEOUT_MS: int = 800
+
+    # 分数缓存条目数（按 查询哈希 + 片段ID 缓存）
+    RERANKER_CACHE_SIZE: int = 10000
+
+    # ONNX 推理线程数（0 表示使用 onnxruntime 默认值）
+    RERANKER_NUM_THREADS: int = 0
+
+    # 是否启用两阶段检索（先按文档质心选文档，再在选中文档内检索片段）
+    ENABLE_TWO_STAGE_RETRIEVAL: bool = False
+
+    # 两阶段检索第一阶段选出的文档数
+    TWO_STAGE_TOP_DOCS: int = 20
+
+    # 提示词中参考资料与对话历史的默认 Token 预算
+    CONTEXT_TOKEN_BUDGET: int = 3000
+
+    # 按模型覆盖 Token 预算，格式：模型名前缀:预算，逗号分隔（如 glm-4:6000,qwen:4000）
+    CONTEXT_MODEL_BUDGETS: str = ""
+
+    # 对话历史最多占用的预算比例（剩余预算用于参考资料）
+    CONTEXT_HISTORY_RATIO: float = 0.3
+
+    # 参与打包的候选片段数（按相关性依次装入预算）
+    CONTEXT_CANDIDATE_K: int = 8
+
+    # 是否默认启用参考资料抽取式压缩（请求未指定时使用，只保留片段中与问题相关的句子）
+    ENABLE_CONTEXT_COMPRESSION: bool = False
+
+    # 压缩后每个片段保留的 Token 比例
+    CONTEXT_COMPRESSION_RATIO: float = 0.5
+
+    # 不超过该 Token 数的片段不压缩（压缩后的片段也至少保留该预算）
+    CONTEXT_COMPRESSION_MIN_TOKENS: int = 48
+
+    # 本地分词器路径（tokenizer.json 文件或其所在目录，为空时按中文字符与英文单词估算 Token 数）
+    TOKENIZER_PATH: str = ""
+
+    # 是否启用语义答案缓存（相似问题直接返回已缓存的回答与来源）
+    ENABLE_ANSWER_CACHE: bool = False
+
+    # 语义答案缓存命中的余弦相似度阈值
+    ANSWER_CACHE_THRESHOLD: float = 0.92
+
+    # 语义答案缓存最大条目数（超出时淘汰最久未命中的条目）
+    ANSWER_CACHE_SIZE: int = 1000
+
+    # 语义答案缓存条目有效期（秒）
+    ANSWER_CACHE_TTL: int = 86400
+
+    # 是否启用父子片段入库（向量化小的子片段，检索命中后返回其所在的父片段作为参考资料）
+    ENABLE_PARENT_CHILD_CHUNKING: bool = False
+
+    # 父片段长度（字符数，父片段只存储在关系数据库中，不写入向量库）
+    PARENT_CHUNK_SIZE: int = 2000
+
+    # 子片段长度（字符数，子片段写入向量库用于检索）
+    CHILD_CHUNK_SIZE: int = 400
+
+    # 相邻子片段重叠长度（字符数）
+    CHILD_CHUNK_OVERLAP: int = 50
+
+    # 是否默认启用多查询检索（请求未指定时使用，将问题扩展为多个查询变体分别检索后融合）
+    ENABLE_MULTI_QUERY: bool = False
+
+    # 查询变体生成方式：rule（规则改写）/ llm（大模型改写）/ history（结合对话上下文）
+    MULTI_QUERY_MODE: str = "rule"
+
+    # 除原问题外最多生成的查询变体数
+    MULTI_QUERY_VARIANTS: int = 3
+
+    # 多查询检索的延迟预算（毫秒，含变体生成），超时未完成的变体检索被丢弃
+    MULTI_QUERY_BUDGET_MS: int = 1500
+
+    # 倒数排名融合（RRF）的平滑常数
+    MULTI_QUERY_RRF_K: int = 60
+
+    # 是否启用会话检索工作集（追问先在会话最近检索到的片段中打分，未达到阈值时回退到全量检索）
+    ENABLE_CONVERSATION_CACHE: bool = False
+
+    # 直接使用工作集所需的最高余弦相似度
+    CONVERSATION_CACHE_THRESHOLD: float = 0.75
+
+    # 每个会话工作集最多保存的片段数
+    CONVERSATION_CACHE_MAX_CHUNKS: int = 64
+
+    # 最多保存工作集的会话数（超出时淘汰最久未访问的会话）
+    CONVERSATION_CACHE_MAX_CONVERSATIONS: int = 1000
+
+    # 会话工作集未访问的有效期（秒）
+    CONVERSATION_CACHE_TTL: int = 3600
+
+    @field_validator("MMR_LAMBDA")
+    @classmethod
+    def validate_mmr_lambda(cls, v: float) -> float:
+        """
+        函数级注释：验证 MMR 权衡系数
+        参数：v - 权衡系数（0-1之间）
+        返回值：验证后的值
+        """
+        if not 0 <= v <= 1:
+            raise ValueError(f"MMR权衡系数必须在0-1之间: {v}")
+        return v
+
+    @field_validator("MMR_FETCH_K")
+    @classmethod
+    def validate_mmr_fetch_k(cls, v: int) -> int:
+        """
+        函数级注释：验证 MMR 候选集大小
+        参数：v - 候选集大小
+        返回值：验证后的值
+        """
+        if v <= 0:
+            raise ValueError(f"MMR候选集大小必须为正整数: {v}")
+        return v
+
+    @field_validator("RERANKER_BACKEND")
+    @classmethod
+    def validate_reranker_backend(cls, v: str) -> str:
+        """
+        函数级注释：验证重排序推理后端
+        参数：v - 后端名称
+        返回值：验证后的值（小写）
+        """
+        v = v.lower()
+        if v not in ("auto", "onnx", "torch"):
+            raise ValueError(f"不支持的重排序推理后端: {v}，可选值: auto, onnx, torch")
+        return v
+
+    @field_validator("MULTI_QUERY_MODE")
+    @classmethod
+    def validate_multi_query_mode(cls, v: str) -> str:
+        """
+        函数级注释：验证查询变体生成方式
+        参数：v - 生成方式
+        返回值：验证后的值（小写）
+        """
+        v = v.lower()
+        if v not in ("rule", "llm", "history"):
+            raise ValueError(f"不支持的查询变体生成方式: {v}，可选值: rule, llm, history")
+        return v
+
+    @field_validator("CONTEXT_HISTORY_RATIO")
+    @classmethod
+    def validate_context_history_ratio(cls, v: float) -> float:
+        """
+        函数级注释：验证对话历史预算比例
+        参数：v - 比例（0-1之间）
+        返回值：验证后的值
+        """
+        if not 0 <= v <= 1:
+            raise ValueError(f"对话历史预算比例必须在0-1之间: {v}")
+        return v
+
+    @field_validator("CONTEXT_COMPRESSION_RATIO")
+    @classmethod
+    def validate_context_compression_ratio(cls, v: float) -> float:
+        """
+        函数级注释：验证参考资料压缩保留比例
+        参数：v - 比例（0-1之间，不含0）
+        返回值：验证后的值
+        """
+        if not 0 < v <= 1:
+            raise ValueError(f"参考资料压缩保留比例必须在0-1之间: {v}")
+        return v
+
+    @field_validator("ANSWER_CACHE_THRESHOLD")
+    @classmethod
+    def validate_answer_cache_threshold(cls, v: float) -> float:
+        """
+        函数级注释：验证语义答案缓存相似度阈值
+        参数：v - 阈值（0-1之间）
+        返回值：验证后的值
+        """
+        if not 0 < v <= 1:
+            raise ValueError(f"答案缓存相似度阈值必须在0-1之间: {v}")
+        return v
+
+    @field_validator("CONVERSATION_CACHE_THRESHOLD")
+    @classmethod
+    def validate_conversation_cache_threshold(cls, v: float) -> float:
+        """
+        函数级注释：验证会话检索工作集相似度阈值
+        参数：v - 阈值（0-1之间）
+        返回值：验证后的值
+        """
+        if not 0 < v <= 1:
+            raise ValueError(f"会话工作集相似度阈值必须在0-1之间: {v}")
+        return v
+
+    @field_validator("CHILD_CHUNK_OVERLAP")
+    @classmethod
+    def validate_child_chunk_overlap(cls, v: int) -> int:
+        """
+        函数级注释：验证子片段重叠长度
+        参数：v - 重叠长度（非负整数）
+        返回值：验证后的值
+        """
+        if v < 0:
+            raise ValueError(f"子片段重叠长度不能为负数: {v}")
+        return v
+
+    @field_validator(
+        "RERANKER_MAX_LENGTH", "RERANKER_TIMEOUT_MS", "RERANKER_CACHE_SIZE", "TWO_STAGE_TOP_DOCS",
+        "CONTEXT_TOKEN_BUDGET", "CONTEXT_CANDIDATE_K", "CONTEXT_COMPRESSION_MIN_TOKENS", "ANSWER_CACHE_SIZE",
+        "ANSWER_CACHE_TTL", "PARENT_CHUNK_SIZE", "CHILD_CHUNK_SIZE",
+        "MULTI_QUERY_VARIANTS", "MULTI_QUERY_BUDGET_MS", "MULTI_QUERY_RRF_K",
+        "CONVERSATION_CACHE_MAX_CHUNKS", "CONVERSATION_CACHE_MAX_CONVERSATIONS", "CONVERSATION_CACHE_TTL"
+    )
+    @classmethod
+    def validate_reranker_positive(cls, v: int) -> int:
+        """
+        函数级注释：验证检索相关的正整数参数
+        参数：v - 参数值
+        返回值：验证后的值
+        """
+        if v <= 0:
+            raise ValueError(f"检索参数必须为正整数: {v}")
+        return v
+
+
+# 内部变量：导出所有公共接口
+__all__ = ['RetrievalConfig']
@@ -43,6 +43,12 @@ class SecurityConfig(BaseSettings):
     # 是否过滤邮箱
     FILTER_EMAIL: bool = True
 
+    # 是否过滤身份证号（校验码验证通过才脱敏）
+    FILTER_ID_CARD: bool = False
+
+    # 是否过滤银行卡号（Luhn 校验通过才脱敏）
+    FILTER_BANK_CARD: bool = False
+
     @field_validator("SENSITIVE_DATA_MASK_STRATEGY")
     @classmethod
     def validate_mask_strategy(cls, v: str) -> str:
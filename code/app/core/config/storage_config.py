@@ -8,6 +8,7 @@
 设计原则：单一职责原则
 """
 
+from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -23,7 +24,8 @@ class StorageConfig(BaseSettings):
 
     职责：
         1. 管理向量数据库配置
-        2. 管理文件存储路径配置
+        2. 管理向量索引（HNSW）参数配置
+        3. 管理文件存储路径配置
     """
 
     # 内部逻辑：配置Settings，从环境变量读取配置
@@ -33,12 +35,47 @@ class StorageConfig(BaseSettings):
     CHROMA_DB_PATH: str = "./data/chroma_db"
     CHROMA_COLLECTION_NAME: str = "knowledge_base"
 
+    # HNSW 索引参数（仅在集合创建时生效，默认值与 Chroma 内置默认一致）
+    # 距离度量：l2 / cosine / ip
+    CHROMA_HNSW_SPACE: str = "l2"
+    # 每个节点的最大连接数，越大召回越高、内存越大
+    CHROMA_HNSW_M: int = 16
+    # 建索引时的候选队列大小，越大索引质量越高、建索引越慢
+    CHROMA_HNSW_CONSTRUCTION_EF: int = 100
+    # 查询时的候选队列大小，越大召回越高、查询越慢
+    CHROMA_HNSW_SEARCH_EF: int = 10
+
     # 文件上传存储配置
     UPLOAD_FILES_PATH: str = "./data/files"
 
     # 本地模型存储目录
     LOCAL_MODEL_DIR: str = "./models"
 
+    @field_validator("CHROMA_HNSW_SPACE")
+    @classmethod
+    def validate_hnsw_space(cls, v: str) -> str:
+        """
+        函数级注释：验证 HNSW 距离度量
+        参数：v - 距离度量名称
+        返回值：验证后的值（小写）
+        """
+        v = v.lower()
+        if v not in ("l2", "cosine", "ip"):
+            raise ValueError(f"不支持的HNSW距离度量: {v}，可选值: l2, cosine, ip")
+        return v
+
+    @field_validator("CHROMA_HNSW_M", "CHROMA_HNSW_CONSTRUCTION_EF", "CHROMA_HNSW_SEARCH_EF")
+    @classmethod
+    def validate_hnsw_positive(cls, v: int) -> int:
+        """
+        函数级注释：验证 HNSW 整数参数
+        参数：v - 参数值
+        返回值：验证后的值
+        """
+        if v <= 0:
+            raise ValueError(f"HNSW参数必须为正整数: {v}")
+        return v
+
 
 # 内部变量：导出所有公共接口
 __all__ = ['StorageConfig']
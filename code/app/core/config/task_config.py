@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：任务调度配置模块
+内部逻辑：管理后台低优先级任务与进行中请求合并的开关与节流配置
+设计模式：建造者模式
+设计原则：单一职责原则
+"""
+
+from pydantic import field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class TaskConfig(BaseSettings):
+    """
+    类级注释：任务调度配置类
+
+    配置优先级（从高到低）：
+        1. 环境变量：系统环境变量或 docker run -e 注入
+        2. Dockerfile ENV：Dockerfile 中定义的 ENV 指令
+        3. 配置文件：.env.prod（生产）或 .env（开发）
+        4. 代码默认值：本类属性定义的默认值
+
+    职责：
+        1. 管理文档预生成（摘要、关键词与简介）开关
+        2. 管理后台任务的节流与空闲等待配置
+        3. 管理进行中相同请求的合并开关
+    """
+
+    # 内部逻辑：配置Settings，从环境变量读取配置
+    model_config = SettingsConfigDict(case_sensitive=True, extra="ignore")
+
+    # 是否在文档入库后于后台低优先级预生成摘要、关键词与简介
+    ENABLE_DOCUMENT_INSIGHTS: bool = False
+
+    # 后台预生成相邻两个文档之间的最小间隔（秒）
+    INSIGHT_THROTTLE_SECONDS: float = 5.0
+
+    # 最近一次对话请求结束后至少空闲多久（秒）才开始后台预生成
+    INSIGHT_IDLE_SECONDS: float = 10.0
+
+    # 是否合并进行中的相同请求（查询向量、语义搜索、无对话历史的问答）
+    ENABLE_REQUEST_COALESCING: bool = True
+
+    @field_validator("INSIGHT_THROTTLE_SECONDS", "INSIGHT_IDLE_SECONDS")
+    @classmethod
+    def validate_insight_seconds(cls, v: float) -> float:
+        """
+        函数级注释：验证文档预生成节流参数
+        参数：v - 秒数
+        返回值：验证后的值
+        """
+        if v < 0:
+            raise ValueError(f"文档预生成节流参数不能为负数: {v}")
+        return v
+
+
+# 内部变量：导出所有公共接口
+__all__ = ['TaskConfig']
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：模型配置缓存模块
+内部逻辑：模型配置很少变更，但每次对话都需要读取当前启用的配置，
+         本模块在进程内缓存配置，只在写入配置时失效，避免每次对话都查询数据库
+设计模式：单例模式（全局配置缓存）
+设计原则：单一职责原则
+
+实现说明：
+    - 每个缓存项带有代次，读取数据库前记录代次，写回时代次已变化（期间有写入）则放弃写回，避免缓存旧配置
+    - 多进程部署时设置 CONFIG_CACHE_SYNC_SECONDS，写入配置后递增 config_version 表中的版本号，
+      其他进程按间隔读取版本号，发现变化后失效本进程缓存
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+# 内部变量：缓存名称（与配置表名一致）
+LLM_CONFIG_CACHE = "model_config"
+EMBEDDING_CONFIG_CACHE = "embedding_config"
+
+
+class ConfigCache:
+    """
+    类级注释：进程内模型配置缓存
+    职责：
+        1. 按名称缓存当前启用的配置（包括"没有启用配置"）
+        2. 写入配置时失效缓存，并可通过版本号通知其他进程
+        3. 统计命中、未命中与失效次数
+    """
+
+    def __init__(self):
+        """
+        函数级注释：初始化配置缓存
+        """
+        self._entries: Dict[str, Any] = {}
+        self._generations: Dict[str, int] = {}
+        self._known_versions: Dict[str, int] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, name: str) -> Tuple[bool, Any]:
+        """
+        函数级注释：读取缓存
+        参数：
+            name - 缓存名称
+        返回值：Tuple[bool, Any] - (是否命中, 配置)，配置可能为 None（没有启用的配置）
+        """
+        with self._lock:
+            if name in self._entries:
+                self.hits += 1
+                return True, self._entries[name]
+            self.misses += 1
+            return False, None
+
+    def generation(self, name: str) -> int:
+        """
+        函数级注释：获取缓存项的当前代次（读取数据库前调用，写回时传入）
+        参数：
+            name - 缓存名称
+        返回值：int - 代次
+        """
+        with self._lock:
+            return self._generations.get(name, 0)
+
+    def set(self, name: str, value: Any, generation: int) -> bool:
+        """
+        函数级注释：写入缓存
+        参数：
+            name - 缓存名称
+            value - 配置
+            generation - 读取数据库前记录的代次
+        返回值：bool - 是否写入（期间发生失效时不写入）
+        """
+        with self._lock:
+            if self._generations.get(name, 0) != generation:
+                return False
+            self._entries[name] = value
+            return True
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """
+        函数级注释：失效缓存
+        参数：
+            name - 缓存名称（None 表示全部）
+        """
+        with self._lock:
+            names = [name] if name is not None else list(set(self._entries) | set(self._generations))
+            for item in names:
+                self._entries.pop(item, None)
+                self._generations[item] = self._generations.get(item, 0) + 1
+            self.invalidations += 1
+        logger.debug(f"模型配置缓存已失效: {name or '全部'}")
+
+    @staticmethod
+    def sync_enabled() -> bool:
+        """
+        函数级注释：判断是否启用跨进程版本检查
+        返回值：bool
+        """
+        return settings.CONFIG_CACHE_SYNC_SECONDS > 0
+
+    async def sync(self, db: AsyncSession, name: str) -> None:
+        """
+        函数级注释：检查其他进程是否写入过配置
+        内部逻辑：距上次检查超过间隔时读取版本号，版本号变化则失效本进程缓存；读取失败不影响对话
+        参数：
+            db - 数据库会话
+            name - 缓存名称
+        """
+        # Guard Clause：未启用或未到检查时间
+        if not self.sync_enabled():
+            return
+        now = time.monotonic()
+        if now - self._checked_at.get(name, float("-inf")) < settings.CONFIG_CACHE_SYNC_SECONDS:
+            return
+        self._checked_at[name] = now
+
+        from app.models.model_config import ConfigVersion
+
+        try:
+            result = await db.execute(select(ConfigVersion.version).where(ConfigVersion.name == name))
+            version = result.scalar_one_or_none() or 0
+        except Exception as e:
+            logger.warning(f"读取配置版本失败，继续使用缓存: {name}, {str(e)}")
+            return
+
+        known = self._known_versions.get(name)
+        self._known_versions[name] = version
+        if known is not None and known != version:
+            logger.info(f"检测到其他进程更新了配置: {name}, 版本 {known} -> {version}")
+            self.invalidate(name)
+
+    async def bump(self, db: AsyncSession, name: str) -> None:
+        """
+        函数级注释：递增配置版本号，通知其他进程（写入配置后调用）
+        参数：
+            db - 数据库会话
+            name - 缓存名称
+        """
+        # Guard Clause：未启用跨进程版本检查
+        if not self.sync_enabled():
+            return
+
+        from app.models.model_config import ConfigVersion
+
+        try:
+            result = await db.execute(
+                update(ConfigVersion)
+                .where(ConfigVersion.name == name)
+                .values(version=ConfigVersion.version + 1)
+            )
+            if result.rowcount == 0:
+                await db.execute(insert(ConfigVersion).values(name=name, version=1))
+            await db.commit()
+
+            result = await db.execute(select(ConfigVersion.version).where(ConfigVersion.name == name))
+            self._known_versions[name] = result.scalar_one()
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"更新配置版本失败，其他进程将不会感知本次变更: {name}, {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        函数级注释：获取缓存统计
+        返回值：Dict[str, Any] - 命中、未命中、失效次数、已缓存的配置与已知版本号
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "cached": sorted(self._entries),
+                "sync_seconds": settings.CONFIG_CACHE_SYNC_SECONDS,
+                "versions": dict(self._known_versions),
+            }
+
+    def clear(self) -> None:
+        """
+        函数级注释：清空缓存、版本记录与统计
+        """
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+            self._known_versions.clear()
+            self._checked_at.clear()
+            self.hits = self.misses = self.invalidations = 0
+
+
+# 内部变量：全局模型配置缓存
+config_cache = ConfigCache()
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'ConfigCache',
+    'config_cache',
+    'LLM_CONFIG_CACHE',
+    'EMBEDDING_CONFIG_CACHE',
+]
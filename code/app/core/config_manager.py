@@ -171,8 +171,9 @@ class ConfigManager:
         # 内部逻辑：更新配置存储
         self._config.update(config)
 
-        # 内部逻辑：增加版本号
+        # 内部逻辑：增加版本号并失效对应的模型配置缓存
         self._config_versions[event_type] += 1
+        self._invalidate_config_cache(event_type)
 
         logger.info(f"配置已更新: {event_type.value}, 版本: {self._config_versions[event_type]}")
 
@@ -267,10 +268,29 @@ class ConfigManager:
         返回值：None
         """
         # 内部逻辑：这里可以添加从数据库或文件加载配置的逻辑
-        # 目前只是触发版本号更新
+        # 目前只是触发版本号更新，并失效模型配置缓存（下次读取时重新查询数据库）
         self._config_versions[event_type] += 1
+        self._invalidate_config_cache(event_type)
         await self._notify_listeners(event_type, self._config)
 
+    @staticmethod
+    def _invalidate_config_cache(event_type: ConfigEventType) -> None:
+        """
+        函数级注释：失效事件对应的模型配置缓存
+        参数：
+            event_type - 配置变更事件类型
+        返回值：None
+        @private
+        """
+        from app.core.config_cache import config_cache, LLM_CONFIG_CACHE, EMBEDDING_CONFIG_CACHE
+
+        if event_type == ConfigEventType.LLM_CHANGED:
+            config_cache.invalidate(LLM_CONFIG_CACHE)
+        elif event_type == ConfigEventType.EMBEDDING_CHANGED:
+            config_cache.invalidate(EMBEDDING_CONFIG_CACHE)
+        elif event_type == ConfigEventType.GLOBAL_CHANGED:
+            config_cache.invalidate()
+
     def clear(self) -> None:
         """
         函数级注释：清空所有配置
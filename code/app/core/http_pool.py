@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：模型提供商HTTP连接池模块
+内部逻辑：按端点（协议 + 主机 + 端口）维护进程级共享的 httpx 客户端，
+         所有 LLM 与 Embedding 实例复用同一端点的连接，避免每次调用或每次切换配置都重新建立连接与 TLS 握手
+设计模式：享元模式（按端点共享客户端）+ 单例模式（全局连接池）
+设计原则：单一职责原则
+
+实现说明：
+    - 连接数、空闲连接数、空闲保持时间与超时由 HTTP_POOL_* 配置控制，HTTP/2 默认关闭，开启后仅在安装 h2 时生效
+    - 异步客户端与事件循环绑定，按端点 + 事件循环缓存，事件循环关闭后的客户端在下次创建时清理
+    - 通过 httpcore 的 trace 扩展统计新建连接数，请求数与新建连接数之差即为复用连接的请求数
+"""
+
+import asyncio
+import importlib.util
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from loguru import logger
+
+from app.core.config import settings
+
+
+class _EndpointStats:
+    """
+    类级注释：单个端点的连接统计
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def add_request(self) -> None:
+        """
+        函数级注释：记录一次请求
+        """
+        with self._lock:
+            self.requests += 1
+
+    def add_connection(self) -> None:
+        """
+        函数级注释：记录一次新建连接
+        """
+        with self._lock:
+            self.connections += 1
+
+    def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        """
+        函数级注释：同步客户端的连接事件回调
+        参数：
+            event_name - httpcore 事件名
+            info - 事件信息
+        """
+        if event_name == "connection.connect_tcp.complete":
+            self.add_connection()
+
+    async def atrace(self, event_name: str, info: Dict[str, Any]) -> None:
+        """
+        函数级注释：异步客户端的连接事件回调
+        """
+        self.trace(event_name, info)
+
+
+class HttpClientPool:
+    """
+    类级注释：模型提供商HTTP连接池
+    职责：
+        1. 按端点提供共享的同步 / 异步 httpx 客户端
+        2. 统计每个端点的请求数、新建连接数与连接复用率
+        3. 应用关闭时关闭所有客户端
+    """
+
+    def __init__(self):
+        """
+        函数级注释：初始化连接池
+        """
+        self._clients: Dict[str, httpx.Client] = {}
+        self._async_clients: Dict[Tuple[str, int], Tuple[Optional[asyncio.AbstractEventLoop], httpx.AsyncClient]] = {}
+        self._stats: Dict[str, _EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def endpoint_of(url: str) -> str:
+        """
+        函数级注释：提取URL的端点（协议 + 主机 + 端口）
+        参数：
+            url - 请求地址或模型 base_url
+        返回值：str - 端点，如 https://open.bigmodel.cn:443
+        """
+        parsed = httpx.URL(url)
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        return f"{parsed.scheme}://{parsed.host}:{port}"
+
+    # 内部变量：是否已提示未安装 h2（只提示一次）
+    _h2_missing_logged = False
+
+    @classmethod
+    def http2_enabled(cls) -> bool:
+        """
+        函数级注释：判断是否启用HTTP/2
+        内部逻辑：配置开启且已安装 h2 时启用（仅对 HTTPS 端点生效）；配置开启但未安装 h2 时提示一次并使用 HTTP/1.1
+        返回值：bool
+        """
+        if not settings.HTTP_POOL_HTTP2:
+            return False
+        if importlib.util.find_spec("h2") is not None:
+            return True
+        if not cls._h2_missing_logged:
+            cls._h2_missing_logged = True
+            logger.warning("HTTP_POOL_HTTP2 已开启但未安装 h2（pip install 'httpx[http2]'），使用 HTTP/1.1")
+        return False
+
+    @staticmethod
+    def _client_options() -> Dict[str, Any]:
+        """
+        函数级注释：构建客户端参数
+        返回值：Dict[str, Any] - httpx 客户端参数
+        """
+        return {
+            "limits": httpx.Limits(
+                max_connections=settings.HTTP_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_POOL_KEEPALIVE_EXPIRY,
+            ),
+            "timeout": httpx.Timeout(settings.HTTP_POOL_TIMEOUT),
+            "http2": HttpClientPool.http2_enabled(),
+        }
+
+    def _get_stats(self, endpoint: str) -> _EndpointStats:
+        """
+        函数级注释：获取（不存在时创建）端点统计，调用方需持有锁
+        """
+        stats = self._stats.get(endpoint)
+        if stats is None:
+            stats = self._stats[endpoint] = _EndpointStats()
+        return stats
+
+    def get_client(self, url: str) -> httpx.Client:
+        """
+        函数级注释：获取端点共享的同步客户端
+        参数：
+            url - 请求地址或模型 base_url
+        返回值：httpx.Client
+        """
+        endpoint = self.endpoint_of(url)
+        with self._lock:
+            client = self._clients.get(endpoint)
+            if client is not None and not client.is_closed:
+                return client
+
+            stats = self._get_stats(endpoint)
+
+            def on_request(request: httpx.Request) -> None:
+                stats.add_request()
+                request.extensions["trace"] = stats.trace
+
+            client = httpx.Client(event_hooks={"request": [on_request]}, **self._client_options())
+            self._clients[endpoint] = client
+
+        logger.info(f"已创建模型端点连接池: {endpoint}")
+        return client
+
+    def get_async_client(self, url: str) -> httpx.AsyncClient:
+        """
+        函数级注释：获取端点共享的异步客户端（与当前事件循环绑定）
+        参数：
+            url - 请求地址或模型 base_url
+        返回值：httpx.AsyncClient
+        """
+        endpoint = self.endpoint_of(url)
+        try:
+            loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            # 内部逻辑：不在事件循环中创建（如同步构造模型实例），首次使用时再绑定事件循环
+            loop = None
+        key = (endpoint, id(loop))
+
+        with self._lock:
+            cached = self._async_clients.get(key)
+            if cached is not None and cached[0] is loop and not cached[1].is_closed:
+                return cached[1]
+
+            # 内部逻辑：清理已关闭事件循环的客户端（其连接随事件循环一起失效）
+            stale_keys = [
+                key for key, (client_loop, _) in self._async_clients.items()
+                if client_loop is not None and client_loop.is_closed()
+            ]
+            for stale in stale_keys:
+                del self._async_clients[stale]
+
+            stats = self._get_stats(endpoint)
+
+            async def on_request(request: httpx.Request) -> None:
+                stats.add_request()
+                request.extensions["trace"] = stats.atrace
+
+            client = httpx.AsyncClient(event_hooks={"request": [on_request]}, **self._client_options())
+            self._async_clients[key] = (loop, client)
+
+        logger.info(f"已创建模型端点异步连接池: {endpoint}")
+        return client
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        函数级注释：获取每个端点的连接统计
+        返回值：Dict[str, Dict[str, Any]] - 端点 -> 请求数、新建连接数、复用连接的请求数、复用率
+        """
+        with self._lock:
+            items = list(self._stats.items())
+            sync_endpoints = set(self._clients)
+            async_endpoints = [endpoint for endpoint, _ in self._async_clients]
+
+        result = {}
+        for endpoint, stats in items:
+            reused = max(stats.requests - stats.connections, 0)
+            result[endpoint] = {
+                "requests": stats.requests,
+                "connections_opened": stats.connections,
+                "reused_requests": reused,
+                "reuse_rate": round(reused / stats.requests, 4) if stats.requests else 0.0,
+                "sync_client": endpoint in sync_endpoints,
+                "async_clients": async_endpoints.count(endpoint),
+            }
+        return result
+
+    def close(self) -> None:
+        """
+        函数级注释：关闭所有同步客户端并清空统计
+        """
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._stats.clear()
+        for client in clients:
+            client.close()
+
+    async def aclose(self) -> None:
+        """
+        函数级注释：关闭所有客户端（应用关闭时调用）
+        内部逻辑：只能在所属事件循环中关闭异步客户端，其他事件循环的客户端直接丢弃
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            async_clients = list(self._async_clients.values())
+            self._async_clients.clear()
+        for client_loop, client in async_clients:
+            if client_loop is loop or client_loop is None:
+                await client.aclose()
+        self.close()
+
+
+# 内部变量：全局模型提供商HTTP连接池
+http_client_pool = HttpClientPool()
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'HttpClientPool',
+    'http_client_pool',
+]
@@ -536,9 +536,18 @@ class VectorizingState(DocumentState):
         vector_store.add_texts(
             texts=chunks,
             ids=vector_ids,
-            metadatas=[{"doc_id": context.document_id, "chunk_index": i} for i in range(len(chunks))]
+            metadatas=[
+                {"doc_id": context.document_id, "chunk_index": i, "chunk_id": vector_id}
+                for i, vector_id in enumerate(vector_ids)
+            ]
         )
 
+        # 内部逻辑：更新文档质心索引（两阶段检索使用）
+        IngestService._refresh_document_centroid(vector_store, context.document_id)
+
+        # 内部逻辑：新文档可能改变检索结果，使语义答案缓存失效
+        IngestService._invalidate_answer_cache(context.document_id)
+
         return vector_ids
 
     def can_process(self) -> bool:
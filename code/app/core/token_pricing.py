@@ -212,41 +212,15 @@ class TokenPricingCalculator:
     def estimate_tokens(text: str) -> int:
         """
         函数级注释：估算文本的Token数量
-        内部逻辑：使用简单启发式方法，1个Token约等于1.5个中文字或0.75个英文单词
+        内部逻辑：委托 token_counter.count_tokens（配置了本地分词器时使用分词器，否则按
+                 1个Token约等于1.5个中文字或0.75个英文单词估算，结果按文本缓存）
         参数：
             text: 输入文本
         返回值：估算的Token数量
         """
-        # 内部变量：初始化计数
-        chinese_chars = 0
-        english_words = 0
+        from app.utils.token_counter import count_tokens
 
-        # 内部逻辑：遍历文本字符
-        i = 0
-        while i < len(text):
-            char = text[i]
-
-            # 内部逻辑：判断是否为中文字符
-            if '\u4e00' <= char <= '\u9fff':
-                chinese_chars += 1
-                i += 1
-            # 内部逻辑：英文和数字
-            elif char.isalnum() or char in "_-":
-                # 内部逻辑：统计完整单词
-                word_start = i
-                while i < len(text) and (text[i].isalnum() or text[i] in "_-"):
-                    i += 1
-                if i > word_start:
-                    english_words += 1
-            else:
-                i += 1
-
-        # 内部逻辑：按比例估算Token
-        # 中文：1 Token ≈ 1.5 字
-        # 英文：1 Token ≈ 0.75 词
-        estimated_tokens = int(chinese_chars / 1.5 + english_words / 0.75)
-
-        return max(estimated_tokens, 1)  # 至少1个Token
+        return max(count_tokens(text), 1)  # 至少1个Token
 
 
 # ============================================================================
@@ -6,6 +6,9 @@
 设计模式：依赖注入模式
 """
 
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
 from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
 from sqlalchemy.orm import sessionmaker
 from loguru import logger
@@ -66,6 +69,29 @@ async def get_db():
             await session.close()
 
 
+@asynccontextmanager
+async def open_session(like: Optional[AsyncSession] = None) -> AsyncIterator[AsyncSession]:
+    """
+    函数级注释：创建独立的数据库会话（不绑定请求作用域）
+    内部逻辑：供可能比发起请求存活更久的任务使用（如合并执行的问答），请求结束时不会被关闭；
+             传入参照会话时新会话绑定到同一引擎，否则使用全局会话工厂
+    参数：
+        like - 参照的会话（如请求会话，可选）
+    返回值：AsyncSession - 数据库异步会话（退出上下文时关闭）
+    """
+    bind = getattr(like, "bind", None)
+    if bind is not None:
+        async with AsyncSession(bind=bind, expire_on_commit=False, autoflush=False) as session:
+            yield session
+        return
+
+    if AsyncSessionLocal is None:
+        await init_session_factory()
+
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
 async def get_engine() -> AsyncEngine:
     """
     函数级注释：获取数据库引擎（用于初始化表结构）
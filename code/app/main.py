@@ -45,10 +45,12 @@ from app.core.config import settings
 from app.api.v1.api import api_router
 from app.models.models import Base
 from app.db.factory import DatabaseFactory
+from app.core.http_pool import http_client_pool
 from app.core.di.service_container import get_container, ServiceLifetime
 from app.services.chat_service import ChatService
 from app.services.ingest_service import IngestService
 from app.services.search_service import SearchService
+from app.services.document_insight_service import document_insight_queue
 from app.core.middleware import create_validation_middleware, ValidationChainMiddleware, ServiceScopeMiddleware
 from app.core.validation_chain import ValidationChainFactory
 from app.services.chat.service_initializer import initialize_chat_services
@@ -84,6 +86,38 @@ async def init_database():
             logger.info("数据库表已存在，跳过初始化")
 
 
+def init_vector_store():
+    """
+    函数级注释：初始化向量集合
+    内部逻辑：集合不存在时按配置的 HNSW 参数创建；已存在但参数不一致时仅告警；
+             启用两阶段检索时为片段集合中缺少质心的文档补齐质心（入库时始终维护质心，
+             这里补齐本功能上线前入库或质心写入失败的文档）
+    返回值：无
+    """
+    from app.services.retrieval.hnsw import ensure_collection, find_collection, get_chroma_client
+    from app.services.retrieval.centroid_index import DocumentCentroidIndex
+
+    try:
+        ensure_collection()
+    except Exception as e:
+        # 内部逻辑：向量集合检查失败不阻塞启动，后续首次写入时仍会按默认参数创建
+        logger.error(f"向量集合初始化失败: {str(e)}")
+        return
+
+    # Guard Clause：未启用两阶段检索时不维护质心回填
+    if not settings.ENABLE_TWO_STAGE_RETRIEVAL:
+        return
+
+    try:
+        # 内部逻辑：补齐缺少质心的文档（不能以索引为空为条件：新入库的文档会写入质心，旧文档仍可能缺失）
+        client = get_chroma_client()
+        chunk_collection = find_collection(client, settings.CHROMA_COLLECTION_NAME)
+        if chunk_collection is not None:
+            DocumentCentroidIndex(client, settings.CHROMA_COLLECTION_NAME).backfill_missing(chunk_collection)
+    except Exception as e:
+        logger.error(f"文档质心索引回填失败: {str(e)}")
+
+
 def init_service_container():
     """
     函数级注释：初始化服务容器（依赖注入）
@@ -189,17 +223,20 @@ def create_app() -> FastAPI:
     async def startup_event():
         """
         函数级注释：应用启动时执行的事件处理器
-        内部逻辑：初始化数据库表结构 + 服务容器 + 预加载模型配置
+        内部逻辑：初始化数据库表结构 + 向量集合 + 服务容器 + 预加载模型配置
         设计模式：依赖注入模式 - 在启动时初始化服务容器
         """
         # 1. 初始化数据库表结构
         await init_database()
 
-        # 2. 初始化服务容器（依赖注入）
+        # 2. 初始化向量集合（应用 HNSW 索引参数）
+        init_vector_store()
+
+        # 3. 初始化服务容器（依赖注入）
         # 设计模式：依赖注入模式 - 集中管理服务注册
         init_service_container()
 
-        # 3. 预加载默认配置
+        # 4. 预加载默认配置
         from app.core.initializers import init_default_configs
         import app.db.session as session_module
 
@@ -212,14 +249,23 @@ def create_app() -> FastAPI:
         async with session_module.AsyncSessionLocal() as db:
             await init_default_configs(db)
 
+        # 内部逻辑：回填尚未预生成摘要、简介与关键词的文档（未启用时忽略）
+        document_insight_queue.request_refresh()
+
+        # 内部逻辑：启用重排序时在后台加载并预热交叉编码器，避免首批请求承担模型加载时间
+        from app.services.retrieval.cross_encoder import warm_up_cross_encoder_reranker
+        warm_up_cross_encoder_reranker()
+
         logger.info("应用启动完成")
 
     @app.on_event("shutdown")
     async def shutdown_event():
         """
         函数级注释：应用关闭时执行的事件处理器
-        内部逻辑：关闭数据库引擎
+        内部逻辑：停止文档预生成队列 -> 关闭模型提供商连接池 -> 关闭数据库引擎
         """
+        await document_insight_queue.stop()
+        await http_client_pool.aclose()
         await DatabaseFactory.dispose_engine()
 
     @app.get("/")
@@ -9,7 +9,7 @@
 from app.models.models import Base, TaskStatus
 
 # 内部逻辑：导入文档相关模型
-from app.models.models import Document, VectorMapping, IngestTask
+from app.models.models import Document, VectorMapping, ParentChunk, DocumentSummary, DocumentInsight, IngestTask
 
 # 内部逻辑：导入对话持久化相关模型
 from app.models.conversation import (
@@ -21,7 +21,7 @@ from app.models.conversation import (
 )
 
 # 内部逻辑：导入模型配置相关模型
-from app.models.model_config import ModelConfig, EmbeddingConfig
+from app.models.model_config import ModelConfig, EmbeddingConfig, ConfigVersion
 
 # 内部变量：导出所有模型
 __all__ = [
@@ -31,6 +31,9 @@ __all__ = [
     # 文档相关
     "Document",
     "VectorMapping",
+    "ParentChunk",
+    "DocumentSummary",
+    "DocumentInsight",
     "IngestTask",
     # 对话持久化相关
     "Conversation",
@@ -41,4 +44,5 @@ __all__ = [
     # 模型配置相关
     "ModelConfig",
     "EmbeddingConfig",
+    "ConfigVersion",
 ]
@@ -141,3 +141,27 @@ class EmbeddingConfig(Base):
     def __repr__(self):
         """函数级注释：模型字符串表示"""
         return f"<EmbeddingConfig(id={self.id}, provider={self.provider_id}, model={self.model_name})>"
+
+
+class ConfigVersion(Base):
+    """
+    类级注释：配置版本表，多进程部署时用于通知其他进程配置已变更
+    属性：
+        name: 配置名称（与配置表名一致，如 model_config、embedding_config）
+        version: 版本号（每次写入配置后加一）
+        updated_at: 更新时间
+    """
+    __tablename__ = "config_version"
+
+    # 属性：主键（配置名称）
+    name = Column(String(50), primary_key=True, comment="配置名称")
+
+    # 属性：版本号
+    version = Column(Integer, nullable=False, default=0, comment="版本号")
+
+    # 属性：时间戳（本地时间）
+    updated_at = Column(DateTime, default=get_local_time, onupdate=get_local_time, comment="更新时间(本地时间)")
+
+    def __repr__(self):
+        """函数级注释：模型字符串表示"""
+        return f"<ConfigVersion(name={self.name}, version={self.version})>"
@@ -56,6 +56,12 @@ class Document(Base):
 
     # 关系：一个文档对应多个向量片段映射
     mappings = relationship("VectorMapping", back_populates="document", cascade="all, delete-orphan")
+    # 关系：一个文档对应多条已生成的摘要（片段组摘要与全文摘要）
+    summaries = relationship("DocumentSummary", back_populates="document", cascade="all, delete-orphan")
+    # 关系：一个文档对应一条预生成的简介与关键词
+    insight = relationship("DocumentInsight", back_populates="document", cascade="all, delete-orphan", uselist=False)
+    # 关系：一个文档对应多个父片段（父子片段入库模式）
+    parents = relationship("ParentChunk", back_populates="document", cascade="all, delete-orphan")
 
 class VectorMapping(Base):
     """
@@ -77,6 +83,84 @@ class VectorMapping(Base):
     # 关系：关联回文档对象
     document = relationship("Document", back_populates="mappings")
 
+class ParentChunk(Base):
+    """
+    类级注释：父片段模型，父子片段入库模式下存储父片段原文（向量库只存储子片段）
+    属性：
+        id: 主键
+        document_id: 关联的文档 ID
+        parent_id: 父片段唯一标识，子片段元数据中的 parent_id 指向该值
+        position: 父片段在文档中的序号
+        content: 父片段内容，检索命中子片段后作为参考资料返回
+    索引：在 parent_id 上建立唯一索引以加速按子片段回查
+    外键约束：关联到 documents 表的 id 字段
+    """
+    __tablename__ = "parent_chunks"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True, comment="关联文档ID")
+    parent_id = Column(String(100), nullable=False, unique=True, index=True, comment="父片段ID")
+    position = Column(Integer, default=0, nullable=False, comment="父片段序号")
+    content = Column(Text, nullable=False, comment="父片段内容")
+
+    # 关系：关联回文档对象
+    document = relationship("Document", back_populates="parents")
+
+class DocumentSummary(Base):
+    """
+    类级注释：文档摘要模型，持久化片段组摘要与全文摘要，供重复总结与文档对比复用
+    属性：
+        id: 主键
+        document_id: 关联的文档 ID
+        level: 摘要层级 (group: 片段组摘要, document: 全文摘要)
+        group_index: 片段组序号（全文摘要为 0）
+        content_hash: 摘要输入内容与提示词版本的哈希值，内容变化后自动失效
+        summary: 摘要内容
+        created_at: 生成时间
+    索引：在 (document_id, content_hash) 上建立索引以加速复用查询
+    外键约束：关联到 documents 表的 id 字段
+    """
+    __tablename__ = "document_summaries"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True, comment="关联文档ID")
+    level = Column(String(20), nullable=False, comment="摘要层级 (group, document)")
+    group_index = Column(Integer, default=0, nullable=False, comment="片段组序号")
+    content_hash = Column(String(64), nullable=False, index=True, comment="输入内容哈希值")
+    summary = Column(Text, nullable=False, comment="摘要内容")
+    # 属性：时间戳（本地时间）
+    created_at = Column(DateTime, default=get_local_time, comment="创建时间(本地时间)")
+
+    # 关系：关联回文档对象
+    document = relationship("Document", back_populates="summaries")
+
+class DocumentInsight(Base):
+    """
+    类级注释：文档预生成信息模型，存储入库后后台生成的简介与关键词（全文摘要存储在 DocumentSummary）
+    属性：
+        id: 主键
+        document_id: 关联的文档 ID（唯一）
+        abstract: 简短简介
+        keywords: 关键词列表 (JSON 字符串存储)
+        model_key: 生成时使用的模型标识，与当前模型不一致时需要重新生成
+        created_at: 创建时间
+        updated_at: 更新时间
+    外键约束：关联到 documents 表的 id 字段
+    """
+    __tablename__ = "document_insights"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, unique=True, index=True, comment="关联文档ID")
+    abstract = Column(Text, nullable=True, comment="简短简介")
+    keywords = Column(String(512), nullable=True, comment="关键词列表 (JSON 字符串存储)")
+    model_key = Column(String(200), nullable=False, comment="生成时使用的模型标识")
+    # 属性：时间戳（本地时间）
+    created_at = Column(DateTime, default=get_local_time, comment="创建时间(本地时间)")
+    updated_at = Column(DateTime, default=get_local_time, onupdate=get_local_time, comment="更新时间(本地时间)")
+
+    # 关系：关联回文档对象
+    document = relationship("Document", back_populates="insight")
+
 class IngestTask(Base):
     """
     类级注释：文件摄入任务模型，用于异步处理文件上传
@@ -4,7 +4,7 @@
 文件级注释：对话与问答相关的 Pydantic 模型
 """
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 
 class ChatMessage(BaseModel):
@@ -26,12 +26,24 @@ class ChatRequest(BaseModel):
         use_agent: 是否启用 Agent 模式
         stream: 是否启用流式返回
         formatting_options: 文档格式化选项
+        use_mmr: 是否启用 MMR 多样化检索（None 表示使用全局配置）
+        mmr_lambda: MMR 权衡系数（None 表示使用全局配置）
+        compress_context: 是否压缩参考资料，只保留与问题相关的句子（None 表示使用全局配置）
+        compression_ratio: 压缩后每个片段保留的 Token 比例（None 表示使用全局配置）
+        multi_query: 是否启用多查询检索（None 表示使用全局配置）
+        conversation_id: 所属会话ID（会话接口填写，用于会话检索工作集）
     """
     message: str
     history: Optional[List[ChatMessage]] = []
     use_agent: bool = False
     stream: bool = False
     formatting_options: Optional[Dict[str, Any]] = None
+    use_mmr: Optional[bool] = None
+    mmr_lambda: Optional[float] = Field(None, ge=0, le=1)
+    compress_context: Optional[bool] = None
+    compression_ratio: Optional[float] = Field(None, gt=0, le=1)
+    multi_query: Optional[bool] = None
+    conversation_id: Optional[int] = None
 
 class SourceInfo(BaseModel):
     """
@@ -40,12 +52,14 @@ class SourceInfo(BaseModel):
         doc_id: 文档 ID
         file_name: 文件名
         text_segment: 文本片段内容
-        score: 相关度评分
+        score: 相关度评分（1 - 向量检索距离）
+        chunk_id: 片段ID（向量库中的ID）
     """
     doc_id: int
     file_name: str
     text_segment: str
     score: Optional[float] = None
+    chunk_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     """
@@ -54,10 +68,16 @@ class ChatResponse(BaseModel):
         answer: 模型生成的回答内容
         sources: 引用来源列表
         formatting_applied: 是否应用了格式化
+        context_tokens: 打包后提示词上下文的 Token 数（问题 + 历史 + 参考资料）
+        cached: 是否来自语义答案缓存
+        compression_ratio: 参考资料压缩比例（压缩后 / 压缩前 Token 数，未压缩时为空）
     """
     answer: str
     sources: List[SourceInfo]
     formatting_applied: bool = False
+    context_tokens: Optional[int] = None
+    cached: bool = False
+    compression_ratio: Optional[float] = None
 
 class SourceDetail(BaseModel):
     """
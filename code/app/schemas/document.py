@@ -25,10 +25,14 @@ class DocumentRead(DocumentBase):
         id: 文档唯一标识
         created_at: 创建时间
         chunk_count: 文档片段数量
+        abstract: 预生成的简介（未生成时为空）
+        keywords: 预生成的关键词（未生成时为空）
     """
     id: int
     created_at: datetime
     chunk_count: int = 0
+    abstract: Optional[str] = None
+    keywords: Optional[List[str]] = None
 
     model_config = {
         "from_attributes": True,
@@ -49,3 +53,11 @@ class DocumentListResponse(BaseModel):
     skip: int = 0
     limit: int = 10
 
+
+class InsightRegenerateResponse(BaseModel):
+    """
+    类级注释：文档预生成重新生成响应模型
+    属性：
+        queued: 本次加入队列的文档数量
+    """
+    queued: int
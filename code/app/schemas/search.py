@@ -24,5 +24,20 @@ class SearchResult(BaseModel):
     score: float
 
 
-
-
+class SimilarDocumentResult(BaseModel):
+    """
+    类级注释：相似文档结果模型
+    属性：
+        doc_id: 文档 ID
+        file_name: 文件名
+        source_type: 来源类型（FILE/WEB/DB）
+        score: 文档级相似度（命中片段的最高相似度）
+        matched_chunks: 命中的片段数量
+        best_chunk: 最相似的片段内容
+    """
+    doc_id: int
+    file_name: Optional[str] = None
+    source_type: Optional[str] = None
+    score: float
+    matched_chunks: int
+    best_chunk: str
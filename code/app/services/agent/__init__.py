@@ -6,10 +6,13 @@
 内部逻辑：提供智能体服务和工具管理
 """
 
+from app.services.agent.run_context import AgentRunContext, agent_run_context
 from app.services.agent.tool_registry import ToolRegistry, tool_registry
 
 # 内部变量：导出所有公共接口
 __all__ = [
+    'AgentRunContext',
+    'agent_run_context',
     'ToolRegistry',
     'tool_registry',
 ]
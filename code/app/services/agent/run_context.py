@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：Agent 运行上下文模块
+内部逻辑：保存单次 Agent 运行的模型、工具与检索结果，通过 ContextVar 绑定到当前请求，
+         工具在执行器线程中也能读取（ContextVar 随上下文复制），并发请求之间互不影响
+设计模式：上下文对象模式
+设计原则：单一职责原则
+
+实现说明：
+    - 编译后的图在多次运行间复用，图节点不持有请求状态，运行所需的模型与工具从本上下文读取
+    - 同一步的多个工具调用可能在不同线程中并发记录检索结果，记录时加锁
+"""
+
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.tools import BaseTool
+
+
+@dataclass
+class AgentRunContext:
+    """
+    类级注释：单次 Agent 运行上下文
+    属性：
+        model: 已绑定工具的模型
+        tools_map: 工具名称 -> 工具实例
+        tool_timeout: 单个工具调用超时（秒）
+        vector_db: 检索工具使用的向量库（None 表示使用工具注册表注入的依赖）
+        sources: 本次运行检索到的文档ID（去重，保持顺序）
+        documents: 本次运行检索到的片段
+    """
+    model: Any
+    tools_map: Dict[str, BaseTool]
+    tool_timeout: float
+    vector_db: Any = None
+    sources: List[int] = field(default_factory=list)
+    documents: List[Document] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record_retrieval(self, docs: List[Document]) -> None:
+        """
+        函数级注释：记录一次检索结果
+        参数：
+            docs - 检索到的片段
+        """
+        with self._lock:
+            for doc in docs:
+                doc_id = doc.metadata.get("doc_id", 0)
+                if doc_id not in self.sources:
+                    self.sources.append(doc_id)
+            self.documents.extend(docs)
+
+    def snapshot(self) -> Dict[str, list]:
+        """
+        函数级注释：获取当前检索结果的副本（供图状态合并）
+        返回值：Dict[str, list] - sources 与 documents
+        """
+        with self._lock:
+            return {"sources": list(self.sources), "documents": list(self.documents)}
+
+
+# 内部变量：当前请求的 Agent 运行上下文
+agent_run_context: ContextVar[Optional[AgentRunContext]] = ContextVar(
+    "agent_run_context",
+    default=None
+)
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'AgentRunContext',
+    'agent_run_context',
+]
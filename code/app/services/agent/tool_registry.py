@@ -13,10 +13,21 @@
     - 提供单例访问
 """
 
+from contextvars import ContextVar
 from typing import Dict, List, Callable, Any, Optional
 from langchain_core.tools import BaseTool
 from loguru import logger
 
+from app.services.agent.run_context import agent_run_context
+from app.services.retrieval import MMROptions, VectorRetriever
+
+
+# 内部变量：当前 Agent 运行的检索选项（请求级上下文，避免并发请求相互覆盖）
+retrieval_options_context: ContextVar[Optional[MMROptions]] = ContextVar(
+    "agent_retrieval_options",
+    default=None
+)
+
 
 class ToolRegistry:
     """
@@ -177,13 +188,19 @@ def _create_retrieve_knowledge_tool() -> BaseTool:
         参数：query - 检索关键词
         返回值：检索到的文本片段拼接字符串
         """
-        vector_db = tool_registry._dependencies.get('vector_db')
+        # 内部逻辑：优先使用当前运行上下文的向量库，未设置时使用注册表注入的依赖
+        run_context = agent_run_context.get()
+        vector_db = getattr(run_context, "vector_db", None) or tool_registry._dependencies.get('vector_db')
         if not vector_db:
             return "向量数据库未初始化"
 
-        docs = vector_db.similarity_search(query, k=3)
-        from app.services.agent_service import AgentService
-        AgentService._last_retrieved_ids = [doc.metadata.get("doc_id", 0) for doc in docs]
+        # 内部逻辑：优先使用当前请求的 MMR 选项，未设置时使用全局配置
+        mmr_options = retrieval_options_context.get() or MMROptions.resolve()
+        docs = VectorRetriever(vector_db).search(query, k=3, mmr_options=mmr_options)
+
+        # 内部逻辑：检索结果记录到当前请求的运行上下文，并发请求互不影响
+        if run_context is not None:
+            run_context.record_retrieval(docs)
         return "\n\n".join([doc.page_content for doc in docs])
 
     return retrieve_knowledge
@@ -294,4 +311,5 @@ _register_default_tools()
 __all__ = [
     'ToolRegistry',
     'tool_registry',
+    'retrieval_options_context',
 ]
@@ -5,17 +5,49 @@
 内部逻辑：定义 Agent 状态、工具集、ReAct 节点及图流转逻辑
 设计模式：依赖注入 + 注册表模式
 设计原则：开闭原则、依赖倒置原则
+
+实现说明：
+    - 编译后的图按工具集缓存并在多次运行间复用，图节点不绑定服务实例，从请求级运行上下文读取模型、工具与检索结果
+    - 服务实例按模型与向量库配置缓存（get_agent_service），请求间不再重复创建模型、向量库与工具绑定
+    - 同一步的多个工具调用并发执行，每个调用单独限时，结果按调用顺序返回
 """
 
-from typing import Annotated, List, TypedDict, Dict, Any
+import asyncio
+from contextlib import contextmanager
+from typing import Annotated, Iterator, List, Tuple, TypedDict, Dict, Any, Optional
+from langchain_core.documents import Document
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, ToolMessage
 from langchain_core.tools import tool, BaseTool
 from langgraph.graph import StateGraph, END
 from langchain_community.vectorstores import Chroma
+from loguru import logger
+from app.core.base_factory import InstanceCache
 from app.core.config import settings
 from app.services.ingest_service import IngestService
+from app.utils.embedding_factory import EmbeddingFactory
 from app.utils.llm_factory import LLMFactory
-from app.services.agent.tool_registry import ToolRegistry
+from app.services.agent.run_context import AgentRunContext, agent_run_context
+from app.services.agent.tool_registry import ToolRegistry, retrieval_options_context
+from app.services.retrieval import MMROptions
+
+
+def _merge_documents(left: List[Document], right: List[Document]) -> List[Document]:
+    """
+    函数级注释：合并检索到的片段并去重
+    内部逻辑：按 (doc_id, chunk_id) 去重（无片段ID时使用内容），保持首次检索的顺序
+    参数：
+        left - 已有片段
+        right - 新检索的片段
+    返回值：List[Document] - 合并后的片段
+    """
+    merged = list(left)
+    seen = {(doc.metadata.get("doc_id"), doc.metadata.get("chunk_id") or doc.page_content) for doc in left}
+    for doc in right:
+        key = (doc.metadata.get("doc_id"), doc.metadata.get("chunk_id") or doc.page_content)
+        if key not in seen:
+            seen.add(key)
+            merged.append(doc)
+    return merged
 
 
 # 类级：定义智能体状态
@@ -25,9 +57,11 @@ class AgentState(TypedDict):
     属性：
         messages: 消息历史列表
         sources: 检索到的来源列表 (doc_id)
+        documents: 检索到的片段列表（元数据携带片段ID与相关度评分）
     """
     messages: Annotated[List[BaseMessage], lambda x, y: x + y]
     sources: Annotated[List[int], lambda x, y: list(set(x + y))]
+    documents: Annotated[List[Document], _merge_documents]
 
 
 class AgentService:
@@ -35,10 +69,8 @@ class AgentService:
     类级注释：智能体服务类，构建并运行 LangGraph 工作流
     """
 
-    # 类级注释：工具映射字典，用于通过名称查找工具
-    _tools_map: Dict[str, BaseTool] = {}
-    # 类级注释：存储上次检索的文档 ID
-    _last_retrieved_ids: List[int] = []
+    # 类级注释：已编译的图（按工具集缓存，图节点不持有请求状态，可在多次运行间复用）
+    _compiled_graphs: Dict[Tuple[str, ...], Any] = {}
 
     def __init__(self):
         """
@@ -64,72 +96,96 @@ class AgentService:
         # 内部逻辑：从工具注册表获取工具（解耦）
         self.tools = ToolRegistry.get_all()
 
-        # 内部逻辑：构建工具名称映射字典
-        AgentService._tools_map = ToolRegistry.get_tools_map()
+        # 内部变量：工具名称映射字典，用于通过名称查找工具
+        self.tools_map: Dict[str, BaseTool] = ToolRegistry.get_tools_map()
 
         # 内部逻辑：将工具绑定到模型（部分模型支持，若不支持则需通过 Prompt 引导）
         self.model_with_tools = self.llm.bind_tools(self.tools)
 
-    def _call_model(self, state: AgentState) -> Dict[str, Any]:
+    @staticmethod
+    def _require_run_context() -> AgentRunContext:
+        """
+        函数级注释：获取当前请求的运行上下文
+        内部逻辑：图节点不绑定服务实例，运行所需的模型与工具只从运行上下文读取
+        返回值：AgentRunContext - 当前运行上下文
+        异常：RuntimeError - 当前上下文未绑定运行上下文时
+        """
+        run_context = agent_run_context.get()
+        # Guard Clause：图节点必须在 run / bind_run_context 绑定的上下文中执行
+        if run_context is None:
+            raise RuntimeError("Agent 图节点需要在运行上下文中执行")
+        return run_context
+
+    @staticmethod
+    def _call_model(state: AgentState) -> Dict[str, Any]:
         """
         函数级注释：调用大模型生成响应或工具调用指令
+        内部逻辑：使用当前运行上下文中的模型（图在多次运行间复用）
         参数：state - 智能体当前状态
         返回值：包含新消息的字典
         """
-        messages = state['messages']
-        response = self.model_with_tools.invoke(messages)
+        model = AgentService._require_run_context().model
+        response = model.invoke(state['messages'])
         return {"messages": [response]}
 
-    def _execute_tools(self, state: AgentState) -> Dict[str, Any]:
+    @staticmethod
+    async def _execute_tools(state: AgentState) -> Dict[str, Any]:
         """
         函数级注释：执行模型提出的工具调用请求
+        内部逻辑：同一步的多个工具调用并发执行，每个调用单独限时，结果按调用顺序返回；
+                 来源取自当前运行上下文记录的检索结果
         参数：state - 智能体当前状态
         返回值：包含工具执行结果消息和来源的字典
         """
         last_message = state['messages'][-1]
-        tool_messages = []
+        tool_calls = getattr(last_message, "tool_calls", None) or []
+        run_context = AgentService._require_run_context()
 
-        # 内部逻辑：处理多工具并行调用
-        if hasattr(last_message, "tool_calls") and last_message.tool_calls:
-            for tool_call in last_message.tool_calls:
-                # 内部逻辑：通过名称查找工具并执行
-                tool_name = tool_call.get("name", "")
-                tool_args = tool_call.get("args", {})
-                tool = AgentService._tools_map.get(tool_name)
-
-                if tool:
-                    try:
-                        # 内部逻辑：执行工具调用
-                        result = tool.invoke(tool_args)
-                        tool_messages.append(
-                            ToolMessage(
-                                content=str(result),
-                                tool_call_id=tool_call.get("id", "")
-                            )
-                        )
-                    except Exception as e:
-                        # 内部逻辑：处理工具执行异常
-                        tool_messages.append(
-                            ToolMessage(
-                                content=f"工具执行出错: {str(e)}",
-                                tool_call_id=tool_call.get("id", "")
-                            )
-                        )
-                else:
-                    # 内部逻辑：处理工具未找到的情况
-                    tool_messages.append(
-                        ToolMessage(
-                            content=f"未找到工具: {tool_name}",
-                            tool_call_id=tool_call.get("id", "")
-                        )
-                    )
+        tool_messages = await asyncio.gather(*(
+            AgentService._invoke_tool(tool_call, run_context.tools_map, run_context.tool_timeout)
+            for tool_call in tool_calls
+        ))
 
-        return {
-            "messages": tool_messages,
-            "sources": AgentService._last_retrieved_ids.copy()
-        }
+        return {"messages": list(tool_messages), **run_context.snapshot()}
+
+    @staticmethod
+    async def _invoke_tool(
+        tool_call: Dict[str, Any],
+        tools_map: Dict[str, BaseTool],
+        timeout: float
+    ) -> ToolMessage:
+        """
+        函数级注释：执行单个工具调用
+        内部逻辑：同步工具由 ainvoke 放到线程池执行（复制当前上下文）；
+                 超时、异常与未找到工具均转换为工具消息返回给模型，不中断本次运行
+        参数：
+            tool_call - 工具调用指令
+            tools_map - 工具名称映射
+            timeout - 超时秒数
+        返回值：ToolMessage - 工具执行结果消息
+        """
+        tool_name = tool_call.get("name", "")
+        tool_call_id = tool_call.get("id", "")
+        selected_tool = tools_map.get(tool_name)
+
+        # Guard Clause：处理工具未找到的情况
+        if selected_tool is None:
+            return ToolMessage(content=f"未找到工具: {tool_name}", tool_call_id=tool_call_id)
+
+        try:
+            result = await asyncio.wait_for(selected_tool.ainvoke(tool_call.get("args", {})), timeout)
+            content = str(result)
+        except asyncio.TimeoutError:
+            logger.warning(f"Agent 工具调用超时: {tool_name}（{timeout:g} 秒）")
+            content = f"工具执行超时: {tool_name}（超过 {timeout:g} 秒）"
+        except Exception as e:
+            # 内部逻辑：处理工具执行异常
+            content = f"工具执行出错: {str(e)}"
+
+        return ToolMessage(content=content, tool_call_id=tool_call_id)
 
-    def _should_continue(self, state: AgentState) -> str:
+    @staticmethod
+    def _should_continue(state: AgentState) -> str:
         """
         函数级注释：根据最后一条消息判断是否继续执行工具或结束
         参数：state - 智能体当前状态
@@ -141,16 +197,18 @@ class AgentService:
             return "action"
         return END
 
-    def create_graph(self):
+    @staticmethod
+    def create_graph():
         """
         函数级注释：构建 LangGraph 状态机图
+        内部逻辑：节点均为静态函数，编译后的图不持有任何服务实例
         返回值：编译后的图对象
         """
         workflow = StateGraph(AgentState)
 
         # 内部逻辑：添加节点
-        workflow.add_node("agent", self._call_model)
-        workflow.add_node("action", self._execute_tools)
+        workflow.add_node("agent", AgentService._call_model)
+        workflow.add_node("action", AgentService._execute_tools)
 
         # 内部逻辑：设置入口
         workflow.set_entry_point("agent")
@@ -158,7 +216,7 @@ class AgentService:
         # 内部逻辑：添加条件边
         workflow.add_conditional_edges(
             "agent",
-            self._should_continue,
+            AgentService._should_continue,
             {
                 "action": "action",
                 END: END
@@ -170,15 +228,98 @@ class AgentService:
 
         return workflow.compile()
 
-    async def run(self, query: str, history: List[BaseMessage] = None) -> Dict[str, Any]:
+    def get_graph(self):
+        """
+        函数级注释：获取编译后的图（按工具集缓存）
+        内部逻辑：图结构只取决于工具集；模型与工具实例在运行时从运行上下文读取，
+                 因此模型配置变化后仍可复用同一个图
+        返回值：编译后的图对象
+        """
+        key = tuple(sorted(self.tools_map))
+        graph = AgentService._compiled_graphs.get(key)
+        if graph is None:
+            graph = self.create_graph()
+            AgentService._compiled_graphs[key] = graph
+            logger.debug(f"编译 Agent 图: 工具集 {list(key)}")
+        return graph
+
+    @classmethod
+    def clear_graph_cache(cls) -> None:
+        """
+        函数级注释：清空已编译的图缓存
+        内部逻辑：主要用于测试场景
+        """
+        cls._compiled_graphs.clear()
+
+    def new_run_context(self) -> AgentRunContext:
+        """
+        函数级注释：创建本服务的请求级运行上下文
+        内部逻辑：检索结果只记录在运行上下文中，并发请求互不影响
+        返回值：AgentRunContext - 新的运行上下文
+        """
+        return AgentRunContext(
+            model=self.model_with_tools,
+            tools_map=self.tools_map,
+            tool_timeout=settings.AGENT_TOOL_TIMEOUT,
+            vector_db=self.vector_db
+        )
+
+    @contextmanager
+    def bind_run_context(self, mmr_options: Optional[MMROptions] = None) -> Iterator[AgentRunContext]:
+        """
+        函数级注释：将新的运行上下文与 MMR 选项绑定到当前请求上下文
+        内部逻辑：供图节点与检索工具读取，退出时恢复之前的上下文
+        参数：
+            mmr_options: 检索工具使用的 MMR 选项（None 表示使用全局配置）
+        返回值：AgentRunContext - 已绑定的运行上下文
+        """
+        run_context = self.new_run_context()
+        options_token = retrieval_options_context.set(mmr_options)
+        run_token = agent_run_context.set(run_context)
+        try:
+            yield run_context
+        finally:
+            agent_run_context.reset(run_token)
+            retrieval_options_context.reset(options_token)
+
+    @staticmethod
+    def config_key() -> str:
+        """
+        函数级注释：获取当前生效的服务配置键
+        内部逻辑：由模型配置、嵌入模型配置与向量库位置组成，任一变化都需要新的服务实例
+        返回值：str - 配置键
+        """
+        return "|".join([
+            LLMFactory.current_cache_key(),
+            EmbeddingFactory.current_cache_key(),
+            settings.CHROMA_DB_PATH,
+            settings.CHROMA_COLLECTION_NAME,
+        ])
+
+    @classmethod
+    def clear_service_cache(cls) -> None:
+        """
+        函数级注释：清空已缓存的服务实例
+        内部逻辑：主要用于测试场景
+        """
+        _service_cache.clear()
+
+    async def run(
+        self,
+        query: str,
+        history: List[BaseMessage] = None,
+        mmr_options: Optional[MMROptions] = None
+    ) -> Dict[str, Any]:
         """
         函数级注释：运行智能体解决问题
+        内部逻辑：创建请求级运行上下文 -> 绑定到当前上下文 -> 运行缓存的图
         参数：
             query: 用户输入问题
             history: 对话历史
-        返回值：包含回答和来源 ID 的字典
+            mmr_options: 检索工具使用的 MMR 选项（None 表示使用全局配置）
+        返回值：包含回答、来源 ID 与检索片段的字典
         """
-        app = self.create_graph()
+        app = self.get_graph()
 
         # 内部逻辑：准备初始消息列表
         messages = [SystemMessage(content="你是一个专业的知识库助手，你可以通过检索本地知识库来回答问题。请始终用中文回答。")]
@@ -186,14 +327,35 @@ class AgentService:
             messages.extend(history)
         messages.append(HumanMessage(content=query))
 
-        # 内部逻辑：重置检索 ID
-        AgentService._last_retrieved_ids = []
-
         # 内部逻辑：异步运行获取最终状态
-        inputs = {"messages": messages, "sources": []}
-        final_state = await app.ainvoke(inputs)
+        inputs = {"messages": messages, "sources": [], "documents": []}
+        with self.bind_run_context(mmr_options):
+            final_state = await app.ainvoke(inputs)
 
         return {
             "answer": final_state["messages"][-1].content,
-            "sources": final_state.get("sources", [])
+            "sources": final_state.get("sources", []),
+            "documents": final_state.get("documents", [])
         }
+
+
+# 内部变量：服务实例缓存（按模型与向量库配置区分，容量同模型实例缓存）
+_service_cache = InstanceCache("AgentService")
+
+
+def get_agent_service() -> AgentService:
+    """
+    函数级注释：获取当前配置对应的智能体服务实例
+    内部逻辑：按配置键复用实例，配置切换后创建新实例；模型不支持 bind_tools 时
+             抛出的 NotImplementedError 不会被缓存
+    返回值：AgentService - 服务实例
+    """
+    return _service_cache.get_or_create(AgentService.config_key(), AgentService)
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'AgentState',
+    'AgentService',
+    'get_agent_service',
+]
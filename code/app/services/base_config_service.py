@@ -14,6 +14,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from loguru import logger
 
+from app.core.config_cache import config_cache
+
 # 泛型类型：配置模型类型
 T = TypeVar('T')
 
@@ -25,7 +27,8 @@ class BaseConfigService(ABC, Generic[T]):
     职责：
         1. 定义配置服务的通用操作模板
         2. 提供公共的 CRUD 逻辑
-        3. 子类只需实现模型特定的抽象方法
+        3. 缓存当前启用的配置，写入配置时失效
+        4. 子类只需实现模型特定的抽象方法
     内部变量：
         _config_model: 配置模型类（由子类提供）
     """
@@ -77,6 +80,7 @@ class BaseConfigService(ABC, Generic[T]):
         await db.refresh(config)
 
         # 内部逻辑：如果配置处于启用状态，触发热重载
+        await cls._invalidate_cache(db)
         if config.status == 1:
             await cls._reload_config(config)
 
@@ -103,6 +107,7 @@ class BaseConfigService(ABC, Generic[T]):
         if not configs:
             logger.info(f"未找到{cls._get_config_type()}配置，开始初始化默认配置")
             configs = await cls._init_default_configs(db)
+            await cls._invalidate_cache(db)
 
         return configs
 
@@ -135,6 +140,28 @@ class BaseConfigService(ABC, Generic[T]):
         # 内部逻辑：数据修复 - 如果有多个status=1，保留第一个或优先保留有api_key的
         return await cls._fix_multiple_active_configs(db, active_configs)
 
+    @classmethod
+    async def get_cached_default_config(cls, db: AsyncSession) -> Optional[T]:
+        """
+        函数级注释：获取当前启用的配置（优先读取进程内缓存）
+        内部逻辑：检查其他进程是否写入过配置 -> 命中缓存直接返回 -> 未命中查询数据库并缓存副本
+        参数：
+            db: 数据库会话
+        返回值：启用中的配置对象（与数据库会话无关的副本），未找到返回None
+        """
+        name = cls._get_cache_name()
+        await config_cache.sync(db, name)
+
+        found, config = config_cache.get(name)
+        if found:
+            return config
+
+        generation = config_cache.generation(name)
+        config = await cls.get_default_config(db)
+        snapshot = cls._snapshot(config) if config is not None else None
+        config_cache.set(name, snapshot, generation)
+        return snapshot
+
     @classmethod
     async def get_config_by_id(cls, db: AsyncSession, config_id: str) -> Optional[T]:
         """
@@ -185,7 +212,8 @@ class BaseConfigService(ABC, Generic[T]):
         await db.commit()
         await db.refresh(config)
 
-        # 内部逻辑：触发热重载
+        # 内部逻辑：失效配置缓存并触发热重载
+        await cls._invalidate_cache(db)
         await cls._reload_config(config)
 
         logger.info(f"已启用{cls._get_config_type()}: {config.provider_name} - {config.model_name}")
@@ -219,6 +247,7 @@ class BaseConfigService(ABC, Generic[T]):
 
         await db.delete(config)
         await db.commit()
+        await cls._invalidate_cache(db)
         logger.info(f"{cls._get_config_type()}配置已删除: {config_id}")
         return True
 
@@ -267,6 +296,39 @@ class BaseConfigService(ABC, Generic[T]):
 
     # ==================== 私有辅助方法 ====================
 
+    @classmethod
+    def _get_cache_name(cls) -> str:
+        """
+        函数级注释：获取配置缓存名称（与配置表名一致）
+        返回值：如 "model_config" 或 "embedding_config"
+        """
+        return cls._get_config_model().__tablename__
+
+    @classmethod
+    def _snapshot(cls, config: T) -> T:
+        """
+        函数级注释：复制配置对象的列值，得到与数据库会话无关的对象（可在会话关闭后跨请求使用）
+        参数：
+            config: 配置对象
+        返回值：未加入任何会话的配置对象副本
+        """
+        config_model = cls._get_config_model()
+        return config_model(**{
+            column.key: getattr(config, column.key)
+            for column in config_model.__table__.columns
+        })
+
+    @classmethod
+    async def _invalidate_cache(cls, db: AsyncSession) -> None:
+        """
+        函数级注释：写入配置后失效配置缓存，并通知其他进程（启用跨进程版本检查时）
+        参数：
+            db: 数据库会话
+        """
+        name = cls._get_cache_name()
+        config_cache.invalidate(name)
+        await config_cache.bump(db, name)
+
     @classmethod
     async def _fix_multiple_active_configs(cls, db: AsyncSession, active_configs: List[T]) -> T:
         """
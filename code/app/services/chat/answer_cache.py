@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：语义答案缓存模块
+内部逻辑：按问题向量的余弦相似度匹配历史问题，命中时直接返回已缓存的回答与来源，
+         跳过检索与大模型调用，并统计命中率与节省的 Token 数
+设计模式：缓存模式 + 单例模式
+设计原则：单一职责原则
+
+实现说明：
+    - 缓存按作用域分区：模型配置（模型类型 + 模型名）与检索选项（MMR）不同的请求互不命中
+    - 知识库代数：文档入库时代数加一并清空缓存；文档删除时代数加一并淘汰引用该文档的条目，
+      生成期间代数发生变化的回答不会写入缓存，避免保存基于旧知识库的回答
+    - 条目按最近命中时间淘汰（LRU），超过有效期的条目在查找时移除
+    - 缓存位于进程内，多进程部署时每个进程独立维护
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+import numpy as np
+from loguru import logger
+
+from app.services.chat.context_packer import model_name_of
+
+
+@dataclass
+class CachedAnswer:
+    """
+    类级注释：缓存的回答条目
+    """
+    question: str  # 原始问题
+    answer: str  # 回答内容
+    sources: List[Dict[str, Any]] = field(default_factory=list)  # 来源信息（SourceInfo 字典）
+    doc_ids: FrozenSet[int] = frozenset()  # 回答引用的文档ID
+    context_tokens: int = 0  # 生成回答时的上下文 Token 数
+    completion_tokens: int = 0  # 回答 Token 数
+    created_at: float = field(default_factory=time.time)  # 写入时间
+    hit_count: int = 0  # 命中次数
+
+    @property
+    def saved_tokens(self) -> int:
+        """
+        函数级注释：每次命中节省的 Token 数（上下文 + 回答）
+        """
+        return self.context_tokens + self.completion_tokens
+
+
+@dataclass
+class AnswerCacheProbe:
+    """
+    类级注释：一次缓存查找的结果，未命中时用于回答生成后写入缓存
+    """
+    embedding: List[float]  # 问题向量
+    scope: str  # 缓存作用域
+    generation: int  # 查找前读取的知识库代数
+    hit: Optional[CachedAnswer] = None  # 命中的条目
+
+
+class _ScopeIndex:
+    """
+    类级注释：单个作用域内的问题向量索引
+    内部逻辑：按条目ID保存归一化向量，查找时懒加载拼接为矩阵，一次矩阵乘法得到全部相似度
+    """
+
+    def __init__(self):
+        # 内部变量：条目ID -> 归一化向量
+        self.vectors: Dict[int, np.ndarray] = {}
+        # 内部变量：拼接后的 (条目ID列表, 向量矩阵)，条目变化时置空
+        self._matrix: Optional[tuple] = None
+
+    def add(self, entry_id: int, vector: np.ndarray) -> None:
+        """
+        函数级注释：加入条目向量
+        """
+        self.vectors[entry_id] = vector
+        self._matrix = None
+
+    def remove(self, entry_id: int) -> None:
+        """
+        函数级注释：移除条目向量
+        """
+        if self.vectors.pop(entry_id, None) is not None:
+            self._matrix = None
+
+    def similarities(self, query: np.ndarray) -> tuple:
+        """
+        函数级注释：计算查询向量与作用域内全部问题的余弦相似度
+        参数：
+            query - 归一化查询向量
+        返回值：(条目ID列表, 相似度数组)
+        """
+        if self._matrix is None:
+            ids = list(self.vectors)
+            self._matrix = (ids, np.vstack([self.vectors[i] for i in ids]))
+        ids, matrix = self._matrix
+        if matrix.shape[1] != query.shape[0]:
+            return [], np.empty(0)
+        return ids, matrix @ query
+
+
+class SemanticAnswerCache:
+    """
+    类级注释：语义答案缓存
+    职责：
+        1. 按问题向量相似度查找同作用域内的已缓存回答
+        2. 写入新回答，按容量与有效期淘汰条目
+        3. 文档变更时使缓存失效
+        4. 统计命中率与节省的 Token 数
+    """
+
+    def __init__(self, threshold: float = 0.92, max_size: int = 1000, ttl_seconds: int = 86400):
+        """
+        函数级注释：初始化语义答案缓存
+        参数：
+            threshold - 命中所需的最低余弦相似度
+            max_size - 最大条目数
+            ttl_seconds - 条目有效期（秒）
+        """
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        # 内部变量：条目ID -> (作用域, 条目)，按最近命中顺序排列
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        # 内部变量：作用域 -> 向量索引
+        self._scopes: Dict[str, _ScopeIndex] = {}
+        self._next_id = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        # 内部变量：统计信息
+        self._hits = 0
+        self._misses = 0
+        self._saved_tokens = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        """
+        函数级注释：当前知识库代数（文档入库或删除时递增）
+        """
+        return self._generation
+
+    @staticmethod
+    def scope_key(llm, mmr_options=None, compression=None, multi_query=None) -> str:
+        """
+        函数级注释：根据模型配置与检索选项生成缓存作用域
+        参数：
+            llm - LangChain 模型实例
+            mmr_options - MMR 检索选项
+            compression - 参考资料压缩选项
+            multi_query - 多查询检索选项
+        返回值：str - 作用域键
+        """
+        scope = f"{type(llm).__name__}:{model_name_of(llm) or ''}"
+        if mmr_options is not None and mmr_options.enabled:
+            scope += f"|mmr:{mmr_options.lambda_mult}:{mmr_options.fetch_k}"
+        if compression is not None and compression.enabled:
+            scope += f"|compress:{compression.ratio}:{compression.min_tokens}"
+        if multi_query is not None and multi_query.enabled:
+            scope += f"|mq:{multi_query.mode}:{multi_query.num_variants}"
+        return scope
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> Optional[np.ndarray]:
+        """
+        函数级注释：向量归一化（零向量或形状异常时返回 None）
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        if vector.ndim != 1 or norm == 0:
+            return None
+        return vector / norm
+
+    async def aprobe(self, question: str, embeddings, scope: str) -> AnswerCacheProbe:
+        """
+        函数级注释：向量化问题并查找缓存
+        内部逻辑：先读取知识库代数再向量化（在工作线程中执行），保证写入时能识别期间发生的文档变更
+        参数：
+            question - 用户问题
+            embeddings - Embedding 实例
+            scope - 缓存作用域
+        返回值：AnswerCacheProbe - 查找结果
+        """
+        generation = self._generation
+        embedding = await asyncio.to_thread(embeddings.embed_query, question)
+        return AnswerCacheProbe(
+            embedding=embedding,
+            scope=scope,
+            generation=generation,
+            hit=self.lookup(embedding, scope)
+        )
+
+    def lookup(self, embedding: Sequence[float], scope: str) -> Optional[CachedAnswer]:
+        """
+        函数级注释：查找与问题向量最相似的已缓存回答
+        内部逻辑：按相似度从高到低检查阈值以上的条目，跳过并移除已过期条目
+        参数：
+            embedding - 问题向量
+            scope - 缓存作用域
+        返回值：Optional[CachedAnswer] - 命中的条目，未命中时为 None
+        """
+        query = self._normalize(embedding)
+        with self._lock:
+            index = self._scopes.get(scope)
+            if query is None or index is None:
+                self._misses += 1
+                return None
+
+            ids, scores = index.similarities(query)
+            now = time.time()
+            for position in np.argsort(-scores):
+                if scores[position] < self.threshold:
+                    break
+                entry_id = ids[position]
+                entry = self._entries[entry_id][1]
+                if now - entry.created_at > self.ttl_seconds:
+                    self._remove(entry_id)
+                    continue
+
+                self._entries.move_to_end(entry_id)
+                entry.hit_count += 1
+                self._hits += 1
+                self._saved_tokens += entry.saved_tokens
+                logger.debug(f"答案缓存命中: 相似度 {scores[position]:.3f}，原问题: {entry.question[:50]}")
+                return entry
+
+            self._misses += 1
+            return None
+
+    def store(
+        self,
+        embedding: Sequence[float],
+        scope: str,
+        entry: CachedAnswer,
+        generation: Optional[int] = None
+    ) -> bool:
+        """
+        函数级注释：写入回答
+        参数：
+            embedding - 问题向量
+            scope - 缓存作用域
+            entry - 回答条目
+            generation - 生成回答前读取的知识库代数（与当前代数不一致时不写入）
+        返回值：bool - 是否写入
+        """
+        vector = self._normalize(embedding)
+        with self._lock:
+            # Guard Clause：生成期间知识库发生变化，回答可能已过时
+            if vector is None or (generation is not None and generation != self._generation):
+                return False
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (scope, entry)
+            self._scopes.setdefault(scope, _ScopeIndex()).add(entry_id, vector)
+
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+            return True
+
+    def advance_generation(self) -> None:
+        """
+        函数级注释：知识库新增内容后使全部缓存失效
+        """
+        with self._lock:
+            self._generation += 1
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+            self._scopes.clear()
+
+    def invalidate_documents(self, doc_ids: Iterable[int]) -> int:
+        """
+        函数级注释：淘汰引用指定文档的条目
+        参数：
+            doc_ids - 发生变更的文档ID
+        返回值：int - 淘汰的条目数
+        """
+        targets = set(doc_ids)
+        with self._lock:
+            self._generation += 1
+            stale = [entry_id for entry_id, (_, entry) in self._entries.items() if entry.doc_ids & targets]
+            for entry_id in stale:
+                self._remove(entry_id)
+            self._invalidations += len(stale)
+            return len(stale)
+
+    def clear(self) -> None:
+        """
+        函数级注释：清空缓存与统计信息
+        """
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+            self._hits = self._misses = self._saved_tokens = 0
+            self._evictions = self._invalidations = 0
+
+    def _remove(self, entry_id: int) -> None:
+        """
+        函数级注释：移除条目及其向量（调用方需持有锁）
+        """
+        scope, _ = self._entries.pop(entry_id)
+        index = self._scopes.get(scope)
+        if index is not None:
+            index.remove(entry_id)
+            if not index.vectors:
+                del self._scopes[scope]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        函数级注释：获取缓存统计信息
+        返回值：Dict[str, Any] - 条目数、命中率、节省的 Token 数等
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "threshold": self.threshold,
+                "generation": self._generation,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "saved_tokens": self._saved_tokens,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+# 内部变量：全局缓存实例（首次使用时按配置创建）
+_answer_cache: Optional[SemanticAnswerCache] = None
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """
+    函数级注释：获取全局语义答案缓存实例
+    返回值：SemanticAnswerCache
+    """
+    global _answer_cache
+    if _answer_cache is None:
+        from app.core.config import settings
+
+        _answer_cache = SemanticAnswerCache(
+            threshold=settings.ANSWER_CACHE_THRESHOLD,
+            max_size=settings.ANSWER_CACHE_SIZE,
+            ttl_seconds=settings.ANSWER_CACHE_TTL
+        )
+    return _answer_cache
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'CachedAnswer',
+    'AnswerCacheProbe',
+    'SemanticAnswerCache',
+    'get_answer_cache',
+]
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：参考资料抽取式压缩模块
+内部逻辑：在上下文打包前将检索片段切分为句子，按与问题的词语重合度为句子打分，
+         每个片段只保留得分最高的句子（不超过按比例计算的 Token 预算），按原顺序拼接
+设计模式：策略模式（作为可选的检索后处理阶段）+ 值对象（压缩结果）
+设计原则：单一职责原则
+
+实现说明：
+    - 打分只使用问题与句子的词语重合度（中文按相邻两字切分，英文按单词切分），以 IDF 加权，
+      不产生额外的向量化调用，压缩耗时远小于模型处理被删除 Token 的耗时
+    - 在前面片段中已出现过的句子（页眉、重复标题、模板化声明等）直接删除
+    - 片段中没有与问题重合的句子时（语义检索命中但无词语重合），保留开头的句子
+    - 压缩比例 = 压缩后参考资料 Token 数 / 压缩前 Token 数，随回答返回
+"""
+
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Set
+
+from langchain_core.documents import Document
+from loguru import logger
+
+from app.utils.token_counter import count_tokens
+
+# 内部变量：句子边界（中文句末标点之后、英文句点后的空白、换行）
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[。！？!?；;])|(?<=\.)\s+|\n+")
+# 内部变量：连续的中文字符
+_CJK_RUN = re.compile(r"[\u4e00-\u9fff]+")
+# 内部变量：英文单词与数字
+_WORD = re.compile(r"[A-Za-z0-9_]+")
+# 内部变量：不参与打分的英文停用词
+_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "be", "can", "do", "does", "for", "how", "in", "is", "it",
+    "of", "on", "or", "the", "to", "what", "when", "where", "which", "who", "why", "with",
+})
+
+
+@dataclass
+class CompressionOptions:
+    """
+    类级注释：参考资料压缩选项
+    职责：封装单次请求的压缩参数，支持请求级覆盖全局配置
+    """
+    enabled: bool = False  # 是否启用压缩
+    ratio: float = 0.5  # 每个片段保留的 Token 比例
+    min_tokens: int = 48  # 不超过该 Token 数的片段不压缩
+
+    @classmethod
+    def resolve(
+        cls,
+        compress_context: Optional[bool] = None,
+        compression_ratio: Optional[float] = None
+    ) -> 'CompressionOptions':
+        """
+        函数级注释：合并请求参数与全局配置
+        参数：
+            compress_context - 请求指定的是否启用（None 表示使用全局配置）
+            compression_ratio - 请求指定的保留比例（None 表示使用全局配置）
+        返回值：CompressionOptions - 合并后的选项
+        """
+        from app.core.config import settings
+
+        return cls(
+            enabled=settings.ENABLE_CONTEXT_COMPRESSION if compress_context is None else compress_context,
+            ratio=settings.CONTEXT_COMPRESSION_RATIO if compression_ratio is None else compression_ratio,
+            min_tokens=settings.CONTEXT_COMPRESSION_MIN_TOKENS
+        )
+
+
+@dataclass
+class CompressedContext:
+    """
+    类级注释：参考资料压缩结果
+    """
+    documents: List[Document] = field(default_factory=list)  # 压缩后的片段（顺序不变）
+    enabled: bool = False  # 是否执行了压缩
+    original_tokens: int = 0  # 压缩前片段 Token 数
+    compressed_tokens: int = 0  # 压缩后片段 Token 数
+    compressed_documents: int = 0  # 被压缩的片段数
+    dropped_documents: int = 0  # 只包含重复句子而被删除的片段数
+
+    @property
+    def ratio(self) -> Optional[float]:
+        """
+        函数级注释：压缩比例（压缩后 / 压缩前 Token 数，未执行压缩时为 None）
+        """
+        if not self.enabled:
+            return None
+        if self.original_tokens == 0:
+            return 1.0
+        return round(self.compressed_tokens / self.original_tokens, 4)
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    函数级注释：将文本切分为句子
+    参数：
+        text - 输入文本
+    返回值：List[str] - 去除首尾空白后的非空句子
+    """
+    return [sentence.strip() for sentence in _SENTENCE_BOUNDARY.split(text) if sentence and sentence.strip()]
+
+
+def extract_terms(text: str) -> Set[str]:
+    """
+    函数级注释：提取用于重合度打分的词语
+    内部逻辑：中文按相邻两字切分（单字按单字），英文与数字按单词切分并转小写，去除英文停用词
+    参数：
+        text - 输入文本
+    返回值：Set[str] - 词语集合
+    """
+    terms: Set[str] = set()
+    for run in _CJK_RUN.findall(text):
+        if len(run) == 1:
+            terms.add(run)
+        else:
+            terms.update(run[i:i + 2] for i in range(len(run) - 1))
+    for word in _WORD.findall(text):
+        word = word.lower()
+        if word not in _STOPWORDS:
+            terms.add(word)
+    return terms
+
+
+class ContextCompressor:
+    """
+    类级注释：参考资料抽取式压缩器
+    职责：
+        1. 将片段切分为句子并删除重复句子
+        2. 按与问题的词语重合度为句子打分
+        3. 在每个片段的 Token 预算内保留得分最高的句子
+    """
+
+    def __init__(self, options: CompressionOptions):
+        """
+        函数级注释：初始化压缩器
+        参数：
+            options - 压缩选项
+        """
+        self.options = options
+
+    def compress(self, question: str, documents: Sequence[Document]) -> CompressedContext:
+        """
+        函数级注释：压缩检索片段
+        参数：
+            question - 用户问题
+            documents - 检索片段（按相关性降序）
+        返回值：CompressedContext - 压缩结果（未启用时原样返回片段）
+        """
+        # Guard Clause：未启用压缩
+        if not self.options.enabled:
+            return CompressedContext(documents=list(documents))
+
+        result = CompressedContext(enabled=True)
+        query_terms = extract_terms(question)
+
+        # 内部逻辑：切分句子并删除前面已出现过的句子
+        seen: Set[str] = set()
+        chunks: List[List[str]] = []
+        complete: List[bool] = []
+        for doc in documents:
+            sentences = []
+            all_sentences = split_sentences(doc.page_content)
+            for sentence in all_sentences:
+                if sentence not in seen:
+                    seen.add(sentence)
+                    sentences.append(sentence)
+            chunks.append(sentences)
+            complete.append(len(sentences) == len(all_sentences))
+
+        # 内部逻辑：按包含各词语的句子数计算 IDF，出现越少的问题词权重越高
+        sentence_terms = [[extract_terms(sentence) & query_terms for sentence in sentences] for sentences in chunks]
+        document_frequency: Dict[str, int] = {}
+        total_sentences = 0
+        for terms_list in sentence_terms:
+            total_sentences += len(terms_list)
+            for terms in terms_list:
+                for term in terms:
+                    document_frequency[term] = document_frequency.get(term, 0) + 1
+        idf = {
+            term: math.log(1 + total_sentences / (1 + frequency))
+            for term, frequency in document_frequency.items()
+        }
+
+        for doc, sentences, terms_list, unchanged in zip(documents, chunks, sentence_terms, complete):
+            tokens = count_tokens(doc.page_content)
+            result.original_tokens += tokens
+
+            if not sentences:
+                result.dropped_documents += 1
+                continue
+
+            scores = [sum(idf[term] for term in terms) for terms in terms_list]
+            content = self._select(doc.page_content, sentences, scores, tokens, unchanged)
+            if content is doc.page_content:
+                result.documents.append(doc)
+                result.compressed_tokens += tokens
+                continue
+
+            result.documents.append(Document(page_content=content, metadata={**doc.metadata, "compressed": True}))
+            result.compressed_tokens += count_tokens(content)
+            result.compressed_documents += 1
+
+        logger.debug(
+            f"参考资料压缩: {result.original_tokens} -> {result.compressed_tokens} Token"
+            f"（比例 {result.ratio}），压缩片段 {result.compressed_documents}，删除重复片段 {result.dropped_documents}"
+        )
+        return result
+
+    def _select(
+        self,
+        content: str,
+        sentences: List[str],
+        scores: List[float],
+        tokens: int,
+        unchanged: bool
+    ) -> str:
+        """
+        函数级注释：在片段预算内选择句子
+        内部逻辑：按得分从高到低装入预算（得分相同时靠前的优先），没有与问题重合的句子时按原顺序装入；
+                 得分最高的句子即使超出预算也保留，选中的句子按原顺序拼接
+        参数：
+            content - 片段原文
+            sentences - 去重后的句子
+            scores - 句子得分
+            tokens - 片段原文 Token 数
+            unchanged - 去重时是否未删除句子
+        返回值：str - 压缩后的文本（无需压缩时返回原文对象本身）
+        """
+        # Guard Clause：短片段不按得分筛选，只删除重复句子
+        if tokens <= self.options.min_tokens:
+            return content if unchanged else " ".join(sentences)
+
+        budget = max(int(tokens * self.options.ratio), self.options.min_tokens)
+        if any(scores):
+            order = sorted((index for index, score in enumerate(scores) if score > 0), key=lambda i: (-scores[i], i))
+        else:
+            order = list(range(len(sentences)))
+
+        selected: List[int] = []
+        used = 0
+        for index in order:
+            sentence_tokens = count_tokens(sentences[index])
+            if selected and used + sentence_tokens > budget:
+                continue
+            selected.append(index)
+            used += sentence_tokens
+
+        if len(selected) == len(sentences) and unchanged:
+            return content
+        return " ".join(sentences[index] for index in sorted(selected))
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'CompressionOptions',
+    'CompressedContext',
+    'ContextCompressor',
+    'split_sentences',
+    'extract_terms',
+]
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：上下文打包模块
+内部逻辑：在按模型确定的 Token 预算内装入对话历史与检索片段，超出部分按价值从低到高截断或丢弃，
+         并返回实际装入的 Token 数
+设计模式：策略模式（按模型选择预算）+ 值对象（打包结果）
+设计原则：单一职责原则
+
+实现说明：
+    - 用户问题必须完整保留，先从预算中扣除
+    - 对话历史最多占用 CONTEXT_HISTORY_RATIO 比例的预算，从最新一轮开始装入，较早的消息先被丢弃
+    - 检索片段按相关性顺序装入，放不下时截断到剩余预算；剩余预算过小时丢弃，继续尝试后续更短的片段
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from langchain_core.documents import Document
+from loguru import logger
+
+from app.utils.token_counter import count_tokens, truncate_to_tokens
+
+# 内部变量：片段截断后至少保留的 Token 数（剩余预算更小时直接丢弃）
+MIN_TRUNCATED_TOKENS = 64
+
+# 内部变量：对话历史中的角色显示名称
+ROLE_LABELS = {"user": "用户", "assistant": "助手", "system": "系统"}
+
+
+@dataclass
+class PackedContext:
+    """
+    类级注释：上下文打包结果
+    """
+    documents: List[Document] = field(default_factory=list)  # 装入的片段（按相关性排序）
+    history: List[Dict[str, str]] = field(default_factory=list)  # 装入的历史消息（按时间正序）
+    budget: int = 0  # Token 预算
+    question_tokens: int = 0  # 用户问题 Token 数
+    document_tokens: int = 0  # 片段 Token 数
+    history_tokens: int = 0  # 历史消息 Token 数
+    dropped_documents: int = 0  # 丢弃的片段数
+    truncated_documents: int = 0  # 截断的片段数
+    dropped_history: int = 0  # 丢弃的历史消息数
+
+    @property
+    def total_tokens(self) -> int:
+        """
+        函数级注释：打包后上下文的总 Token 数（问题 + 历史 + 片段）
+        """
+        return self.question_tokens + self.history_tokens + self.document_tokens
+
+    def format_documents(self) -> str:
+        """
+        函数级注释：格式化片段为参考资料文本
+        """
+        return "\n\n".join(doc.page_content for doc in self.documents)
+
+    def format_history(self) -> str:
+        """
+        函数级注释：格式化历史消息为对话文本
+        """
+        return "\n".join(
+            f"{ROLE_LABELS.get(message['role'], message['role'])}: {message['content']}"
+            for message in self.history
+        )
+
+    def format_history_block(self) -> str:
+        """
+        函数级注释：格式化提示词中的对话历史段落（无历史时为空字符串）
+        """
+        if not self.history:
+            return ""
+        return f"对话历史:\n{self.format_history()}\n\n"
+
+
+def parse_model_budgets(value: str) -> Dict[str, int]:
+    """
+    函数级注释：解析按模型覆盖的预算配置
+    参数：
+        value - 配置字符串，格式：模型名前缀:预算，逗号分隔
+    返回值：Dict[str, int] - {模型名前缀: 预算}
+    """
+    budgets: Dict[str, int] = {}
+    for item in value.split(","):
+        prefix, _, budget = item.strip().rpartition(":")
+        if not prefix or not budget.strip().isdigit():
+            continue
+        budgets[prefix.strip().lower()] = int(budget)
+    return budgets
+
+
+def resolve_budget(model_name: Optional[str] = None) -> int:
+    """
+    函数级注释：获取模型对应的 Token 预算
+    内部逻辑：按最长前缀匹配 CONTEXT_MODEL_BUDGETS，未匹配时使用 CONTEXT_TOKEN_BUDGET
+    参数：
+        model_name - 模型名称
+    返回值：int - Token 预算
+    """
+    from app.core.config import settings
+
+    if model_name:
+        name = model_name.lower()
+        matched = [
+            (len(prefix), budget)
+            for prefix, budget in parse_model_budgets(settings.CONTEXT_MODEL_BUDGETS).items()
+            if name.startswith(prefix)
+        ]
+        if matched:
+            return max(matched)[1]
+    return settings.CONTEXT_TOKEN_BUDGET
+
+
+def model_name_of(llm) -> Optional[str]:
+    """
+    函数级注释：读取 LangChain 模型实例的模型名称
+    参数：
+        llm - LangChain 模型实例
+    返回值：Optional[str] - 模型名称
+    """
+    for attr in ("model_name", "model"):
+        value = getattr(llm, attr, None)
+        if isinstance(value, str) and value:
+            return value
+    return None
+
+
+class ContextPacker:
+    """
+    类级注释：上下文打包器
+    职责：
+        1. 统计问题、历史消息与检索片段的 Token 数
+        2. 在预算内按价值装入历史消息与片段
+        3. 记录截断与丢弃情况
+    """
+
+    def __init__(self, budget: int, history_ratio: Optional[float] = None):
+        """
+        函数级注释：初始化打包器
+        参数：
+            budget - Token 预算
+            history_ratio - 对话历史最多占用的预算比例（None 表示使用全局配置）
+        """
+        from app.core.config import settings
+
+        self.budget = budget
+        self.history_ratio = settings.CONTEXT_HISTORY_RATIO if history_ratio is None else history_ratio
+
+    @classmethod
+    def for_llm(cls, llm) -> 'ContextPacker':
+        """
+        函数级注释：按模型实例的名称创建打包器
+        参数：
+            llm - LangChain 模型实例
+        返回值：ContextPacker
+        """
+        return cls(resolve_budget(model_name_of(llm)))
+
+    def pack(
+        self,
+        question: str,
+        documents: Sequence[Document],
+        history: Optional[Sequence] = None
+    ) -> PackedContext:
+        """
+        函数级注释：在预算内打包问题、历史消息与检索片段
+        参数：
+            question - 用户问题
+            documents - 检索片段（按相关性降序）
+            history - 历史消息（按时间正序，元素为 ChatMessage 或 {role, content} 字典）
+        返回值：PackedContext - 打包结果
+        """
+        packed = PackedContext(budget=self.budget, question_tokens=count_tokens(question))
+        remaining = max(self.budget - packed.question_tokens, 0)
+
+        self._pack_history(packed, history or [], int(remaining * self.history_ratio))
+        remaining -= packed.history_tokens
+        self._pack_documents(packed, documents, remaining)
+
+        if packed.dropped_documents or packed.truncated_documents or packed.dropped_history:
+            logger.debug(
+                f"上下文打包: 预算 {self.budget}，装入 {packed.total_tokens} Token，"
+                f"片段 {len(packed.documents)}（截断 {packed.truncated_documents}，丢弃 {packed.dropped_documents}），"
+                f"历史 {len(packed.history)}（丢弃 {packed.dropped_history}）"
+            )
+        return packed
+
+    @staticmethod
+    def _pack_history(packed: PackedContext, history: Sequence, budget: int) -> None:
+        """
+        函数级注释：从最新一轮开始装入历史消息，放不下时丢弃更早的消息
+        参数：
+            packed - 打包结果
+            history - 历史消息（按时间正序）
+            budget - 历史消息预算
+        """
+        selected: List[Dict[str, str]] = []
+        for index in range(len(history) - 1, -1, -1):
+            message = history[index]
+            role = message["role"] if isinstance(message, dict) else message.role
+            content = message["content"] if isinstance(message, dict) else message.content
+            tokens = count_tokens(content)
+            if packed.history_tokens + tokens > budget:
+                packed.dropped_history = index + 1
+                break
+            selected.append({"role": role, "content": content})
+            packed.history_tokens += tokens
+
+        packed.history = selected[::-1]
+
+    @staticmethod
+    def _pack_documents(packed: PackedContext, documents: Sequence[Document], budget: int) -> None:
+        """
+        函数级注释：按相关性装入片段，放不下时截断或丢弃
+        参数：
+            packed - 打包结果
+            documents - 检索片段（按相关性降序）
+            budget - 片段预算
+        """
+        for doc in documents:
+            remaining = budget - packed.document_tokens
+            tokens = count_tokens(doc.page_content)
+
+            if tokens <= remaining:
+                packed.documents.append(doc)
+                packed.document_tokens += tokens
+                continue
+
+            # 内部逻辑：剩余预算足够时截断片段，否则丢弃并继续尝试后续片段
+            if remaining >= MIN_TRUNCATED_TOKENS:
+                content = truncate_to_tokens(doc.page_content, remaining)
+                packed.documents.append(Document(
+                    page_content=content,
+                    metadata={**doc.metadata, "truncated": True}
+                ))
+                packed.document_tokens += count_tokens(content)
+                packed.truncated_documents += 1
+            else:
+                packed.dropped_documents += 1
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'PackedContext',
+    'ContextPacker',
+    'resolve_budget',
+]
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：文档总结引擎模块
+内部逻辑：将文档片段按顺序划分为片段组，片段组并行总结（限制并发数）后逐层归并为全文摘要，
+         片段组摘要与全文摘要持久化，重复总结与文档对比时直接复用
+设计模式：映射-归约（Map-Reduce）+ 缓存旁路模式
+设计原则：单一职责原则
+
+实现说明：
+    - 数据库会话不能并发使用，因此分为三步：读取片段与已有摘要 -> 并发调用大模型 -> 写回新摘要
+    - 摘要按输入内容、提示词版本与模型标识的哈希值复用，文档内容、片段组划分或模型变化后
+      旧摘要自动失效并在写回时清理
+    - 只有一个片段组的文档只调用一次大模型
+"""
+
+import asyncio
+import hashlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.models.models import Document, DocumentSummary, VectorMapping
+from app.services.chat.context_packer import model_name_of
+
+# 内部变量：提示词版本（修改提示词后递增，使已持久化的摘要失效）
+PROMPT_VERSION = "1"
+
+# 内部变量：逐层归并的最大层数（超出时截断拼接后直接生成全文摘要）
+MAX_REDUCE_LEVELS = 8
+
+# 内部变量：摘要层级
+LEVEL_GROUP = "group"
+LEVEL_DOCUMENT = "document"
+
+# 内部变量：片段组总结提示词
+GROUP_PROMPT = "请提炼下面这段文档片段的要点，保留关键事实、数据和结论：\n\n{text}"
+
+# 内部变量：中间归并提示词
+REDUCE_PROMPT = "下面是同一份文档若干连续部分的要点，请合并为一份简洁的要点摘要：\n\n{text}"
+
+# 内部变量：全文总结提示词
+FINAL_PROMPT = "帅哥，请帮我总结下面这段文档的核心内容：\n\n{text}"
+
+
+@dataclass
+class _DocumentWork:
+    """
+    类级注释：单个文档的总结任务
+    """
+    doc_id: int
+    file_name: str
+    groups: List[str] = field(default_factory=list)  # 片段组文本（按文档顺序）
+    group_hashes: List[str] = field(default_factory=list)  # 片段组摘要的内容哈希
+    document_hash: str = ""  # 全文摘要的内容哈希
+
+
+def model_signature(llm: Any) -> str:
+    """
+    函数级注释：获取大模型实例的标识（模型类型 + 模型名称）
+    参数：
+        llm - 大模型实例
+    返回值：str - 模型标识
+    """
+    return f"{type(llm).__name__}:{model_name_of(llm) or ''}"
+
+
+def _content_hash(level: str, text: str, model_key: str) -> str:
+    """
+    函数级注释：计算摘要输入内容的哈希值
+    参数：
+        level - 摘要层级
+        text - 输入内容
+        model_key - 模型标识
+    返回值：str - SHA-256 十六进制摘要
+    """
+    return hashlib.sha256(f"{PROMPT_VERSION}:{model_key}:{level}:{text}".encode("utf-8")).hexdigest()
+
+
+def group_chunks(chunks: Sequence[str], group_chars: int) -> List[str]:
+    """
+    函数级注释：按顺序将片段合并为不超过指定字符数的片段组
+    内部逻辑：单个片段超过上限时单独成组并截断
+    参数：
+        chunks - 片段内容（按文档顺序）
+        group_chars - 每组最大字符数
+    返回值：List[str] - 片段组文本
+    """
+    groups: List[str] = []
+    current: List[str] = []
+    size = 0
+    for chunk in chunks:
+        chunk = chunk[:group_chars]
+        # 内部逻辑：加上换行分隔符后超出上限时结束当前组
+        if current and size + 1 + len(chunk) > group_chars:
+            groups.append("\n".join(current))
+            current, size = [], 0
+        size += len(chunk) + (1 if current else 0)
+        current.append(chunk)
+    if current:
+        groups.append("\n".join(current))
+    return groups
+
+
+class DocumentSummarizer:
+    """
+    类级注释：文档总结引擎
+    内部逻辑：片段组并行总结 -> 逐层归并 -> 持久化复用
+    职责：
+        1. 读取文档片段并划分片段组
+        2. 在并发上限内调用大模型生成缺失的片段组摘要与全文摘要
+        3. 持久化新生成的摘要并清理失效摘要
+    """
+
+    def __init__(
+        self,
+        llm: Any,
+        group_chars: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        model_key: Optional[str] = None
+    ):
+        """
+        函数级注释：初始化文档总结引擎
+        参数：
+            llm - 非流式大模型实例（需提供 ainvoke）
+            group_chars - 每个片段组的最大字符数（None 表示使用全局配置）
+            max_concurrency - 并发调用大模型的最大数量（None 表示使用全局配置）
+            model_key - 模型标识（None 表示根据模型实例推断）
+        """
+        self.llm = llm
+        self.model_key = model_key or model_signature(llm)
+        self.group_chars = group_chars or settings.SUMMARY_GROUP_CHARS
+        self.max_concurrency = max_concurrency or settings.SUMMARY_MAX_CONCURRENCY
+
+    async def summarize(self, db: AsyncSession, doc_id: int) -> Optional[str]:
+        """
+        函数级注释：总结单个文档
+        参数：
+            db - 数据库会话
+            doc_id - 文档ID
+        返回值：Optional[str] - 全文摘要（文档无内容时返回 None）
+        """
+        summaries = await self.summarize_many(db, [doc_id])
+        return summaries[doc_id][1] if doc_id in summaries else None
+
+    async def summarize_many(
+        self,
+        db: AsyncSession,
+        doc_ids: Sequence[int]
+    ) -> Dict[int, Tuple[str, str]]:
+        """
+        函数级注释：总结多个文档（所有文档共享同一个并发上限）
+        参数：
+            db - 数据库会话
+            doc_ids - 文档ID列表
+        返回值：Dict[int, Tuple[str, str]] - 文档ID -> (文件名, 全文摘要)，无内容的文档不包含在内
+        """
+        works = await self._load_works(db, doc_ids)
+
+        # Guard Clause：所有文档都没有内容
+        if not works:
+            return {}
+
+        cached = await self._load_summaries(db, list(works))
+
+        # 内部逻辑：并发生成缺失的摘要（不访问数据库）
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = await asyncio.gather(*(
+            self._summarize_work(work, cached, semaphore) for work in works.values()
+        ))
+
+        new_rows = [row for _, rows in results for row in rows]
+        if new_rows:
+            await self._save_summaries(db, list(works.values()), new_rows)
+
+        return {
+            work.doc_id: (work.file_name, summary)
+            for work, (summary, _) in zip(works.values(), results)
+        }
+
+    async def _load_works(self, db: AsyncSession, doc_ids: Sequence[int]) -> Dict[int, _DocumentWork]:
+        """
+        函数级注释：读取文档片段并划分片段组
+        内部逻辑：单次查询读取所有文档的片段，按写入顺序排列
+        参数：
+            db - 数据库会话
+            doc_ids - 文档ID列表
+        返回值：Dict[int, _DocumentWork] - 按请求顺序排列的总结任务
+        """
+        result = await db.execute(
+            select(Document.id, Document.file_name, VectorMapping.chunk_content)
+            .join(VectorMapping, Document.id == VectorMapping.document_id)
+            .where(Document.id.in_(set(doc_ids)))
+            .order_by(Document.id, VectorMapping.id)
+        )
+
+        file_names: Dict[int, str] = {}
+        chunks: Dict[int, List[str]] = defaultdict(list)
+        for doc_id, file_name, chunk_content in result.all():
+            file_names[doc_id] = file_name
+            chunks[doc_id].append(chunk_content)
+
+        works: Dict[int, _DocumentWork] = {}
+        for doc_id in dict.fromkeys(doc_ids):
+            if doc_id not in chunks:
+                continue
+            groups = group_chunks(chunks[doc_id], self.group_chars)
+            group_hashes = [_content_hash(LEVEL_GROUP, text, self.model_key) for text in groups]
+            works[doc_id] = _DocumentWork(
+                doc_id=doc_id,
+                file_name=file_names[doc_id],
+                groups=groups,
+                group_hashes=group_hashes,
+                document_hash=_content_hash(LEVEL_DOCUMENT, ",".join(group_hashes), self.model_key)
+            )
+        return works
+
+    @staticmethod
+    async def _load_summaries(db: AsyncSession, doc_ids: List[int]) -> Dict[Tuple[int, str], str]:
+        """
+        函数级注释：读取已持久化的摘要
+        参数：
+            db - 数据库会话
+            doc_ids - 文档ID列表
+        返回值：Dict[Tuple[int, str], str] - (文档ID, 内容哈希) -> 摘要
+        """
+        result = await db.execute(
+            select(DocumentSummary.document_id, DocumentSummary.content_hash, DocumentSummary.summary)
+            .where(DocumentSummary.document_id.in_(doc_ids))
+        )
+        return {(row[0], row[1]): row[2] for row in result.all()}
+
+    async def _summarize_work(
+        self,
+        work: _DocumentWork,
+        cached: Dict[Tuple[int, str], str],
+        semaphore: asyncio.Semaphore
+    ) -> Tuple[str, List[DocumentSummary]]:
+        """
+        函数级注释：生成单个文档的全文摘要
+        内部逻辑：全文摘要已存在时直接返回；只有一个片段组时直接生成全文摘要；
+                 否则并行生成缺失的片段组摘要，再逐层归并
+        参数：
+            work - 总结任务
+            cached - 已持久化的摘要
+            semaphore - 并发上限
+        返回值：Tuple[str, List[DocumentSummary]] - 全文摘要与新生成的摘要记录
+        """
+        document_summary = cached.get((work.doc_id, work.document_hash))
+        if document_summary is not None:
+            return document_summary, []
+
+        new_rows: List[DocumentSummary] = []
+
+        if len(work.groups) == 1:
+            document_summary = await self._invoke(FINAL_PROMPT, work.groups[0], semaphore)
+        else:
+            async def summarize_group(index: int) -> str:
+                summary = cached.get((work.doc_id, work.group_hashes[index]))
+                if summary is None:
+                    summary = await self._invoke(GROUP_PROMPT, work.groups[index], semaphore)
+                    new_rows.append(DocumentSummary(
+                        document_id=work.doc_id,
+                        level=LEVEL_GROUP,
+                        group_index=index,
+                        content_hash=work.group_hashes[index],
+                        summary=summary
+                    ))
+                return summary
+
+            partials = await asyncio.gather(*(summarize_group(index) for index in range(len(work.groups))))
+            document_summary = await self._reduce(list(partials), semaphore)
+
+        new_rows.append(DocumentSummary(
+            document_id=work.doc_id,
+            level=LEVEL_DOCUMENT,
+            group_index=0,
+            content_hash=work.document_hash,
+            summary=document_summary
+        ))
+        logger.info(f"文档总结完成: doc_id={work.doc_id}, 片段组 {len(work.groups)} 个")
+        return document_summary, new_rows
+
+    async def _reduce(self, partials: List[str], semaphore: asyncio.Semaphore) -> str:
+        """
+        函数级注释：逐层归并摘要
+        内部逻辑：按字符上限将摘要分批，能放入一批时生成全文摘要，否则各批并行归并后继续下一层；
+                 每条摘要截断到半批以内（含换行分隔符），保证每层至少两两合并；
+                 分批未能减少摘要数时强制两两合并，超过最大层数时截断拼接后生成全文摘要
+        参数：
+            partials - 待归并的摘要（按文档顺序）
+            semaphore - 并发上限
+        返回值：str - 全文摘要
+        """
+        for _ in range(MAX_REDUCE_LEVELS):
+            partials = [partial[:(self.group_chars - 1) // 2] for partial in partials]
+            batches = group_chunks(partials, self.group_chars)
+            if len(batches) == 1:
+                return await self._invoke(FINAL_PROMPT, batches[0], semaphore)
+            if len(batches) == len(partials):
+                batches = ["\n".join(partials[i:i + 2]) for i in range(0, len(partials), 2)]
+            partials = list(await asyncio.gather(*(
+                self._invoke(REDUCE_PROMPT, batch, semaphore) for batch in batches
+            )))
+
+        logger.warning(f"摘要归并超过最大层数 {MAX_REDUCE_LEVELS}，截断后生成全文摘要")
+        return await self._invoke(FINAL_PROMPT, "\n".join(partials)[:self.group_chars], semaphore)
+
+    async def _invoke(self, template: str, text: str, semaphore: asyncio.Semaphore) -> str:
+        """
+        函数级注释：在并发上限内调用大模型
+        参数：
+            template - 提示词模板
+            text - 输入内容
+            semaphore - 并发上限
+        返回值：str - 模型输出
+        """
+        async with semaphore:
+            response = await self.llm.ainvoke(template.format(text=text))
+        return response.content
+
+    @staticmethod
+    async def _save_summaries(
+        db: AsyncSession,
+        works: List[_DocumentWork],
+        new_rows: List[DocumentSummary]
+    ) -> None:
+        """
+        函数级注释：写回新生成的摘要并清理失效摘要
+        内部逻辑：写入失败只记录日志，不影响本次总结结果
+        参数：
+            db - 数据库会话
+            works - 本次总结的任务
+            new_rows - 新生成的摘要记录
+        """
+        try:
+            for work in works:
+                current_hashes = [*work.group_hashes, work.document_hash]
+                await db.execute(
+                    delete(DocumentSummary).where(
+                        DocumentSummary.document_id == work.doc_id,
+                        DocumentSummary.content_hash.notin_(current_hashes)
+                    )
+                )
+            db.add_all(new_rows)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"保存文档摘要失败: {str(e)}")
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'DocumentSummarizer',
+    'group_chunks',
+    'model_signature',
+]
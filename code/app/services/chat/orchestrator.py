@@ -14,6 +14,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
 from app.schemas.chat import ChatRequest, ChatResponse, SourceDetail
+from app.services.chat.answer_cache import AnswerCacheProbe, CachedAnswer, get_answer_cache
+from app.services.chat.context_compressor import CompressionOptions
 from app.services.chat.strategies import (
     ChatStrategyFactory,
     RAGStrategy,
@@ -23,15 +25,25 @@ from app.services.chat.strategies import (
 from app.services.chat.streaming_strategies import StreamingStrategyFactory
 from app.services.chat.sources_processor import SourcesProcessor
 from app.services.chat.document_formatter import DocumentFormatter, DocumentFormatterBuilder
+from app.services.chat.document_summarizer import DocumentSummarizer
+from app.services.chat.pipeline import ChatPipelineBuilder, PipelineContext
+from app.services.retrieval import MMROptions, MultiQueryOptions
 from app.models.models import Document, VectorMapping
 from sqlalchemy.future import select
 
 # 内部逻辑：导入依赖服务
-from app.services.ingest_service import IngestService
-from app.services.agent_service import AgentService
+from app.services.agent_service import AgentService, get_agent_service
 from app.services.llm_provider import llm_provider
 from app.core.config import settings
 from app.utils.sensitive_data_filter import get_filter, StreamingSensitiveFilter
+from app.utils.token_counter import count_tokens, StreamTokenCounter
+from app.utils.interactive_activity import interactive
+from app.utils.singleflight import get_singleflight
+from app.db.session import open_session
+from app.utils.stream_events import STREAM_DONE, StreamEvent, as_stream_events
+
+# 内部变量：回放缓存回答时每个 SSE 数据块的字符数
+CACHE_REPLAY_CHUNK_SIZE = 24
 
 
 class ChatOrchestrator:
@@ -78,6 +90,7 @@ class ChatOrchestrator:
         # 内部变量：Agent服务（可选依赖）
         self._agent_service = agent_service
 
+    @interactive
     async def chat(
         self,
         db: AsyncSession,
@@ -99,50 +112,118 @@ class ChatOrchestrator:
                 sources=[]
             )
 
-        # 内部逻辑：初始化向量库和模型
-        embeddings = IngestService.get_embeddings()
-        from langchain_community.vectorstores import Chroma
-        vector_db = Chroma(
-            persist_directory=settings.CHROMA_DB_PATH,
-            embedding_function=embeddings,
-            collection_name=settings.CHROMA_COLLECTION_NAME
-        )
-
-        # 内部变量：获取非流式LLM实例
-        llm = await llm_provider.get_llm(db, streaming=False)
+        # 内部逻辑：并发初始化向量库和非流式模型
+        context = await self._init_components(db, request, streaming=False)
+        embeddings, vector_db, llm = context.get('embeddings'), context.get('vector_db'), context.get('llm')
 
         # 内部逻辑：注册策略
         # 内部变量：AgentService（延迟初始化，避免在RAG模式下创建）
         agent_svc = None
         if request.use_agent:
-            # 内部逻辑：只在 Agent 模式下创建 AgentService
+            # 内部逻辑：只在 Agent 模式下获取 AgentService（按模型配置复用实例）
             # 原因：某些 LLM 不支持 bind_tools()，会导致 NotImplementedError
             try:
-                agent_svc = self._agent_service if self._agent_service else AgentService()
+                agent_svc = self._agent_service or get_agent_service()
             except NotImplementedError:
                 # 内部逻辑：LLM 不支持 bind_tools()，无法使用 Agent 模式
                 logger.warning("当前 LLM 不支持 bind_tools()，无法使用 Agent 模式，将回退到 RAG 模式")
                 request.use_agent = False
 
+        # 内部逻辑：语义答案缓存命中时直接返回，跳过检索与模型调用
+        probe = await self._probe_answer_cache(request, llm, embeddings)
+        if probe and probe.hit:
+            return ChatResponse(
+                answer=probe.hit.answer,
+                sources=probe.hit.sources,
+                context_tokens=probe.hit.context_tokens,
+                cached=True
+            )
+
         ChatStrategyFactory.clear()
         ChatStrategyFactory.register("rag", RAGStrategy(vector_db, llm))
         if agent_svc:
             ChatStrategyFactory.register("agent", AgentStrategy(agent_svc))
 
-        # 内部逻辑：选择并执行策略
+        # 内部逻辑：选择策略
         strategy = ChatStrategyFactory.get_strategy(request.use_agent)
-        answer: ChatAnswer = await strategy.execute(request, db)
+
+        # 内部逻辑：合并进行中的相同问答，每个调用方得到独立的响应副本
+        key = self._coalescing_key(request, llm)
+        if key is None:
+            return await self._answer(strategy, request, db, probe)
+
+        async def answer() -> ChatResponse:
+            # 内部逻辑：合并执行可能比发起请求存活更久，使用独立会话而不是发起请求的会话
+            async with open_session(db) as shared_db:
+                return await self._answer(strategy, request, shared_db, probe)
+
+        response = await get_singleflight("chat").do(key, answer)
+        return response.model_copy(deep=True)
+
+    async def _answer(
+        self,
+        strategy,
+        request: ChatRequest,
+        db: AsyncSession,
+        probe: Optional[AnswerCacheProbe]
+    ) -> ChatResponse:
+        """
+        函数级注释：执行策略并构建对话响应
+        内部逻辑：执行策略 -> 处理来源 -> 写入语义答案缓存
+        参数：
+            strategy - 对话策略
+            request - 对话请求对象
+            db - 数据库异步会话
+            probe - 语义答案缓存查找结果
+        返回值：ChatResponse - 对话响应
+        """
+        # 内部逻辑：缓存未命中时检索复用查找缓存时计算的问题向量
+        query_embedding = probe.embedding if probe else None
+        answer: ChatAnswer = await strategy.execute(request, db, query_embedding=query_embedding)
 
         # 内部逻辑：处理来源信息
         sources = await self.sources_processor.process(
             answer.sources_data,
-            db
+            db,
+            answer.documents
         )
 
+        if probe:
+            self._store_answer(
+                probe, request.message, answer.text,
+                [source.model_dump() for source in sources], answer.context_tokens
+            )
+
         return ChatResponse(
             answer=answer.text,
-            sources=sources
+            sources=sources,
+            context_tokens=answer.context_tokens,
+            compression_ratio=answer.compression_ratio
+        )
+
+    @staticmethod
+    def _coalescing_key(request: ChatRequest, llm) -> Optional[tuple]:
+        """
+        函数级注释：生成问答请求的合并指纹
+        内部逻辑：只合并无对话历史的 RAG 问答（对话历史与 Agent 工具调用使回答因人而异）；
+                 指纹包含会话ID，不同会话的问答不合并（检索会写入各自会话的检索工作集）
+        参数：
+            request - 对话请求
+            llm - 本次请求使用的模型实例
+        返回值：Optional[tuple] - 请求指纹，不适用合并时为 None
+        """
+        # Guard Clause：未启用请求合并、Agent 模式或带对话历史
+        if not settings.ENABLE_REQUEST_COALESCING or request.use_agent or request.history:
+            return None
+
+        scope = get_answer_cache().scope_key(
+            llm,
+            MMROptions.resolve(request.use_mmr, request.mmr_lambda),
+            CompressionOptions.resolve(request.compress_context, request.compression_ratio),
+            MultiQueryOptions.resolve(request.multi_query)
         )
+        formatting = json.dumps(request.formatting_options or {}, sort_keys=True, default=str)
+        return (scope, request.message, formatting, request.conversation_id)
 
     async def stream_chat(
         self,
@@ -150,55 +231,67 @@ class ChatOrchestrator:
         request: ChatRequest
     ) -> AsyncGenerator[str, None]:
         """
-        函数级注释：执行流式对话
-        内部逻辑：初始化 -> 获取策略 -> 委托执行 -> 发送完成标记
-        设计模式：策略模式 - 消除条件分支
+        函数级注释：执行流式对话（SSE 格式）
+        内部逻辑：将 stream_events 的事件编码为 SSE 帧
         参数：
             db - 数据库异步会话
             request - 对话请求对象
         生成值：str - SSE格式的数据块
         """
+        async for event in self.stream_events(db, request):
+            yield event.encode()
+
+    @interactive
+    async def stream_events(
+        self,
+        db: AsyncSession,
+        request: ChatRequest
+    ) -> AsyncGenerator[StreamEvent, None]:
+        """
+        函数级注释：执行流式对话（结构化事件）
+        内部逻辑：初始化 -> 获取策略 -> 委托执行 -> 发送完成事件
+        设计模式：策略模式 - 消除条件分支
+        参数：
+            db - 数据库异步会话
+            request - 对话请求对象
+        生成值：StreamEvent - 流式对话事件
+        """
         try:
             # 内部变量：调试日志
             logger.debug(f"开始流式对话: use_agent={request.use_agent}, message={request.message[:50]}...")
 
             # Guard Clauses：Mock模式处理
             if settings.USE_MOCK:
-                yield "data: " + ChatResponse(
-                    answer="帅哥，这是 Mock 模式下的流式回答。",
-                    sources=[]
-                ).model_dump_json() + "\n\n"
+                yield StreamEvent(answer="帅哥，这是 Mock 模式下的流式回答。", sources=[])
                 return
 
-            # 内部逻辑：初始化向量库和模型
+            # 内部逻辑：并发初始化向量库和流式模型
             logger.debug("初始化向量库和LLM...")
-            embeddings = IngestService.get_embeddings()
-            from langchain_community.vectorstores import Chroma
-            vector_db = Chroma(
-                persist_directory=settings.CHROMA_DB_PATH,
-                embedding_function=embeddings,
-                collection_name=settings.CHROMA_COLLECTION_NAME
-            )
-
-            # 内部变量：获取流式LLM实例
-            logger.debug("获取流式LLM实例...")
-            llm = await llm_provider.get_llm(db, streaming=True)
-            logger.debug(f"LLM实例类型: {type(llm).__name__}")
+            context = await self._init_components(db, request, streaming=True)
+            embeddings, vector_db, llm = context.get('embeddings'), context.get('vector_db'), context.get('llm')
+            logger.debug(f"LLM实例类型: {type(llm).__name__}, 初始化耗时: {context.timings}")
 
             # 内部逻辑：设置流式策略依赖
             # 内部变量：AgentService（延迟初始化，避免在RAG模式下创建）
             agent_svc = None
             if request.use_agent:
-                # 内部逻辑：只在 Agent 模式下创建 AgentService
+                # 内部逻辑：只在 Agent 模式下获取 AgentService（按模型配置复用实例）
                 # 原因：某些 LLM 不支持 bind_tools()，会导致 NotImplementedError
                 try:
-                    agent_svc = self._agent_service if self._agent_service else AgentService()
-                    logger.debug(f"AgentService已创建: {type(agent_svc).__name__}")
+                    agent_svc = self._agent_service or get_agent_service()
+                    logger.debug(f"AgentService已就绪: {type(agent_svc).__name__}")
                 except NotImplementedError:
                     # 内部逻辑：LLM 不支持 bind_tools()，无法使用 Agent 模式
                     logger.warning("当前 LLM 不支持 bind_tools()，无法使用 Agent 模式，将回退到 RAG 模式")
                     request.use_agent = False
 
+            # 内部逻辑：语义答案缓存命中时按流式格式回放已缓存的回答
+            probe = await self._probe_answer_cache(request, llm, embeddings)
+            if probe and probe.hit:
+                for event in self._replay_cached_answer(probe.hit):
+                    yield event
+                return
+
             StreamingStrategyFactory.set_dependencies(
                 vector_db=vector_db,
                 llm=llm,
@@ -215,8 +308,25 @@ class ChatOrchestrator:
 
             # 内部逻辑：委托给策略执行
             logger.debug("开始执行流式策略...")
-            async for chunk in strategy.execute(request, db):
-                yield chunk
+            def open_stream(stream_db: AsyncSession) -> AsyncGenerator[StreamEvent, None]:
+                stream = as_stream_events(strategy.execute(
+                    request, stream_db, query_embedding=probe.embedding if probe else None
+                ))
+                if probe:
+                    stream = self._cache_stream(stream, probe, request.message)
+                return stream
+
+            async def open_shared_stream() -> AsyncGenerator[StreamEvent, None]:
+                # 内部逻辑：广播可能比发起请求存活更久，使用独立会话而不是发起请求的会话
+                async with open_session(db) as shared_db:
+                    async for event in open_stream(shared_db):
+                        yield event
+
+            # 内部逻辑：合并进行中的相同问答，所有请求方订阅同一次生成的广播
+            key = self._coalescing_key(request, llm)
+            stream = open_stream(db) if key is None else get_singleflight("chat").stream(key, open_shared_stream)
+            async for event in stream:
+                yield event
             logger.debug("流式策略执行完成")
 
         except Exception as e:
@@ -229,11 +339,141 @@ class ChatOrchestrator:
             logger.error(f"流式对话异常: {error_msg}")
             logger.error(f"异常类型: {type(e).__name__}")
             logger.error(f"异常堆栈: {traceback.format_exc()}")
-            yield f"data: {json.dumps({'error': error_msg}, ensure_ascii=False)}\n\n"
+            yield StreamEvent(error=error_msg)
 
         finally:
-            # 内部逻辑：确保发送完成标记
-            yield f"data: {json.dumps({'done': True}, ensure_ascii=False)}\n\n"
+            # 内部逻辑：确保发送完成事件
+            yield STREAM_DONE
+
+    @staticmethod
+    async def _init_components(db: AsyncSession, request: ChatRequest, streaming: bool) -> PipelineContext:
+        """
+        函数级注释：初始化对话所需的组件
+        内部逻辑：通过对话管道并发执行向量库初始化（线程池，不阻塞事件循环）与模型获取；
+                 检索与对话历史仍由策略与会话服务负责（检索依赖语义答案缓存的查找结果）
+        参数：
+            db - 数据库异步会话
+            request - 对话请求对象
+            streaming - 是否获取流式模型
+        返回值：PipelineContext - 包含 embeddings、vector_db、llm 的管道上下文
+        """
+        context = PipelineContext(request, db)
+        await ChatPipelineBuilder().with_streaming(streaming).with_llm_init().build().execute(context)
+        return context
+
+    @staticmethod
+    async def _probe_answer_cache(
+        request: ChatRequest,
+        llm,
+        embeddings
+    ) -> Optional[AnswerCacheProbe]:
+        """
+        函数级注释：查找语义答案缓存
+        内部逻辑：仅缓存无对话历史的 RAG 问答（历史会改变问题含义），查找失败时按未命中处理
+        参数：
+            request - 对话请求
+            llm - 本次请求使用的模型实例（决定缓存作用域）
+            embeddings - Embedding 实例
+        返回值：Optional[AnswerCacheProbe] - 查找结果，不适用缓存时为 None
+        """
+        # Guard Clause：未启用缓存、Agent 模式或带对话历史
+        if not settings.ENABLE_ANSWER_CACHE or request.use_agent or request.history:
+            return None
+
+        cache = get_answer_cache()
+        scope = cache.scope_key(
+            llm,
+            MMROptions.resolve(request.use_mmr, request.mmr_lambda),
+            CompressionOptions.resolve(request.compress_context, request.compression_ratio),
+            MultiQueryOptions.resolve(request.multi_query)
+        )
+        try:
+            return await cache.aprobe(request.message, embeddings, scope)
+        except Exception as e:
+            logger.warning(f"语义答案缓存查找失败，按未命中处理: {str(e)}")
+            return None
+
+    @staticmethod
+    def _store_answer(
+        probe: AnswerCacheProbe,
+        question: str,
+        answer: str,
+        sources: List[dict],
+        context_tokens: Optional[int],
+        completion_tokens: Optional[int] = None
+    ) -> None:
+        """
+        函数级注释：将生成的回答写入语义答案缓存
+        参数：
+            probe - 生成前的缓存查找结果
+            question - 用户问题
+            answer - 回答内容
+            sources - 来源信息字典列表
+            context_tokens - 上下文 Token 数
+            completion_tokens - 回答 Token 数（流式输出时已增量计数，None 表示按回答计算）
+        """
+        get_answer_cache().store(
+            probe.embedding,
+            probe.scope,
+            CachedAnswer(
+                question=question,
+                answer=answer,
+                sources=sources,
+                doc_ids=frozenset(source["doc_id"] for source in sources if source.get("doc_id")),
+                context_tokens=context_tokens or 0,
+                completion_tokens=count_tokens(answer) if completion_tokens is None else completion_tokens
+            ),
+            generation=probe.generation
+        )
+
+    @staticmethod
+    def _replay_cached_answer(entry: CachedAnswer):
+        """
+        函数级注释：将缓存的回答转换为与实时生成一致的流式事件
+        参数：
+            entry - 缓存条目
+        生成值：StreamEvent - 流式对话事件（先来源，再按固定长度切分的回答）
+        """
+        yield StreamEvent(sources=entry.sources, context_tokens=entry.context_tokens, cached=True)
+        for start in range(0, len(entry.answer), CACHE_REPLAY_CHUNK_SIZE):
+            yield StreamEvent(answer=entry.answer[start:start + CACHE_REPLAY_CHUNK_SIZE])
+
+    async def _cache_stream(
+        self,
+        stream: AsyncGenerator[StreamEvent, None],
+        probe: AnswerCacheProbe,
+        question: str
+    ) -> AsyncGenerator[StreamEvent, None]:
+        """
+        函数级注释：透传流式事件并收集回答，完整生成后写入语义答案缓存
+        内部逻辑：出现错误或降级告警、客户端中途断开时不写入
+        参数：
+            stream - 策略生成的流式事件
+            probe - 生成前的缓存查找结果
+            question - 用户问题
+        生成值：StreamEvent - 原样透传的流式事件
+        """
+        answer_parts: List[str] = []
+        completion_counter = StreamTokenCounter()
+        sources: List[dict] = []
+        context_tokens = 0
+        complete = True
+
+        async for event in stream:
+            yield event
+            if event.error is not None or event.warning is not None:
+                complete = False
+            if event.sources is not None:
+                sources = event.sources
+                context_tokens = event.context_tokens or 0
+            if event.answer:
+                answer_parts.append(event.answer)
+                completion_counter.feed(event.answer)
+
+        if complete and answer_parts:
+            self._store_answer(
+                probe, question, "".join(answer_parts), sources, context_tokens, completion_counter.total
+            )
 
     async def get_sources(
         self,
@@ -248,8 +488,6 @@ class ChatOrchestrator:
             doc_id - 文档ID（可选）
         返回值：List[SourceDetail] - 来源详情列表
         """
-        from app.models.models import VectorMapping
-
         # 内部逻辑：构建查询
         if doc_id:
             result = await db.execute(
@@ -299,38 +537,25 @@ class ChatOrchestrator:
     ) -> str:
         """
         函数级注释：文档总结
-        内部逻辑：获取文档内容 -> 调用LLM生成总结
+        内部逻辑：片段组并行总结后逐层归并为全文摘要，已持久化的摘要直接复用
         参数：
             db - 数据库会话
             doc_id - 文档ID
         返回值：str - 总结结果
         """
-        from app.models.models import VectorMapping
         from fastapi import HTTPException
 
-        # 内部逻辑：获取文档内容
-        result = await db.execute(
-            select(VectorMapping.chunk_content).where(
-                VectorMapping.document_id == doc_id
-            )
-        )
-        chunks = result.scalars().all()
-
-        # Guard Clauses：无内容时抛出异常
-        if not chunks:
-            raise HTTPException(status_code=404, detail="未找到文档内容")
-
-        full_text = "\n".join(chunks)
-
         # 内部变量：获取LLM实例
         llm = await llm_provider.get_llm(db, streaming=False)
 
-        # 内部逻辑：构造总结Prompt
-        prompt = f"帅哥，请帮我总结下面这段文档的核心内容：\n\n{full_text[:4000]}"
+        # 内部逻辑：生成（或复用）全文摘要
+        summary = await DocumentSummarizer(llm).summarize(db, doc_id)
 
-        # 内部逻辑：调用模型
-        response = await llm.ainvoke(prompt)
-        return response.content
+        # Guard Clauses：无内容时抛出异常
+        if summary is None:
+            raise HTTPException(status_code=404, detail="未找到文档内容")
+
+        return summary
 
     async def compare_documents(
         self,
@@ -339,59 +564,39 @@ class ChatOrchestrator:
     ) -> str:
         """
         函数级注释：文档对比
-        内部逻辑：获取多文档内容 -> 调用LLM生成对比
-        优化：使用单次查询替代循环查询（N+1问题优化）
+        内部逻辑：并发生成（或复用）各文档的全文摘要 -> 基于摘要调用LLM生成对比
+        优化：各文档的片段在单次查询中读取，对比基于完整内容的摘要而非截断的原文
         参数：
             db - 数据库会话
             doc_ids - 文档ID列表
         返回值：str - 对比结果
         """
-        from app.models.models import VectorMapping
         from fastapi import HTTPException
 
         # Guard Clauses：文档ID列表为空时抛出异常
         if not doc_ids:
             raise HTTPException(status_code=400, detail="文档ID列表不能为空")
 
-        # 内部逻辑：一次性查询所有文档内容（优化 N+1 查询问题）
-        result = await db.execute(
-            select(
-                Document.id,
-                Document.file_name,
-                VectorMapping.chunk_content
-            )
-            .join(VectorMapping, Document.id == VectorMapping.document_id)
-            .where(Document.id.in_(doc_ids))
-            .order_by(Document.id)
-        )
+        # 内部变量：获取LLM实例
+        llm = await llm_provider.get_llm(db, streaming=False)
 
-        rows = result.all()
+        # 内部逻辑：所有文档共享同一个并发上限生成摘要
+        summaries = await DocumentSummarizer(llm).summarize_many(db, doc_ids)
 
         # Guard Clauses：无内容时抛出异常
-        if not rows:
+        if not summaries:
             raise HTTPException(status_code=404, detail="未找到对比文档的内容")
 
-        # 内部逻辑：按文档ID分组并格式化内容
-        from collections import defaultdict
-        doc_chunks = defaultdict(list)
-        for row in rows:
-            doc_chunks[row[0]].append((row[1], row[2]))  # (file_name, chunk_content)
-
         # 内部逻辑：构造对比内容
-        contents = []
-        for doc_id in doc_ids:
-            if doc_id in doc_chunks:
-                file_name = doc_chunks[doc_id][0][0]  # 获取文件名
-                text = "\n".join([chunk[1] for chunk in doc_chunks[doc_id]])
-                contents.append(f"文档名: {file_name}\n内容: {text[:2000]}")
+        contents = [
+            f"文档名: {file_name}\n内容摘要: {summary}"
+            for file_name, summary in summaries.values()
+        ]
 
         # 内部逻辑：构造对比Prompt
         comparison_text = "\n\n---\n\n".join(contents)
         prompt = f"帅哥，请帮我对比分析以下几份文档的异同：\n\n{comparison_text}"
 
-        # 内部变量：获取LLM实例
-        llm = await llm_provider.get_llm(db, streaming=False)
-
         # 内部逻辑：调用模型
         response = await llm.ainvoke(prompt)
         return response.content
@@ -3,7 +3,7 @@
 上海宇羲伏天智能科技有限公司出品
 
 文件级注释：对话处理管道模块
-内部逻辑：使用责任链模式拆分ChatOrchestrator的多重职责
+内部逻辑：使用责任链模式拆分ChatOrchestrator的多重职责，处理器可声明依赖，互不依赖的处理器并发执行
 设计模式：责任链模式（Chain of Responsibility Pattern）+ 建造者模式（Builder Pattern）
 设计原则：单一职责原则（SRP）、开闭原则（OCP）
 
@@ -11,10 +11,17 @@
     - 将ChatOrchestrator的多重职责拆分为独立的处理器
     - 每个处理器只负责一个特定的处理步骤
     - 支持处理器链的动态组合
+    - 未声明依赖的处理器依赖之前添加的全部处理器，保持责任链的顺序语义
+    - 声明依赖的处理器在依赖完成后立即启动，互不依赖的处理器通过 asyncio 并发执行
+    - 使用数据库会话的处理器串行执行（同一 AsyncSession 不支持并发）
+    - 任一处理器失败时取消其余处理器并抛出原异常，与责任链一致
+    - 每个处理器的耗时（毫秒）记录在 context.timings 中
 """
 
+import asyncio
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
@@ -39,6 +46,8 @@ class PipelineContext:
         self.db = db
         # 内部变量：上下文数据
         self.data: Dict[str, Any] = {}
+        # 内部变量：各处理器耗时（毫秒）
+        self.timings: Dict[str, float] = {}
 
     def get(self, key: str, default: Any = None) -> Any:
         """
@@ -79,6 +88,23 @@ class PipelineHandler(ABC):
     # 内部变量：下一个处理器
     _next: Optional['PipelineHandler'] = None
 
+    # 内部变量：处理器名称（为空时使用类名）
+    name: Optional[str] = None
+
+    # 内部变量：依赖的处理器名称（None 表示依赖之前添加的全部处理器，空元组表示无依赖）
+    depends_on: Optional[Tuple[str, ...]] = None
+
+    # 内部变量：是否使用数据库会话（此类处理器在管道内串行执行）
+    uses_db: bool = False
+
+    @property
+    def handler_name(self) -> str:
+        """
+        函数级注释：获取处理器名称
+        返回值：处理器名称
+        """
+        return self.name or type(self).__name__
+
     def set_next(self, handler: 'PipelineHandler') -> 'PipelineHandler':
         """
         函数级注释：设置下一个处理器
@@ -121,9 +147,13 @@ class LLMInitializationHandler(PipelineHandler):
     """
     类级注释：LLM初始化处理器
     设计模式：责任链模式 - 具体处理器
-    职责：初始化LLM和向量库
+    职责：初始化LLM（向量库由 VectorStoreHandler 并发初始化）
     """
 
+    name = "llm"
+    depends_on = ()
+    uses_db = True
+
     def __init__(self, streaming: bool = False):
         """
         函数级注释：初始化处理器
@@ -135,33 +165,128 @@ class LLMInitializationHandler(PipelineHandler):
 
     async def _process(self, context: PipelineContext) -> Any:
         """
-        函数级注释：初始化LLM和向量库
+        函数级注释：初始化LLM
         参数：
             context - 管道上下文
         """
-        from app.services.ingest_service import IngestService
         from app.services.llm_provider import llm_provider
-        from langchain_community.vectorstores import Chroma
-        from app.core.config import settings
-
-        # 内部逻辑：初始化向量库
-        embeddings = IngestService.get_embeddings()
-        vector_db = Chroma(
-            persist_directory=settings.CHROMA_DB_PATH,
-            embedding_function=embeddings,
-            collection_name=settings.CHROMA_COLLECTION_NAME
-        )
 
         # 内部逻辑：获取LLM实例
         llm = await llm_provider.get_llm(context.db, streaming=self.streaming)
 
         # 内部逻辑：存储到上下文
-        context.set('vector_db', vector_db)
         context.set('llm', llm)
 
         logger.debug(f"LLM初始化完成: streaming={self.streaming}")
 
 
+class VectorStoreHandler(PipelineHandler):
+    """
+    类级注释：向量库初始化处理器
+    设计模式：责任链模式 - 具体处理器
+    职责：初始化嵌入模型与向量库
+    """
+
+    name = "vector_store"
+    depends_on = ()
+
+    async def _process(self, context: PipelineContext) -> Any:
+        """
+        函数级注释：初始化向量库
+        内部逻辑：嵌入模型加载与 Chroma 初始化为同步阻塞操作，放到线程池执行
+        参数：
+            context - 管道上下文
+        """
+        from app.services.ingest_service import IngestService
+        from langchain_community.vectorstores import Chroma
+        from app.core.config import settings
+
+        def create_vector_db():
+            """内部函数：创建嵌入模型与向量库实例"""
+            embeddings = IngestService.get_embeddings()
+            return embeddings, Chroma(
+                persist_directory=settings.CHROMA_DB_PATH,
+                embedding_function=embeddings,
+                collection_name=settings.CHROMA_COLLECTION_NAME
+            )
+
+        embeddings, vector_db = await asyncio.to_thread(create_vector_db)
+        context.set('embeddings', embeddings)
+        context.set('vector_db', vector_db)
+
+        logger.debug("向量库初始化完成")
+
+
+class HistoryLoadingHandler(PipelineHandler):
+    """
+    类级注释：对话历史加载处理器
+    设计模式：责任链模式 - 具体处理器
+    职责：加载会话的最近历史消息
+    """
+
+    name = "history"
+    depends_on = ()
+    uses_db = True
+
+    async def _process(self, context: PipelineContext) -> Any:
+        """
+        函数级注释：加载对话历史
+        内部逻辑：上下文中有 conversation_id 时从数据库读取最近消息，否则使用请求携带的历史
+        参数：
+            context - 管道上下文
+        """
+        conversation_id = context.get('conversation_id')
+        if conversation_id is None:
+            context.set('history', list(getattr(context.request, 'history', None) or []))
+            return
+
+        from app.models.conversation import MessageRole
+        from app.services.conversation_service import ConversationService
+
+        messages = await ConversationService._recent_history(
+            context.db, conversation_id, context.get('current_message_id')
+        )
+        context.set('history', [
+            {"role": "user" if msg.role == MessageRole.USER else "assistant", "content": msg.content}
+            for msg in messages
+        ])
+
+        logger.debug(f"对话历史加载完成: {len(messages)}条")
+
+
+class RetrievalHandler(PipelineHandler):
+    """
+    类级注释：检索处理器
+    设计模式：责任链模式 - 具体处理器
+    职责：检索候选片段并提取来源文档ID
+    """
+
+    name = "retrieval"
+    depends_on = ("vector_store",)
+
+    async def _process(self, context: PipelineContext) -> Any:
+        """
+        函数级注释：检索候选片段
+        参数：
+            context - 管道上下文
+        """
+        from app.core.config import settings
+        from app.services.retrieval import MMROptions, VectorRetriever
+
+        request = context.request
+        mmr_options = MMROptions.resolve(getattr(request, 'use_mmr', None), getattr(request, 'mmr_lambda', None))
+        documents = await VectorRetriever(context.get('vector_db')).asearch(
+            request.message,
+            k=settings.CONTEXT_CANDIDATE_K,
+            mmr_options=mmr_options
+        )
+
+        context.set('documents', documents)
+        context.set('doc_ids', [doc.metadata["doc_id"] for doc in documents if doc.metadata.get("doc_id")])
+
+        logger.debug(f"检索完成: {len(documents)}个片段")
+
+
 class SourceProcessingHandler(PipelineHandler):
     """
     类级注释：来源处理处理器
@@ -169,6 +294,8 @@ class SourceProcessingHandler(PipelineHandler):
     职责：处理文档来源信息
     """
 
+    uses_db = True
+
     def __init__(self, sources_processor):
         """
         函数级注释：初始化来源处理器
@@ -184,8 +311,14 @@ class SourceProcessingHandler(PipelineHandler):
         参数：
             context - 管道上下文
         """
+        from app.services.retrieval import expand_to_parents
+
+        # 内部逻辑：父子片段模式入库的文档，命中的子片段替换为去重后的父片段（检索处理器不使用数据库会话，在此回查）
+        documents = await expand_to_parents(context.db, context.get('documents') or [])
+        context.set('documents', documents)
+
         doc_ids = context.get('doc_ids', [])
-        sources = await self.sources_processor.process(doc_ids, context.db)
+        sources = await self.sources_processor.process(doc_ids, context.db, documents)
 
         context.set('sources', sources)
         logger.debug(f"来源处理完成: {len(sources)}个来源")
@@ -260,42 +393,97 @@ class ChatPipeline:
     """
     类级注释：对话处理管道
     设计模式：责任链模式 + 建造者模式
-    职责：管理和执行处理器链
+    职责：管理处理器及其依赖，按依赖关系调度执行（互不依赖的处理器并发）
     """
 
     def __init__(self):
         """函数级注释：初始化管道"""
-        # 内部变量：链头
-        self._head: Optional[PipelineHandler] = None
-        # 内部变量：链尾
-        self._tail: Optional[PipelineHandler] = None
+        # 内部变量：处理器列表（按添加顺序）
+        self._handlers: List[PipelineHandler] = []
+        # 内部变量：处理器名称 -> 依赖的处理器名称
+        self._dependencies: Dict[str, Tuple[str, ...]] = {}
 
     def add_handler(self, handler: PipelineHandler) -> 'ChatPipeline':
         """
         函数级注释：添加处理器
+        内部逻辑：未声明依赖时依赖之前添加的全部处理器；依赖必须是已添加的处理器（保证无环）
         参数：
             handler - 管道处理器
         返回值：管道自身（支持链式调用）
+        异常：ValueError - 处理器名称重复或依赖未添加的处理器
         """
-        if self._head is None:
-            self._head = handler
-            self._tail = handler
+        name = handler.handler_name
+        if name in self._dependencies:
+            raise ValueError(f"管道处理器名称重复: {name}")
+
+        if handler.depends_on is None:
+            dependencies = tuple(h.handler_name for h in self._handlers)
         else:
-            self._tail.set_next(handler)
-            self._tail = handler
+            dependencies = tuple(handler.depends_on)
+            unknown = [dep for dep in dependencies if dep not in self._dependencies]
+            if unknown:
+                raise ValueError(f"管道处理器 {name} 依赖未添加的处理器: {unknown}")
+
+        self._handlers.append(handler)
+        self._dependencies[name] = dependencies
         return self
 
     async def execute(self, context: PipelineContext) -> Any:
         """
         函数级注释：执行管道
+        内部逻辑：依赖全部完成的处理器立即启动；任一处理器失败时取消其余处理器并抛出原异常
         参数：
             context - 管道上下文
-        返回值：处理结果
+        返回值：最后添加的处理器的处理结果
         """
-        if self._head is None:
+        if not self._handlers:
             logger.warning("管道为空，没有处理器执行")
             return None
-        return await self._head.handle(context)
+
+        # 内部变量：数据库会话锁（同一 AsyncSession 不支持并发）
+        db_lock = asyncio.Lock()
+        pending = {handler.handler_name: handler for handler in self._handlers}
+        running: Dict[asyncio.Task, str] = {}
+        results: Dict[str, Any] = {}
+
+        try:
+            while pending or running:
+                for name in [n for n in pending if all(dep in results for dep in self._dependencies[n])]:
+                    task = asyncio.create_task(self._run_handler(pending.pop(name), context, db_lock))
+                    running[task] = name
+
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    name = running.pop(task)
+                    # 内部逻辑：task.result() 会抛出处理器的原异常
+                    results[name] = task.result()
+        finally:
+            # 内部逻辑：出错或被取消时清理仍在执行的处理器
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        return results[self._handlers[-1].handler_name]
+
+    @staticmethod
+    async def _run_handler(handler: PipelineHandler, context: PipelineContext, db_lock: asyncio.Lock) -> Any:
+        """
+        函数级注释：执行单个处理器并记录耗时
+        参数：
+            handler - 管道处理器
+            context - 管道上下文
+            db_lock - 数据库会话锁
+        返回值：处理结果
+        """
+        start = time.perf_counter()
+        try:
+            if handler.uses_db:
+                async with db_lock:
+                    return await handler._process(context)
+            return await handler._process(context)
+        finally:
+            context.timings[handler.handler_name] = (time.perf_counter() - start) * 1000
 
 
 class ChatPipelineBuilder:
@@ -324,15 +512,42 @@ class ChatPipelineBuilder:
 
     def with_llm_init(self) -> 'ChatPipelineBuilder':
         """
-        函数级注释：添加LLM初始化处理器
+        函数级注释：添加LLM初始化与向量库初始化处理器（两者并发执行）
         返回值：建造者自身
         """
         def factory():
             streaming = self._config.get('streaming', False)
             return LLMInitializationHandler(streaming=streaming)
+        self._handler_factories.append(VectorStoreHandler)
         self._handler_factories.append(factory)
         return self
 
+    def with_history(self) -> 'ChatPipelineBuilder':
+        """
+        函数级注释：添加对话历史加载处理器
+        返回值：建造者自身
+        """
+        self._handler_factories.append(HistoryLoadingHandler)
+        return self
+
+    def with_retrieval(self) -> 'ChatPipelineBuilder':
+        """
+        函数级注释：添加检索处理器（依赖向量库初始化）
+        返回值：建造者自身
+        """
+        self._handler_factories.append(RetrievalHandler)
+        return self
+
+    def with_handler(self, handler: PipelineHandler) -> 'ChatPipelineBuilder':
+        """
+        函数级注释：添加自定义处理器
+        参数：
+            handler - 管道处理器
+        返回值：建造者自身
+        """
+        self._handler_factories.append(lambda: handler)
+        return self
+
     def with_source_processing(self, sources_processor) -> 'ChatPipelineBuilder':
         """
         函数级注释：添加来源处理处理器
@@ -386,6 +601,9 @@ __all__ = [
     'ChatPipeline',
     'ChatPipelineBuilder',
     'LLMInitializationHandler',
+    'VectorStoreHandler',
+    'HistoryLoadingHandler',
+    'RetrievalHandler',
     'SourceProcessingHandler',
     'SensitiveDataFilterHandler',
     'ResponseBuildingHandler',
@@ -6,13 +6,13 @@
 设计模式：单一职责原则 - 专注于来源数据处理
 """
 
-from typing import List, Dict, Set
+from typing import List
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from loguru import logger
 
 from app.schemas.chat import SourceInfo
-from app.models.models import Document, VectorMapping
+from app.models.models import Document
 
 
 class SourcesProcessor:
@@ -20,7 +20,7 @@ class SourcesProcessor:
     类级注释：来源信息处理器
     内部逻辑：统一处理RAG和Agent模式下的来源信息
     设计模式：单一职责原则 - 专注于来源数据处理
-    职责：验证文档存在性、格式化来源信息、计算相关度评分
+    职责：验证文档存在性、格式化来源信息、透传检索阶段的片段ID与相关度评分
     """
 
     async def process(
@@ -31,33 +31,33 @@ class SourcesProcessor:
     ) -> List[SourceInfo]:
         """
         函数级注释：处理来源信息
-        内部逻辑：验证文档存在性 -> 格式化来源信息 -> 计算评分
+        内部逻辑：批量查询文件名并验证文档存在性 -> 按实际使用的片段构建来源
         参数：
             doc_ids - 文档ID列表
             db - 数据库异步会话
-            documents - 可选的文档对象列表（用于RAG模式）
+            documents - 实际使用的片段列表（元数据携带 doc_id、chunk_id 与 score）
         返回值：List[SourceInfo] - 来源信息列表
         """
+        # 内部逻辑：未显式传入文档ID时从片段元数据中提取
+        if not doc_ids and documents:
+            doc_ids = [doc.metadata.get("doc_id") for doc in documents if doc.metadata.get("doc_id")]
+
         # Guard Clauses：无文档ID时返回空列表
         if not doc_ids:
             return []
 
-        # 内部逻辑：批量查询文档信息
+        # 内部逻辑：批量查询文档信息（每次请求只查询一次）
         file_names = {}
-        valid_doc_ids = set()  # 内部变量：记录存在的文档ID
-
-        if doc_ids:
-            doc_result = await db.execute(
-                select(Document.id, Document.file_name).where(
-                    Document.id.in_(doc_ids)
-                )
+        doc_result = await db.execute(
+            select(Document.id, Document.file_name).where(
+                Document.id.in_(set(doc_ids))
             )
-            for row in doc_result.all():
-                file_names[row[0]] = row[1]
-                valid_doc_ids.add(row[0])
+        )
+        for row in doc_result.all():
+            file_names[row[0]] = row[1]
 
         # 内部逻辑：记录被过滤掉的无效文档ID
-        invalid_doc_ids = set(doc_ids) - valid_doc_ids
+        invalid_doc_ids = set(doc_ids) - set(file_names)
         if invalid_doc_ids:
             logger.warning(
                 f"检测到已删除文档的向量引用: {invalid_doc_ids}，已过滤"
@@ -66,66 +66,40 @@ class SourcesProcessor:
         # 内部逻辑：构建来源信息列表
         sources = []
 
-        # 内部逻辑：RAG模式使用documents参数
         if documents:
-            for idx, doc in enumerate(documents):
+            # 内部逻辑：每个实际使用的片段对应一条来源，评分为检索阶段的真实相关度
+            for doc in documents:
                 doc_id = doc.metadata.get("doc_id", 0)
 
                 # Guard Clauses：跳过无效文档ID
-                if doc_id not in valid_doc_ids:
+                if doc_id not in file_names:
                     logger.debug(
                         f"跳过无效文档ID: {doc_id}（文档已被删除）"
                     )
                     continue
 
-                # 内部逻辑：计算相关度评分
-                score = 1.0 - (idx * 0.1)
-
+                chunk_id = doc.metadata.get("chunk_id")
                 sources.append(SourceInfo(
                     doc_id=doc_id,
-                    file_name=file_names.get(doc_id, "未知文档"),
+                    file_name=file_names[doc_id],
                     text_segment=doc.page_content[:200] + "...",
-                    score=score
+                    score=doc.metadata.get("score"),
+                    chunk_id=str(chunk_id) if chunk_id is not None else None
                 ))
         else:
-            # 内部逻辑：Agent模式需要额外查询内容
-            doc_info = {}
-            if doc_ids:
-                doc_result = await db.execute(
-                    select(
-                        Document.id,
-                        Document.file_name,
-                        VectorMapping.chunk_content
-                    )
-                    .join(VectorMapping, Document.id == VectorMapping.document_id)
-                    .where(Document.id.in_(doc_ids))
-                )
-                for row in doc_result.all():
-                    doc_info[row[0]] = {
-                        "file_name": row[1],
-                        "content": row[2]
-                    }
-
-            for idx, doc_id in enumerate(doc_ids):
+            # 内部逻辑：只有文档ID时没有可引用的片段，只返回文档级来源，不再加载文档的全部片段
+            for doc_id in dict.fromkeys(doc_ids):
                 # Guard Clauses：跳过无效文档ID
-                if doc_id not in valid_doc_ids:
+                if doc_id not in file_names:
                     logger.debug(
                         f"跳过无效文档ID: {doc_id}（文档已被删除）"
                     )
                     continue
 
-                info = doc_info.get(
-                    doc_id,
-                    {"file_name": "未知文档", "content": "无片段内容"}
-                )
-                segment = info.get("content", "无片段内容")
-                score = 1.0 - (idx * 0.1)
-
                 sources.append(SourceInfo(
                     doc_id=doc_id,
-                    file_name=info.get("file_name", "未知文档"),
-                    text_segment=segment[:200] + "...",
-                    score=score
+                    file_name=file_names[doc_id],
+                    text_segment="无片段内容"
                 ))
 
         return sources
@@ -13,7 +13,33 @@ from loguru import logger
 
 from app.schemas.chat import ChatRequest, SourceInfo
 from app.models.models import Document, VectorMapping
+from app.core.config import settings
+from app.services.chat.context_compressor import CompressionOptions, ContextCompressor
+from app.services.chat.context_packer import ContextPacker
+from app.services.retrieval import MMROptions, MultiQueryOptions, MultiQueryRetriever, expand_to_parents
 from sqlalchemy.future import select
+from langchain_core.prompts import ChatPromptTemplate
+
+
+# 内部变量：RAG 问答提示词模板
+RAG_PROMPT = ChatPromptTemplate.from_template(
+    """帅哥，请基于以下提供的参考资料回答用户的问题。
+如果你在资料中找不到答案，就直接说你不知道，不要尝试胡编乱造。
+
+【重要约束】
+在回答中绝对不要包含以下信息：
+- 任何手机号码（11位数字）
+- 任何邮箱地址
+
+如果需要引用联系方式，请使用"联系方式"、"电话"等替代表述。
+
+{history}参考资料:
+{context}
+
+用户问题: {question}
+
+回答:"""
+)
 
 
 class ChatAnswer:
@@ -25,18 +51,30 @@ class ChatAnswer:
     def __init__(
         self,
         text: str,
-        sources_data: List[int] = None
+        sources_data: List[int] = None,
+        context_tokens: Optional[int] = None,
+        documents: List = None,
+        compression_ratio: Optional[float] = None
     ):
         """
         函数级注释：初始化回答结果
         参数：
             text - 回答文本内容
             sources_data - 来源文档ID列表
+            context_tokens - 打包后提示词上下文的 Token 数
+            documents - 实际使用的片段列表（元数据携带片段ID与相关度评分）
+            compression_ratio - 参考资料压缩比例（未压缩时为 None）
         """
         # 内部变量：回答文本
         self.text = text
         # 内部变量：来源文档ID列表
         self.sources_data = sources_data or []
+        # 内部变量：提示词上下文 Token 数
+        self.context_tokens = context_tokens
+        # 内部变量：实际使用的片段列表
+        self.documents = documents or []
+        # 内部变量：参考资料压缩比例
+        self.compression_ratio = compression_ratio
 
 
 class ChatStrategy(ABC):
@@ -50,7 +88,8 @@ class ChatStrategy(ABC):
     async def execute(
         self,
         request: ChatRequest,
-        db: AsyncSession
+        db: AsyncSession,
+        query_embedding: Optional[List[float]] = None
     ) -> ChatAnswer:
         """
         函数级注释：执行对话策略
@@ -58,6 +97,7 @@ class ChatStrategy(ABC):
         参数：
             request - 对话请求对象
             db - 数据库异步会话
+            query_embedding - 已计算的问题向量（可选，检索时复用，避免重复向量化）
         返回值：ChatAnswer - 对话回答结果
         """
         pass
@@ -85,65 +125,51 @@ class RAGStrategy(ChatStrategy):
     async def execute(
         self,
         request: ChatRequest,
-        db: AsyncSession
+        db: AsyncSession,
+        query_embedding: Optional[List[float]] = None
     ) -> ChatAnswer:
         """
         函数级注释：执行RAG对话策略
-        内部逻辑：检索相关文档 -> 构建上下文 -> 生成回答
+        内部逻辑：检索候选片段（每次请求仅检索一次，可选多查询融合） -> 回查父片段 -> 压缩参考资料（可选） -> 按 Token 预算打包上下文 -> 异步生成回答
         参数：
             request - 对话请求对象
             db - 数据库异步会话
+            query_embedding - 已计算的问题向量（可选，检索时复用，避免重复向量化）
         返回值：ChatAnswer - 对话回答结果
         """
-        # 内部逻辑：检索相关文档
-        retrieved_docs = self.vector_db.as_retriever(
-            search_kwargs={"k": 3}
-        ).invoke(request.message)
-
-        # 内部逻辑：构建上下文
-        def format_docs(docs):
-            """内部函数：格式化文档为上下文字符串"""
-            return "\n\n".join(doc.page_content for doc in docs)
+        # 内部逻辑：解析本次请求的 MMR 与多查询选项（请求参数优先于全局配置）
+        mmr_options = MMROptions.resolve(request.use_mmr, request.mmr_lambda)
+        retriever = MultiQueryRetriever(self.vector_db, self.llm)
+
+        # 内部逻辑：只检索一次（多查询模式下为一次批量向量化与并发检索），检索结果同时用于构建上下文与来源列表
+        candidates = await retriever.asearch(
+            request.message,
+            k=settings.CONTEXT_CANDIDATE_K,
+            options=MultiQueryOptions.resolve(request.multi_query),
+            history=[msg.content for msg in request.history or [] if msg.role == "user"],
+            mmr_options=mmr_options,
+            conversation_id=request.conversation_id,
+            query_embedding=query_embedding
+        )
+        # 内部逻辑：父子片段模式入库的文档，命中的子片段替换为去重后的父片段
+        candidates = await expand_to_parents(db, candidates)
 
-        context = format_docs(retrieved_docs)
+        # 内部逻辑：压缩参考资料（请求可选启用），再按模型的 Token 预算打包历史消息与检索片段
+        compressed = ContextCompressor(
+            CompressionOptions.resolve(request.compress_context, request.compression_ratio)
+        ).compress(request.message, candidates)
+        packed = ContextPacker.for_llm(self.llm).pack(request.message, compressed.documents, request.history)
+        retrieved_docs = packed.documents
 
-        # 内部逻辑：构建Prompt
-        from langchain_core.prompts import ChatPromptTemplate
+        # 内部逻辑：使用异步接口调用大模型，不阻塞事件循环
         from langchain_core.output_parsers import StrOutputParser
-        from langchain_core.runnables import RunnablePassthrough
 
-        prompt = ChatPromptTemplate.from_template(
-            """帅哥，请基于以下提供的参考资料回答用户的问题。
-如果你在资料中找不到答案，就直接说你不知道，不要尝试胡编乱造。
-
-【重要约束】
-在回答中绝对不要包含以下信息：
-- 任何手机号码（11位数字）
-- 任何邮箱地址
-
-如果需要引用联系方式，请使用"联系方式"、"电话"等替代表述。
-
-参考资料:
-{context}
-
-用户问题: {question}
-
-回答:"""
-        )
-
-        # 内部逻辑：构建RAG链
-        rag_chain = (
-            {
-                "context": self.vector_db.as_retriever(search_kwargs={"k": 3}) | format_docs,
-                "question": RunnablePassthrough()
-            }
-            | prompt
-            | self.llm
-            | StrOutputParser()
-        )
-
-        # 内部逻辑：执行查询获取回答
-        answer = rag_chain.invoke(request.message)
+        rag_chain = RAG_PROMPT | self.llm | StrOutputParser()
+        answer = await rag_chain.ainvoke({
+            "history": packed.format_history_block(),
+            "context": packed.format_documents(),
+            "question": request.message
+        })
 
         # 内部逻辑：提取来源文档ID
         doc_ids = [
@@ -153,14 +179,19 @@ class RAGStrategy(ChatStrategy):
         ]
 
         # 内部逻辑：应用敏感信息过滤
-        from app.core.config import settings
         from app.utils.sensitive_data_filter import get_filter
 
         if settings.ENABLE_SENSITIVE_DATA_FILTER:
             filter_instance = get_filter()
             answer, _ = filter_instance.filter_all(answer)
 
-        return ChatAnswer(text=answer, sources_data=doc_ids)
+        return ChatAnswer(
+            text=answer,
+            sources_data=doc_ids,
+            context_tokens=packed.total_tokens,
+            documents=retrieved_docs,
+            compression_ratio=compressed.ratio
+        )
 
 
 class AgentStrategy(ChatStrategy):
@@ -182,7 +213,8 @@ class AgentStrategy(ChatStrategy):
     async def execute(
         self,
         request: ChatRequest,
-        db: AsyncSession
+        db: AsyncSession,
+        query_embedding: Optional[List[float]] = None
     ) -> ChatAnswer:
         """
         函数级注释：执行Agent对话策略
@@ -190,6 +222,7 @@ class AgentStrategy(ChatStrategy):
         参数：
             request - 对话请求对象
             db - 数据库异步会话
+            query_embedding - 已计算的问题向量（Agent 模式不使用）
         返回值：ChatAnswer - 对话回答结果
         """
         # 内部逻辑：转换历史记录为LangChain格式
@@ -204,7 +237,11 @@ class AgentStrategy(ChatStrategy):
                     history.append(AIMessage(content=msg.content))
 
         # 内部逻辑：运行智能体
-        result = await self.agent_service.run(request.message, history=history)
+        result = await self.agent_service.run(
+            request.message,
+            history=history,
+            mmr_options=MMROptions.resolve(request.use_mmr, request.mmr_lambda)
+        )
 
         # 内部逻辑：应用敏感信息过滤
         from app.core.config import settings
@@ -218,7 +255,7 @@ class AgentStrategy(ChatStrategy):
         # 内部逻辑：提取来源文档ID
         doc_ids = result.get("sources", [])
 
-        return ChatAnswer(text=filtered_answer, sources_data=doc_ids)
+        return ChatAnswer(text=filtered_answer, sources_data=doc_ids, documents=result.get("documents"))
 
 
 class ChatStrategyFactory:
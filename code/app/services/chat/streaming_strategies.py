@@ -13,17 +13,21 @@
     - 使用工厂模式管理策略实例
 """
 
-import json
 from abc import ABC, abstractmethod
-from typing import AsyncGenerator, Optional
+from typing import AsyncGenerator, List, Optional
 
 from loguru import logger
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.chat import ChatRequest, SourceDetail
+from app.services.chat.context_compressor import CompressionOptions, ContextCompressor
+from app.services.chat.context_packer import ContextPacker
 from app.services.chat.sources_processor import SourcesProcessor
+from app.services.retrieval import MMROptions, MultiQueryOptions, MultiQueryRetriever, expand_to_parents
 from app.core.config import settings
 from app.utils.sensitive_data_filter import get_filter, StreamingSensitiveFilter
+from app.utils.sse import coalesce_text
+from app.utils.stream_events import StreamEvent
 
 
 class StreamingStrategy(ABC):
@@ -37,15 +41,17 @@ class StreamingStrategy(ABC):
     async def execute(
         self,
         request: ChatRequest,
-        db: AsyncSession
-    ) -> AsyncGenerator[str, None]:
+        db: AsyncSession,
+        query_embedding: Optional[List[float]] = None
+    ) -> AsyncGenerator[StreamEvent, None]:
         """
         函数级注释：执行流式对话
         内部逻辑：由具体策略实现各自的流式对话流程
         参数：
             request - 对话请求
             db - 数据库会话
-        生成值：str - SSE格式的数据块
+            query_embedding - 已计算的问题向量（可选，检索时复用，避免重复向量化）
+        生成值：StreamEvent - 流式对话事件（SSE 编码在接口处完成）
         """
         pass
 
@@ -83,15 +89,33 @@ class RAGStreamingStrategy(StreamingStrategy):
     async def execute(
         self,
         request: ChatRequest,
-        db: AsyncSession
-    ) -> AsyncGenerator[str, None]:
+        db: AsyncSession,
+        query_embedding: Optional[List[float]] = None
+    ) -> AsyncGenerator[StreamEvent, None]:
         """
         函数级注释：执行RAG流式对话
-        内部逻辑：检索 -> 发送来源 -> 流式生成回答
+        内部逻辑：检索（可选多查询融合） -> 回查父片段 -> 压缩参考资料（可选） -> 按 Token 预算打包上下文 -> 发送来源 -> 流式生成回答
         """
-        # 内部逻辑：检索相关文档
-        docs = self.vector_db.similarity_search(request.message, k=3)
-        context = "\n\n".join([doc.page_content for doc in docs])
+        # 内部逻辑：检索候选片段（请求可选启用 MMR 多样化与多查询融合）
+        mmr_options = MMROptions.resolve(request.use_mmr, request.mmr_lambda)
+        candidates = await MultiQueryRetriever(self.vector_db, self.llm).asearch(
+            request.message,
+            k=settings.CONTEXT_CANDIDATE_K,
+            options=MultiQueryOptions.resolve(request.multi_query),
+            history=[msg.content for msg in request.history or [] if msg.role == "user"],
+            mmr_options=mmr_options,
+            conversation_id=request.conversation_id,
+            query_embedding=query_embedding
+        )
+        # 内部逻辑：父子片段模式入库的文档，命中的子片段替换为去重后的父片段
+        candidates = await expand_to_parents(db, candidates)
+
+        # 内部逻辑：压缩参考资料（请求可选启用），再按模型的 Token 预算打包历史消息与检索片段
+        compressed = ContextCompressor(
+            CompressionOptions.resolve(request.compress_context, request.compression_ratio)
+        ).compress(request.message, candidates)
+        packed = ContextPacker.for_llm(self.llm).pack(request.message, compressed.documents, request.history)
+        docs = packed.documents
 
         # 内部逻辑：构建Prompt
         prompt_template = """帅哥，请基于以下提供的参考资料回答用户的问题。
@@ -103,14 +127,15 @@ class RAGStreamingStrategy(StreamingStrategy):
 
 如果需要引用联系方式，请使用"联系方式"、"电话"等替代表述。
 
-参考资料:
+{history}参考资料:
 {context}
 
 用户问题: {question}
 
 回答:"""
         full_prompt = prompt_template.format(
-            context=context,
+            history=packed.format_history_block(),
+            context=packed.format_documents(),
             question=request.message
         )
 
@@ -118,26 +143,27 @@ class RAGStreamingStrategy(StreamingStrategy):
         doc_ids = [doc.metadata.get("doc_id", 0) for doc in docs if doc.metadata.get("doc_id")]
         sources = await self.sources_processor.process(doc_ids, db, docs)
 
-        # 内部逻辑：先发送来源信息
-        yield f"data: {json.dumps({'sources': [s.model_dump() for s in sources]}, ensure_ascii=False)}\n\n"
+        # 内部逻辑：先发送来源信息、打包后的上下文 Token 数与压缩比例
+        yield StreamEvent(
+            sources=[s.model_dump() for s in sources],
+            context_tokens=packed.total_tokens,
+            compression_ratio=compressed.ratio
+        )
 
         # 内部逻辑：初始化流式敏感信息过滤器
         streaming_filter = None
         if settings.ENABLE_SENSITIVE_DATA_FILTER:
             filter_instance = get_filter()
-            streaming_filter = StreamingSensitiveFilter(filter_instance, window_size=20)
+            streaming_filter = StreamingSensitiveFilter(filter_instance)
 
-        # 内部逻辑：流式生成回答（带降级处理）
+        # 内部逻辑：流式生成回答（带降级处理），模型输出片段按时间窗口合并为较少的帧
         try:
-            async for chunk in self.llm.astream(full_prompt):
-                content = chunk.content
-
-                # 内部逻辑：应用敏感信息过滤
-                if streaming_filter:
-                    content = streaming_filter.process(content)
-
-                if content:
-                    yield f"data: {json.dumps({'answer': content}, ensure_ascii=False)}\n\n"
+            async for content in coalesce_text(
+                self._answer_chunks(full_prompt, streaming_filter),
+                settings.SSE_COALESCE_WINDOW_MS,
+                settings.SSE_COALESCE_MAX_BYTES
+            ):
+                yield StreamEvent(answer=content)
 
         except Exception as e:
             """
@@ -164,7 +190,7 @@ class RAGStreamingStrategy(StreamingStrategy):
 
             if is_stream_format_error or is_sse_error:
                 logger.warning("检测到流式响应格式错误，尝试降级为非流式调用...")
-                yield f"data: {json.dumps({'warning': '正在切换为非流式模式...'}, ensure_ascii=False)}\n\n"
+                yield StreamEvent(warning='正在切换为非流式模式...')
 
                 try:
                     # 内部逻辑：降级为非流式调用（invoke）
@@ -180,7 +206,7 @@ class RAGStreamingStrategy(StreamingStrategy):
                             content = content + remaining
 
                     if content:
-                        yield f"data: {json.dumps({'answer': content}, ensure_ascii=False)}\n\n"
+                        yield StreamEvent(answer=content)
 
                     logger.info("非流式降级调用成功")
 
@@ -191,16 +217,35 @@ class RAGStreamingStrategy(StreamingStrategy):
                     """
                     fallback_msg = str(fallback_error)
                     logger.error(f"非流式降级调用也失败: {fallback_msg}")
-                    yield f"data: {json.dumps({'error': f'LLM调用失败（流式和非流式均失败）: {fallback_msg}'}, ensure_ascii=False)}\n\n"
+                    yield StreamEvent(error=f'LLM调用失败（流式和非流式均失败）: {fallback_msg}')
             else:
                 # 内部逻辑：其他类型的错误直接返回，不尝试降级
-                yield f"data: {json.dumps({'error': f'LLM调用失败: {error_msg}'}, ensure_ascii=False)}\n\n"
+                yield StreamEvent(error=f'LLM调用失败: {error_msg}')
 
         # 内部逻辑：刷新过滤器缓冲区
         if streaming_filter:
             remaining = streaming_filter.flush()
             if remaining:
-                yield f"data: {json.dumps({'answer': remaining}, ensure_ascii=False)}\n\n"
+                yield StreamEvent(answer=remaining)
+
+    async def _answer_chunks(
+        self,
+        prompt: str,
+        streaming_filter: Optional[StreamingSensitiveFilter]
+    ) -> AsyncGenerator[str, None]:
+        """
+        函数级注释：逐片段读取模型输出并应用流式敏感信息过滤
+        参数：
+            prompt - 完整提示词
+            streaming_filter - 流式敏感信息过滤器（未启用时为 None）
+        生成值：str - 过滤后的非空回答片段
+        """
+        async for chunk in self.llm.astream(prompt):
+            content = chunk.content
+            if streaming_filter:
+                content = streaming_filter.process(content)
+            if content:
+                yield content
 
 
 class AgentStreamingStrategy(StreamingStrategy):
@@ -236,8 +281,9 @@ class AgentStreamingStrategy(StreamingStrategy):
     async def execute(
         self,
         request: ChatRequest,
-        db: AsyncSession
-    ) -> AsyncGenerator[str, None]:
+        db: AsyncSession,
+        query_embedding: Optional[List[float]] = None
+    ) -> AsyncGenerator[StreamEvent, None]:
         """
         函数级注释：执行Agent流式对话
         内部逻辑：调用Agent服务 -> 处理来源 -> 发送完整回答
@@ -247,11 +293,14 @@ class AgentStreamingStrategy(StreamingStrategy):
 
         # 内部逻辑：运行Agent
         agent = self.agent_service
-        result = await agent.run(request.message)
+        result = await agent.run(
+            request.message,
+            mmr_options=MMROptions.resolve(request.use_mmr, request.mmr_lambda)
+        )
 
         # 内部逻辑：处理来源信息
         doc_ids = result.get("sources", [])
-        sources = await self.sources_processor.process(doc_ids, db)
+        sources = await self.sources_processor.process(doc_ids, db, result.get("documents"))
 
         # 内部逻辑：应用敏感信息过滤（Guard Clause - 防止answer键缺失）
         filtered_answer = result.get("answer", "")
@@ -260,7 +309,7 @@ class AgentStreamingStrategy(StreamingStrategy):
             filtered_answer, _ = filter_instance.filter_all(filtered_answer)
 
         # 内部逻辑：Agent模式一次性发送完整回答
-        yield f"data: {json.dumps({'answer': filtered_answer, 'sources': [s.model_dump() for s in sources]}, ensure_ascii=False)}\n\n"
+        yield StreamEvent(answer=filtered_answer, sources=[s.model_dump() for s in sources])
 
 
 class StreamingStrategyFactory:
@@ -86,6 +86,23 @@ class ChatService:
         async for chunk in orchestrator.stream_chat(db, request):
             yield chunk
 
+    @staticmethod
+    async def stream_chat_events(
+        db: AsyncSession,
+        request: ChatRequest
+    ):
+        """
+        函数级注释：异步生成器，执行流式对话逻辑并产出结构化事件
+        内部逻辑：委托给ChatOrchestrator处理，供会话持久化等内部消费方直接读取事件字段
+        参数：
+            db: 数据库异步会话
+            request: 对话请求对象
+        生成值：StreamEvent - 流式对话事件（由接口层编码为 SSE）
+        """
+        orchestrator = get_orchestrator()
+        async for event in orchestrator.stream_events(db, request):
+            yield event
+
     @staticmethod
     async def get_sources(
         db: AsyncSession,
@@ -6,7 +6,6 @@
 设计原则：复用现有ChatService，遵循SOLID原则，使用Guard Clauses模式
 """
 
-import json
 from typing import List, Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -35,10 +34,16 @@ from app.models.conversation import (
 )
 from app.models.models import Document
 from app.services.chat_service import ChatService
+from app.services.retrieval.working_set import get_working_sets
 from app.schemas.chat import ChatRequest
 from app.core.config import settings
 from app.core.token_pricing import calculate_token_cost, TokenPricingCalculator
 from app.utils.timezone_helper import get_local_time
+from app.utils.token_counter import StreamTokenCounter
+from app.utils.stream_events import STREAM_DONE, StreamEvent
+
+# 内部变量：发送消息时读取的最近历史消息条数（再由上下文打包按 Token 预算裁剪）
+HISTORY_FETCH_LIMIT = 20
 
 
 class ConversationService:
@@ -225,7 +230,7 @@ class ConversationService:
     ) -> bool:
         """
         函数级注释：删除会话（物理删除）
-        内部逻辑：直接删除，通过CASCADE级联删除关联数据
+        内部逻辑：直接删除，通过CASCADE级联删除关联数据，并淘汰会话检索工作集
         参数：
             db: 数据库会话
             conversation_id: 会话ID
@@ -245,6 +250,9 @@ class ConversationService:
         await db.delete(conversation)
         await db.commit()
 
+        # 内部逻辑：淘汰会话检索工作集
+        get_working_sets().evict(conversation_id)
+
         logger.info(f"会话 {conversation_id} 已物理删除")
         return True
 
@@ -333,19 +341,13 @@ class ConversationService:
         db.add(user_message)
         await db.flush()
 
-        # 内部逻辑：获取历史消息作为上下文
-        history_result = await db.execute(
-            select(Message)
-            .where(Message.conversation_id == conversation_id)
-            .order_by(Message.created_at.asc())
-            .limit(20)  # 内部变量：限制历史消息数量
-        )
-        history_messages = history_result.scalars().all()
+        # 内部逻辑：获取最近的历史消息作为上下文（由上下文打包按 Token 预算进一步裁剪）
+        history_messages = await ConversationService._recent_history(db, conversation_id, user_message.id)
 
         # 内部逻辑：转换为ChatRequest格式
         chat_history = [
             {"role": "user" if msg.role == DBMessageRole.USER else "assistant", "content": msg.content}
-            for msg in history_messages[:-1]  # 内部逻辑：排除刚添加的用户消息
+            for msg in history_messages
         ]
 
         # 内部逻辑：调用ChatService获取回复
@@ -353,13 +355,19 @@ class ConversationService:
             message=request.content,
             history=chat_history,
             use_agent=request.use_agent or conversation.use_agent == 1,
-            stream=False
+            stream=False,
+            conversation_id=conversation_id
         )
         chat_response = await ChatService.chat_completion(db, chat_request)
 
         # 内部逻辑：估算并保存Token统计
         model_name = conversation.model_name or settings.CHAT_MODEL
-        prompt_tokens = TokenPricingCalculator.estimate_tokens(request.content)
+        # 内部逻辑：优先使用上下文打包统计的提示词 Token 数（含历史与参考资料），未统计时按用户输入估算
+        context_tokens = chat_response.context_tokens
+        if isinstance(context_tokens, int) and context_tokens > 0:
+            prompt_tokens = context_tokens
+        else:
+            prompt_tokens = TokenPricingCalculator.estimate_tokens(request.content)
         completion_tokens = TokenPricingCalculator.estimate_tokens(chat_response.answer)
         cost_info = calculate_token_cost(model_name, prompt_tokens, completion_tokens)
 
@@ -413,6 +421,7 @@ class ConversationService:
             msg_source = MessageSource(
                 message_id=assistant_message.id,
                 document_id=doc_id,
+                chunk_id=source.chunk_id,
                 file_name=source.file_name,
                 text_segment=source.text_segment,
                 score=int(source.score * 100) if source.score else None,
@@ -444,14 +453,32 @@ class ConversationService:
         request: SendMessageRequest
     ):
         """
-        函数级注释：发送消息（流式）
-        内部逻辑：保存用户消息 -> 流式生成 -> 逐步yield -> 完成后保存
+        函数级注释：发送消息（流式，SSE 格式）
+        内部逻辑：将 send_message_events 的事件编码为 SSE 帧
         参数：
             db: 数据库会话
             conversation_id: 会话ID
             request: 消息请求
         生成值：SSE格式的JSON字符串
         """
+        async for event in ConversationService.send_message_events(db, conversation_id, request):
+            yield event.encode()
+
+    @staticmethod
+    async def send_message_events(
+        db: AsyncSession,
+        conversation_id: int,
+        request: SendMessageRequest
+    ):
+        """
+        函数级注释：发送消息（流式，结构化事件）
+        内部逻辑：保存用户消息 -> 流式生成 -> 逐步yield -> 完成后保存
+        参数：
+            db: 数据库会话
+            conversation_id: 会话ID
+            request: 消息请求
+        生成值：StreamEvent - 流式对话事件（持久化直接读取事件字段，不解析 SSE 文本）
+        """
         try:
             # 内部逻辑：验证会话存在
             conv_result = await db.execute(
@@ -459,7 +486,7 @@ class ConversationService:
             )
             conversation = conv_result.scalar_one_or_none()
             if conversation is None:
-                yield f"data: {json.dumps({'error': '会话不存在'}, ensure_ascii=False)}\n\n"
+                yield StreamEvent(error='会话不存在')
                 return
 
             # 内部逻辑：保存用户消息
@@ -473,18 +500,12 @@ class ConversationService:
             db.add(user_message)
             await db.commit()
 
-            # 内部逻辑：获取历史消息
-            history_result = await db.execute(
-                select(Message)
-                .where(Message.conversation_id == conversation_id)
-                .order_by(Message.created_at.asc())
-                .limit(20)
-            )
-            history_messages = history_result.scalars().all()
+            # 内部逻辑：获取最近的历史消息
+            history_messages = await ConversationService._recent_history(db, conversation_id, user_message.id)
 
             chat_history = [
                 {"role": "user" if msg.role == DBMessageRole.USER else "assistant", "content": msg.content}
-                for msg in history_messages[:-1]
+                for msg in history_messages
             ]
 
             # 内部逻辑：调用ChatService流式接口
@@ -492,36 +513,36 @@ class ConversationService:
                 message=request.content,
                 history=chat_history,
                 use_agent=request.use_agent or conversation.use_agent == 1,
-                stream=True
+                stream=True,
+                conversation_id=conversation_id
             )
 
-            # 内部变量：累积助手回复内容
+            # 内部变量：累积助手回复内容（Token 数随片段增量计数，流式结束时即可得到）
             assistant_content = ""
+            completion_counter = StreamTokenCounter()
             sources = []
+            context_tokens = None
 
             # 内部逻辑：处理流式响应
-            async for chunk in ChatService.stream_chat_completion(db, chat_request):
-                # 内部逻辑：直接转发SSE数据
-                yield chunk
-
-                # 内部逻辑：解析数据用于持久化
-                if chunk.startswith("data: "):
-                    data_str = chunk[6:]
-                    try:
-                        data = json.loads(data_str)
-                        if data.get("answer"):
-                            assistant_content += data["answer"]
-                        if data.get("sources"):
-                            sources = data["sources"]
-                    except json.JSONDecodeError:
-                        pass
+            async for event in ChatService.stream_chat_events(db, chat_request):
+                # 内部逻辑：直接转发事件
+                yield event
+
+                # 内部逻辑：读取事件字段用于持久化
+                if event.answer:
+                    assistant_content += event.answer
+                    completion_counter.feed(event.answer)
+                if event.sources:
+                    sources = event.sources
+                if event.context_tokens:
+                    context_tokens = event.context_tokens
 
             # 内部逻辑：流式结束后保存助手消息
             if assistant_content:
                 # 内部逻辑：估算Token
                 model_name = conversation.model_name or settings.CHAT_MODEL
-                prompt_tokens = TokenPricingCalculator.estimate_tokens(request.content)
-                completion_tokens = TokenPricingCalculator.estimate_tokens(assistant_content)
+                prompt_tokens = context_tokens or TokenPricingCalculator.estimate_tokens(request.content)
+                completion_tokens = max(completion_counter.total, 1)
                 cost_info = calculate_token_cost(model_name, prompt_tokens, completion_tokens)
 
                 assistant_message = Message(
@@ -572,6 +593,7 @@ class ConversationService:
                     msg_source = MessageSource(
                         message_id=assistant_message.id,
                         document_id=doc_id,
+                        chunk_id=source.get("chunk_id"),
                         file_name=source.get("file_name", ""),
                         text_segment=source.get("text_segment", ""),
                         score=int(source.get("score", 0) * 100) if source.get("score") else None,
@@ -600,10 +622,35 @@ class ConversationService:
             logger.error(f"流式发送消息异常: {str(e)}")
             logger.error(f"异常类型: {type(e).__name__}")
             logger.error(f"异常堆栈: {traceback.format_exc()}")
-            yield f"data: {json.dumps({'error': str(e) or '未知错误'}, ensure_ascii=False)}\n\n"
+            yield StreamEvent(error=str(e) or '未知错误')
         finally:
-            # 内部逻辑：确保发送完成标记
-            yield f"data: {json.dumps({'done': True}, ensure_ascii=False)}\n\n"
+            # 内部逻辑：确保发送完成事件
+            yield STREAM_DONE
+
+    @staticmethod
+    async def _recent_history(
+        db: AsyncSession,
+        conversation_id: int,
+        current_message_id: int,
+        limit: int = HISTORY_FETCH_LIMIT
+    ) -> List[Message]:
+        """
+        函数级注释：获取会话中最近的历史消息
+        内部逻辑：按时间倒序取最近 limit 条（排除当前用户消息），再恢复为时间正序
+        参数：
+            db: 数据库会话
+            conversation_id: 会话ID
+            current_message_id: 当前用户消息ID
+            limit: 最多返回的消息数
+        返回值：按时间正序排列的历史消息
+        """
+        result = await db.execute(
+            select(Message)
+            .where(and_(Message.conversation_id == conversation_id, Message.id != current_message_id))
+            .order_by(desc(Message.created_at), desc(Message.id))
+            .limit(limit)
+        )
+        return list(reversed(result.scalars().all()))
 
     @staticmethod
     def _to_conversation_response(conversation: Conversation) -> ConversationResponse:
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：文档预生成服务层实现
+内部逻辑：文档入库后在后台低优先级队列中预生成全文摘要、简介与关键词并持久化，
+         文档总结、对比与文档列表直接使用已生成的结果；模型切换后重新生成
+设计模式：生产者-消费者模式（单工作协程队列）
+设计原则：单一职责原则
+
+实现说明：
+    - 队列逐个处理文档，总结时并发数为 1；有对话请求进行中或刚结束时暂停，避免与交互请求争用大模型
+    - 相邻两个文档之间至少间隔 INSIGHT_THROTTLE_SECONDS 秒
+    - 全文摘要由 DocumentSummarizer 持久化（按模型标识复用），本服务只额外存储简介与关键词
+    - 工作协程在队列为空时退出，下次入队时重新创建，无需常驻
+"""
+
+import asyncio
+import json
+import re
+from contextlib import suppress
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from sqlalchemy import exists, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.models.models import Document, DocumentInsight, VectorMapping
+from app.services.chat.document_summarizer import DocumentSummarizer, model_signature
+from app.services.llm_provider import llm_provider
+from app.utils.interactive_activity import interactive_activity
+
+# 内部变量：简介与关键词提示词
+INSIGHT_PROMPT = (
+    "请根据下面的文档摘要，写一句不超过100字的简介，并给出不超过5个关键词，严格按以下格式输出：\n"
+    "简介：<简介>\n"
+    "关键词：<关键词1>，<关键词2>\n\n"
+    "{summary}"
+)
+
+# 内部变量：简介最大字符数（模型未按格式输出时从摘要截取）
+ABSTRACT_MAX_CHARS = 100
+
+# 内部变量：关键词最大数量
+MAX_KEYWORDS = 5
+
+# 内部变量：关键词分隔符
+KEYWORD_SEPARATOR = re.compile(r"[,，、;；\s]+")
+
+
+def parse_insight(text: str, summary: str) -> Tuple[str, List[str]]:
+    """
+    函数级注释：解析模型输出的简介与关键词
+    内部逻辑：按“简介：”“关键词：”前缀逐行解析，缺少简介时从摘要截取
+    参数：
+        text - 模型输出
+        summary - 全文摘要
+    返回值：Tuple[str, List[str]] - (简介, 关键词列表)
+    """
+    abstract = ""
+    keywords: List[str] = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("简介"):
+            abstract = line[2:].lstrip("：: ").strip()
+        elif line.startswith("关键词"):
+            parts = KEYWORD_SEPARATOR.split(line[3:].lstrip("：: "))
+            keywords = list(dict.fromkeys(part for part in parts if part))[:MAX_KEYWORDS]
+
+    if not abstract:
+        abstract = summary.strip()[:ABSTRACT_MAX_CHARS]
+    return abstract, keywords
+
+
+class DocumentInsightService:
+    """
+    类级注释：文档预生成服务类，生成并查询文档的全文摘要、简介与关键词
+    """
+
+    @staticmethod
+    async def generate(db: AsyncSession, doc_id: int, llm: Any = None) -> Optional[DocumentInsight]:
+        """
+        函数级注释：生成单个文档的全文摘要、简介与关键词
+        内部逻辑：生成（或复用）全文摘要 -> 基于摘要生成简介与关键词 -> 写入或更新记录
+        参数：
+            db: 数据库异步会话
+            doc_id: 文档ID
+            llm: 大模型实例（None 表示使用当前默认模型）
+        返回值：Optional[DocumentInsight] - 预生成记录（文档无内容时返回 None）
+        """
+        llm = llm or await llm_provider.get_llm(db, streaming=False)
+        summarizer = DocumentSummarizer(llm, max_concurrency=1)
+
+        summary = await summarizer.summarize(db, doc_id)
+
+        # Guard Clause：文档无内容（或已被删除）
+        if summary is None:
+            return None
+
+        response = await llm.ainvoke(INSIGHT_PROMPT.format(summary=summary))
+        abstract, keywords = parse_insight(response.content, summary)
+
+        result = await db.execute(select(DocumentInsight).where(DocumentInsight.document_id == doc_id))
+        insight = result.scalar_one_or_none()
+        if insight is None:
+            insight = DocumentInsight(document_id=doc_id)
+            db.add(insight)
+
+        insight.abstract = abstract
+        insight.keywords = json.dumps(keywords, ensure_ascii=False)
+        insight.model_key = summarizer.model_key
+        await db.commit()
+
+        logger.info(f"文档预生成完成: doc_id={doc_id}, 关键词 {keywords}")
+        return insight
+
+    @staticmethod
+    async def find_stale(db: AsyncSession, model_key: Optional[str] = None) -> List[int]:
+        """
+        函数级注释：查询需要（重新）预生成的文档
+        内部逻辑：有片段内容、且没有预生成记录或记录的模型标识与当前模型不一致
+        参数：
+            db: 数据库异步会话
+            model_key: 当前模型标识（None 表示根据当前默认模型推断）
+        返回值：List[int] - 文档ID列表（按入库顺序）
+        """
+        if model_key is None:
+            model_key = model_signature(await llm_provider.get_llm(db, streaming=False))
+
+        result = await db.execute(
+            select(Document.id)
+            .outerjoin(DocumentInsight, DocumentInsight.document_id == Document.id)
+            .where(
+                exists().where(VectorMapping.document_id == Document.id),
+                or_(DocumentInsight.id.is_(None), DocumentInsight.model_key != model_key)
+            )
+            .order_by(Document.id)
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def get_insights(db: AsyncSession, doc_ids: Sequence[int]) -> Dict[int, DocumentInsight]:
+        """
+        函数级注释：批量查询文档的预生成记录
+        参数：
+            db: 数据库异步会话
+            doc_ids: 文档ID列表
+        返回值：Dict[int, DocumentInsight] - 文档ID -> 预生成记录
+        """
+        # Guard Clause：无文档时不查询
+        if not doc_ids:
+            return {}
+
+        result = await db.execute(
+            select(DocumentInsight).where(DocumentInsight.document_id.in_(doc_ids))
+        )
+        return {insight.document_id: insight for insight in result.scalars().all()}
+
+
+class DocumentInsightQueue:
+    """
+    类级注释：文档预生成后台队列
+    内部逻辑：单个工作协程按入队顺序逐个处理文档，处理前等待对话空闲，处理后节流
+    职责：
+        1. 接收入库完成的文档（去重）
+        2. 接收模型切换后的重新生成请求，扫描需要重新生成的文档
+        3. 在独立的数据库会话中调用 DocumentInsightService 生成结果
+    """
+
+    def __init__(self, session_factory: Optional[Callable] = None):
+        """
+        函数级注释：初始化队列
+        参数：
+            session_factory - 数据库会话工厂（None 表示使用应用的会话工厂）
+        """
+        self._session_factory = session_factory
+        self._pending: Dict[int, None] = {}
+        self._refresh_requested = False
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> List[int]:
+        """
+        函数级注释：获取等待处理的文档ID
+        返回值：List[int] - 文档ID列表
+        """
+        return list(self._pending)
+
+    def enqueue(self, doc_id: int) -> None:
+        """
+        函数级注释：将文档加入预生成队列
+        参数：
+            doc_id - 文档ID
+        """
+        # Guard Clause：未启用预生成
+        if not settings.ENABLE_DOCUMENT_INSIGHTS:
+            return
+
+        self._pending[doc_id] = None
+        self._ensure_worker()
+
+    def request_refresh(self) -> None:
+        """
+        函数级注释：请求重新扫描需要预生成的文档（启动回填或模型切换后调用）
+        """
+        # Guard Clause：未启用预生成
+        if not settings.ENABLE_DOCUMENT_INSIGHTS:
+            return
+
+        self._refresh_requested = True
+        self._ensure_worker()
+
+    def _ensure_worker(self) -> None:
+        """
+        函数级注释：确保工作协程正在运行
+        内部逻辑：不在事件循环中调用时（如同步脚本）跳过，等待下次入队或重新扫描
+        """
+        if self._worker is not None and not self._worker.done():
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            logger.debug("当前没有运行中的事件循环，暂不启动文档预生成队列")
+            return
+
+        self._worker = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        """
+        函数级注释：工作协程主循环
+        内部逻辑：先处理重新扫描请求，再逐个处理文档，队列为空时退出
+        """
+        while self._refresh_requested or self._pending:
+            if self._refresh_requested:
+                self._refresh_requested = False
+                await self._scan_stale()
+                continue
+
+            # 内部逻辑：等待对话空闲后再取出文档，等待期间新入队的重复文档会被合并
+            await interactive_activity.wait_idle(settings.INSIGHT_IDLE_SECONDS)
+            doc_id = next(iter(self._pending))
+            self._pending.pop(doc_id)
+
+            try:
+                async with self._open_session() as db:
+                    await DocumentInsightService.generate(db, doc_id)
+            except Exception as e:
+                logger.warning(f"文档预生成失败: doc_id={doc_id}, {str(e)}")
+
+            await asyncio.sleep(settings.INSIGHT_THROTTLE_SECONDS)
+
+    async def _scan_stale(self) -> None:
+        """
+        函数级注释：扫描需要（重新）预生成的文档并入队
+        """
+        try:
+            async with self._open_session() as db:
+                doc_ids = await DocumentInsightService.find_stale(db)
+        except Exception as e:
+            logger.warning(f"扫描待预生成文档失败: {str(e)}")
+            return
+
+        for doc_id in doc_ids:
+            self._pending[doc_id] = None
+        if doc_ids:
+            logger.info(f"文档预生成队列新增 {len(doc_ids)} 个待处理文档")
+
+    def _open_session(self):
+        """
+        函数级注释：创建独立的数据库会话
+        返回值：异步会话上下文管理器
+        """
+        if self._session_factory is not None:
+            return self._session_factory()
+
+        import app.db.session as session_module
+        return session_module.AsyncSessionLocal()
+
+    async def stop(self) -> None:
+        """
+        函数级注释：停止工作协程并清空队列（应用关闭时调用）
+        """
+        self._pending.clear()
+        self._refresh_requested = False
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._worker
+        self._worker = None
+
+
+# 内部变量：全局文档预生成队列
+document_insight_queue = DocumentInsightQueue()
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'DocumentInsightService',
+    'DocumentInsightQueue',
+    'document_insight_queue',
+    'parse_insight',
+]
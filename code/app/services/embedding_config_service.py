@@ -191,6 +191,7 @@ class EmbeddingConfigService(BaseConfigService[EmbeddingConfig]):
 
         await db.commit()
         await db.refresh(config)
+        await cls._invalidate_cache(db)
 
         # 内部逻辑：如果配置处于激活状态，触发热重载
         # 修复：之前保存配置后不会触发热重载，导致运行时配置不更新
@@ -9,12 +9,12 @@ import hashlib
 import json
 import os
 import uuid
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from fastapi import UploadFile, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.ingest import IngestResponse
 from app.schemas.document import DocumentListResponse, DocumentRead
-from app.models.models import Document, VectorMapping, IngestTask, TaskStatus
+from app.models.models import Document, VectorMapping, ParentChunk, IngestTask, TaskStatus
 from sqlalchemy.future import select
 from sqlalchemy import func
 from app.core.config import settings
@@ -37,6 +37,8 @@ from app.schemas.ingest import IngestResponse, DBIngestRequest
 
 # 说明：智谱AI Embeddings（生产环境使用，无需本地模型）
 from app.utils.zhipuai_embeddings import ZhipuAIEmbeddings
+from app.services.retrieval.centroid_index import DocumentCentroidIndex
+from app.services.retrieval.parent_child import split_parent_child
 
 class IngestService:
     """
@@ -245,7 +247,13 @@ class IngestService:
 
             logger.info(f"[诊断] 使用 EmbeddingFactory 获取 Embeddings，提供商: {current_provider}，模型: {current_model}")
             logger.info(f"使用 EmbeddingFactory 获取 Embeddings，提供商: {current_provider}，模型: {current_model}")
-            return EmbeddingFactory.create_embeddings()
+            embeddings = EmbeddingFactory.create_embeddings()
+
+            # 内部逻辑：合并并发的相同查询向量计算
+            if settings.ENABLE_REQUEST_COALESCING:
+                from app.utils.singleflight import SingleFlightEmbeddings
+                embeddings = SingleFlightEmbeddings(embeddings)
+            return embeddings
         except ImportError as e:
             # 内部逻辑：降级到原来的实现（当 EmbeddingFactory 不可用时）
             logger.warning(f"[诊断] EmbeddingFactory 导入失败: {e}")
@@ -380,13 +388,6 @@ class IngestService:
             if task_id:
                 await IngestService.update_task_status(db, task_id, TaskStatus.PROCESSING, progress=50)
 
-            # 内部逻辑：文本切分
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200
-            )
-            chunks = text_splitter.split_documents(docs)
-
             # 内部逻辑：保存元数据到 SQLite
             new_doc = Document(
                 file_name=file.filename,
@@ -402,9 +403,8 @@ class IngestService:
             if task_id:
                 await IngestService.update_task_status(db, task_id, TaskStatus.PROCESSING, progress=60, document_id=new_doc.id)
 
-            # 内部逻辑：为每个 chunk 添加 document_id 元数据，确保 RAG 溯源准确
-            for chunk in chunks:
-                chunk.metadata["doc_id"] = new_doc.id
+            # 内部逻辑：文本切分，并为每个 chunk 添加 doc_id 与片段ID元数据（片段ID同时作为向量库ID，与向量映射一致）
+            chunks, parents = IngestService._split_documents(docs, new_doc.id)
 
             # 内部逻辑：向量化并存入 ChromaDB
             embeddings = IngestService.get_embeddings()
@@ -412,10 +412,17 @@ class IngestService:
             vector_db = Chroma.from_documents(
                 documents=chunks,
                 embedding=embeddings,
+                ids=[chunk.metadata["chunk_id"] for chunk in chunks],
                 persist_directory=settings.CHROMA_DB_PATH,
                 collection_name=settings.CHROMA_COLLECTION_NAME
             )
             vector_db.persist()
+
+            # 内部逻辑：更新文档质心索引（两阶段检索使用）
+            IngestService._refresh_document_centroid(vector_db, new_doc.id)
+
+            # 内部逻辑：新文档可能改变检索结果，使语义答案缓存失效
+            IngestService._invalidate_answer_cache(new_doc.id)
             
             # 内部逻辑：更新任务进度
             if task_id:
@@ -425,17 +432,23 @@ class IngestService:
             for i, chunk in enumerate(chunks):
                 mapping = VectorMapping(
                     document_id=new_doc.id,
-                    chunk_id=f"{new_doc.id}_{i}",
+                    chunk_id=chunk.metadata["chunk_id"],
                     chunk_content=chunk.page_content
                 )
                 db.add(mapping)
 
+            # 内部逻辑：保存父片段（父子片段入库模式，父片段不写入向量库）
+            db.add_all(parents)
+
             await db.commit()
             
             # 内部逻辑：更新任务状态为完成
             if task_id:
                 await IngestService.update_task_status(db, task_id, TaskStatus.COMPLETED, progress=100)
 
+            # 内部逻辑：后台低优先级预生成摘要、简介与关键词（未启用时忽略）
+            IngestService._schedule_document_insight(new_doc.id)
+
             logger.info(f"文件处理成功: {file.filename} -> {save_path}")
             return IngestResponse(
                 document_id=new_doc.id,
@@ -514,10 +527,6 @@ class IngestService:
             elif docs and docs[0].metadata.get("source"):
                 page_title = os.path.basename(docs[0].metadata["source"])
 
-            # 内部逻辑：文本切分
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-            chunks = text_splitter.split_documents(docs)
-            
             # 内部逻辑：保存元数据
             new_doc = Document(
                 file_name=page_title,
@@ -533,9 +542,8 @@ class IngestService:
             if task_id:
                 await IngestService.update_task_status(db, task_id, TaskStatus.PROCESSING, progress=60, document_id=new_doc.id)
 
-            # 内部逻辑：为 chunk 添加 doc_id 元数据
-            for chunk in chunks:
-                chunk.metadata["doc_id"] = new_doc.id
+            # 内部逻辑：文本切分，并为每个 chunk 添加 doc_id 与片段ID元数据（片段ID同时作为向量库ID，与向量映射一致）
+            chunks, parents = IngestService._split_documents(docs, new_doc.id)
 
             # 内部逻辑：向量化
             embeddings = IngestService.get_embeddings()
@@ -543,26 +551,39 @@ class IngestService:
             vector_db = Chroma.from_documents(
                 documents=chunks,
                 embedding=embeddings,
+                ids=[chunk.metadata["chunk_id"] for chunk in chunks],
                 persist_directory=settings.CHROMA_DB_PATH,
                 collection_name=settings.CHROMA_COLLECTION_NAME
             )
             vector_db.persist()
 
+            # 内部逻辑：更新文档质心索引（两阶段检索使用）
+            IngestService._refresh_document_centroid(vector_db, new_doc.id)
+
+            # 内部逻辑：新文档可能改变检索结果，使语义答案缓存失效
+            IngestService._invalidate_answer_cache(new_doc.id)
+
             # 内部逻辑：保存向量映射
             for i, chunk in enumerate(chunks):
                 mapping = VectorMapping(
                     document_id=new_doc.id,
-                    chunk_id=f"{new_doc.id}_{i}",
+                    chunk_id=chunk.metadata["chunk_id"],
                     chunk_content=chunk.page_content
                 )
                 db.add(mapping)
 
+            # 内部逻辑：保存父片段（父子片段入库模式，父片段不写入向量库）
+            db.add_all(parents)
+
             await db.commit()
 
             # 内部逻辑：更新任务状态为完成
             if task_id:
                 await IngestService.update_task_status(db, task_id, TaskStatus.COMPLETED, progress=100)
 
+            # 内部逻辑：后台低优先级预生成摘要、简介与关键词（未启用时忽略）
+            IngestService._schedule_document_insight(new_doc.id)
+
             return IngestResponse(
                 document_id=new_doc.id,
                 status="completed",
@@ -632,10 +653,6 @@ class IngestService:
             )
             docs = loader.load()
             
-            # 内部逻辑：文本切分 (针对长记录)
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-            chunks = text_splitter.split_documents(docs)
-            
             # 内部逻辑：保存元数据到 SQLite 提前获取 ID
             new_doc = Document(
                 file_name=f"DB:{request.table_name}",
@@ -650,9 +667,8 @@ class IngestService:
             if task_id:
                 await IngestService.update_task_status(db, task_id, TaskStatus.PROCESSING, progress=60, document_id=new_doc.id)
 
-            # 内部逻辑：为 chunk 添加 doc_id 元数据
-            for chunk in chunks:
-                chunk.metadata["doc_id"] = new_doc.id
+            # 内部逻辑：文本切分，并为每个 chunk 添加 doc_id 与片段ID元数据（片段ID同时作为向量库ID，与向量映射一致）
+            chunks, parents = IngestService._split_documents(docs, new_doc.id)
 
             # 内部逻辑：向量化
             embeddings = IngestService.get_embeddings()
@@ -660,26 +676,39 @@ class IngestService:
             vector_db = Chroma.from_documents(
                 documents=chunks,
                 embedding=embeddings,
+                ids=[chunk.metadata["chunk_id"] for chunk in chunks],
                 persist_directory=settings.CHROMA_DB_PATH,
                 collection_name=settings.CHROMA_COLLECTION_NAME
             )
             vector_db.persist()
 
+            # 内部逻辑：更新文档质心索引（两阶段检索使用）
+            IngestService._refresh_document_centroid(vector_db, new_doc.id)
+
+            # 内部逻辑：新文档可能改变检索结果，使语义答案缓存失效
+            IngestService._invalidate_answer_cache(new_doc.id)
+
             # 内部逻辑：保存映射关系
             for i, chunk in enumerate(chunks):
                 mapping = VectorMapping(
                     document_id=new_doc.id,
-                    chunk_id=f"{new_doc.id}_{i}",
+                    chunk_id=chunk.metadata["chunk_id"],
                     chunk_content=chunk.page_content
                 )
                 db.add(mapping)
 
+            # 内部逻辑：保存父片段（父子片段入库模式，父片段不写入向量库）
+            db.add_all(parents)
+
             await db.commit()
 
             # 内部逻辑：更新任务状态为完成
             if task_id:
                 await IngestService.update_task_status(db, task_id, TaskStatus.COMPLETED, progress=100)
 
+            # 内部逻辑：后台低优先级预生成摘要、简介与关键词（未启用时忽略）
+            IngestService._schedule_document_insight(new_doc.id)
+
             return IngestResponse(
                 document_id=new_doc.id,
                 status="completed",
@@ -744,6 +773,10 @@ class IngestService:
             # 内部变量：构建文档ID到片段数量的映射字典
             chunk_count_dict = {row[0]: row[1] for row in chunk_count_result.all()}
 
+            # 内部逻辑：批量查询预生成的简介与关键词
+            from app.services.document_insight_service import DocumentInsightService
+            insights = await DocumentInsightService.get_insights(db, document_ids)
+
             # 内部逻辑：构建文档列表
             document_list = []
             for doc in documents:
@@ -755,18 +788,22 @@ class IngestService:
                 tags_value = doc.tags
                 if tags_value and isinstance(tags_value, str):
                     try:
-                        import json
                         tags_value = json.loads(tags_value)
                     except (json.JSONDecodeError, TypeError):
                         tags_value = None
 
+                # 内部变量：预生成的简介与关键词（未生成时为空）
+                insight = insights.get(doc.id)
+
                 document_dict = {
                     "id": doc.id,
                     "file_name": doc.file_name,
                     "source_type": doc.source_type,
                     "tags": tags_value,
                     "created_at": doc.created_at,
-                    "chunk_count": chunk_count
+                    "chunk_count": chunk_count,
+                    "abstract": insight.abstract if insight else None,
+                    "keywords": json.loads(insight.keywords) if insight and insight.keywords else None
                 }
 
                 # 内部逻辑：转换为 Pydantic 对象
@@ -838,6 +875,83 @@ class IngestService:
                     logger.error(f"更新任务失败状态时出错: {str(update_error)}")
                 await db.rollback()
 
+    @staticmethod
+    def _split_documents(docs: List, doc_id: int) -> Tuple[List, List[ParentChunk]]:
+        """
+        函数级注释：切分文档并写入片段元数据
+        内部逻辑：普通模式下按 1000 字符切分，片段同时用于向量化与参考资料；
+                 父子片段模式下向量库只写入子片段，子片段元数据通过 parent_id 指向父片段
+        参数：
+            docs: 加载器输出的文档
+            doc_id: 文档ID
+        返回值：Tuple[List, List[ParentChunk]] - (写入向量库的片段, 待持久化的父片段)
+        """
+        if settings.ENABLE_PARENT_CHILD_CHUNKING:
+            return split_parent_child(
+                docs,
+                doc_id,
+                parent_size=settings.PARENT_CHUNK_SIZE,
+                child_size=settings.CHILD_CHUNK_SIZE,
+                child_overlap=settings.CHILD_CHUNK_OVERLAP
+            )
+
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+        chunks = text_splitter.split_documents(docs)
+        for i, chunk in enumerate(chunks):
+            chunk.metadata["doc_id"] = doc_id
+            chunk.metadata["chunk_id"] = f"{doc_id}_{i}"
+        return chunks, []
+
+    @staticmethod
+    def _refresh_document_centroid(vector_db, doc_id: int) -> None:
+        """
+        函数级注释：刷新文档质心索引
+        内部逻辑：根据向量库中该文档现有的片段向量重算质心，片段已删除时移除质心；
+                 失败只记录告警，不影响入库与删除流程（可通过回填重建）
+        参数：
+            vector_db: LangChain Chroma 实例
+            doc_id: 文档ID
+        """
+        try:
+            DocumentCentroidIndex.for_vector_db(vector_db).refresh_document(vector_db._collection, doc_id)
+        except Exception as e:
+            logger.warning(f"更新文档质心索引失败: doc_id={doc_id}, {str(e)}")
+
+    @staticmethod
+    def _invalidate_answer_cache(doc_id: int, deleted: bool = False) -> None:
+        """
+        函数级注释：文档变更后使语义答案缓存与会话检索工作集失效
+        内部逻辑：新增文档可能改变任意问题的检索结果，清空全部缓存与工作集；
+                 删除文档只淘汰引用该文档的回答，并从工作集中移除该文档的片段
+        参数：
+            doc_id: 文档ID
+            deleted: 是否为删除操作
+        """
+        from app.services.chat.answer_cache import get_answer_cache
+        from app.services.retrieval.working_set import get_working_sets
+
+        if deleted:
+            get_answer_cache().invalidate_documents([doc_id])
+            get_working_sets().invalidate_documents([doc_id])
+        else:
+            get_answer_cache().advance_generation()
+            get_working_sets().clear()
+
+    @staticmethod
+    def _schedule_document_insight(doc_id: int) -> None:
+        """
+        函数级注释：将新入库的文档加入预生成队列
+        内部逻辑：入队失败只记录告警，不影响入库流程（模型切换或重启时会重新扫描）
+        参数：
+            doc_id: 文档ID
+        """
+        from app.services.document_insight_service import document_insight_queue
+
+        try:
+            document_insight_queue.enqueue(doc_id)
+        except Exception as e:
+            logger.warning(f"加入文档预生成队列失败: doc_id={doc_id}, {str(e)}")
+
     @staticmethod
     async def delete_document(db: AsyncSession, doc_id: int) -> bool:
         """
@@ -880,9 +994,15 @@ class IngestService:
                 else:
                     logger.warning(f"ChromaDB 中未找到 doc_id={doc_id} 的向量")
 
-            # 内部逻辑：从 SQLite 中删除文档记录 (级联删除会自动处理 VectorMapping)
+                # 内部逻辑：同步删除文档质心
+                IngestService._refresh_document_centroid(vector_db, doc_id)
+
+            # 内部逻辑：从 SQLite 中删除文档记录 (级联删除会自动处理 VectorMapping 与父片段)
             await db.delete(doc)
             await db.commit()
+
+            # 内部逻辑：淘汰引用该文档的语义答案缓存
+            IngestService._invalidate_answer_cache(doc_id, deleted=True)
             
             logger.info(f"成功删除文档 ID: {doc_id}, 文件名: {doc.file_name}")
             return True
@@ -13,6 +13,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from langchain_core.language_models import BaseChatModel
 from loguru import logger
 
+from app.core.config_cache import config_cache, LLM_CONFIG_CACHE
 from app.utils.llm_factory import LLMFactory
 from app.services.model_config_service import ModelConfigService
 
@@ -61,14 +62,14 @@ class LLMProvider:
     ) -> BaseChatModel:
         """
         函数级注释：获取LLM实例
-        内部逻辑：从数据库获取默认配置 -> 使用配置创建LLM -> 无配置则使用默认
+        内部逻辑：获取默认配置（优先读取进程内缓存） -> 使用配置创建LLM -> 无配置则使用默认
         参数：
             db: 数据库会话
             streaming: 是否启用流式输出
         返回值：LLM实例
         """
-        # 内部逻辑：从数据库获取启用的配置
-        default_config = await ModelConfigService.get_default_config(db)
+        # 内部逻辑：获取启用的配置（配置只在写入时失效，对话请求不再查询数据库）
+        default_config = await ModelConfigService.get_cached_default_config(db)
 
         if default_config:
             logger.debug(f"使用数据库配置创建LLM: {default_config.provider_name}")
@@ -80,10 +81,11 @@ class LLMProvider:
     async def refresh_config(self, db: AsyncSession) -> None:
         """
         函数级注释：刷新LLM配置
-        内部逻辑：重新加载默认配置并触发热重载
+        内部逻辑：失效配置缓存 -> 从数据库重新加载默认配置并触发热重载
         参数：
             db: 数据库会话
         """
+        config_cache.invalidate(LLM_CONFIG_CACHE)
         default_config = await ModelConfigService.get_default_config(db)
         if default_config:
             # 内部逻辑：设置运行时配置会自动清除缓存
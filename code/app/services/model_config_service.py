@@ -130,6 +130,10 @@ class ModelConfigService(BaseConfigService[ModelConfig]):
 
             LLMFactory.set_runtime_config(config_dict)
             logger.info(f"LLM运行时配置已热重载: {config.provider_name} - {config.model_name}, endpoint={config.endpoint}")
+
+            # 内部逻辑：模型切换后重新生成由其他模型生成的文档摘要、简介与关键词
+            from app.services.document_insight_service import document_insight_queue
+            document_insight_queue.request_refresh()
         except ImportError:
             logger.warning("LLMFactory未找到，跳过热重载")
         except Exception as e:
@@ -245,6 +249,7 @@ class ModelConfigService(BaseConfigService[ModelConfig]):
 
         await db.commit()
         await db.refresh(config)
+        await cls._invalidate_cache(db)
 
         # 内部逻辑：如果配置处于激活状态，触发热重载
         # 修复：之前保存配置后不会触发热重载，导致运行时配置不更新
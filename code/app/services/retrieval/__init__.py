@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：检索服务模块
+内部逻辑：组织向量检索及检索后处理阶段（MMR多样化、交叉编码器重排序）、文档质心两阶段检索、多查询检索、会话检索工作集、父子片段及向量索引参数管理，供搜索、对话、Agent 复用
+设计模式：外观模式 - 隐藏内部复杂性，提供简单接口
+"""
+
+from .centroid_index import DocumentCentroidIndex
+from .cross_encoder import CrossEncoderReranker, get_cross_encoder_reranker
+from .hnsw import HNSWParams, ensure_collection, rebuild_collection
+from .mmr import MMROptions, maximal_marginal_relevance
+from .multi_query import MultiQueryOptions, MultiQueryRetriever, reciprocal_rank_fusion
+from .parent_child import expand_to_parents, split_parent_child
+from .vector_retriever import VectorRetriever
+from .working_set import RetrievalWorkingSets, get_working_sets
+
+# 内部变量：定义模块公开接口
+__all__ = [
+    'DocumentCentroidIndex',
+    'CrossEncoderReranker',
+    'get_cross_encoder_reranker',
+    'HNSWParams',
+    'ensure_collection',
+    'rebuild_collection',
+    'MMROptions',
+    'maximal_marginal_relevance',
+    'MultiQueryOptions',
+    'MultiQueryRetriever',
+    'reciprocal_rank_fusion',
+    'split_parent_child',
+    'expand_to_parents',
+    'VectorRetriever',
+    'RetrievalWorkingSets',
+    'get_working_sets',
+]
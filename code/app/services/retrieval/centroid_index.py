@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：文档质心索引模块
+内部逻辑：为每个文档维护一个质心向量（片段向量均值），存放在独立的 Chroma 集合中，
+         用于两阶段检索：先按质心选出 top-N 文档，再在这些文档内做片段检索
+设计模式：仓储模式（封装质心集合的读写）
+设计原则：单一职责原则
+
+实现说明：
+    - 质心由向量库中已存储的片段向量计算，维护过程不调用嵌入模型
+    - 文档入库后更新质心，删除文档时同步删除质心
+    - 已有语料可通过 rebuild 一次性回填（分页读取片段向量并按文档累加）
+    - 启动时通过 backfill_missing 补齐缺少质心的文档、移除已无片段的质心，保证索引与片段集合一致
+"""
+
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from loguru import logger
+
+from app.services.retrieval.hnsw import HNSWParams, find_collection
+from app.services.retrieval.similar_documents import representative_vectors
+
+# 内部变量：质心集合名称后缀
+CENTROID_COLLECTION_SUFFIX = "_doc_centroids"
+
+
+class DocumentCentroidIndex:
+    """
+    类级注释：文档质心索引
+    职责：
+        1. 文档入库/删除时维护质心
+        2. 按查询向量选出最相关的文档
+        3. 从片段集合回填全部质心
+    """
+
+    def __init__(self, client, chunk_collection_name: str):
+        """
+        函数级注释：初始化质心索引
+        参数：
+            client - Chroma 客户端（与片段集合共用）
+            chunk_collection_name - 片段集合名称
+        """
+        self.client = client
+        self.name = f"{chunk_collection_name}{CENTROID_COLLECTION_SUFFIX}"
+        # 内部变量：质心集合（懒加载）
+        self._collection = None
+
+    @classmethod
+    def for_vector_db(cls, vector_db) -> 'DocumentCentroidIndex':
+        """
+        函数级注释：为 LangChain Chroma 向量库创建质心索引
+        参数：
+            vector_db - LangChain Chroma 实例
+        返回值：DocumentCentroidIndex
+        """
+        return cls(vector_db._client, vector_db._collection.name)
+
+    @property
+    def collection(self):
+        """
+        函数级注释：获取质心集合，不存在时按配置的 HNSW 参数创建
+        返回值：Chroma 集合
+        """
+        if self._collection is None:
+            self._collection = find_collection(self.client, self.name)
+            if self._collection is None:
+                self._collection = self.client.create_collection(
+                    name=self.name,
+                    metadata=HNSWParams.from_settings().to_metadata()
+                )
+        return self._collection
+
+    def upsert(self, doc_id: int, chunk_embeddings) -> None:
+        """
+        函数级注释：写入文档质心
+        参数：
+            doc_id - 文档ID
+            chunk_embeddings - 文档全部片段向量
+        """
+        centroid = representative_vectors(chunk_embeddings, 1)[0]
+        self.collection.upsert(
+            ids=[str(doc_id)],
+            embeddings=[centroid.tolist()],
+            metadatas=[{"doc_id": doc_id, "chunk_count": len(chunk_embeddings)}]
+        )
+
+    def refresh_document(self, chunk_collection, doc_id: int) -> bool:
+        """
+        函数级注释：根据片段集合中已存储的向量刷新文档质心
+        参数：
+            chunk_collection - 片段集合
+            doc_id - 文档ID
+        返回值：bool - 文档存在片段并已写入质心
+        """
+        result = chunk_collection.get(where={"doc_id": doc_id}, include=["embeddings"])
+        embeddings = result.get("embeddings") or []
+        if len(embeddings) == 0:
+            self.delete(doc_id)
+            return False
+
+        self.upsert(doc_id, embeddings)
+        return True
+
+    def delete(self, doc_id: int) -> None:
+        """
+        函数级注释：删除文档质心
+        参数：
+            doc_id - 文档ID
+        """
+        self.collection.delete(ids=[str(doc_id)])
+
+    def count(self) -> int:
+        """
+        函数级注释：获取质心数量
+        返回值：已索引的文档数
+        """
+        return self.collection.count()
+
+    def indexed_documents(self) -> Set[int]:
+        """
+        函数级注释：获取已写入质心的文档ID
+        返回值：Set[int] - 文档ID集合
+        """
+        return {int(doc_id) for doc_id in self.collection.get(include=[])["ids"]}
+
+    def backfill_missing(self, chunk_collection, batch_size: int = 1000) -> int:
+        """
+        函数级注释：补齐缺少质心的文档
+        内部逻辑：分页读取片段元数据得到片段集合中的全部文档ID，与已索引的文档ID比较：
+                 缺少质心的文档按已存储的片段向量写入质心，已无片段的文档删除质心；
+                 不以"索引为空"作为回填条件，索引只覆盖部分文档时同样补齐
+        参数：
+            chunk_collection - 片段集合
+            batch_size - 每页片段数
+        返回值：int - 补齐的文档数
+        """
+        chunk_doc_ids: Set[int] = set()
+        for offset in range(0, chunk_collection.count(), batch_size):
+            batch = chunk_collection.get(limit=batch_size, offset=offset, include=["metadatas"])
+            chunk_doc_ids.update(
+                metadata["doc_id"] for metadata in batch["metadatas"]
+                if metadata and metadata.get("doc_id") is not None
+            )
+
+        indexed = self.indexed_documents()
+        missing = sorted(chunk_doc_ids - indexed)
+        stale = sorted(indexed - chunk_doc_ids)
+
+        for doc_id in missing:
+            self.refresh_document(chunk_collection, doc_id)
+        if stale:
+            self.collection.delete(ids=[str(doc_id) for doc_id in stale])
+
+        if missing or stale:
+            logger.info(f"文档质心索引补齐完成: 新增 {len(missing)} 个文档，移除 {len(stale)} 个失效质心")
+        return len(missing)
+
+    def top_documents(self, query_embedding, n: int) -> List[int]:
+        """
+        函数级注释：按质心相似度选出 top-N 文档
+        参数：
+            query_embedding - 查询向量
+            n - 文档数量
+        返回值：List[int] - 文档ID列表（按相似度降序）
+        """
+        total = self.count()
+        if total == 0:
+            return []
+
+        result = self.collection.query(
+            query_embeddings=[list(query_embedding)],
+            n_results=min(n, total),
+            include=["metadatas"]
+        )
+        return [metadata["doc_id"] for metadata in result["metadatas"][0]]
+
+    def rebuild(self, chunk_collection, batch_size: int = 1000) -> int:
+        """
+        函数级注释：从片段集合回填全部文档质心
+        内部逻辑：分页读取片段向量，按文档累加向量和与片段数，最后批量写入
+        参数：
+            chunk_collection - 片段集合
+            batch_size - 每页片段数
+        返回值：int - 写入的文档数
+        """
+        sums: Dict[int, np.ndarray] = {}
+        counts: Dict[int, int] = {}
+
+        total = chunk_collection.count()
+        for offset in range(0, total, batch_size):
+            batch = chunk_collection.get(
+                limit=batch_size,
+                offset=offset,
+                include=["embeddings", "metadatas"]
+            )
+            for embedding, metadata in zip(batch["embeddings"], batch["metadatas"]):
+                doc_id = (metadata or {}).get("doc_id")
+                if doc_id is None:
+                    continue
+                vector = np.asarray(embedding, dtype=np.float32)
+                if doc_id in sums:
+                    sums[doc_id] += vector
+                    counts[doc_id] += 1
+                else:
+                    sums[doc_id] = vector.copy()
+                    counts[doc_id] = 1
+
+        doc_ids = list(sums.keys())
+        for start in range(0, len(doc_ids), batch_size):
+            page = doc_ids[start:start + batch_size]
+            self.collection.upsert(
+                ids=[str(doc_id) for doc_id in page],
+                embeddings=[(sums[doc_id] / counts[doc_id]).tolist() for doc_id in page],
+                metadatas=[{"doc_id": doc_id, "chunk_count": counts[doc_id]} for doc_id in page]
+            )
+
+        logger.info(f"文档质心索引回填完成: {len(doc_ids)} 个文档，{total} 个片段")
+        return len(doc_ids)
+
+
+def scope_filter(doc_ids: List[int], base_filter: Optional[dict] = None) -> dict:
+    """
+    函数级注释：构造限定文档范围的元数据过滤条件
+    参数：
+        doc_ids - 文档ID列表
+        base_filter - 原有过滤条件
+    返回值：dict - Chroma where 条件
+    """
+    scope = {"doc_id": {"$in": doc_ids}}
+    return {"$and": [base_filter, scope]} if base_filter else scope
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'DocumentCentroidIndex',
+    'scope_filter',
+]
@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：本地交叉编码器重排序模块
+内部逻辑：在 CPU 上加载本地交叉编码器模型，对 (查询, 候选片段) 对打分，用于检索结果重排序
+设计模式：单例模式（按配置缓存模型实例）+ 缓存模式（分数缓存）
+设计原则：单一职责原则、依赖倒置原则（推理后端可替换）
+
+实现说明：
+    - 推理后端：优先使用 ONNX（onnxruntime + tokenizers，需安装 rerank 可选依赖，可直接加载 int8 量化导出），
+      无 ONNX 文件时回退到 sentence-transformers（需安装 local-emb 可选依赖）
+    - 所有 (查询, 片段) 对在一次前向计算中完成，序列长度按配置截断，padding 只补齐到批内最长
+    - 分数按 (查询哈希, 片段ID) 缓存，重复查询只计算未命中的片段
+    - 推理超时返回 None，由调用方保持向量检索顺序
+    - 模型在启动时（或首次请求时）于后台线程加载并预热，加载时间不计入请求的推理超时
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.utils.llm_proxy import LRUCache
+
+# 内部变量：分数缓存过期时间（秒），片段内容变化时片段ID随之变化，这里只做容量兜底
+SCORE_CACHE_TTL_SECONDS = 24 * 3600
+
+# 内部变量：推理后端所需依赖对应的可选依赖分组（pyproject.toml 中的 extras）
+BACKEND_EXTRAS = {"onnx": "rerank", "torch": "local-emb"}
+
+
+class CrossEncoderReranker:
+    """
+    类级注释：本地交叉编码器重排序器
+    职责：
+        1. 后台加载并预热本地模型（ONNX 或 sentence-transformers）
+        2. 批量计算 (查询, 片段) 相关性分数并缓存
+        3. 带超时的异步重排序接口
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        backend: str = "auto",
+        onnx_file: str = "model.onnx",
+        max_length: int = 256,
+        timeout_ms: int = 800,
+        cache_size: int = 10000,
+        num_threads: int = 0
+    ):
+        """
+        函数级注释：初始化重排序器（不立即加载模型）
+        参数：
+            model_path - 本地模型目录
+            backend - 推理后端（auto / onnx / torch）
+            onnx_file - ONNX 模型文件名（相对模型目录）
+            max_length - 最大序列长度
+            timeout_ms - 重排序超时时间（毫秒）
+            cache_size - 分数缓存条目数
+            num_threads - ONNX 推理线程数（0 表示默认）
+        """
+        self.model_path = model_path
+        self.backend = backend
+        self.onnx_file = onnx_file
+        self.max_length = max_length
+        self.timeout = timeout_ms / 1000
+        self.num_threads = num_threads
+
+        # 内部变量：模型加载锁与缓存锁
+        self._load_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        # 内部变量：推理函数（加载后设置）
+        self._predict_fn = None
+        # 内部变量：后台预热任务
+        self._warm_up_task: Optional[asyncio.Task] = None
+        # 内部变量：分数缓存
+        self._cache = LRUCache(max_size=cache_size, ttl_seconds=SCORE_CACHE_TTL_SECONDS)
+
+    def _resolve_backend(self) -> str:
+        """
+        函数级注释：确定实际使用的推理后端
+        返回值：onnx 或 torch
+        """
+        if self.backend != "auto":
+            return self.backend
+        onnx_path = os.path.join(self.model_path, self.onnx_file)
+        return "onnx" if os.path.exists(onnx_path) else "torch"
+
+    def _load_onnx(self):
+        """
+        函数级注释：加载 ONNX 模型与分词器
+        返回值：推理函数 (pairs) -> logits
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        tokenizer = Tokenizer.from_file(os.path.join(self.model_path, "tokenizer.json"))
+        tokenizer.enable_truncation(max_length=self.max_length, strategy="longest_first")
+
+        # 内部逻辑：padding 只补齐到批内最长序列
+        pad_token = next((t for t in ("[PAD]", "<pad>") if tokenizer.token_to_id(t) is not None), None)
+        pad_id = tokenizer.token_to_id(pad_token) if pad_token else 0
+        tokenizer.enable_padding(pad_id=pad_id, pad_token=pad_token or "[PAD]")
+
+        options = ort.SessionOptions()
+        if self.num_threads > 0:
+            options.intra_op_num_threads = self.num_threads
+        session = ort.InferenceSession(
+            os.path.join(self.model_path, self.onnx_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        input_names = {i.name for i in session.get_inputs()}
+
+        def predict(pairs: List[Tuple[str, str]]) -> np.ndarray:
+            encodings = tokenizer.encode_batch(pairs)
+            feeds = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            return session.run(None, {k: v for k, v in feeds.items() if k in input_names})[0]
+
+        return predict
+
+    def _load_torch(self):
+        """
+        函数级注释：使用 sentence-transformers 加载交叉编码器（CPU）
+        返回值：推理函数 (pairs) -> logits
+        """
+        import torch
+        from sentence_transformers import CrossEncoder
+
+        model = CrossEncoder(self.model_path, max_length=self.max_length, device="cpu")
+
+        def predict(pairs: List[Tuple[str, str]]) -> np.ndarray:
+            return model.predict(
+                pairs,
+                batch_size=len(pairs),
+                activation_fct=torch.nn.Identity(),
+                show_progress_bar=False,
+                convert_to_numpy=True
+            )
+
+        return predict
+
+    def _ensure_loaded(self):
+        """
+        函数级注释：懒加载模型（线程安全）
+        返回值：推理函数
+        """
+        if self._predict_fn is None:
+            with self._load_lock:
+                if self._predict_fn is None:
+                    backend = self._resolve_backend()
+                    loader = self._load_onnx if backend == "onnx" else self._load_torch
+                    self._predict_fn = loader()
+                    logger.info(f"交叉编码器重排序模型已加载: {self.model_path}（后端: {backend}）")
+        return self._predict_fn
+
+    @property
+    def is_loaded(self) -> bool:
+        """
+        函数级注释：模型是否已加载
+        """
+        return self._predict_fn is not None
+
+    def warm_up(self) -> None:
+        """
+        函数级注释：加载模型并执行一次推理预热
+        内部逻辑：首次推理会分配推理会话的内存，预热后请求内的推理只包含打分本身
+        """
+        predict = self._ensure_loaded()
+        predict([("预热", "预热")])
+
+    def _warm_up_in_background(self) -> None:
+        """
+        函数级注释：后台预热（失败时只记录日志，重排序保持回退到向量检索顺序）
+        """
+        try:
+            self.warm_up()
+        except ImportError as e:
+            extra = BACKEND_EXTRAS[self._resolve_backend()]
+            logger.error(
+                f"交叉编码器重排序模型加载失败（缺少依赖 {e.name}，请安装 {extra} 可选依赖："
+                f"pip install \"knowledge-agentic[{extra}]\"），将使用向量检索顺序"
+            )
+        except Exception as e:
+            logger.error(f"交叉编码器重排序模型加载失败，将使用向量检索顺序: {str(e)}")
+
+    def start_warm_up(self) -> asyncio.Task:
+        """
+        函数级注释：在线程池中后台加载并预热模型
+        内部逻辑：同一实例只启动一次预热任务，重复调用返回同一任务
+        返回值：asyncio.Task - 预热任务
+        """
+        if self._warm_up_task is None:
+            self._warm_up_task = asyncio.create_task(asyncio.to_thread(self._warm_up_in_background))
+        return self._warm_up_task
+
+    @staticmethod
+    def _to_scores(logits: np.ndarray) -> np.ndarray:
+        """
+        函数级注释：将模型输出转换为 0-1 相关性分数
+        内部逻辑：单输出取 sigmoid；二分类输出取正类概率
+        参数：
+            logits - 模型原始输出
+        返回值：np.ndarray - 相关性分数
+        """
+        logits = np.asarray(logits, dtype=np.float32)
+        if logits.ndim == 2 and logits.shape[1] == 2:
+            logits = logits[:, 1] - logits[:, 0]
+        else:
+            logits = logits.reshape(-1)
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    def score(self, query: str, candidates: Sequence[Tuple[str, str]]) -> List[float]:
+        """
+        函数级注释：计算查询与候选片段的相关性分数
+        内部逻辑：先查缓存，未命中的片段在一次前向计算中批量打分后写入缓存
+        参数：
+            query - 查询文本
+            candidates - (片段ID, 片段文本) 列表
+        返回值：List[float] - 与 candidates 顺序一致的分数
+        """
+        query_hash = hashlib.sha1(query.encode("utf-8")).hexdigest()
+        keys = [f"{query_hash}:{chunk_id}" for chunk_id, _ in candidates]
+
+        with self._cache_lock:
+            scores = [self._cache.get(key) for key in keys]
+
+        missing = [i for i, value in enumerate(scores) if value is None]
+        if missing:
+            predict = self._ensure_loaded()
+            logits = predict([(query, candidates[i][1]) for i in missing])
+            fresh = self._to_scores(logits)
+
+            with self._cache_lock:
+                for i, value in zip(missing, fresh):
+                    scores[i] = float(value)
+                    self._cache.put(keys[i], scores[i])
+
+        logger.debug(f"交叉编码器打分完成: {len(candidates)} 个片段，缓存命中 {len(candidates) - len(missing)} 个")
+        return scores
+
+    async def rerank(self, query: str, candidates: Sequence[Tuple[str, str]]) -> Optional[List[float]]:
+        """
+        函数级注释：带超时的异步打分
+        内部逻辑：在线程池中执行推理，超时或失败时返回 None（调用方保持向量检索顺序）；
+                 模型尚未加载时启动后台预热并直接返回 None，超时只约束推理本身
+        参数：
+            query - 查询文本
+            candidates - (片段ID, 片段文本) 列表
+        返回值：Optional[List[float]] - 分数列表，超时或失败时为 None
+        """
+        if not candidates:
+            return []
+
+        # Guard Clause：模型未就绪时不在请求内加载，避免请求超时与工作线程堆积在加载锁上
+        if not self.is_loaded:
+            self.start_warm_up()
+            logger.debug("交叉编码器重排序模型加载中，使用向量检索顺序")
+            return None
+
+        try:
+            return await asyncio.wait_for(
+                asyncio.to_thread(self.score, query, list(candidates)),
+                timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"交叉编码器重排序超时（{self.timeout * 1000:.0f}ms），使用向量检索顺序")
+        except Exception as e:
+            logger.warning(f"交叉编码器重排序失败，使用向量检索顺序: {str(e)}")
+        return None
+
+    def cache_size(self) -> int:
+        """
+        函数级注释：获取当前缓存条目数
+        返回值：缓存条目数
+        """
+        return self._cache.size()
+
+
+# 内部变量：按配置缓存的重排序器实例
+_reranker_instance: Optional[CrossEncoderReranker] = None
+_reranker_config: Optional[tuple] = None
+
+
+def get_cross_encoder_reranker() -> Optional[CrossEncoderReranker]:
+    """
+    函数级注释：获取全局交叉编码器重排序器
+    内部逻辑：未配置模型目录或目录不存在时返回 None；配置变化时重建实例
+    返回值：Optional[CrossEncoderReranker] - 重排序器实例
+    """
+    global _reranker_instance, _reranker_config
+    from app.core.config import settings
+
+    model_path = settings.RERANKER_MODEL_PATH
+    if not model_path or not os.path.isdir(model_path):
+        return None
+
+    config = (
+        model_path,
+        settings.RERANKER_BACKEND,
+        settings.RERANKER_ONNX_FILE,
+        settings.RERANKER_MAX_LENGTH,
+        settings.RERANKER_TIMEOUT_MS,
+        settings.RERANKER_CACHE_SIZE,
+        settings.RERANKER_NUM_THREADS,
+    )
+    if _reranker_instance is None or _reranker_config != config:
+        _reranker_instance = CrossEncoderReranker(*config)
+        _reranker_config = config
+    return _reranker_instance
+
+
+def warm_up_cross_encoder_reranker() -> Optional[asyncio.Task]:
+    """
+    函数级注释：启用重排序时在后台预热全局交叉编码器（应用启动时调用）
+    返回值：Optional[asyncio.Task] - 预热任务，未启用或未配置模型时为 None
+    """
+    from app.core.config import settings
+
+    if not settings.ENABLE_RERANKING:
+        return None
+    reranker = get_cross_encoder_reranker()
+    if reranker is None:
+        return None
+    logger.info(f"开始后台加载交叉编码器重排序模型: {reranker.model_path}")
+    return reranker.start_warm_up()
+
+
+def reset_cross_encoder_reranker() -> None:
+    """
+    函数级注释：清除全局重排序器实例（配置更新或测试时使用）
+    """
+    global _reranker_instance, _reranker_config
+    _reranker_instance = None
+    _reranker_config = None
+
+
+def quantize_onnx_model(model_path: str, source_file: str = "model.onnx", output_file: str = "model_int8.onnx") -> str:
+    """
+    函数级注释：将 ONNX 模型动态量化为 int8
+    内部逻辑：使用 onnxruntime 动态量化（权重 int8），生成的文件可通过 RERANKER_ONNX_FILE 指定
+    参数：
+        model_path - 模型目录
+        source_file - 源 ONNX 文件名
+        output_file - 量化后的文件名
+    返回值：str - 量化后的文件路径
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    output_path = os.path.join(model_path, output_file)
+    quantize_dynamic(os.path.join(model_path, source_file), output_path, weight_type=QuantType.QInt8)
+    logger.info(f"ONNX 模型已量化为 int8: {output_path}")
+    return output_path
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'CrossEncoderReranker',
+    'get_cross_encoder_reranker',
+    'warm_up_cross_encoder_reranker',
+    'reset_cross_encoder_reranker',
+    'quantize_onnx_model',
+]
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：HNSW 索引参数管理模块
+内部逻辑：将配置中的 HNSW 参数应用到 Chroma 集合创建过程，并为已有集合提供安全的重建迁移
+设计模式：值对象模式（HNSWParams）
+设计原则：单一职责原则
+
+实现说明：
+    - Chroma 在集合创建时把 hnsw:* 元数据固化到向量段，之后修改集合元数据不会改变已建索引
+    - 因此已有集合的参数不一致时只记录告警，不会静默覆盖元数据；需要通过重建迁移生效
+    - 重建迁移先把数据完整复制到新集合，再交换名称，原集合保留为备份
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+# 内部变量：Chroma 内置的 HNSW 默认参数（集合未设置 hnsw:* 元数据时生效）
+CHROMA_DEFAULT_SPACE = "l2"
+CHROMA_DEFAULT_M = 16
+CHROMA_DEFAULT_CONSTRUCTION_EF = 100
+CHROMA_DEFAULT_SEARCH_EF = 10
+
+
+@dataclass(frozen=True)
+class HNSWParams:
+    """
+    类级注释：HNSW 索引参数
+    职责：在配置、Chroma 集合元数据之间转换 HNSW 参数
+    """
+    space: str = CHROMA_DEFAULT_SPACE  # 距离度量：l2 / cosine / ip
+    M: int = CHROMA_DEFAULT_M  # 每个节点的最大连接数
+    construction_ef: int = CHROMA_DEFAULT_CONSTRUCTION_EF  # 建索引候选队列大小
+    search_ef: int = CHROMA_DEFAULT_SEARCH_EF  # 查询候选队列大小
+
+    @classmethod
+    def from_settings(cls) -> 'HNSWParams':
+        """
+        函数级注释：从全局配置读取 HNSW 参数
+        返回值：HNSWParams - 配置中的参数
+        """
+        from app.core.config import settings
+
+        return cls(
+            space=settings.CHROMA_HNSW_SPACE,
+            M=settings.CHROMA_HNSW_M,
+            construction_ef=settings.CHROMA_HNSW_CONSTRUCTION_EF,
+            search_ef=settings.CHROMA_HNSW_SEARCH_EF
+        )
+
+    @classmethod
+    def from_metadata(cls, metadata: Optional[Dict[str, Any]]) -> 'HNSWParams':
+        """
+        函数级注释：从 Chroma 集合元数据解析 HNSW 参数
+        内部逻辑：未设置的参数回退到 Chroma 内置默认值
+        参数：
+            metadata - 集合元数据
+        返回值：HNSWParams - 集合实际使用的参数
+        """
+        metadata = metadata or {}
+        return cls(
+            space=str(metadata.get("hnsw:space", CHROMA_DEFAULT_SPACE)),
+            M=int(metadata.get("hnsw:M", CHROMA_DEFAULT_M)),
+            construction_ef=int(metadata.get("hnsw:construction_ef", CHROMA_DEFAULT_CONSTRUCTION_EF)),
+            search_ef=int(metadata.get("hnsw:search_ef", CHROMA_DEFAULT_SEARCH_EF))
+        )
+
+    def to_metadata(self) -> Dict[str, Any]:
+        """
+        函数级注释：转换为 Chroma 集合元数据
+        返回值：Dict[str, Any] - hnsw:* 元数据
+        """
+        return {
+            "hnsw:space": self.space,
+            "hnsw:M": self.M,
+            "hnsw:construction_ef": self.construction_ef,
+            "hnsw:search_ef": self.search_ef,
+        }
+
+    def diff(self, other: 'HNSWParams') -> Dict[str, tuple]:
+        """
+        函数级注释：对比两组参数
+        参数：
+            other - 目标参数
+        返回值：Dict[str, tuple] - 不一致的参数 {名称: (当前值, 目标值)}
+        """
+        return {
+            name: (getattr(self, name), getattr(other, name))
+            for name in ("space", "M", "construction_ef", "search_ef")
+            if getattr(self, name) != getattr(other, name)
+        }
+
+
+def cosine_to_relevance(similarity: float, space: str = CHROMA_DEFAULT_SPACE) -> float:
+    """
+    函数级注释：将余弦相似度换算为与 Chroma 检索一致的相关度评分（1 - 距离）
+    内部逻辑：按单位向量换算；Chroma 的 l2 为平方欧氏距离（2 - 2·cos），cosine 与 ip 距离为 1 - cos
+    参数：
+        similarity - 余弦相似度
+        space - 集合的距离度量
+    返回值：float - 与 VectorRetriever.attach_scores 同一尺度的评分
+    """
+    if space == "l2":
+        return 2.0 * similarity - 1.0
+    return similarity
+
+
+def get_chroma_client(client=None):
+    """
+    函数级注释：获取 Chroma 客户端
+    参数：
+        client - 外部传入的客户端（None 时按配置创建持久化客户端）
+    返回值：Chroma 客户端
+    """
+    if client is not None:
+        return client
+
+    import chromadb
+    from app.core.config import settings
+
+    # 内部逻辑：与 LangChain Chroma 使用相同的客户端配置，复用同一个共享系统实例
+    client_settings = chromadb.config.Settings(is_persistent=True)
+    client_settings.persist_directory = settings.CHROMA_DB_PATH
+    return chromadb.Client(client_settings)
+
+
+def find_collection(client, name: str):
+    """
+    函数级注释：按名称查找集合
+    参数：
+        client - Chroma 客户端
+        name - 集合名称
+    返回值：集合实例，不存在时返回 None
+    """
+    for collection in client.list_collections():
+        if collection.name == name:
+            return collection
+    return None
+
+
+def ensure_collection(
+    client=None,
+    name: Optional[str] = None,
+    params: Optional[HNSWParams] = None
+) -> Dict[str, Any]:
+    """
+    函数级注释：确保向量集合按配置的 HNSW 参数创建
+    内部逻辑：
+        1. 集合不存在 -> 使用配置参数创建
+        2. 集合已存在且参数一致 -> 无操作
+        3. 集合已存在且参数不一致 -> 仅告警，不修改元数据（已建索引不会随元数据变化）
+    参数：
+        client - Chroma 客户端（None 时按配置创建）
+        name - 集合名称（None 时使用配置）
+        params - 目标参数（None 时使用配置）
+    返回值：Dict[str, Any] - 检查结果 {created, params, mismatched}
+    """
+    from app.core.config import settings
+
+    client = get_chroma_client(client)
+    name = name or settings.CHROMA_COLLECTION_NAME
+    params = params or HNSWParams.from_settings()
+
+    collection = find_collection(client, name)
+    if collection is None:
+        client.create_collection(name=name, metadata=params.to_metadata())
+        logger.info(f"向量集合已创建: {name}, HNSW参数: {params}")
+        return {"created": True, "params": params, "mismatched": {}}
+
+    current = HNSWParams.from_metadata(collection.metadata)
+    mismatched = current.diff(params)
+    if mismatched:
+        logger.warning(
+            f"向量集合 {name} 的HNSW参数与配置不一致: {mismatched}，"
+            f"已建索引继续使用当前参数。如需生效请执行重建迁移: python migrate_chroma_hnsw.py --apply"
+        )
+    return {"created": False, "params": current, "mismatched": mismatched}
+
+
+def rebuild_collection(
+    client=None,
+    name: Optional[str] = None,
+    params: Optional[HNSWParams] = None,
+    batch_size: int = 500
+) -> Dict[str, Any]:
+    """
+    函数级注释：使用新的 HNSW 参数重建已有集合
+    内部逻辑：
+        1. 创建临时集合并按批复制 id、向量、文本、元数据（不重新调用嵌入模型）
+        2. 校验条目数一致后，将原集合改名为备份，再将临时集合改名为正式名称
+        3. 任一步骤失败时删除临时集合，原集合保持不变
+    参数：
+        client - Chroma 客户端（None 时按配置创建）
+        name - 集合名称（None 时使用配置）
+        params - 目标参数（None 时使用配置）
+        batch_size - 每批复制的条目数
+    返回值：Dict[str, Any] - 迁移结果 {count, backup_name, params}
+    """
+    from app.core.config import settings
+
+    client = get_chroma_client(client)
+    name = name or settings.CHROMA_COLLECTION_NAME
+    params = params or HNSWParams.from_settings()
+
+    source = find_collection(client, name)
+    if source is None:
+        raise ValueError(f"向量集合不存在: {name}")
+
+    # 内部变量：临时集合与备份集合名称（集合名称最长 63 个字符）
+    suffix = datetime.now().strftime("%Y%m%d%H%M%S")
+    temp_name = f"{name[:40]}_rebuild_{suffix}"
+    backup_name = f"{name[:40]}_backup_{suffix}"
+
+    target = client.create_collection(name=temp_name, metadata=params.to_metadata())
+    try:
+        total = source.count()
+        for offset in range(0, total, batch_size):
+            batch = source.get(
+                limit=batch_size,
+                offset=offset,
+                include=["embeddings", "documents", "metadatas"]
+            )
+            if not batch["ids"]:
+                break
+            target.add(
+                ids=batch["ids"],
+                embeddings=batch["embeddings"],
+                documents=batch["documents"],
+                metadatas=batch["metadatas"]
+            )
+
+        if target.count() != total:
+            raise RuntimeError(f"重建后条目数不一致: 原集合 {total}，新集合 {target.count()}")
+    except Exception:
+        client.delete_collection(temp_name)
+        raise
+
+    # 内部逻辑：交换名称，原集合保留为备份
+    source.modify(name=backup_name)
+    target.modify(name=name)
+    logger.info(f"向量集合 {name} 重建完成: {total} 条，HNSW参数: {params}，原集合备份为 {backup_name}")
+
+    return {"count": total, "backup_name": backup_name, "params": params}
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'HNSWParams',
+    'cosine_to_relevance',
+    'get_chroma_client',
+    'find_collection',
+    'ensure_collection',
+    'rebuild_collection',
+]
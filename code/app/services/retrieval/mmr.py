@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：最大边际相关性（MMR）多样化模块
+内部逻辑：基于候选向量预先计算相似度矩阵，使用 NumPy 向量化完成 MMR 贪心选择
+设计模式：策略模式（作为可选的检索后处理阶段）
+设计原则：单一职责原则
+
+实现说明：
+    - 候选向量直接复用向量库中已存储的 embedding，不产生额外的向量化调用
+    - 相似度矩阵一次性计算，每轮选择只做 O(n) 的向量运算，避免逐对 Python 循环
+    - 50 个候选片段的选择耗时在亚毫秒级
+"""
+
+from dataclasses import dataclass
+from itertools import chain
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+@dataclass
+class MMROptions:
+    """
+    类级注释：MMR 检索选项
+    职责：封装单次检索的 MMR 参数，支持请求级覆盖全局配置
+    """
+    enabled: bool = False  # 是否启用 MMR 多样化
+    lambda_mult: float = 0.5  # 相关性/多样性权衡系数
+    fetch_k: int = 20  # 候选集大小
+
+    @classmethod
+    def resolve(
+        cls,
+        use_mmr: Optional[bool] = None,
+        mmr_lambda: Optional[float] = None,
+        fetch_k: Optional[int] = None
+    ) -> 'MMROptions':
+        """
+        函数级注释：合并请求参数与全局配置
+        内部逻辑：请求参数为 None 时回退到 settings 中的默认值
+        参数：
+            use_mmr - 请求指定的是否启用（None 表示使用全局配置）
+            mmr_lambda - 请求指定的权衡系数（None 表示使用全局配置）
+            fetch_k - 请求指定的候选集大小（None 表示使用全局配置）
+        返回值：MMROptions - 合并后的选项
+        """
+        from app.core.config import settings
+
+        return cls(
+            enabled=settings.ENABLE_MMR if use_mmr is None else use_mmr,
+            lambda_mult=settings.MMR_LAMBDA if mmr_lambda is None else mmr_lambda,
+            fetch_k=settings.MMR_FETCH_K if fetch_k is None else fetch_k
+        )
+
+
+def _as_matrix(embeddings: Sequence[Sequence[float]]) -> np.ndarray:
+    """
+    函数级注释：将候选向量转换为 float32 矩阵
+    内部逻辑：Chroma 返回的是 Python 嵌套列表，使用 fromiter 展平转换比逐行构造更快
+    参数：
+        embeddings - 候选向量（ndarray 或嵌套列表）
+    返回值：二维 float32 矩阵
+    """
+    if isinstance(embeddings, np.ndarray) or len(embeddings) == 0:
+        return np.asarray(embeddings, dtype=np.float32)
+
+    rows = len(embeddings)
+    dim = len(embeddings[0])
+    flat = np.fromiter(chain.from_iterable(embeddings), dtype=np.float32, count=rows * dim)
+    return flat.reshape(rows, dim)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    函数级注释：按行做 L2 归一化
+    内部逻辑：零向量保持为零，避免除零
+    参数：
+        matrix - 二维向量矩阵
+    返回值：归一化后的矩阵
+    """
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def maximal_marginal_relevance(
+    query_embedding: Sequence[float],
+    embeddings: Sequence[Sequence[float]],
+    k: int = 4,
+    lambda_mult: float = 0.5
+) -> List[int]:
+    """
+    函数级注释：执行 MMR 选择
+    内部逻辑：
+        1. 归一化候选向量与查询向量，计算查询相似度向量和候选相似度矩阵
+        2. 维护"与已选集合的最大相似度"向量，每轮用 np.maximum 增量更新
+        3. 每轮得分 = λ * 查询相似度 - (1-λ) * 最大冗余度，取 argmax
+    参数：
+        query_embedding - 查询向量
+        embeddings - 候选向量列表（顺序与候选片段一致）
+        k - 需要选出的数量
+        lambda_mult - 权衡系数（1=只看相关性，0=只看多样性）
+    返回值：List[int] - 按选择顺序排列的候选下标
+    """
+    candidates = _as_matrix(embeddings)
+
+    # Guard Clauses：无候选或无需选择
+    if k <= 0 or candidates.ndim != 2 or candidates.shape[0] == 0:
+        return []
+
+    query = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+
+    # 内部逻辑：余弦相似度 = 归一化后的点积
+    unit_candidates = _normalize_rows(candidates)
+    query_similarity = (unit_candidates @ _normalize_rows(query).T).ravel()
+    similarity_matrix = unit_candidates @ unit_candidates.T
+
+    # 内部变量：候选数量与实际选择数量
+    count = candidates.shape[0]
+    k = min(k, count)
+
+    # 内部逻辑：第一个结果总是与查询最相关的候选
+    first = int(np.argmax(query_similarity))
+    selected = [first]
+    available = np.ones(count, dtype=bool)
+    available[first] = False
+    max_redundancy = similarity_matrix[first].copy()
+
+    # 内部逻辑：贪心选择，每轮为向量化的 O(n) 计算
+    while len(selected) < k:
+        scores = lambda_mult * query_similarity - (1.0 - lambda_mult) * max_redundancy
+        scores[~available] = -np.inf
+        chosen = int(np.argmax(scores))
+        selected.append(chosen)
+        available[chosen] = False
+        np.maximum(max_redundancy, similarity_matrix[chosen], out=max_redundancy)
+
+    return selected
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'MMROptions',
+    'maximal_marginal_relevance',
+]
@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：多查询检索模块
+内部逻辑：将问题扩展为多个查询变体（规则改写、大模型改写或结合对话上下文），
+         所有变体一次批量向量化，并发执行向量检索，再以倒数排名融合（RRF）合并结果
+设计模式：策略模式（变体生成方式）+ 外观模式（对检索调用方提供与单查询检索相同的接口）
+设计原则：单一职责原则、开闭原则
+
+实现说明：
+    - 原问题始终作为第一个变体，其检索结果是融合的基线，不受延迟预算限制
+    - 变体只额外产生一次批量向量化调用（embed_documents），不逐个调用 embed_query
+    - 延迟预算从检索开始计时（含变体生成），超时未完成的变体检索直接丢弃
+    - 大模型改写失败或超时时回退到规则改写，变体不足时以规则改写补齐
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+from loguru import logger
+
+from app.core.config import settings
+from app.services.retrieval.mmr import MMROptions
+from app.services.retrieval.vector_retriever import VectorRetriever
+from app.services.retrieval.working_set import get_working_sets
+
+# 内部变量：问题开头的客套用语
+_POLITE_PREFIX = re.compile(r"^(请问一下|请问|麻烦问一下|麻烦|我想知道|想问一下|想了解一下|请|能否|可以)")
+# 内部变量：中文疑问词与语气词
+_CJK_QUESTION_WORDS = re.compile(r"(什么是|是什么|有哪些|是哪些|怎么样|怎么|怎样|如何|为什么|为何|哪些|哪个|多少|吗|呢|吧)")
+# 内部变量：英文疑问词与虚词
+_EN_QUESTION_WORDS = re.compile(
+    r"\b(what|how|why|which|who|when|where|is|are|was|were|does|do|did|can|could|should|please|tell me|the|a|an)\b",
+    re.IGNORECASE
+)
+# 内部变量：标点与空白
+_PUNCTUATION = re.compile(r"[？?！!。.,，、；;：:\"'“”‘’（）()\s]+")
+# 内部变量：复合问题的分句边界
+_CLAUSE_BOUNDARY = re.compile(r"[，,；;？?]|\band\b", re.IGNORECASE)
+# 内部变量：大模型输出行首的编号与列表符号
+_LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.、)）]|[（(]\d+[)）])\s*")
+
+# 内部变量：大模型改写提示词
+LLM_EXPANSION_PROMPT = """请将下面的用户问题改写为 {n} 个不同表述的检索查询，用于在知识库中检索相关资料。
+要求：保持原意，可以补充同义词或展开缩写，每行一个查询，不要编号，不要输出其他内容。
+
+用户问题: {question}
+
+检索查询:"""
+
+
+@dataclass
+class MultiQueryOptions:
+    """
+    类级注释：多查询检索选项
+    职责：封装单次请求的多查询参数，支持请求级覆盖全局配置
+    """
+    enabled: bool = False  # 是否启用多查询检索
+    mode: str = "rule"  # 变体生成方式：rule / llm / history
+    num_variants: int = 3  # 除原问题外最多生成的变体数
+    budget_ms: int = 1500  # 延迟预算（毫秒，含变体生成）
+    rrf_k: int = 60  # 倒数排名融合平滑常数
+
+    @classmethod
+    def resolve(cls, multi_query: Optional[bool] = None) -> 'MultiQueryOptions':
+        """
+        函数级注释：合并请求参数与全局配置
+        参数：
+            multi_query - 请求指定的是否启用（None 表示使用全局配置）
+        返回值：MultiQueryOptions - 合并后的选项
+        """
+        from app.core.config import settings
+
+        return cls(
+            enabled=settings.ENABLE_MULTI_QUERY if multi_query is None else multi_query,
+            mode=settings.MULTI_QUERY_MODE,
+            num_variants=settings.MULTI_QUERY_VARIANTS,
+            budget_ms=settings.MULTI_QUERY_BUDGET_MS,
+            rrf_k=settings.MULTI_QUERY_RRF_K
+        )
+
+
+def _keywords(text: str) -> str:
+    """
+    函数级注释：去除客套用语、疑问词与标点，得到关键词形式的查询
+    """
+    text = _POLITE_PREFIX.sub("", text.strip())
+    text = _CJK_QUESTION_WORDS.sub("", text)
+    text = _EN_QUESTION_WORDS.sub(" ", text)
+    return _PUNCTUATION.sub(" ", text).strip()
+
+
+def rule_variants(question: str) -> List[str]:
+    """
+    函数级注释：按规则改写问题
+    内部逻辑：
+        1. 关键词形式：去除客套用语、疑问词与标点
+        2. 复合问题按分句拆分为子问题，每个子问题取关键词形式
+    参数：
+        question - 用户问题
+    返回值：List[str] - 查询变体（可能包含与原问题相同的项，由调用方去重）
+    """
+    variants = [_keywords(question)]
+    clauses = [_keywords(clause) for clause in _CLAUSE_BOUNDARY.split(question)]
+    clauses = [clause for clause in clauses if len(clause) >= 2]
+    if len(clauses) > 1:
+        variants.extend(clauses)
+    return [variant for variant in variants if variant]
+
+
+def history_variants(question: str, history: Sequence[str]) -> List[str]:
+    """
+    函数级注释：结合对话上下文改写问题
+    内部逻辑：追问通常省略了主语（如“那它的有效期呢”），将最近的用户问题与当前问题拼接，越近的越靠前
+    参数：
+        question - 用户问题
+        history - 之前的用户问题（按时间顺序）
+    返回值：List[str] - 查询变体
+    """
+    keywords = _keywords(question) or question
+    return [f"{_keywords(previous) or previous} {keywords}" for previous in reversed(history) if previous.strip()]
+
+
+def _dedupe(variants: Sequence[str]) -> List[str]:
+    """
+    函数级注释：按规范化后的文本去重，保持顺序
+    """
+    seen = set()
+    unique = []
+    for variant in variants:
+        key = _PUNCTUATION.sub(" ", variant).strip().lower()
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(variant.strip())
+    return unique
+
+
+class QueryExpander:
+    """
+    类级注释：查询变体生成器
+    设计模式：策略模式
+    职责：按配置的生成方式将问题扩展为查询变体，原问题始终位于第一个
+    """
+
+    def __init__(self, llm=None):
+        """
+        函数级注释：初始化变体生成器
+        参数：
+            llm - 大模型实例（llm 生成方式使用，为空时回退到规则改写）
+        """
+        # 内部变量：大模型
+        self.llm = llm
+
+    async def expand(
+        self,
+        question: str,
+        options: MultiQueryOptions,
+        history: Sequence[str] = (),
+        timeout: Optional[float] = None
+    ) -> List[str]:
+        """
+        函数级注释：生成查询变体
+        参数：
+            question - 用户问题
+            options - 多查询选项
+            history - 之前的用户问题（按时间顺序）
+            timeout - 大模型改写的超时时间（秒）
+        返回值：List[str] - 原问题与去重后的变体，最多 num_variants + 1 个
+        """
+        variants: List[str] = []
+        if options.mode == "llm":
+            variants = await self._llm_variants(question, options.num_variants, timeout)
+        elif options.mode == "history":
+            variants = history_variants(question, history)
+
+        # 内部逻辑：规则改写兜底并补齐变体数
+        variants = _dedupe([question, *variants, *rule_variants(question)])
+        return variants[:options.num_variants + 1]
+
+    async def _llm_variants(self, question: str, n: int, timeout: Optional[float]) -> List[str]:
+        """
+        函数级注释：使用大模型改写问题
+        内部逻辑：失败或超时返回空列表，由规则改写兜底
+        参数：
+            question - 用户问题
+            n - 变体数
+            timeout - 超时时间（秒）
+        返回值：List[str] - 查询变体
+        """
+        # Guard Clause：未提供大模型
+        if self.llm is None:
+            return []
+
+        try:
+            response = await asyncio.wait_for(
+                self.llm.ainvoke(LLM_EXPANSION_PROMPT.format(n=n, question=question)),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"大模型改写查询超时，回退到规则改写: {timeout:.3f}s")
+            return []
+        except Exception as e:
+            logger.warning(f"大模型改写查询失败，回退到规则改写: {str(e)}")
+            return []
+
+        text = getattr(response, "content", response)
+        lines = (_LIST_MARKER.sub("", line).strip() for line in str(text).splitlines())
+        return [line for line in lines if line][:n]
+
+
+def reciprocal_rank_fusion(
+    result_lists: Sequence[Sequence[Tuple[Document, float]]],
+    rrf_k: int = 60
+) -> List[Tuple[Document, float]]:
+    """
+    函数级注释：以倒数排名融合（RRF）合并多个检索结果
+    内部逻辑：片段得分 = Σ 1 / (rrf_k + 排名)，按片段ID（缺失时按内容）去重；
+             每个片段保留各查询中最小的距离，得分相同时按距离排序
+    参数：
+        result_lists - 各查询的 (文档, 距离) 列表（按相关度排序）
+        rrf_k - 平滑常数
+    返回值：List[Tuple[Document, float]] - 按融合得分排序的 (文档, 距离) 列表
+    """
+    scores: Dict[str, float] = {}
+    best: Dict[str, Tuple[Document, float]] = {}
+    for results in result_lists:
+        for rank, (doc, distance) in enumerate(results, start=1):
+            key = (doc.metadata or {}).get("chunk_id") or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            if key not in best or distance < best[key][1]:
+                best[key] = (doc, float(distance))
+
+    order = sorted(scores, key=lambda key: (-scores[key], best[key][1]))
+    return [best[key] for key in order]
+
+
+class MultiQueryRetriever:
+    """
+    类级注释：多查询检索器
+    设计模式：外观模式
+    职责：
+        1. 未启用多查询时直接执行单查询检索（会话内的追问优先在会话检索工作集中打分）
+        2. 启用时生成查询变体，一次批量向量化，在延迟预算内并发检索，融合后返回前 k 个片段
+    """
+
+    def __init__(self, vector_db, llm=None, two_stage: Optional[bool] = None):
+        """
+        函数级注释：初始化多查询检索器
+        参数：
+            vector_db - LangChain Chroma 向量库实例
+            llm - 大模型实例（llm 生成方式使用）
+            two_stage - 是否启用两阶段检索（None 表示使用全局配置）
+        """
+        # 内部变量：单查询检索器（每个变体的检索复用两阶段与 MMR 逻辑）
+        self.retriever = VectorRetriever(vector_db, two_stage)
+        # 内部变量：查询变体生成器
+        self.expander = QueryExpander(llm)
+
+    async def asearch(
+        self,
+        question: str,
+        k: int = 3,
+        options: Optional[MultiQueryOptions] = None,
+        history: Sequence[str] = (),
+        mmr_options: Optional[MMROptions] = None,
+        filter: Optional[Dict] = None,
+        conversation_id: Optional[int] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Document]:
+        """
+        函数级注释：异步执行多查询检索
+        内部逻辑：生成变体 -> 一次批量向量化 -> 线程池并发检索 -> 丢弃超出预算的变体 -> RRF 融合；
+                 未启用多查询时走单查询检索，会话内的对话（无过滤条件）优先使用会话检索工作集
+        参数：
+            question - 用户问题
+            k - 返回结果数量（每个变体同样检索 k 个片段）
+            options - 多查询选项（None 或未启用时走单查询检索）
+            history - 之前的用户问题（history 生成方式使用）
+            mmr_options - MMR 选项（作用于每个变体的检索）
+            filter - 元数据过滤条件
+            conversation_id - 所属会话ID（单查询检索时使用会话检索工作集）
+            query_embedding - 已计算的原问题向量（可选，如语义答案缓存查找时的向量，避免重复向量化）
+        返回值：List[Document] - 文档列表（元数据包含 score 与 chunk_id）
+        """
+        if options is None or not options.enabled:
+            if conversation_id is not None and filter is None and settings.ENABLE_CONVERSATION_CACHE:
+                return await get_working_sets().asearch(
+                    self.retriever, conversation_id, question, k, mmr_options, query_embedding
+                )
+            return await self.retriever.asearch(question, k, mmr_options, filter, query_embedding)
+
+        started = time.perf_counter()
+        deadline = started + options.budget_ms / 1000
+
+        variants = await self.expander.expand(question, options, history, timeout=deadline - time.perf_counter())
+        # 内部逻辑：原问题已有向量时只批量向量化其余变体
+        if query_embedding is None:
+            embeddings = await asyncio.to_thread(self.retriever.vector_db.embeddings.embed_documents, variants)
+        else:
+            embeddings = [query_embedding]
+            if len(variants) > 1:
+                embeddings += await asyncio.to_thread(
+                    self.retriever.vector_db.embeddings.embed_documents, variants[1:]
+                )
+
+        tasks = [
+            asyncio.create_task(asyncio.to_thread(
+                self.retriever.search_by_vector_with_scores, embedding, k, mmr_options, filter
+            ))
+            for embedding in embeddings
+        ]
+        await asyncio.wait(tasks, timeout=max(deadline - time.perf_counter(), 0))
+
+        # 内部逻辑：原问题的检索结果是基线，超出预算也等待完成
+        try:
+            result_lists = [await tasks[0]]
+        except Exception:
+            for task in tasks[1:]:
+                task.cancel()
+            raise
+
+        dropped = 0
+        for variant, task in zip(variants[1:], tasks[1:]):
+            if not task.done():
+                task.cancel()
+                dropped += 1
+            elif task.exception() is not None:
+                logger.warning(f"查询变体检索失败，已忽略: {variant} - {str(task.exception())}")
+                dropped += 1
+            else:
+                result_lists.append(task.result())
+
+        fused = reciprocal_rank_fusion(result_lists, options.rrf_k)[:k]
+        logger.debug(
+            f"多查询检索完成: {len(variants)} 个查询，丢弃 {dropped} 个，"
+            f"融合后 {len(fused)} 个片段，耗时 {(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+        return VectorRetriever.attach_scores(fused)
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'MultiQueryOptions',
+    'QueryExpander',
+    'MultiQueryRetriever',
+    'reciprocal_rank_fusion',
+    'rule_variants',
+    'history_variants',
+]
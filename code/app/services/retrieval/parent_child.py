@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：父子片段模块
+内部逻辑：入库时先将文档切分为较大的父片段，再将每个父片段切分为较小的子片段；
+         只有子片段写入向量库（向量更精确），父片段存储在关系数据库中；
+         检索命中子片段后按 parent_id 回查父片段，去重后作为参考资料（上下文更完整）
+设计模式：组合模式（父片段包含子片段）
+设计原则：单一职责原则
+
+实现说明：
+    - 子片段的片段ID沿用 "{doc_id}_{序号}" 格式，与向量库ID、向量映射一致，删除与修复流程无需区分入库模式
+    - 父片段ID为 "{doc_id}_p{序号}"，随文档级联删除，不写入向量库
+    - 是否回查父片段由检索结果的元数据决定（子片段带有 parent_id），与当前入库配置无关，
+      切换配置后已入库的文档仍按入库时的模式检索
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.models import ParentChunk
+
+
+def split_parent_child(
+    docs: Sequence[Document],
+    doc_id: int,
+    parent_size: int,
+    child_size: int,
+    child_overlap: int
+) -> Tuple[List[Document], List[ParentChunk]]:
+    """
+    函数级注释：将文档切分为父片段与子片段
+    参数：
+        docs - 加载器输出的文档
+        doc_id - 文档ID
+        parent_size - 父片段长度（字符数）
+        child_size - 子片段长度（字符数）
+        child_overlap - 相邻子片段重叠长度（字符数）
+    返回值：Tuple[List[Document], List[ParentChunk]] - (写入向量库的子片段, 待持久化的父片段)
+    """
+    parent_splitter = RecursiveCharacterTextSplitter(chunk_size=parent_size, chunk_overlap=0)
+    # 内部逻辑：重叠长度不能超过子片段长度
+    child_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=child_size,
+        chunk_overlap=min(child_overlap, child_size - 1)
+    )
+
+    children: List[Document] = []
+    parents: List[ParentChunk] = []
+    for position, parent in enumerate(parent_splitter.split_documents(list(docs))):
+        parent_id = f"{doc_id}_p{position}"
+        parents.append(ParentChunk(
+            document_id=doc_id,
+            parent_id=parent_id,
+            position=position,
+            content=parent.page_content
+        ))
+        for child in child_splitter.split_documents([parent]):
+            child.metadata["doc_id"] = doc_id
+            child.metadata["chunk_id"] = f"{doc_id}_{len(children)}"
+            child.metadata["parent_id"] = parent_id
+            children.append(child)
+
+    return children, parents
+
+
+async def expand_to_parents(db: AsyncSession, documents: Sequence[Document]) -> List[Document]:
+    """
+    函数级注释：将检索命中的子片段替换为去重后的父片段
+    内部逻辑：
+        1. 没有子片段（普通入库模式）时原样返回，不访问数据库
+        2. 一次查询取回全部父片段，保持检索顺序，同一父片段只保留相关度最高（最靠前）的子片段位置
+        3. 父片段元数据沿用命中子片段的元数据（doc_id、chunk_id、score），并记录命中的子片段数
+        4. 父片段缺失（如映射不一致）时保留子片段本身
+    参数：
+        db - 数据库异步会话
+        documents - 检索结果（按相关度排序）
+    返回值：List[Document] - 父片段与普通片段列表
+    """
+    parent_ids = list(dict.fromkeys(
+        doc.metadata["parent_id"] for doc in documents if doc.metadata.get("parent_id")
+    ))
+    # Guard Clause：检索结果中没有子片段
+    if not parent_ids:
+        return list(documents)
+
+    result = await db.execute(
+        select(ParentChunk.parent_id, ParentChunk.content).where(ParentChunk.parent_id.in_(parent_ids))
+    )
+    contents: Dict[str, str] = dict(result.all())
+
+    expanded: List[Document] = []
+    positions: Dict[str, int] = {}
+    for doc in documents:
+        parent_id = doc.metadata.get("parent_id")
+        if not parent_id or parent_id not in contents:
+            if parent_id:
+                logger.warning(f"父片段不存在，使用子片段作为参考资料: parent_id={parent_id}")
+            expanded.append(doc)
+            continue
+
+        if parent_id in positions:
+            parent = expanded[positions[parent_id]]
+            parent.metadata["matched_children"] += 1
+            continue
+
+        positions[parent_id] = len(expanded)
+        expanded.append(Document(
+            page_content=contents[parent_id],
+            metadata={**doc.metadata, "matched_children": 1}
+        ))
+
+    logger.debug(f"父片段回查: {len(documents)} 个检索结果 -> {len(expanded)} 个参考资料")
+    return expanded
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'split_parent_child',
+    'expand_to_parents',
+]
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：相似文档检索模块（More Like This）
+内部逻辑：以源文档已存储的片段向量构建代表向量，在向量库中检索其他文档的片段，再聚合为文档级得分
+设计模式：管道模式（取向量 -> 代表向量 -> ANN 检索 -> 文档聚合）
+设计原则：单一职责原则
+
+实现说明：
+    - 源文档的片段向量直接从向量库读取，整个过程不调用嵌入模型
+    - 代表向量可以是全部片段的均值，也可以是多个 k-means 质心（适合主题分散的长文档）
+    - 检索时通过元数据过滤排除源文档自身的片段
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import numpy as np
+from loguru import logger
+
+
+@dataclass
+class SimilarDocumentHit:
+    """
+    类级注释：文档级相似检索结果
+    """
+    doc_id: int  # 文档ID
+    score: float  # 文档得分（命中片段的最高相似度）
+    matched_chunks: int = 0  # 命中的片段数量
+    best_chunk: str = ""  # 最相似的片段内容
+    chunk_scores: List[float] = field(default_factory=list)  # 命中片段的相似度
+
+
+def representative_vectors(embeddings, n_centroids: int = 1, iterations: int = 10) -> np.ndarray:
+    """
+    函数级注释：由片段向量构建代表向量
+    内部逻辑：
+        1. n_centroids <= 1 时返回全部片段向量的均值
+        2. 片段数不超过质心数时直接返回全部片段向量
+        3. 否则执行 k-means（最远点初始化，结果确定）
+    参数：
+        embeddings - 片段向量（n, dim）
+        n_centroids - 代表向量数量
+        iterations - k-means 迭代次数
+    返回值：np.ndarray - (k, dim) 代表向量
+    """
+    vectors = np.asarray(embeddings, dtype=np.float32)
+
+    if n_centroids <= 1:
+        return vectors.mean(axis=0, keepdims=True)
+    if len(vectors) <= n_centroids:
+        return vectors
+
+    # 内部逻辑：最远点初始化，首个质心取离均值最近的片段
+    mean = vectors.mean(axis=0)
+    first = int(np.argmin(((vectors - mean) ** 2).sum(axis=1)))
+    centroids = [vectors[first]]
+    min_dist = ((vectors - vectors[first]) ** 2).sum(axis=1)
+    for _ in range(1, n_centroids):
+        chosen = int(np.argmax(min_dist))
+        centroids.append(vectors[chosen])
+        np.minimum(min_dist, ((vectors - vectors[chosen]) ** 2).sum(axis=1), out=min_dist)
+    centroids = np.stack(centroids)
+
+    # 内部逻辑：Lloyd 迭代
+    for _ in range(iterations):
+        distances = ((vectors[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+        labels = distances.argmin(axis=1)
+        updated = np.stack([
+            vectors[labels == i].mean(axis=0) if np.any(labels == i) else centroids[i]
+            for i in range(n_centroids)
+        ])
+        if np.allclose(updated, centroids):
+            break
+        centroids = updated
+
+    return centroids
+
+
+def find_similar_documents(
+    collection,
+    doc_id: int,
+    top_k: int = 5,
+    n_centroids: int = 1,
+    chunks_per_query: int = 50
+) -> List[SimilarDocumentHit]:
+    """
+    函数级注释：查找与指定文档相似的其他文档
+    内部逻辑：读取源文档片段向量 -> 构建代表向量 -> 排除源文档的 ANN 检索 -> 按文档聚合
+    参数：
+        collection - Chroma 集合
+        doc_id - 源文档ID
+        top_k - 返回的文档数量
+        n_centroids - 代表向量数量（1 表示均值）
+        chunks_per_query - 每个代表向量检索的片段数
+    返回值：List[SimilarDocumentHit] - 按得分降序排列的相似文档
+    异常：ValueError - 源文档在向量库中没有片段
+    """
+    source = collection.get(where={"doc_id": doc_id}, include=["embeddings"])
+    source_embeddings = source.get("embeddings") or []
+    if len(source_embeddings) == 0:
+        raise ValueError(f"向量库中未找到文档的片段: doc_id={doc_id}")
+
+    queries = representative_vectors(source_embeddings, n_centroids)
+    results = collection.query(
+        query_embeddings=queries.tolist(),
+        n_results=chunks_per_query,
+        where={"doc_id": {"$ne": doc_id}},
+        include=["documents", "metadatas", "distances"]
+    )
+
+    # 内部逻辑：按文档聚合，同一片段被多个代表向量命中时只计一次
+    hits: Dict[int, SimilarDocumentHit] = {}
+    seen_chunks = set()
+    for ids, documents, metadatas, distances in zip(
+        results["ids"], results["documents"], results["metadatas"], results["distances"]
+    ):
+        for chunk_id, content, metadata, distance in zip(ids, documents, metadatas, distances):
+            if chunk_id in seen_chunks:
+                continue
+            seen_chunks.add(chunk_id)
+
+            hit_doc_id = (metadata or {}).get("doc_id")
+            if hit_doc_id is None:
+                continue
+            # 内部逻辑：与语义搜索一致，相似度 = 1 - 距离
+            similarity = 1.0 - float(distance)
+
+            hit = hits.setdefault(hit_doc_id, SimilarDocumentHit(doc_id=hit_doc_id, score=similarity))
+            hit.matched_chunks += 1
+            hit.chunk_scores.append(similarity)
+            if similarity >= hit.score or not hit.best_chunk:
+                hit.score = max(hit.score, similarity)
+                hit.best_chunk = content or ""
+
+    # 内部逻辑：得分相同时命中片段多的文档优先
+    ranked = sorted(hits.values(), key=lambda h: (h.score, h.matched_chunks), reverse=True)
+
+    logger.debug(
+        f"相似文档检索完成: doc_id={doc_id}，代表向量 {len(queries)} 个，"
+        f"命中片段 {len(seen_chunks)} 个，文档 {len(hits)} 个"
+    )
+    return ranked[:top_k]
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'SimilarDocumentHit',
+    'representative_vectors',
+    'find_similar_documents',
+]
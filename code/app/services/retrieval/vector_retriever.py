@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：向量检索器模块
+内部逻辑：统一封装搜索、对话、Agent 三条链路的向量检索，支持可选的文档质心两阶段检索与 MMR 多样化阶段，
+         并提供以已计算向量检索的入口供多查询检索复用
+设计模式：外观模式 - 对 Chroma 向量库的检索调用提供统一入口
+设计原则：单一职责原则、开闭原则
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from loguru import logger
+
+from app.core.config import settings
+from app.services.retrieval.centroid_index import DocumentCentroidIndex, scope_filter
+from app.services.retrieval.mmr import MMROptions, maximal_marginal_relevance
+
+
+class VectorRetriever:
+    """
+    类级注释：向量检索器
+    设计模式：外观模式
+    职责：
+        1. 普通模式下直接调用向量库的相似度搜索
+        2. 两阶段模式下先按文档质心选出 top-N 文档，再限定在这些文档内检索片段
+        3. MMR 模式下一次取回候选片段及其已存储向量，在内存中完成多样化选择
+        4. 返回的文档元数据携带片段ID（chunk_id）与真实相关度（score），供来源展示与持久化
+    """
+
+    def __init__(self, vector_db, two_stage: Optional[bool] = None):
+        """
+        函数级注释：初始化检索器
+        参数：
+            vector_db - LangChain Chroma 向量库实例
+            two_stage - 是否启用两阶段检索（None 表示使用全局配置）
+        """
+        # 内部变量：向量库
+        self.vector_db = vector_db
+        # 内部变量：是否启用两阶段检索
+        self.two_stage = settings.ENABLE_TWO_STAGE_RETRIEVAL if two_stage is None else two_stage
+
+    def search_with_scores(
+        self,
+        query: str,
+        k: int = 3,
+        mmr_options: Optional[MMROptions] = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        函数级注释：执行带分数的检索
+        内部逻辑：根据 MMR 选项选择普通检索或 MMR 检索
+        参数：
+            query - 查询文本
+            k - 返回结果数量
+            mmr_options - MMR 选项（None 或未启用时走普通检索）
+            filter - 元数据过滤条件
+        返回值：List[Tuple[Document, float]] - (文档, 距离) 列表，距离越小越相关
+        """
+        if self.two_stage:
+            return self._two_stage_search(query, k, mmr_options, filter)
+
+        if mmr_options is None or not mmr_options.enabled:
+            search_kwargs = {"k": k}
+            if filter:
+                search_kwargs["filter"] = filter
+            return self.vector_db.similarity_search_with_score(query, **search_kwargs)
+
+        return self._mmr_search(query, k, mmr_options, filter)
+
+    def search(
+        self,
+        query: str,
+        k: int = 3,
+        mmr_options: Optional[MMROptions] = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """
+        函数级注释：执行检索（返回带相关度评分的文档）
+        内部逻辑：与带分数检索共用一次向量库调用，将距离换算为相关度写入元数据
+        参数：
+            query - 查询文本
+            k - 返回结果数量
+            mmr_options - MMR 选项
+            filter - 元数据过滤条件
+        返回值：List[Document] - 文档列表（元数据包含 score 与 chunk_id）
+        """
+        return self.attach_scores(self.search_with_scores(query, k, mmr_options, filter))
+
+    @staticmethod
+    def attach_scores(results: List[Tuple[Document, float]]) -> List[Document]:
+        """
+        函数级注释：将检索距离换算为相关度评分并写入文档元数据
+        内部逻辑：Chroma 返回的是距离，相关度 = 1 - 距离（与搜索服务一致）；
+                 复制元数据，避免修改向量库返回的原对象
+        参数：
+            results - (文档, 距离) 列表
+        返回值：List[Document] - 元数据带 score 的文档列表
+        """
+        return [
+            Document(
+                page_content=doc.page_content,
+                metadata={**(doc.metadata or {}), "score": round(1.0 - float(distance), 4)}
+            )
+            for doc, distance in results
+        ]
+
+    async def asearch(
+        self,
+        query: str,
+        k: int = 3,
+        mmr_options: Optional[MMROptions] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Document]:
+        """
+        函数级注释：异步执行检索（仅返回文档）
+        内部逻辑：Chroma 与嵌入调用均为同步阻塞，放到线程池执行，避免阻塞事件循环；
+                 调用方已计算查询向量时直接按向量检索，不再重复向量化
+        参数：
+            query - 查询文本
+            k - 返回结果数量
+            mmr_options - MMR 选项
+            filter - 元数据过滤条件
+            query_embedding - 已计算的查询向量（可选）
+        返回值：List[Document] - 文档列表（元数据包含 score 与 chunk_id）
+        """
+        if query_embedding is not None:
+            results = await asyncio.to_thread(
+                self.search_by_vector_with_scores, query_embedding, k, mmr_options, filter
+            )
+            return self.attach_scores(results)
+        return await asyncio.to_thread(self.search, query, k, mmr_options, filter)
+
+    def search_by_vector_with_scores(
+        self,
+        query_embedding: List[float],
+        k: int = 3,
+        mmr_options: Optional[MMROptions] = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        函数级注释：以已计算的查询向量执行带分数的检索
+        内部逻辑：两阶段模式下先按文档质心限定检索范围，再按 MMR 选项选择普通检索或 MMR 检索；
+                 供两阶段检索与多查询检索（批量向量化后逐个检索）复用，不产生额外的向量化调用
+        参数：
+            query_embedding - 查询向量
+            k - 返回结果数量
+            mmr_options - MMR 选项
+            filter - 元数据过滤条件
+        返回值：List[Tuple[Document, float]] - (文档, 距离) 列表
+        """
+        if self.two_stage:
+            filter = self._scope_to_documents(query_embedding, filter)
+
+        if mmr_options is not None and mmr_options.enabled:
+            return self._mmr_search(None, k, mmr_options, filter, query_embedding=query_embedding)
+
+        return self.vector_db.similarity_search_by_vector_with_relevance_scores(
+            query_embedding, k=k, filter=filter
+        )
+
+    def _two_stage_search(
+        self,
+        query: str,
+        k: int,
+        mmr_options: Optional[MMROptions],
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        函数级注释：执行两阶段检索
+        内部逻辑：
+            1. 查询只向量化一次
+            2. 第一阶段：在文档质心索引中选出 top-N 文档
+            3. 第二阶段：以 doc_id $in 过滤条件在片段集合中检索（可叠加 MMR）
+        参数：
+            query - 查询文本
+            k - 返回结果数量
+            mmr_options - MMR 选项
+            filter - 元数据过滤条件
+        返回值：List[Tuple[Document, float]] - (文档, 距离) 列表
+        """
+        query_embedding = self.vector_db.embeddings.embed_query(query)
+        return self.search_by_vector_with_scores(query_embedding, k, mmr_options, filter)
+
+    def _scope_to_documents(
+        self,
+        query_embedding: List[float],
+        filter: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        函数级注释：按文档质心选出 top-N 文档并生成限定检索范围的过滤条件
+        内部逻辑：质心索引为空时不限定范围，回退到全量片段检索
+        参数：
+            query_embedding - 查询向量
+            filter - 原有元数据过滤条件
+        返回值：Optional[Dict[str, Any]] - 合并后的过滤条件
+        """
+        doc_ids = DocumentCentroidIndex.for_vector_db(self.vector_db).top_documents(
+            query_embedding, settings.TWO_STAGE_TOP_DOCS
+        )
+        if not doc_ids:
+            logger.debug("文档质心索引为空，回退到全量片段检索")
+            return filter
+        return scope_filter(doc_ids, filter)
+
+    def _mmr_search(
+        self,
+        query: Optional[str],
+        k: int,
+        mmr_options: MMROptions,
+        filter: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        函数级注释：执行 MMR 检索
+        内部逻辑：向量化查询 -> 取回 fetch_k 个候选及其已存储向量 -> 向量化 MMR 选择
+        参数：
+            query - 查询文本
+            k - 返回结果数量
+            mmr_options - MMR 选项
+            filter - 元数据过滤条件
+            query_embedding - 已计算的查询向量（为空时重新向量化）
+        返回值：List[Tuple[Document, float]] - 按 MMR 选择顺序排列的 (文档, 距离) 列表
+        """
+        if query_embedding is None:
+            query_embedding = self.vector_db.embeddings.embed_query(query)
+
+        # 内部逻辑：候选集至少包含 k 个片段
+        fetch_k = max(mmr_options.fetch_k, k)
+        query_kwargs = {
+            "query_embeddings": [query_embedding],
+            "n_results": fetch_k,
+            "include": ["documents", "metadatas", "distances", "embeddings"],
+        }
+        if filter:
+            query_kwargs["where"] = filter
+        results = self.vector_db._collection.query(**query_kwargs)
+
+        # Guard Clause：无候选时直接返回
+        candidate_embeddings = (results.get("embeddings") or [[]])[0]
+        if candidate_embeddings is None or len(candidate_embeddings) == 0:
+            return []
+
+        selected = maximal_marginal_relevance(
+            query_embedding,
+            candidate_embeddings,
+            k=k,
+            lambda_mult=mmr_options.lambda_mult
+        )
+
+        ids = results["ids"][0]
+        contents = results["documents"][0]
+        metadatas = results["metadatas"][0]
+        distances = results["distances"][0]
+
+        logger.debug(f"MMR检索完成: 候选 {len(contents)} 个，选出 {len(selected)} 个，λ={mmr_options.lambda_mult}")
+
+        return [
+            (
+                Document(page_content=contents[i], metadata={"chunk_id": ids[i], **(metadatas[i] or {})}),
+                float(distances[i])
+            )
+            for i in selected
+        ]
+
+
+# 内部变量：导出所有公共接口
+__all__ = ['VectorRetriever']
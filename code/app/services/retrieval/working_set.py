@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：会话检索工作集模块
+内部逻辑：为每个会话保存最近检索到的片段及其已存储向量，追问时先在内存中按余弦相似度打分，
+         最高分达到阈值时直接返回，低于阈值时回退到全量向量检索并将结果加入工作集
+设计模式：缓存模式 + 单例模式
+设计原则：单一职责原则
+
+实现说明：
+    - 追问通常命中同几个文档，内存打分只是一次小矩阵乘法（微秒级），跳过向量库的 ANN 检索
+    - 查询仍需向量化一次，回退检索复用该向量，不重复向量化
+    - 片段向量按片段ID从向量库取回（已存储的 embedding），不产生额外的向量化调用
+    - 工作集随会话删除而淘汰，长时间未访问的会话按有效期淘汰，会话数超出上限时淘汰最久未访问的会话
+    - 文档入库时清空全部工作集（新文档可能更相关），文档删除时移除该文档的片段
+    - 工作集位于进程内，多进程部署时每个进程独立维护
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from loguru import logger
+
+from app.services.retrieval.hnsw import CHROMA_DEFAULT_SPACE, cosine_to_relevance
+from app.services.retrieval.mmr import MMROptions, maximal_marginal_relevance
+from app.services.retrieval.vector_retriever import VectorRetriever
+
+
+def _normalize(embedding: Sequence[float]) -> Optional[np.ndarray]:
+    """
+    函数级注释：向量归一化（零向量或形状异常时返回 None）
+    """
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    if vector.ndim != 1 or norm == 0:
+        return None
+    return vector / norm
+
+
+class ConversationWorkingSet:
+    """
+    类级注释：单个会话的检索工作集
+    内部逻辑：按片段ID保存 (片段, 归一化向量)，按最近命中顺序排列，超出容量时淘汰最久未命中的片段；
+             打分时懒加载拼接为矩阵，一次矩阵乘法得到全部相似度
+    """
+
+    def __init__(self, max_chunks: int):
+        """
+        函数级注释：初始化工作集
+        参数：
+            max_chunks - 最多保存的片段数
+        """
+        self.max_chunks = max_chunks
+        # 内部变量：片段ID -> (片段, 归一化向量)
+        self.entries: "OrderedDict[str, Tuple[Document, np.ndarray]]" = OrderedDict()
+        # 内部变量：拼接后的 (片段ID列表, 向量矩阵)，片段变化时置空
+        self._matrix: Optional[tuple] = None
+        # 内部变量：最近访问时间
+        self.touched_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, documents: Sequence[Document], vectors: Sequence[np.ndarray]) -> None:
+        """
+        函数级注释：加入片段及其归一化向量
+        """
+        for doc, vector in zip(documents, vectors):
+            chunk_id = doc.metadata["chunk_id"]
+            self.entries[chunk_id] = (doc, vector)
+            self.entries.move_to_end(chunk_id)
+        while len(self.entries) > self.max_chunks:
+            self.entries.popitem(last=False)
+        self._matrix = None
+
+    def remove_documents(self, doc_ids: set) -> None:
+        """
+        函数级注释：移除指定文档的片段
+        """
+        stale = [chunk_id for chunk_id, (doc, _) in self.entries.items() if doc.metadata.get("doc_id") in doc_ids]
+        for chunk_id in stale:
+            del self.entries[chunk_id]
+        if stale:
+            self._matrix = None
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        mmr_options: Optional[MMROptions] = None
+    ) -> Tuple[float, List[Tuple[Document, float]]]:
+        """
+        函数级注释：在工作集中按余弦相似度检索
+        内部逻辑：启用 MMR 时先取 fetch_k 个最相似的片段，再以已保存的向量完成多样化选择
+        参数：
+            query - 归一化查询向量
+            k - 返回结果数量
+            mmr_options - MMR 选项
+        返回值：(最高相似度, [(片段, 相似度), ...])，维度不一致时最高相似度为 -1
+        """
+        if self._matrix is None:
+            ids = list(self.entries)
+            self._matrix = (ids, np.vstack([self.entries[i][1] for i in ids]))
+        ids, matrix = self._matrix
+        if matrix.shape[1] != query.shape[0]:
+            return -1.0, []
+
+        scores = matrix @ query
+        if mmr_options is not None and mmr_options.enabled:
+            candidates = np.argsort(-scores)[:max(mmr_options.fetch_k, k)]
+            selected = [
+                candidates[i]
+                for i in maximal_marginal_relevance(query, matrix[candidates], k, mmr_options.lambda_mult)
+            ]
+        else:
+            selected = np.argsort(-scores)[:k]
+
+        for position in selected:
+            self.entries.move_to_end(ids[position])
+        return float(scores.max()), [(self.entries[ids[i]][0], float(scores[i])) for i in selected]
+
+
+class RetrievalWorkingSets:
+    """
+    类级注释：会话检索工作集管理器
+    职责：
+        1. 按会话查找工作集，最高相似度达到阈值时直接返回片段
+        2. 未命中时执行全量检索，并从向量库取回片段向量加入工作集
+        3. 会话删除、过期或超出会话数上限时淘汰工作集，文档变更时使工作集失效
+        4. 统计命中率
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.75,
+        max_chunks: int = 64,
+        max_conversations: int = 1000,
+        ttl_seconds: int = 3600,
+        space: str = CHROMA_DEFAULT_SPACE
+    ):
+        """
+        函数级注释：初始化工作集管理器
+        参数：
+            threshold - 直接使用工作集所需的最高余弦相似度
+            max_chunks - 每个会话最多保存的片段数
+            max_conversations - 最多保存工作集的会话数
+            ttl_seconds - 会话工作集未访问的有效期（秒）
+            space - 向量集合的距离度量（命中时评分按此换算，与全量检索的评分一致）
+        """
+        self.threshold = threshold
+        self.space = space
+        self.max_chunks = max_chunks
+        self.max_conversations = max_conversations
+        self.ttl_seconds = ttl_seconds
+
+        # 内部变量：会话ID -> 工作集，按最近访问顺序排列
+        self._sets: "OrderedDict[Hashable, ConversationWorkingSet]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 内部变量：统计信息
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    async def asearch(
+        self,
+        retriever: VectorRetriever,
+        conversation_id: Hashable,
+        query: str,
+        k: int = 3,
+        mmr_options: Optional[MMROptions] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Document]:
+        """
+        函数级注释：会话内检索
+        内部逻辑：向量化查询 -> 工作集打分 -> 最高相似度低于阈值时以同一查询向量执行全量检索并更新工作集
+        参数：
+            retriever - 向量检索器（回退检索使用）
+            conversation_id - 会话ID
+            query - 查询文本
+            k - 返回结果数量
+            mmr_options - MMR 选项
+            query_embedding - 已计算的查询向量（可选，提供时不再向量化查询）
+        返回值：List[Document] - 文档列表（元数据包含 score 与 chunk_id）
+        """
+        vector_db = retriever.vector_db
+        if query_embedding is None:
+            query_embedding = await asyncio.to_thread(vector_db.embeddings.embed_query, query)
+
+        hits = self.lookup(conversation_id, query_embedding, k, mmr_options)
+        if hits is not None:
+            return hits
+
+        results = await asyncio.to_thread(
+            retriever.search_by_vector_with_scores, query_embedding, k, mmr_options
+        )
+        documents = VectorRetriever.attach_scores(results)
+        await asyncio.to_thread(self._remember_from_store, vector_db, conversation_id, documents)
+        return documents
+
+    def lookup(
+        self,
+        conversation_id: Hashable,
+        query_embedding: Sequence[float],
+        k: int,
+        mmr_options: Optional[MMROptions] = None
+    ) -> Optional[List[Document]]:
+        """
+        函数级注释：在会话工作集中检索
+        参数：
+            conversation_id - 会话ID
+            query_embedding - 查询向量
+            k - 返回结果数量
+            mmr_options - MMR 选项
+        返回值：Optional[List[Document]] - 命中时返回片段（score 与全量检索同为 1 - 距离），未命中时为 None
+        """
+        query = _normalize(query_embedding)
+        with self._lock:
+            working_set = self._get(conversation_id)
+            if query is None or not working_set:
+                self._misses += 1
+                return None
+
+            best, results = working_set.search(query, k, mmr_options)
+            if best < self.threshold:
+                self._misses += 1
+                logger.debug(f"会话工作集未命中: conversation_id={conversation_id}, 最高相似度 {best:.3f}")
+                return None
+
+            self._hits += 1
+            return [
+                Document(
+                    page_content=doc.page_content,
+                    metadata={**doc.metadata, "score": round(cosine_to_relevance(score, self.space), 4)}
+                )
+                for doc, score in results
+            ]
+
+    def remember(
+        self,
+        conversation_id: Hashable,
+        documents: Sequence[Document],
+        embeddings: Sequence[Sequence[float]]
+    ) -> None:
+        """
+        函数级注释：将片段及其向量加入会话工作集
+        参数：
+            conversation_id - 会话ID
+            documents - 片段（元数据需包含 chunk_id）
+            embeddings - 片段向量（顺序与片段一致）
+        """
+        pairs = [
+            (doc, vector)
+            for doc, vector in ((doc, _normalize(embedding)) for doc, embedding in zip(documents, embeddings))
+            if vector is not None and doc.metadata.get("chunk_id")
+        ]
+        # Guard Clause：没有可保存的片段
+        if not pairs:
+            return
+
+        with self._lock:
+            working_set = self._get(conversation_id)
+            if working_set is None:
+                working_set = self._sets[conversation_id] = ConversationWorkingSet(self.max_chunks)
+            working_set.add([doc for doc, _ in pairs], [vector for _, vector in pairs])
+
+            while len(self._sets) > self.max_conversations:
+                self._sets.popitem(last=False)
+                self._evictions += 1
+
+    def evict(self, conversation_id: Hashable) -> bool:
+        """
+        函数级注释：淘汰会话工作集（会话删除时调用）
+        返回值：bool - 是否存在该会话的工作集
+        """
+        with self._lock:
+            return self._sets.pop(conversation_id, None) is not None
+
+    def invalidate_documents(self, doc_ids: Iterable[int]) -> None:
+        """
+        函数级注释：从全部工作集中移除指定文档的片段（移除后为空的工作集一并淘汰）
+        """
+        targets = set(doc_ids)
+        with self._lock:
+            for conversation_id, working_set in list(self._sets.items()):
+                working_set.remove_documents(targets)
+                if not working_set:
+                    del self._sets[conversation_id]
+
+    def clear(self) -> None:
+        """
+        函数级注释：清空全部工作集（文档入库或元数据变更时调用）
+        """
+        with self._lock:
+            self._sets.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        函数级注释：获取工作集统计信息
+        返回值：Dict[str, Any] - 会话数、片段数、命中率等
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "conversations": len(self._sets),
+                "chunks": sum(len(working_set) for working_set in self._sets.values()),
+                "threshold": self.threshold,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+    def _get(self, conversation_id: Hashable) -> Optional[ConversationWorkingSet]:
+        """
+        函数级注释：获取会话工作集并刷新访问时间，已过期时淘汰（调用方需持有锁）
+        """
+        working_set = self._sets.get(conversation_id)
+        if working_set is None:
+            return None
+
+        now = time.monotonic()
+        if now - working_set.touched_at > self.ttl_seconds:
+            del self._sets[conversation_id]
+            self._evictions += 1
+            return None
+
+        working_set.touched_at = now
+        self._sets.move_to_end(conversation_id)
+        return working_set
+
+    def _remember_from_store(self, vector_db, conversation_id: Hashable, documents: Sequence[Document]) -> None:
+        """
+        函数级注释：按片段ID从向量库取回已存储的向量并加入工作集
+        内部逻辑：取回失败只记录告警，不影响本次检索结果
+        """
+        chunk_ids = [doc.metadata["chunk_id"] for doc in documents if doc.metadata.get("chunk_id")]
+        # Guard Clause：检索结果没有片段ID（旧版本入库的数据）
+        if not chunk_ids:
+            return
+
+        try:
+            stored = vector_db._collection.get(ids=chunk_ids, include=["embeddings"])
+        except Exception as e:
+            logger.warning(f"取回片段向量失败，跳过会话工作集更新: {str(e)}")
+            return
+
+        vectors = dict(zip(stored["ids"], stored["embeddings"]))
+        pairs = [(doc, vectors[doc.metadata["chunk_id"]]) for doc in documents if doc.metadata.get("chunk_id") in vectors]
+        self.remember(conversation_id, [doc for doc, _ in pairs], [vector for _, vector in pairs])
+
+
+# 内部变量：全局工作集管理器（首次使用时按配置创建）
+_working_sets: Optional[RetrievalWorkingSets] = None
+
+
+def get_working_sets() -> RetrievalWorkingSets:
+    """
+    函数级注释：获取全局会话检索工作集管理器
+    返回值：RetrievalWorkingSets
+    """
+    global _working_sets
+    if _working_sets is None:
+        from app.core.config import settings
+
+        _working_sets = RetrievalWorkingSets(
+            threshold=settings.CONVERSATION_CACHE_THRESHOLD,
+            max_chunks=settings.CONVERSATION_CACHE_MAX_CHUNKS,
+            max_conversations=settings.CONVERSATION_CACHE_MAX_CONVERSATIONS,
+            ttl_seconds=settings.CONVERSATION_CACHE_TTL,
+            space=settings.CHROMA_HNSW_SPACE
+        )
+    return _working_sets
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'ConversationWorkingSet',
+    'RetrievalWorkingSets',
+    'get_working_sets',
+]
@@ -2,16 +2,19 @@
 上海宇羲伏天智能科技有限公司出品
 
 文件级注释：搜索服务层实现
-内部逻辑：执行纯向量库检索及可选重排序（仅本地embedding时启用）
+内部逻辑：执行纯向量库检索及可选重排序（优先本地交叉编码器，其次本地embedding轻量级重排序）
 """
 
-from typing import List, Optional
-from app.schemas.search import SearchResult
+from typing import Awaitable, List, Optional
+from app.schemas.search import SearchResult, SimilarDocumentResult
 from app.core.config import settings
 from langchain_community.embeddings import OllamaEmbeddings, HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
-from langchain_community.cross_encoders import HuggingFaceCrossEncoder
 from app.services.ingest_service import IngestService
+from app.services.retrieval import MMROptions, VectorRetriever, get_cross_encoder_reranker
+from app.services.retrieval.similar_documents import find_similar_documents
+from app.utils.singleflight import get_singleflight
+from app.db.session import open_session
 from loguru import logger
 import os
 
@@ -140,34 +143,150 @@ class SearchService:
     @staticmethod
     def _get_reranker():
         """
-        函数级注释：获取重排序模型实例（已弃用，改用 embedding 重排序）
-        内部逻辑：直接返回 None，使用 embedding 模型做轻量级重排序
-        返回值：None（始终返回 None，改用 embedding 重排序）
+        函数级注释：获取本地交叉编码器重排序器
+        内部逻辑：重排序总开关关闭或未配置 RERANKER_MODEL_PATH 时返回 None，改用 embedding 重排序
+        返回值：CrossEncoderReranker 或 None
         """
-        # 内部逻辑：不再使用专门的重排序模型，改用 embedding 模型
-        logger.debug("使用 embedding 模型做轻量级重排序（无需额外下载模型）")
-        return None
+        if not settings.ENABLE_RERANKING:
+            return None
+        return get_cross_encoder_reranker()
+
+    @staticmethod
+    def _chunk_key(result: dict) -> str:
+        """
+        函数级注释：生成片段的缓存标识
+        内部逻辑：优先使用元数据中的片段ID，否则使用 文档ID + 内容哈希
+        参数：
+            result: 单条检索结果
+        返回值：片段标识
+        """
+        import hashlib
+
+        chunk_id = result["doc"].metadata.get("chunk_id")
+        if chunk_id:
+            return str(chunk_id)
+        content_hash = hashlib.sha1(result["content"].encode("utf-8")).hexdigest()
+        return f"{result['doc_id']}:{content_hash}"
+
+    @staticmethod
+    async def _rerank_with_cross_encoder(query: str, initial_results: list, reranker) -> list:
+        """
+        函数级注释：使用本地交叉编码器重排序
+        内部逻辑：所有候选一次批量打分，超时或失败时保持向量检索顺序
+        参数：
+            query: 查询文本
+            initial_results: 初始搜索结果列表
+            reranker: 交叉编码器重排序器
+        返回值：重排序后的结果列表
+        """
+        candidates = [(SearchService._chunk_key(r), r["content"]) for r in initial_results]
+        scores = await reranker.rerank(query, candidates)
+
+        # Guard Clause：超时或失败时保持原顺序
+        if scores is None:
+            return initial_results
+
+        for result, score in zip(initial_results, scores):
+            result["rerank_score"] = score
+        initial_results.sort(key=lambda x: x["rerank_score"], reverse=True)
+
+        logger.info(f"交叉编码器重排序完成，候选 {len(initial_results)} 个")
+        return initial_results
+
+    @staticmethod
+    async def _load_doc_info(db, doc_ids) -> dict:
+        """
+        函数级注释：批量查询文档的文件名与来源类型
+        参数：
+            db: 数据库会话（为空时返回空映射）
+            doc_ids: 文档ID集合
+        返回值：dict - {文档ID: {"file_name", "source_type"}}
+        """
+        from sqlalchemy.future import select
+
+        doc_info_map = {}
+        if db and doc_ids:
+            try:
+                from app.models.models import Document
+                # 内部逻辑：批量查询文档信息
+                doc_result = await db.execute(
+                    select(Document).where(Document.id.in_(list(doc_ids)))
+                )
+                documents = doc_result.scalars().all()
+                # 内部逻辑：构建ID到文件名的映射
+                for doc in documents:
+                    doc_info_map[doc.id] = {
+                        "file_name": doc.file_name,
+                        "source_type": doc.source_type
+                    }
+                logger.debug(f"[搜索诊断] 查询到 {len(doc_info_map)} 个文档的文件名")
+            except Exception as e:
+                logger.warning(f"[搜索诊断] 查询文件名失败: {str(e)}")
+        return doc_info_map
 
     @staticmethod
     async def semantic_search(
         query: str,
         top_k: int = 5,
         enable_reranking: bool = True,
-        db = None
+        db = None,
+        use_mmr: Optional[bool] = None,
+        mmr_lambda: Optional[float] = None
     ) -> List[SearchResult]:
         """
-        函数级注释：执行语义搜索逻辑（可选重排序）
-        内部逻辑：初始化向量库 -> 执行相似度搜索 -> 可选重排序 -> 查询文件名 -> 转换结果格式
+        函数级注释：执行语义搜索（合并进行中的相同搜索）
+        内部逻辑：并发的相同搜索（查询词与检索参数均相同）只执行一次，共享搜索结果
         参数：
             query: 搜索关键词
             top_k: 返回结果数量
             enable_reranking: 是否启用重排序（默认 True）
             db: 数据库会话（用于查询文件名，可选）
+            use_mmr: 是否启用 MMR 多样化（None 表示使用全局配置）
+            mmr_lambda: MMR 权衡系数（None 表示使用全局配置）
+        返回值：List[SearchResult]
+        """
+        def run(search_db) -> Awaitable[List[SearchResult]]:
+            return SearchService._semantic_search(query, top_k, enable_reranking, search_db, use_mmr, mmr_lambda)
+
+        # Guard Clause：未启用请求合并
+        if not settings.ENABLE_REQUEST_COALESCING:
+            return await run(db)
+
+        async def run_shared() -> List[SearchResult]:
+            # 内部逻辑：合并执行可能比发起请求存活更久，查询文件名使用独立会话而不是发起请求的会话
+            if db is None:
+                return await run(None)
+            async with open_session(db) as shared_db:
+                return await run(shared_db)
+
+        key = (query, top_k, enable_reranking, use_mmr, mmr_lambda, db is not None)
+        results = await get_singleflight("search").do(key, run_shared)
+        # 内部逻辑：每个调用方得到独立的结果副本
+        return [result.model_copy() for result in results]
+
+    @staticmethod
+    async def _semantic_search(
+        query: str,
+        top_k: int = 5,
+        enable_reranking: bool = True,
+        db = None,
+        use_mmr: Optional[bool] = None,
+        mmr_lambda: Optional[float] = None
+    ) -> List[SearchResult]:
+        """
+        函数级注释：执行语义搜索逻辑（可选 MMR 多样化与重排序）
+        内部逻辑：初始化向量库 -> 执行相似度搜索（可选 MMR）-> 可选重排序 -> 查询文件名 -> 转换结果格式
+        参数：
+            query: 搜索关键词
+            top_k: 返回结果数量
+            enable_reranking: 是否启用重排序（默认 True）
+            db: 数据库会话（用于查询文件名，可选）
+            use_mmr: 是否启用 MMR 多样化（None 表示使用全局配置）
+            mmr_lambda: MMR 权衡系数（None 表示使用全局配置）
         返回值：List[SearchResult]
         """
         # 内部变量：记录搜索开始时间
         import time
-        from sqlalchemy.future import select
         start_time = time.time()
 
         try:
@@ -199,7 +318,12 @@ class SearchService:
             initial_k = top_k * 2 if enable_reranking else top_k
             logger.debug(f"[搜索诊断] 搜索查询: '{query}', 请求结果数: {initial_k}")
 
-            results = vector_db.similarity_search_with_score(query, k=initial_k)
+            # 内部逻辑：统一经检索器执行，两阶段检索配置对普通检索与 MMR 检索同样生效；
+            #          MMR 模式下候选已完成多样化选择，直接取 top_k 个结果
+            mmr_options = MMROptions.resolve(use_mmr, mmr_lambda)
+            results = VectorRetriever(vector_db).search_with_scores(
+                query, k=top_k if mmr_options.enabled else initial_k, mmr_options=mmr_options
+            )
 
             # 内部逻辑：记录搜索结果数量
             logger.debug(f"[搜索诊断] 实际检索到 {len(results)} 个结果")
@@ -234,24 +358,7 @@ class SearchService:
                 })
 
             # 内部变量：存储文档ID到文件名的映射
-            doc_info_map = {}
-            if db and doc_ids:
-                try:
-                    from app.models.models import Document
-                    # 内部逻辑：批量查询文档信息
-                    doc_result = await db.execute(
-                        select(Document).where(Document.id.in_(list(doc_ids)))
-                    )
-                    documents = doc_result.scalars().all()
-                    # 内部逻辑：构建ID到文件名的映射
-                    for doc in documents:
-                        doc_info_map[doc.id] = {
-                            "file_name": doc.file_name,
-                            "source_type": doc.source_type
-                        }
-                    logger.debug(f"[搜索诊断] 查询到 {len(doc_info_map)} 个文档的文件名")
-                except Exception as e:
-                    logger.warning(f"[搜索诊断] 查询文件名失败: {str(e)}")
+            doc_info_map = await SearchService._load_doc_info(db, doc_ids)
 
             # 内部逻辑：将文件名信息添加到搜索结果中
             for result in initial_results:
@@ -263,8 +370,12 @@ class SearchService:
                     result["file_name"] = None
                     result["source_type"] = None
 
-            # 内部逻辑：如果启用重排序，则使用 embedding 模型做轻量级重排序
-            if enable_reranking:
+            # 内部逻辑：如果启用重排序，优先使用本地交叉编码器，否则使用 embedding 模型做轻量级重排序
+            cross_encoder = SearchService._get_reranker() if enable_reranking else None
+            if cross_encoder is not None:
+                initial_results = await SearchService._rerank_with_cross_encoder(query, initial_results, cross_encoder)
+                initial_results = initial_results[:top_k]
+            elif enable_reranking:
                 if SearchService._should_use_reranking():
                     # 内部逻辑：使用 embedding 模型做轻量级重排序
                     # 说明：不需要额外下载重排序模型，直接用已有的 embedding 模型计算相似度
@@ -304,3 +415,51 @@ class SearchService:
             """)
             # 内部逻辑：重新抛出异常，让上层处理
             raise
+
+    @staticmethod
+    async def similar_documents(
+        doc_id: int,
+        top_k: int = 5,
+        n_centroids: int = 1,
+        db = None
+    ) -> List[SimilarDocumentResult]:
+        """
+        函数级注释：查找与指定文档相似的其他文档（More Like This）
+        内部逻辑：读取源文档已存储的片段向量构建代表向量 -> 排除源文档的向量检索 -> 按文档聚合 -> 查询文件名
+        说明：全过程复用向量库中已存储的向量，不调用嵌入模型
+        参数：
+            doc_id: 源文档ID
+            top_k: 返回的相似文档数量
+            n_centroids: 代表向量数量（1 表示片段均值，大于 1 时使用 k-means 质心）
+            db: 数据库会话（用于查询文件名，可选）
+        返回值：List[SimilarDocumentResult]
+        异常：ValueError - 源文档在向量库中没有片段
+        """
+        # 内部变量：加载向量库（不需要嵌入模型）
+        vector_db = Chroma(
+            persist_directory=settings.CHROMA_DB_PATH,
+            collection_name=settings.CHROMA_COLLECTION_NAME
+        )
+
+        # 内部逻辑：每个代表向量多取候选片段，保证聚合后有足够的文档
+        hits = find_similar_documents(
+            vector_db._collection,
+            doc_id,
+            top_k=top_k,
+            n_centroids=n_centroids,
+            chunks_per_query=max(top_k * 10, 50)
+        )
+
+        doc_info_map = await SearchService._load_doc_info(db, {hit.doc_id for hit in hits})
+
+        return [
+            SimilarDocumentResult(
+                doc_id=hit.doc_id,
+                file_name=doc_info_map.get(hit.doc_id, {}).get("file_name"),
+                source_type=doc_info_map.get(hit.doc_id, {}).get("source_type"),
+                score=hit.score,
+                matched_chunks=hit.matched_chunks,
+                best_chunk=hit.best_chunk
+            )
+            for hit in hits
+        ]
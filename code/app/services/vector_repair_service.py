@@ -129,6 +129,12 @@ class VectorRepairService:
                     metadatas=metadatas_to_update
                 )
                 vector_db.persist()
+
+                # 内部逻辑：来源元数据已变化，使语义答案缓存与会话检索工作集失效
+                from app.services.chat.answer_cache import get_answer_cache
+                from app.services.retrieval.working_set import get_working_sets
+                get_answer_cache().advance_generation()
+                get_working_sets().clear()
                 logger.info(f"[向量库修复] 成功修复 {len(ids_to_update)} 个chunk的元数据")
 
             return result
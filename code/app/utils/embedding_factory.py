@@ -252,14 +252,13 @@ class EmbeddingFactory(BaseFactory[Embeddings]):
         # 内部逻辑：检查缓存
         if cache_key in cls._instance_cache:
             logger.debug(f"使用缓存的Embedding实例: {cache_key}")
-            return cls._instance_cache[cache_key]
+            return cls._get_or_create(cache_key, lambda: cls._create_by_provider(provider, embedding_config))
 
         # 内部逻辑：创建新实例前记录日志
         logger.info(f"[诊断] 准备创建新的 Embedding 实例，provider={provider}")
 
-        # 内部逻辑：创建新实例
-        embeddings = cls._create_by_provider(provider, embedding_config)
-        cls._instance_cache[cache_key] = embeddings
+        # 内部逻辑：创建新实例（并发的相同请求只创建一次）
+        embeddings = cls._get_or_create(cache_key, lambda: cls._create_by_provider(provider, embedding_config))
 
         logger.info(f"已创建 {cls.SUPPORTED_PROVIDERS.get(provider, provider)} Embedding实例，模型: {embedding_config.get('model')}")
         return embeddings
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：交互请求活跃度跟踪模块
+内部逻辑：统计正在进行的交互式对话请求数，低优先级的后台任务在有交互请求时等待，
+         避免与用户对话争用大模型
+设计模式：装饰器模式
+设计原则：单一职责原则
+
+实现说明：
+    - 计数只在事件循环线程中修改，无需加锁
+    - 等待空闲使用短间隔轮询，不持有与事件循环绑定的同步原语，可在任意事件循环中使用
+"""
+
+import asyncio
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+# 内部变量：等待空闲时的轮询间隔（秒）
+IDLE_POLL_INTERVAL = 0.2
+
+
+class InteractiveActivity:
+    """
+    类级注释：交互请求活跃度跟踪器
+    属性：
+        active: 正在进行的交互请求数
+        last_active_at: 最近一次交互请求结束的时间（单调时钟）
+    """
+
+    def __init__(self):
+        """
+        函数级注释：初始化跟踪器
+        """
+        self.active = 0
+        self.last_active_at = 0.0
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """
+        函数级注释：在上下文范围内记录一个进行中的交互请求
+        """
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.last_active_at = time.monotonic()
+
+    def is_idle(self, quiet_seconds: float = 0.0) -> bool:
+        """
+        函数级注释：判断当前是否空闲
+        参数：
+            quiet_seconds - 最近一次交互请求结束后至少经过的秒数
+        返回值：bool - 是否空闲
+        """
+        return self.active == 0 and time.monotonic() - self.last_active_at >= quiet_seconds
+
+    async def wait_idle(self, quiet_seconds: float = 0.0) -> None:
+        """
+        函数级注释：等待直到没有进行中的交互请求
+        参数：
+            quiet_seconds - 最近一次交互请求结束后至少经过的秒数
+        """
+        while not self.is_idle(quiet_seconds):
+            await asyncio.sleep(IDLE_POLL_INTERVAL)
+
+
+# 内部变量：全局交互请求活跃度跟踪器
+interactive_activity = InteractiveActivity()
+
+
+def interactive(func: Callable) -> Callable:
+    """
+    函数级注释：将协程函数或异步生成器函数标记为交互请求
+    内部逻辑：异步生成器在整个迭代期间计为进行中（流式回答直到发送完毕）
+    参数：
+        func - 被装饰的函数
+    返回值：Callable - 包装后的函数
+    """
+    if inspect.isasyncgenfunction(func):
+        @functools.wraps(func)
+        async def generator_wrapper(*args, **kwargs):
+            with interactive_activity.track():
+                async for item in func(*args, **kwargs):
+                    yield item
+        return generator_wrapper
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with interactive_activity.track():
+            return await func(*args, **kwargs)
+    return wrapper
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'InteractiveActivity',
+    'interactive_activity',
+    'interactive',
+]
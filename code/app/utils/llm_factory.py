@@ -15,7 +15,7 @@
 from typing import Dict, Any, TYPE_CHECKING
 from langchain_core.language_models import BaseChatModel
 from app.core.config import settings
-from app.core.base_factory import BaseFactory
+from app.core.base_factory import BaseFactory, STREAMING_KEY_SUFFIX
 from app.core.endpoint_utils import EndpointUtils
 from app.core.ai_provider import (
     AIProviderType,
@@ -151,7 +151,7 @@ class LLMFactory(BaseFactory[BaseChatModel]):
     def create_llm(cls, streaming: bool = False) -> BaseChatModel:
         """
         函数级注释：根据配置创建LLM实例（支持热切换）
-        内部逻辑：解析配置 -> 检查缓存 -> 创建/返回实例
+        内部逻辑：解析配置 -> 检查缓存（按配置与是否流式区分） -> 创建/返回实例
         参数：
             streaming: 是否启用流式输出，默认False
         返回值：BaseChatModel - LLM实例
@@ -169,21 +169,17 @@ class LLMFactory(BaseFactory[BaseChatModel]):
                 f"支持的提供商: {supported_list}"
             )
 
-        # 内部逻辑：非流式模式下检查缓存
+        # 内部逻辑：流式与非流式实例分别缓存（流式实例不再每次请求都重新创建）
         cache_key = cls._get_cache_key(config)
-        if not streaming and cache_key in cls._instance_cache:
-            logger.debug(f"使用缓存的LLM实例: {cache_key}")
-            return cls._instance_cache[cache_key]
+        if streaming:
+            cache_key += STREAMING_KEY_SUFFIX
 
         # 内部逻辑：根据提供商创建对应的LLM实例
         try:
-            llm = cls._create_by_provider(provider, config, streaming=streaming)
-
-            # 内部逻辑：缓存非流式实例
-            if not streaming:
-                cls._instance_cache[cache_key] = llm
-
-            return llm
+            return cls._get_or_create(
+                cache_key,
+                lambda: cls._create_by_provider(provider, config, streaming=streaming),
+            )
         except Exception as e:
             # 内部逻辑：捕获并记录创建失败的信息
             logger.error(f"创建{provider} LLM实例失败: {str(e)}")
@@ -2,12 +2,19 @@
 上海宇羲伏天智能科技有限公司出品
 
 文件级注释：敏感信息过滤工具类
-内部逻辑：使用正则表达式识别并过滤文本中的敏感信息（手机号、邮箱）
+内部逻辑：将启用的敏感信息规则（手机号、邮箱、身份证号、银行卡号）编译为一个带命名分组的正则，
+         单次扫描完成识别与脱敏；流式过滤只保留可能构成未完成匹配的最短后缀
 设计原则：单一职责、开闭原则、依赖倒置
+
+实现说明：
+    - 规则通过 register_rule 扩展，每条规则提供完整匹配正则、未完成后缀正则、最大长度与可选校验函数
+    - 组合正则中规则顺序即优先级：手机号、邮箱在前（与原先依次过滤的结果一致）
+    - 校验失败（如银行卡号 Luhn 校验不通过）时尝试后续规则，均不满足则保留原文
 """
 
 import re
-from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from enum import Enum
 from loguru import logger
 
@@ -18,9 +25,13 @@ class SensitiveDataType(str, Enum):
     属性：
         MOBILE: 手机号
         EMAIL: 邮箱
+        ID_CARD: 身份证号
+        BANK_CARD: 银行卡号
     """
     MOBILE = "mobile"
     EMAIL = "email"
+    ID_CARD = "id_card"
+    BANK_CARD = "bank_card"
 
 
 class MaskStrategy(str, Enum):
@@ -36,6 +47,135 @@ class MaskStrategy(str, Enum):
     HASH = "hash"        # 哈希替换
 
 
+@dataclass(frozen=True)
+class SensitiveRule:
+    """
+    类级注释：敏感信息识别规则
+    属性：
+        data_type: 敏感信息类型
+        label: 显示名称（用于默认占位符与哈希替换）
+        pattern: 完整匹配正则（不含捕获分组）
+        tail_pattern: 文本末尾可能是未完成匹配的后缀正则（流式过滤用于保留后缀）
+        start_chars: 匹配首字符的字符集（不含方括号，组合正则用于快速跳过无关字符）
+        max_length: 单个匹配的最大长度（流式过滤最多保留的后缀长度）
+        partial_mask: 部分脱敏函数
+        validator: 匹配后的校验函数（None 表示不校验）
+    """
+    data_type: SensitiveDataType
+    label: str
+    pattern: str
+    tail_pattern: str
+    start_chars: str
+    max_length: int
+    partial_mask: Callable[[str], str]
+    validator: Optional[Callable[[str], bool]] = None
+
+
+def _mask_email(email: str) -> str:
+    """
+    函数级注释：邮箱部分脱敏（user@domain.com -> u***@domain.com）
+    """
+    username, _, domain = email.partition('@')
+    masked_username = username[0] + '***' if len(username) > 1 else '***'
+    return f"{masked_username}@{domain}"
+
+
+def _luhn_valid(number: str) -> bool:
+    """
+    函数级注释：银行卡号 Luhn 校验
+    """
+    total = 0
+    for index, char in enumerate(reversed(number)):
+        digit = int(char)
+        if index % 2 == 1:
+            digit = digit * 2 - 9 if digit > 4 else digit * 2
+        total += digit
+    return total % 10 == 0
+
+
+# 内部变量：身份证号校验码加权因子与校验码表（GB 11643）
+_ID_CARD_WEIGHTS = (7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2)
+_ID_CARD_CHECK_CODES = "10X98765432"
+
+
+def _id_card_valid(number: str) -> bool:
+    """
+    函数级注释：18 位身份证号校验码验证
+    """
+    total = sum(int(digit) * weight for digit, weight in zip(number[:17], _ID_CARD_WEIGHTS))
+    return _ID_CARD_CHECK_CODES[total % 11] == number[17].upper()
+
+
+# 内部变量：已注册的规则（按优先级排列）
+_RULES: Dict[SensitiveDataType, SensitiveRule] = {}
+
+
+def register_rule(rule: SensitiveRule) -> None:
+    """
+    函数级注释：注册（或替换）敏感信息规则
+    内部逻辑：新规则追加到优先级末尾；替换已有规则时保持原优先级。注册后创建的过滤器生效
+    参数：
+        rule: 敏感信息规则
+    """
+    _RULES[rule.data_type] = rule
+
+
+def get_rules() -> List[SensitiveRule]:
+    """
+    函数级注释：获取已注册的规则（按优先级排列）
+    返回值：List[SensitiveRule]
+    """
+    return list(_RULES.values())
+
+
+# 手机号：1开头，第二位3-9，共11位数字
+register_rule(SensitiveRule(
+    data_type=SensitiveDataType.MOBILE,
+    label="手机号",
+    pattern=r'(?<!\d)1[3-9]\d{9}(?!\d)',
+    tail_pattern=r'(?<!\d)1(?:[3-9]\d{0,9})?\Z',
+    start_chars='1',
+    max_length=11,
+    partial_mask=lambda mobile: f"{mobile[:3]}****{mobile[7:]}",
+))
+
+# 邮箱：标准格式 username@domain.extension
+# 内部逻辑：不使用 \b 边界，因为中文字符环境下 \b 不工作
+register_rule(SensitiveRule(
+    data_type=SensitiveDataType.EMAIL,
+    label="邮箱",
+    pattern=r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}',
+    tail_pattern=r'[a-zA-Z0-9._%+-]+(?:@[a-zA-Z0-9.-]*)?\Z',
+    start_chars='a-zA-Z0-9._%+-',
+    max_length=64,
+    partial_mask=_mask_email,
+))
+
+# 身份证号：6位地区码 + 8位出生日期 + 3位顺序码 + 校验码
+register_rule(SensitiveRule(
+    data_type=SensitiveDataType.ID_CARD,
+    label="身份证号",
+    pattern=r'(?<!\d)[1-9]\d{5}(?:18|19|20)\d{2}(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01])\d{3}[\dXx](?![\dXx])',
+    tail_pattern=r'(?<!\d)(?:\d{1,18}|\d{17}[Xx])\Z',
+    start_chars='1-9',
+    max_length=18,
+    partial_mask=lambda number: f"{number[:6]}********{number[14:]}",
+    validator=_id_card_valid,
+))
+
+# 银行卡号：3-6开头，16-19位数字，需通过 Luhn 校验
+register_rule(SensitiveRule(
+    data_type=SensitiveDataType.BANK_CARD,
+    label="银行卡号",
+    pattern=r'(?<!\d)[3-6]\d{15,18}(?!\d)',
+    tail_pattern=r'(?<!\d)[3-6]\d{0,18}\Z',
+    start_chars='3-6',
+    max_length=19,
+    partial_mask=lambda number: f"{number[:4]}****{number[-4:]}",
+    validator=_luhn_valid,
+))
+
+
 class SensitiveDataFilter:
     """
     类级注释：敏感信息过滤器
@@ -44,138 +184,192 @@ class SensitiveDataFilter:
     功能：
         1. 识别中国大陆手机号（11位，1开头）
         2. 识别邮箱地址
+        3. 可选识别身份证号、银行卡号及其他已注册规则
     """
 
-    # 内部常量：正则表达式模式
-    # 手机号：1开头，第二位3-9，共11位数字
-    _MOBILE_PATTERN = re.compile(
-        r'(?<!\d)(1[3-9]\d{9})(?!\d)',
-        re.IGNORECASE
-    )
-
-    # 邮箱：标准格式 username@domain.extension
-    # 内部逻辑：不使用 \b 边界，因为中文字符环境下 \b 不工作
-    _EMAIL_PATTERN = re.compile(
-        r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}',
-        re.IGNORECASE
-    )
+    # 内部常量：单项规则正则（保留原有接口）
+    _MOBILE_PATTERN = re.compile(_RULES[SensitiveDataType.MOBILE].pattern)
+    _EMAIL_PATTERN = re.compile(_RULES[SensitiveDataType.EMAIL].pattern)
 
     def __init__(
         self,
         mask_strategy: MaskStrategy = MaskStrategy.FULL,
         enable_mobile_filter: bool = True,
         enable_email_filter: bool = True,
-        custom_placeholder: Optional[Dict[SensitiveDataType, str]] = None
+        custom_placeholder: Optional[Dict[SensitiveDataType, str]] = None,
+        extra_types: Iterable[SensitiveDataType] = ()
     ):
         """
         函数级注释：初始化过滤器
+        内部逻辑：按优先级收集启用的规则，编译组合正则与未完成后缀正则
         参数：
             mask_strategy: 脱敏策略，默认完全替换
             enable_mobile_filter: 是否启用手机号过滤
             enable_email_filter: 是否启用邮箱过滤
             custom_placeholder: 自定义占位符
+            extra_types: 额外启用的规则类型（如身份证号、银行卡号）
         """
         self.mask_strategy = mask_strategy
         self.enable_mobile_filter = enable_mobile_filter
         self.enable_email_filter = enable_email_filter
 
+        enabled = set(extra_types)
+        if enable_mobile_filter:
+            enabled.add(SensitiveDataType.MOBILE)
+        if enable_email_filter:
+            enabled.add(SensitiveDataType.EMAIL)
+
+        # 内部变量：启用的规则（按优先级排列）
+        self.rules: List[SensitiveRule] = [rule for rule in get_rules() if rule.data_type in enabled]
+
         # 内部变量：占位符配置
-        self.placeholders = custom_placeholder or {
-            SensitiveDataType.MOBILE: "[已隐藏手机号]",
-            SensitiveDataType.EMAIL: "[已隐藏邮箱]",
-        }
+        self.placeholders = {rule.data_type: f"[已隐藏{rule.label}]" for rule in get_rules()}
+        self.placeholders.update(custom_placeholder or {})
+
+        # 内部变量：组合正则（命名分组为规则类型）与单项正则
+        # 内部逻辑：组合正则以首字符集前瞻开头，不可能开始匹配的位置（如中文字符）无需逐个尝试各分支
+        self._rule_patterns = {rule.data_type: re.compile(rule.pattern) for rule in self.rules}
+        self._rule_index = {rule.data_type.value: index for index, rule in enumerate(self.rules)}
+        start_chars = "".join(rule.start_chars for rule in self.rules)
+        self._combined = re.compile(
+            f"(?=[{start_chars}])(?:"
+            + "|".join(f"(?P<{rule.data_type.value}>{rule.pattern})" for rule in self.rules)
+            + ")"
+        ) if self.rules else None
+        self._tail = re.compile(
+            f"(?=[{start_chars}])(?:" + "|".join(f"(?:{rule.tail_pattern})" for rule in self.rules) + ")"
+        ) if self.rules else None
+
+        # 内部变量：空统计模板（手机号、邮箱始终包含在统计中）
+        self._empty_stats = {SensitiveDataType.MOBILE: 0, SensitiveDataType.EMAIL: 0}
+        self._empty_stats.update({rule.data_type: 0 for rule in self.rules})
+
+        # 内部变量：单个匹配的最大长度
+        self.max_match_length = max((rule.max_length for rule in self.rules), default=0)
+
+    def _mask(self, rule: SensitiveRule, value: str) -> str:
+        """
+        函数级注释：按脱敏策略替换单个匹配
+        参数：
+            rule: 匹配的规则
+            value: 匹配的原文
+        返回值：str - 脱敏后的文本
+        """
+        if self.mask_strategy == MaskStrategy.FULL:
+            return self.placeholders[rule.data_type]
+        elif self.mask_strategy == MaskStrategy.PARTIAL:
+            return rule.partial_mask(value)
+        else:  # HASH
+            return f"[{rule.label}:{hash(value) % 10000:04d}]"
+
+    def _resolve_rule(self, match: re.Match) -> Optional[SensitiveRule]:
+        """
+        函数级注释：确定匹配所属的规则
+        内部逻辑：命中分组的规则校验失败时，依次尝试优先级更低且能完整匹配该文本的规则
+        参数：
+            match: 组合正则的匹配结果
+        返回值：Optional[SensitiveRule] - 规则，均不满足时为 None
+        """
+        value = match.group(0)
+        candidates = self.rules[self._rule_index[match.lastgroup]:]
+        for rule in candidates:
+            if rule is not candidates[0] and not self._rule_patterns[rule.data_type].fullmatch(value):
+                continue
+            if rule.validator is None or rule.validator(value):
+                return rule
+        return None
+
+    def _filter(
+        self,
+        text: str,
+        pattern: Optional[re.Pattern]
+    ) -> Tuple[str, Dict[SensitiveDataType, int]]:
+        """
+        函数级注释：单次扫描识别并脱敏
+        参数：
+            text: 待过滤文本
+            pattern: 组合正则或单项规则正则（命名分组与规则类型一致）
+        返回值：Tuple[过滤后文本, 各类型替换统计]
+        """
+        stats = self._empty_stats.copy()
+        if pattern is None or not text:
+            return text, stats
 
-    def filter_mobile(self, text: str) -> Tuple[str, int]:
+        def replace(match: re.Match) -> str:
+            rule = self._resolve_rule(match)
+            if rule is None:
+                return match.group(0)
+            stats[rule.data_type] += 1
+            return self._mask(rule, match.group(0))
+
+        return pattern.sub(replace, text), stats
+
+    def filter_type(self, data_type: SensitiveDataType, text: str) -> Tuple[str, int]:
         """
-        函数级注释：过滤手机号
-        内部逻辑：使用正则表达式匹配手机号 -> 根据策略脱敏 -> 返回结果
+        函数级注释：只过滤指定类型的敏感信息
         参数：
+            data_type: 敏感信息类型
             text: 待过滤文本
         返回值：Tuple[过滤后文本, 替换数量]
         """
-        if not self.enable_mobile_filter:
+        rule = next((rule for rule in self.rules if rule.data_type == data_type), None)
+        if rule is None:
             return text, 0
 
-        count = 0
-
-        def replace_mobile(match: re.Match) -> str:
-            nonlocal count
-            count += 1
-            mobile = match.group(1)
+        pattern = re.compile(f"(?P<{data_type.value}>{rule.pattern})")
+        result, stats = self._filter(text, pattern)
+        return result, stats[data_type]
 
-            if self.mask_strategy == MaskStrategy.FULL:
-                return self.placeholders[SensitiveDataType.MOBILE]
-            elif self.mask_strategy == MaskStrategy.PARTIAL:
-                return f"{mobile[:3]}****{mobile[7:]}"
-            else:  # HASH
-                return f"[手机号:{hash(mobile) % 10000:04d}]"
-
-        result = self._MOBILE_PATTERN.sub(replace_mobile, text)
-        return result, count
+    def filter_mobile(self, text: str) -> Tuple[str, int]:
+        """
+        函数级注释：过滤手机号
+        参数：
+            text: 待过滤文本
+        返回值：Tuple[过滤后文本, 替换数量]
+        """
+        return self.filter_type(SensitiveDataType.MOBILE, text)
 
     def filter_email(self, text: str) -> Tuple[str, int]:
         """
         函数级注释：过滤邮箱地址
-        内部逻辑：使用正则表达式匹配邮箱 -> 根据策略脱敏 -> 返回结果
         参数：
             text: 待过滤文本
         返回值：Tuple[过滤后文本, 替换数量]
         """
-        if not self.enable_email_filter:
-            return text, 0
-
-        count = 0
-
-        def replace_email(match: re.Match) -> str:
-            nonlocal count
-            count += 1
-            email = match.group(0)
-
-            if self.mask_strategy == MaskStrategy.FULL:
-                return self.placeholders[SensitiveDataType.EMAIL]
-            elif self.mask_strategy == MaskStrategy.PARTIAL:
-                # user@domain.com -> u***@domain.com
-                parts = email.split('@')
-                username = parts[0]
-                masked_username = username[0] + '***' if len(username) > 1 else '***'
-                return f"{masked_username}@{parts[1]}"
-            else:  # HASH
-                return f"[邮箱:{hash(email) % 10000:04d}]"
-
-        result = self._EMAIL_PATTERN.sub(replace_email, text)
-        return result, count
+        return self.filter_type(SensitiveDataType.EMAIL, text)
 
     def filter_all(self, text: str) -> Tuple[str, Dict[SensitiveDataType, int]]:
         """
         函数级注释：综合过滤所有敏感信息
-        内部逻辑：依次应用各类过滤器 -> 统计结果 -> 记录日志
+        内部逻辑：组合正则单次扫描 -> 统计结果 -> 记录日志
         参数：
             text: 待过滤文本
-        返回值：Tuple[过滤后文本, 各类型替换统计]
+        返回值：Tuple[过滤后文本, 各类型替换统计]（手机号、邮箱始终包含在统计中）
         """
-        stats = {
-            SensitiveDataType.MOBILE: 0,
-            SensitiveDataType.EMAIL: 0
-        }
-        result = text
-
-        # 内部逻辑：按优先级依次过滤
-        result, mobile_count = self.filter_mobile(result)
-        stats[SensitiveDataType.MOBILE] = mobile_count
-
-        result, email_count = self.filter_email(result)
-        stats[SensitiveDataType.EMAIL] = email_count
+        result, stats = self._filter(text, self._combined)
 
         # 内部逻辑：记录过滤日志
-        total_filtered = sum(stats.values())
-        if total_filtered > 0:
-            logger.info(
-                f"敏感信息过滤完成: 手机号={mobile_count}, "
-                f"邮箱={email_count}"
+        if any(stats.values()):
+            summary = ", ".join(
+                f"{_RULES[data_type].label}={count}" for data_type, count in stats.items()
             )
+            logger.info(f"敏感信息过滤完成: {summary}")
 
         return result, stats
 
+    def incomplete_suffix_start(self, text: str) -> int:
+        """
+        函数级注释：定位文本末尾可能构成未完成匹配的最短后缀起点
+        内部逻辑：在末尾 max_match_length 个字符内搜索各规则的未完成后缀正则，取最靠前的起点
+        参数：
+            text: 文本
+        返回值：int - 后缀起点（无需保留时为 len(text)）
+        """
+        if self._tail is None:
+            return len(text)
+        match = self._tail.search(text, max(len(text) - self.max_match_length, 0))
+        return match.start() if match else len(text)
+
     def is_sensitive(self, text: str) -> bool:
         """
         函数级注释：检测文本是否包含敏感信息
@@ -183,53 +377,50 @@ class SensitiveDataFilter:
             text: 待检测文本
         返回值：bool - 是否包含敏感信息
         """
-        if self.enable_mobile_filter and self._MOBILE_PATTERN.search(text):
-            return True
-        if self.enable_email_filter and self._EMAIL_PATTERN.search(text):
-            return True
-        return False
+        if self._combined is None:
+            return False
+        return any(self._resolve_rule(match) for match in self._combined.finditer(text))
 
 
 class StreamingSensitiveFilter:
     """
     类级注释：流式敏感信息过滤器
-    内部逻辑：维护滑动窗口，处理跨chunk敏感信息
+    内部逻辑：每个 chunk 到达后只保留末尾可能构成未完成匹配的最短后缀，其余部分立即过滤输出，
+             每个字符只在输出时被完整扫描一次
     """
 
-    def __init__(self, filter_instance: SensitiveDataFilter, window_size: int = 20):
+    def __init__(self, filter_instance: SensitiveDataFilter, window_size: int = 0):
         """
         函数级注释：初始化流式过滤器
         参数：
             filter_instance: 基础过滤器实例
-            window_size: 缓冲窗口大小（字符数）
+            window_size: 最多保留的后缀字符数（不小于启用规则的最大匹配长度）
         """
         self.filter = filter_instance
-        self.window_size = window_size
-        self.buffer = ""  # 内部变量：缓冲区
+        self.window_size = max(window_size, filter_instance.max_match_length)
+        self.buffer = ""  # 内部变量：缓冲区（未完成的后缀）
 
     def process(self, chunk: str) -> str:
         """
         函数级注释：处理单个chunk
-        内部逻辑：添加到缓冲 -> 检测完整敏感信息 -> 输出安全部分
+        内部逻辑：加入缓冲 -> 定位未完成后缀 -> 过滤并输出之前的部分
         参数：
             chunk: 输入文本块
         返回值：过滤后的安全文本
         """
-        # 内部逻辑：将新chunk加入缓冲区
         self.buffer += chunk
 
-        # 内部逻辑：当缓冲区足够大时，输出前面部分
-        if len(self.buffer) > self.window_size * 2:
-            # 输出前面部分（保留末尾作为重叠区）
-            output_part = self.buffer[:-self.window_size]
-            # 过滤输出部分
-            filtered_output, _ = self.filter.filter_all(output_part)
-            # 更新缓冲区，保留末尾
-            self.buffer = self.buffer[-self.window_size:]
-            return filtered_output
+        # 内部逻辑：保留可能未完成的后缀，超长时按窗口截断
+        split = max(
+            self.filter.incomplete_suffix_start(self.buffer),
+            len(self.buffer) - self.window_size
+        )
+        if split <= 0:
+            return ""
 
-        # 缓冲区未满，暂不输出
-        return ""
+        output_part, self.buffer = self.buffer[:split], self.buffer[split:]
+        filtered_output, _ = self.filter.filter_all(output_part)
+        return filtered_output
 
     def flush(self) -> str:
         """
@@ -269,10 +460,18 @@ def get_filter() -> SensitiveDataFilter:
             MaskStrategy.FULL
         )
 
+        # 内部逻辑：按配置启用身份证号、银行卡号规则
+        extra_types = []
+        if settings.FILTER_ID_CARD:
+            extra_types.append(SensitiveDataType.ID_CARD)
+        if settings.FILTER_BANK_CARD:
+            extra_types.append(SensitiveDataType.BANK_CARD)
+
         _default_filter = SensitiveDataFilter(
             mask_strategy=strategy,
             enable_mobile_filter=settings.FILTER_MOBILE,
             enable_email_filter=settings.FILTER_EMAIL,
+            extra_types=extra_types,
         )
     return _default_filter
 
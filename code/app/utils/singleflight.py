@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：请求合并（singleflight）模块
+内部逻辑：按请求指纹合并正在进行中的相同请求，并发的重复调用方等待同一次执行的结果；
+         流式请求由一次执行广播给所有订阅者，中途加入的订阅者先回放已产生的数据
+设计模式：享元模式（共享执行）+ 观察者模式（流式广播）
+设计原则：单一职责原则
+
+实现说明：
+    - 只合并进行中的请求，执行完成后立即移除，不缓存结果
+    - 协程调用共享一个独立任务，单个调用方取消不会取消共享执行；流式执行在所有订阅者离开后取消
+    - do_sync 供同步代码（如在线程池中计算查询向量）使用，通过线程事件等待
+"""
+
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+
+from langchain_core.embeddings import Embeddings
+
+# 内部变量：泛型类型
+T = TypeVar('T')
+
+
+class _SyncCall:
+    """
+    类级注释：同步执行的共享状态
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _Broadcast:
+    """
+    类级注释：流式执行的广播器
+    内部逻辑：后台任务逐项读取数据源并追加到缓冲区，订阅者按各自进度读取缓冲区
+    """
+
+    def __init__(self, source: AsyncIterator[Any]):
+        """
+        函数级注释：创建广播器并启动读取任务
+        参数：
+            source - 数据源（异步迭代器）
+        """
+        self.items: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[Any]) -> None:
+        """
+        函数级注释：读取数据源并通知订阅者
+        """
+        try:
+            async for item in source:
+                self.items.append(item)
+                self._notify()
+        except asyncio.CancelledError:
+            self.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def _notify(self) -> None:
+        """
+        函数级注释：唤醒正在等待的订阅者
+        """
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        """
+        函数级注释：订阅广播（先回放已产生的数据，再等待后续数据）
+        生成值：数据源产生的每一项
+        """
+        self.subscribers += 1
+        index = 0
+        try:
+            while True:
+                if index < len(self.items):
+                    index += 1
+                    yield self.items[index - 1]
+                    continue
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            # 内部逻辑：所有订阅者都已离开时停止读取数据源
+            if self.subscribers == 0 and not self.done:
+                self.task.cancel()
+
+
+class SingleFlight:
+    """
+    类级注释：请求合并器
+    属性：
+        name: 名称（用于统计）
+    职责：
+        1. 合并进行中的相同协程调用（do）
+        2. 合并进行中的相同同步调用（do_sync）
+        3. 将进行中的相同流式调用广播给所有订阅者（stream）
+        4. 统计实际执行次数与被合并的调用次数
+    """
+
+    def __init__(self, name: str):
+        """
+        函数级注释：初始化请求合并器
+        参数：
+            name - 名称
+        """
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._streams: Dict[Hashable, _Broadcast] = {}
+        self._sync_calls: Dict[Hashable, _SyncCall] = {}
+        self._lock = threading.Lock()
+        self._executions = 0
+        self._coalesced = 0
+
+    def _record(self, coalesced: bool) -> None:
+        """
+        函数级注释：记录一次调用
+        参数：
+            coalesced - 是否被合并到进行中的执行
+        """
+        with self._lock:
+            if coalesced:
+                self._coalesced += 1
+            else:
+                self._executions += 1
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        函数级注释：执行协程调用，进行中的相同调用共享同一次执行
+        参数：
+            key - 请求指纹
+            fn - 无参协程函数（只有首个调用方会执行）
+        返回值：执行结果（异常会传递给所有调用方）
+        """
+        loop = asyncio.get_running_loop()
+        task = self._calls.get(key)
+        coalesced = task is not None and not task.done() and task.get_loop() is loop
+        if not coalesced:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done, key=key: self._finish_call(key, done))
+        self._record(coalesced)
+        return await asyncio.shield(task)
+
+    def _finish_call(self, key: Hashable, task: asyncio.Future) -> None:
+        """
+        函数级注释：协程调用完成后移除进行中的记录
+        """
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # 内部逻辑：所有调用方都已取消时标记异常已读取，避免告警
+        if not task.cancelled():
+            task.exception()
+
+    async def stream(self, key: Hashable, factory: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """
+        函数级注释：执行流式调用，进行中的相同调用订阅同一次执行的广播
+        参数：
+            key - 请求指纹
+            factory - 创建数据源的无参函数（只有首个调用方会调用）
+        生成值：数据源产生的每一项
+        """
+        broadcast = self._streams.get(key)
+        coalesced = (
+            broadcast is not None
+            and not broadcast.done
+            and broadcast.task.get_loop() is asyncio.get_running_loop()
+        )
+        if not coalesced:
+            broadcast = _Broadcast(factory())
+            self._streams[key] = broadcast
+            broadcast.task.add_done_callback(lambda _, key=key, b=broadcast: self._finish_stream(key, b))
+        self._record(coalesced)
+
+        async for item in broadcast.subscribe():
+            yield item
+
+    def _finish_stream(self, key: Hashable, broadcast: _Broadcast) -> None:
+        """
+        函数级注释：流式调用完成后移除进行中的记录
+        """
+        if self._streams.get(key) is broadcast:
+            del self._streams[key]
+
+    def do_sync(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """
+        函数级注释：执行同步调用，其他线程中进行中的相同调用等待同一次执行
+        参数：
+            key - 请求指纹
+            fn - 无参函数（只有首个调用方会执行）
+        返回值：执行结果（异常会传递给所有调用方）
+        """
+        with self._lock:
+            call = self._sync_calls.get(key)
+            leader = call is None
+            if leader:
+                call = _SyncCall()
+                self._sync_calls[key] = call
+        self._record(not leader)
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._sync_calls.pop(key, None)
+            call.event.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        函数级注释：获取统计信息
+        返回值：Dict[str, Any] - 调用次数、实际执行次数、被合并次数、进行中的请求数
+        """
+        with self._lock:
+            calls = self._executions + self._coalesced
+            return {
+                "calls": calls,
+                "executions": self._executions,
+                "coalesced": self._coalesced,
+                "coalesce_rate": round(self._coalesced / calls, 4) if calls else 0.0,
+                "in_flight": len(self._calls) + len(self._streams) + len(self._sync_calls),
+            }
+
+    def reset_stats(self) -> None:
+        """
+        函数级注释：重置统计信息（主要用于测试）
+        """
+        with self._lock:
+            self._executions = 0
+            self._coalesced = 0
+
+
+class SingleFlightEmbeddings(Embeddings):
+    """
+    类级注释：合并查询向量计算的 Embedding 包装器
+    内部逻辑：并发计算相同文本的查询向量时只调用一次底层模型；文档向量计算与其他属性直接透传
+    """
+
+    def __init__(self, embeddings: Embeddings):
+        """
+        函数级注释：包装 Embedding 实例
+        参数：
+            embeddings - 底层 Embedding 实例
+        """
+        self._embeddings = embeddings
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        函数级注释：计算查询向量（合并并发的相同查询）
+        参数：
+            text - 查询文本
+        返回值：List[float] - 查询向量
+        """
+        return get_singleflight("embedding").do_sync(
+            (id(self._embeddings), text),
+            lambda: self._embeddings.embed_query(text)
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        函数级注释：计算文档向量（直接透传）
+        """
+        return self._embeddings.embed_documents(texts)
+
+    def __getattr__(self, name: str) -> Any:
+        """
+        函数级注释：透传底层实例的其他属性（如 model）
+        """
+        if name == "_embeddings":
+            raise AttributeError(name)
+        return getattr(self._embeddings, name)
+
+
+# 内部变量：按名称注册的请求合并器
+_flights: Dict[str, SingleFlight] = {}
+_flights_lock = threading.Lock()
+
+
+def get_singleflight(name: str) -> SingleFlight:
+    """
+    函数级注释：获取（不存在时创建）指定名称的请求合并器
+    参数：
+        name - 名称（如 embedding、search、chat）
+    返回值：SingleFlight
+    """
+    with _flights_lock:
+        flight = _flights.get(name)
+        if flight is None:
+            flight = _flights[name] = SingleFlight(name)
+        return flight
+
+
+def get_singleflight_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    函数级注释：获取所有请求合并器的统计信息
+    返回值：Dict[str, Dict[str, Any]] - 名称 -> 统计信息
+    """
+    with _flights_lock:
+        flights = list(_flights.values())
+    return {flight.name: flight.get_stats() for flight in flights}
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'SingleFlight',
+    'SingleFlightEmbeddings',
+    'get_singleflight',
+    'get_singleflight_stats',
+]
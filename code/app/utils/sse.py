@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：SSE 数据帧编码模块
+内部逻辑：统一流式响应的 data 帧编码与解析，并将大模型逐 Token 输出的回答片段合并为较少的帧
+设计模式：工具函数模块
+设计原则：单一职责原则
+
+实现说明：
+    - JSON 编码优先使用 orjson（C 实现），不可用或编码失败时回退到标准库 json
+    - 回答帧与完成帧使用预编码模板，只序列化回答文本本身
+    - 帧格式保持不变（每帧仍是一个完整的 data: {...} 事件），合并只减少回答帧数量，
+      客户端按原方式拼接 answer 字段即可
+    - 合并在时间窗口到期或累积字节数达到阈值时刷新；窗口内没有新片段也会按时刷新，不会拖延输出
+"""
+
+import asyncio
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 随 langsmith 安装，缺失时使用标准库
+    orjson = None
+
+# 内部变量：预编码的完成帧（与原 json.dumps 输出逐字节一致）
+DONE_EVENT = 'data: {"done": true}\n\n'
+
+# 内部变量：回答帧模板前缀与后缀
+_ANSWER_PREFIX = 'data: {"answer": '
+_EVENT_SUFFIX = '}\n\n'
+
+
+def dumps(value: Any) -> str:
+    """
+    函数级注释：将值编码为 JSON 字符串（保留中文等非 ASCII 字符）
+    参数：
+        value - 可 JSON 序列化的值
+    返回值：str - JSON 文本
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(value, ensure_ascii=False)
+
+
+def sse_event(payload: Dict[str, Any]) -> str:
+    """
+    函数级注释：编码 SSE data 帧
+    参数：
+        payload - 事件数据
+    返回值：str - SSE 帧文本
+    """
+    return f"data: {dumps(payload)}\n\n"
+
+
+def answer_event(text: str) -> str:
+    """
+    函数级注释：编码回答片段帧（预编码模板，只序列化文本）
+    参数：
+        text - 回答片段
+    返回值：str - SSE 帧文本
+    """
+    return _ANSWER_PREFIX + dumps(text) + _EVENT_SUFFIX
+
+
+def parse_event(chunk: str) -> Optional[Dict[str, Any]]:
+    """
+    函数级注释：解析单个 SSE data 帧
+    参数：
+        chunk - SSE 帧文本
+    返回值：Optional[Dict[str, Any]] - 事件数据，非 data 帧或格式错误时为 None
+    """
+    if not chunk.startswith("data: "):
+        return None
+    data = chunk[6:]
+    try:
+        payload = orjson.loads(data) if orjson is not None else json.loads(data)
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+async def coalesce_text(
+    chunks: AsyncIterable[str],
+    window_ms: float,
+    max_bytes: int
+) -> AsyncIterator[str]:
+    """
+    函数级注释：合并流式文本片段
+    内部逻辑：后台任务读取片段追加到缓冲区；首个片段立即输出以保证首字延迟，之后在窗口定时器到期
+             或累积字节数达到阈值时输出合并后的文本。每个片段只做一次列表追加，不为片段创建任务或定时器。
+             源抛出异常时先输出已缓冲的文本再抛出
+    参数：
+        chunks - 文本片段异步迭代器
+        window_ms - 合并时间窗口（毫秒，<= 0 表示不合并）
+        max_bytes - 合并文本的字节数阈值
+    生成值：str - 合并后的文本
+    """
+    # Guard Clause：未启用合并时原样透传
+    if window_ms <= 0:
+        async for text in chunks:
+            if text:
+                yield text
+        return
+
+    loop = asyncio.get_running_loop()
+    window = window_ms / 1000
+    ready = asyncio.Event()
+    parts: List[str] = []
+    state = {"size": 0, "timer": None, "first": True, "done": False, "error": None}
+
+    def flush_due() -> None:
+        state["timer"] = None
+        ready.set()
+
+    async def reader() -> None:
+        try:
+            async for text in chunks:
+                if not text:
+                    continue
+                parts.append(text)
+                state["size"] += len(text.encode("utf-8"))
+                if state["first"] or state["size"] >= max_bytes:
+                    ready.set()
+                elif state["timer"] is None and not ready.is_set():
+                    state["timer"] = loop.call_later(window, flush_due)
+        except Exception as e:
+            state["error"] = e
+        finally:
+            state["done"] = True
+            ready.set()
+
+    task = asyncio.ensure_future(reader())
+    try:
+        while True:
+            await ready.wait()
+            ready.clear()
+            if state["timer"] is not None:
+                state["timer"].cancel()
+                state["timer"] = None
+            if parts:
+                text = "".join(parts)
+                parts.clear()
+                state["size"] = 0
+                state["first"] = False
+                yield text
+            if state["done"] and not parts:
+                break
+        if state["error"] is not None:
+            raise state["error"]
+    finally:
+        if state["timer"] is not None:
+            state["timer"].cancel()
+        if not task.done():
+            task.cancel()
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'DONE_EVENT',
+    'dumps',
+    'sse_event',
+    'answer_event',
+    'parse_event',
+    'coalesce_text',
+]
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：流式对话事件模块
+内部逻辑：流式对话在服务内部以结构化事件传递（策略 -> 编排器 -> 答案缓存 / 会话持久化），
+         只在 HTTP 接口处编码为 SSE 帧，消费方直接读取事件字段，不再解析 SSE 文本
+设计模式：值对象模式（不可变事件）
+设计原则：单一职责原则
+
+实现说明：
+    - 事件不可变，请求合并时多个订阅方共享同一个事件实例
+    - 编码结果与原 SSE 帧格式一致：回答片段使用预编码模板，完成事件使用预编码的完成帧
+    - 策略仍可产出 SSE 文本（如自定义策略），编排器入口处解析一次转换为事件
+"""
+
+from dataclasses import dataclass
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Union
+
+from app.utils.sse import DONE_EVENT, answer_event, parse_event, sse_event
+
+
+@dataclass(frozen=True)
+class StreamEvent:
+    """
+    类级注释：流式对话事件
+    属性：
+        answer - 回答片段
+        sources - 来源信息字典列表
+        context_tokens - 打包后的上下文 Token 数
+        compression_ratio - 参考资料压缩比例
+        cached - 是否为语义答案缓存回放
+        warning - 降级告警
+        error - 错误信息
+        done - 是否为完成事件
+    """
+
+    answer: Optional[str] = None
+    sources: Optional[List[Dict[str, Any]]] = None
+    context_tokens: Optional[int] = None
+    compression_ratio: Optional[float] = None
+    cached: bool = False
+    warning: Optional[str] = None
+    error: Optional[str] = None
+    done: bool = False
+
+    @property
+    def is_answer_only(self) -> bool:
+        """
+        函数级注释：判断是否为只包含回答片段的事件（流式输出中的绝大多数事件）
+        返回值：bool
+        """
+        return (
+            self.answer is not None and self.sources is None and self.context_tokens is None
+            and self.compression_ratio is None and not self.cached
+            and self.warning is None and self.error is None and not self.done
+        )
+
+    def to_payload(self) -> Dict[str, Any]:
+        """
+        函数级注释：转换为 SSE 数据字典（只包含已设置的字段）
+        返回值：Dict[str, Any] - 事件数据
+        """
+        payload: Dict[str, Any] = {}
+        if self.answer is not None:
+            payload["answer"] = self.answer
+        if self.sources is not None:
+            payload["sources"] = self.sources
+        if self.context_tokens is not None:
+            payload["context_tokens"] = self.context_tokens
+        if self.compression_ratio is not None:
+            payload["compression_ratio"] = self.compression_ratio
+        if self.cached:
+            payload["cached"] = True
+        if self.warning is not None:
+            payload["warning"] = self.warning
+        if self.error is not None:
+            payload["error"] = self.error
+        if self.done:
+            payload["done"] = True
+        return payload
+
+    def encode(self) -> str:
+        """
+        函数级注释：编码为 SSE 帧
+        返回值：str - SSE 帧文本
+        """
+        if self.is_answer_only:
+            return answer_event(self.answer)
+        if self.done and self == STREAM_DONE:
+            return DONE_EVENT
+        return sse_event(self.to_payload())
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "StreamEvent":
+        """
+        函数级注释：由 SSE 数据字典构造事件（未知字段忽略）
+        参数：
+            payload - 事件数据
+        返回值：StreamEvent
+        """
+        return cls(
+            answer=payload.get("answer"),
+            sources=payload.get("sources"),
+            context_tokens=payload.get("context_tokens"),
+            compression_ratio=payload.get("compression_ratio"),
+            cached=bool(payload.get("cached")),
+            warning=payload.get("warning"),
+            error=payload.get("error"),
+            done=bool(payload.get("done")),
+        )
+
+
+# 内部变量：完成事件
+STREAM_DONE = StreamEvent(done=True)
+
+
+def to_stream_event(item: Union[StreamEvent, str]) -> Optional[StreamEvent]:
+    """
+    函数级注释：将策略产出的数据转换为事件
+    参数：
+        item - 事件，或 SSE 帧文本
+    返回值：Optional[StreamEvent] - 事件，非 data 帧或格式错误时为 None
+    """
+    if isinstance(item, StreamEvent):
+        return item
+    payload = parse_event(item)
+    return StreamEvent.from_payload(payload) if payload is not None else None
+
+
+async def as_stream_events(items: AsyncIterable[Union[StreamEvent, str]]) -> AsyncIterator[StreamEvent]:
+    """
+    函数级注释：将策略产出的数据流统一为事件流（跳过无法解析的 SSE 帧）
+    参数：
+        items - 事件或 SSE 帧文本的异步迭代器
+    生成值：StreamEvent - 事件
+    """
+    async for item in items:
+        event = to_stream_event(item)
+        if event is not None:
+            yield event
+
+
+async def encode_stream(events: AsyncIterable[StreamEvent]) -> AsyncIterator[str]:
+    """
+    函数级注释：将事件流编码为 SSE 帧（在 HTTP 接口处调用）
+    参数：
+        events - 事件异步迭代器
+    生成值：str - SSE 帧文本
+    """
+    async for event in events:
+        yield event.encode()
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'StreamEvent',
+    'STREAM_DONE',
+    'to_stream_event',
+    'as_stream_events',
+    'encode_stream',
+]
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：Token 计数模块
+内部逻辑：配置了本地分词器（TOKENIZER_PATH）时使用分词器计数，否则使用预编译正则在 C 层完成中文字符与英文单词的切分，
+         按固定比例估算 Token 数；支持按 Token 预算截断文本，以及在流式输出过程中增量计数
+设计模式：工具函数模块
+设计原则：单一职责原则
+
+实现说明：
+    - 估算比例：1 Token ≈ 1.5 个中文字 ≈ 0.75 个英文单词，标点与空白不计入 Token
+    - 与原逐字符循环的估算相比，英文单词只包含 ASCII 字母数字（带重音字母、全角数字等不再并入单词），
+      准确度对比见 benchmarks/token_counter_benchmark.py
+    - 同一文本（如每轮都会重新打包的历史消息）的计数结果按文本缓存
+    - 分词器依赖 tokenizers 包（可选依赖），未安装或加载失败时回退为估算
+"""
+
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Any, List, Optional
+
+from loguru import logger
+
+# 内部变量：单个中文字符
+_CJK_PATTERN = re.compile(r"[\u4e00-\u9fff]")
+# 内部变量：连续的英文、数字、下划线与连字符视为一个单词
+_WORD_PATTERN = re.compile(r"[A-Za-z0-9_\-]+")
+# 内部变量：按出现顺序切分中文字符（分组1）与英文单词（分组2），截断时使用
+_TOKEN_UNIT_PATTERN = re.compile(r"([\u4e00-\u9fff])|([A-Za-z0-9_\-]+)")
+# 内部变量：文本末尾未结束的英文单词（流式片段可能在单词中间断开）
+_TRAILING_WORD_PATTERN = re.compile(r"[A-Za-z0-9_\-]+\Z")
+
+# 内部变量：每个中文字符 / 英文单词折合的 Token 数
+CJK_TOKEN_WEIGHT = 1 / 1.5
+WORD_TOKEN_WEIGHT = 1 / 0.75
+
+# 内部变量：按文本缓存的计数结果数量
+COUNT_CACHE_SIZE = 4096
+
+# 内部变量：流式计数时分词器模式下待计数文本的最大长度（超出后即使没有空白也先行计数）
+STREAM_PENDING_CHARS = 256
+
+# 内部变量：本地分词器（None 表示未配置或加载失败）
+_tokenizer: Optional[Any] = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+
+
+def get_tokenizer() -> Optional[Any]:
+    """
+    函数级注释：获取本地分词器（首次调用时按 TOKENIZER_PATH 加载）
+    返回值：tokenizers.Tokenizer，未配置、未安装 tokenizers 或加载失败时返回 None
+    """
+    global _tokenizer, _tokenizer_loaded
+    if _tokenizer_loaded:
+        return _tokenizer
+
+    with _tokenizer_lock:
+        if _tokenizer_loaded:
+            return _tokenizer
+
+        from app.core.config import settings
+        path = settings.TOKENIZER_PATH
+        if path:
+            if os.path.isdir(path):
+                path = os.path.join(path, "tokenizer.json")
+            try:
+                from tokenizers import Tokenizer
+                _tokenizer = Tokenizer.from_file(path)
+                logger.info(f"Token 计数使用本地分词器: {path}")
+            except Exception as e:
+                logger.warning(f"加载本地分词器失败，Token 计数回退为估算: {path}, {str(e)}")
+        _tokenizer_loaded = True
+        return _tokenizer
+
+
+def reset_tokenizer() -> None:
+    """
+    函数级注释：重置分词器与计数缓存（TOKENIZER_PATH 变更后调用，下次计数时重新加载）
+    """
+    global _tokenizer, _tokenizer_loaded
+    with _tokenizer_lock:
+        _tokenizer = None
+        _tokenizer_loaded = False
+        _count_cached.cache_clear()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    函数级注释：按中文字符与英文单词估算文本的 Token 数量（不使用分词器）
+    参数：
+        text - 输入文本
+    返回值：int - 估算的 Token 数（空文本为 0）
+    """
+    if not text:
+        return 0
+
+    chinese_chars = len(_CJK_PATTERN.findall(text))
+    english_words = len(_WORD_PATTERN.findall(text))
+    return int(chinese_chars * CJK_TOKEN_WEIGHT + english_words * WORD_TOKEN_WEIGHT)
+
+
+def _encode(tokenizer: Any, text: str) -> Any:
+    """
+    函数级注释：使用分词器编码文本（不添加特殊 Token）
+    """
+    return tokenizer.encode(text, add_special_tokens=False)
+
+
+@lru_cache(maxsize=COUNT_CACHE_SIZE)
+def _count_cached(text: str) -> int:
+    """
+    函数级注释：计算文本的 Token 数（按文本缓存）
+    """
+    tokenizer = get_tokenizer()
+    if tokenizer is not None:
+        return len(_encode(tokenizer, text).ids)
+    return estimate_tokens(text)
+
+
+def count_tokens(text: str) -> int:
+    """
+    函数级注释：计算文本的 Token 数量
+    内部逻辑：配置了本地分词器时返回分词结果的 Token 数，否则估算；结果按文本缓存
+    参数：
+        text - 输入文本
+    返回值：int - Token 数（空文本为 0）
+    """
+    if not text:
+        return 0
+    return _count_cached(text)
+
+
+def count_messages_tokens(messages: List[str]) -> int:
+    """
+    函数级注释：计算多条消息的 Token 总数（每条消息的计数分别缓存）
+    参数：
+        messages - 消息内容列表
+    返回值：int - Token 总数
+    """
+    return sum(count_tokens(message) for message in messages)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    函数级注释：按 Token 预算截断文本
+    内部逻辑：使用分词器时按第 max_tokens 个 Token 的结束位置截断；
+             估算时按顺序累加中文字符与英文单词的 Token 权重，在超出预算的单元之前截断
+    参数：
+        text - 输入文本
+        max_tokens - Token 预算
+    返回值：str - 截断后的文本（未超出预算时原样返回）
+    """
+    if max_tokens <= 0:
+        return ""
+
+    tokenizer = get_tokenizer()
+    if tokenizer is not None:
+        offsets = _encode(tokenizer, text).offsets
+        if len(offsets) <= max_tokens:
+            return text
+        return text[:offsets[max_tokens - 1][1]].rstrip()
+
+    used = 0.0
+    for match in _TOKEN_UNIT_PATTERN.finditer(text):
+        used += CJK_TOKEN_WEIGHT if match.lastindex == 1 else WORD_TOKEN_WEIGHT
+        if used > max_tokens + 1e-9:
+            return text[:match.start()].rstrip()
+    return text
+
+
+class StreamTokenCounter:
+    """
+    类级注释：流式输出的增量 Token 计数器
+    内部逻辑：每收到一个片段只处理新增文本，流式结束时即可得到总数，无需再遍历完整回答；
+             片段末尾未结束的英文单词暂存到下一个片段一起计数
+    实现说明：
+        - 估算模式下结果与对完整文本调用 count_tokens 完全一致
+        - 分词器模式下在空白处分段编码（超过 STREAM_PENDING_CHARS 仍无空白时直接分段），
+          分段边界处的 Token 可能与整体编码略有差异
+    """
+
+    def __init__(self):
+        """
+        函数级注释：初始化计数器
+        """
+        self._tokenizer = get_tokenizer()
+        self._chinese_chars = 0
+        self._english_words = 0
+        self._tokens = 0
+        self._pending = ""
+
+    def feed(self, chunk: str) -> None:
+        """
+        函数级注释：计入一个流式片段
+        参数：
+            chunk - 新增的文本片段
+        """
+        if not chunk:
+            return
+
+        text = self._pending + chunk
+        if self._tokenizer is not None:
+            split = max(text.rfind(" "), text.rfind("\n"))
+            if split < 0 and len(text) > STREAM_PENDING_CHARS:
+                split = len(text) - 1
+            if split >= 0:
+                self._tokens += len(_encode(self._tokenizer, text[:split + 1]).ids)
+                text = text[split + 1:]
+            self._pending = text
+            return
+
+        trailing = _TRAILING_WORD_PATTERN.search(text)
+        complete = text[:trailing.start()] if trailing else text
+        self._pending = trailing.group() if trailing else ""
+        self._chinese_chars += len(_CJK_PATTERN.findall(complete))
+        self._english_words += len(_WORD_PATTERN.findall(complete))
+
+    @property
+    def total(self) -> int:
+        """
+        函数级注释：获取当前已计入文本的 Token 总数
+        返回值：int - Token 数
+        """
+        if self._tokenizer is not None:
+            pending = len(_encode(self._tokenizer, self._pending).ids) if self._pending else 0
+            return self._tokens + pending
+
+        words = self._english_words + (1 if self._pending else 0)
+        return int(self._chinese_chars * CJK_TOKEN_WEIGHT + words * WORD_TOKEN_WEIGHT)
+
+
+# 内部变量：导出所有公共接口
+__all__ = [
+    'count_tokens',
+    'count_messages_tokens',
+    'estimate_tokens',
+    'truncate_to_tokens',
+    'get_tokenizer',
+    'reset_tokenizer',
+    'StreamTokenCounter',
+]
@@ -64,9 +64,10 @@ class ZhipuAIEmbeddings(Embeddings):
         参数：texts - 文本列表
         返回值：向量列表
         """
-        import requests
+        from app.core.http_pool import http_client_pool
 
-        # 内部逻辑：调用智谱AI Embeddings API
+        # 内部逻辑：调用智谱AI Embeddings API（复用端点共享连接）
+        client = http_client_pool.get_client(self.api_base)
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -75,7 +76,7 @@ class ZhipuAIEmbeddings(Embeddings):
         # 内部逻辑：批量请求（智谱AI支持批量）
         embeddings = []
         for text in texts:
-            response = requests.post(
+            response = client.post(
                 self.api_base,
                 headers=headers,
                 json={
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：离线基准测试模块
+内部逻辑：存放不随服务运行的性能基准脚本，使用 python -m benchmarks.<脚本名> 运行
+"""
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：HNSW 索引参数离线基准测试
+内部逻辑：针对一组 HNSW 参数组合分别建索引，以暴力检索结果为基准计算 recall@k，并统计查询延迟 p50/p99
+设计原则：离线运行，不依赖服务进程和嵌入模型
+
+使用方式：
+    # 合成语料（聚类高斯分布）
+    python -m benchmarks.hnsw_benchmark --size 20000 --dim 768
+
+    # 导出当前知识库集合中已存储的向量作为语料
+    python -m benchmarks.hnsw_benchmark --from-collection
+
+    # 自定义参数网格
+    python -m benchmarks.hnsw_benchmark --space cosine --m 16 32 --construction-ef 100 200 --search-ef 10 50 100
+"""
+
+import argparse
+import itertools
+import time
+from typing import Dict, List
+
+import numpy as np
+
+
+def synthetic_corpus(size: int, dim: int, clusters: int = 50, seed: int = 0) -> np.ndarray:
+    """
+    函数级注释：生成合成语料向量
+    内部逻辑：按簇中心加噪声生成，模拟真实嵌入向量的聚类分布
+    参数：
+        size - 向量数量
+        dim - 向量维度
+        clusters - 簇数量
+        seed - 随机种子
+    返回值：np.ndarray - (size, dim) 向量矩阵
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(0, clusters, size=size)
+    return (centers[labels] + 0.5 * rng.normal(size=(size, dim))).astype(np.float32)
+
+
+def export_collection() -> np.ndarray:
+    """
+    函数级注释：导出当前知识库集合中的全部向量
+    返回值：np.ndarray - 向量矩阵
+    """
+    from app.core.config import settings
+    from app.services.retrieval.hnsw import find_collection, get_chroma_client
+
+    collection = find_collection(get_chroma_client(), settings.CHROMA_COLLECTION_NAME)
+    if collection is None or collection.count() == 0:
+        raise SystemExit(f"向量集合 {settings.CHROMA_COLLECTION_NAME} 不存在或为空")
+
+    result = collection.get(include=["embeddings"])
+    return np.asarray(result["embeddings"], dtype=np.float32)
+
+
+def brute_force_topk(corpus: np.ndarray, queries: np.ndarray, k: int, space: str) -> np.ndarray:
+    """
+    函数级注释：暴力检索精确 top-k
+    参数：
+        corpus - 语料向量
+        queries - 查询向量
+        k - 返回数量
+        space - 距离度量（l2 / cosine / ip）
+    返回值：np.ndarray - (查询数, k) 下标矩阵
+    """
+    if space == "cosine":
+        corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+        queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+    if space == "l2":
+        # 内部逻辑：||q-x||² = ||x||² - 2q·x + 常数，按行排序时可忽略查询自身的范数
+        distances = (corpus ** 2).sum(axis=1)[None, :] - 2 * queries @ corpus.T
+    else:
+        distances = -(queries @ corpus.T)
+
+    top = np.argpartition(distances, k, axis=1)[:, :k]
+    order = np.take_along_axis(distances, top, axis=1).argsort(axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def run_config(
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    exact: np.ndarray,
+    k: int,
+    space: str,
+    m: int,
+    construction_ef: int,
+    search_ef: int
+) -> Dict[str, float]:
+    """
+    函数级注释：针对一组参数建索引并测量召回率与延迟
+    参数：
+        corpus - 语料向量
+        queries - 查询向量
+        exact - 暴力检索结果
+        k - 返回数量
+        space / m / construction_ef / search_ef - HNSW 参数
+    返回值：Dict[str, float] - 测量结果
+    """
+    import chromadb
+
+    from app.services.retrieval.hnsw import HNSWParams
+
+    client = chromadb.EphemeralClient()
+    name = f"bench_{space}_{m}_{construction_ef}_{search_ef}"
+    params = HNSWParams(space=space, M=m, construction_ef=construction_ef, search_ef=search_ef)
+    collection = client.create_collection(name=name, metadata=params.to_metadata())
+
+    # 内部逻辑：分批写入，统计建索引耗时
+    build_start = time.perf_counter()
+    ids = [str(i) for i in range(len(corpus))]
+    for start in range(0, len(corpus), 5000):
+        collection.add(ids=ids[start:start + 5000], embeddings=corpus[start:start + 5000].tolist())
+    build_seconds = time.perf_counter() - build_start
+
+    # 内部逻辑：逐条查询，统计单次查询延迟
+    hits = 0
+    latencies: List[float] = []
+    for query, truth in zip(queries, exact):
+        query_start = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+        latencies.append((time.perf_counter() - query_start) * 1000)
+        hits += len(set(int(i) for i in result["ids"][0]) & set(truth.tolist()))
+
+    client.delete_collection(name)
+
+    return {
+        "recall": hits / (len(queries) * k),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "build_s": build_seconds,
+    }
+
+
+def main():
+    """
+    函数级注释：解析参数并运行基准测试
+    """
+    parser = argparse.ArgumentParser(description="HNSW 索引参数离线基准测试")
+    parser.add_argument("--from-collection", action="store_true", help="使用当前知识库集合中的向量作为语料")
+    parser.add_argument("--size", type=int, default=10000, help="合成语料数量")
+    parser.add_argument("--dim", type=int, default=384, help="合成语料维度")
+    parser.add_argument("--queries", type=int, default=200, help="查询数量")
+    parser.add_argument("--k", type=int, default=10, help="recall@k 中的 k")
+    parser.add_argument("--space", nargs="+", default=["l2"], choices=["l2", "cosine", "ip"])
+    parser.add_argument("--m", nargs="+", type=int, default=[16, 32])
+    parser.add_argument("--construction-ef", nargs="+", type=int, default=[100, 200])
+    parser.add_argument("--search-ef", nargs="+", type=int, default=[10, 50, 100])
+    args = parser.parse_args()
+
+    corpus = export_collection() if args.from_collection else synthetic_corpus(args.size, args.dim)
+
+    # 内部逻辑：查询向量取语料样本加微小扰动，避免与语料完全重合
+    rng = np.random.default_rng(1)
+    sample = rng.choice(len(corpus), size=min(args.queries, len(corpus)), replace=False)
+    queries = corpus[sample] + 0.05 * rng.normal(size=(len(sample), corpus.shape[1])).astype(np.float32)
+    k = min(args.k, len(corpus) - 1)
+
+    print(f"语料: {corpus.shape[0]} x {corpus.shape[1]}，查询: {len(queries)}，k={k}")
+    print(f"{'space':<8}{'M':>5}{'c_ef':>7}{'s_ef':>7}{'recall@k':>11}{'p50(ms)':>10}{'p99(ms)':>10}{'build(s)':>10}")
+
+    exact_cache: Dict[str, np.ndarray] = {}
+    for space, m, construction_ef, search_ef in itertools.product(
+        args.space, args.m, args.construction_ef, args.search_ef
+    ):
+        if space not in exact_cache:
+            exact_cache[space] = brute_force_topk(corpus, queries, k, space)
+        stats = run_config(corpus, queries, exact_cache[space], k, space, m, construction_ef, search_ef)
+        print(
+            f"{space:<8}{m:>5}{construction_ef:>7}{search_ef:>7}"
+            f"{stats['recall']:>11.4f}{stats['p50_ms']:>10.3f}{stats['p99_ms']:>10.3f}{stats['build_s']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
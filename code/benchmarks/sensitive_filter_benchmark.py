@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：敏感信息过滤离线基准测试
+内部逻辑：生成含少量手机号与邮箱的长中文文本，分别使用“手机号、邮箱两次 re.sub”的原实现与
+         “组合正则单次扫描”的新实现进行整段过滤；流式场景下对比“每个片段重新过滤整个窗口”的原实现
+         与“只保留未完成后缀”的新实现，统计吞吐量（MB/s），并校验输出是否与整段过滤一致
+         （原流式实现在片段边界处可能漏掉被切开的手机号）
+设计原则：离线运行，不依赖服务进程
+
+使用方式：
+    python -m benchmarks.sensitive_filter_benchmark --size-kb 1024 --chunk 3
+"""
+
+import argparse
+import random
+import re
+import time
+from typing import Callable, Iterable, List, Tuple
+
+from loguru import logger
+
+from app.utils.sensitive_data_filter import SensitiveDataFilter, StreamingSensitiveFilter
+
+# 内部变量：模拟回答文本
+SAMPLE_TEXT = "根据员工手册第三章的规定，员工每年享有带薪年假，入职满一年后可以通过人事系统提交申请，审批通过后生效。"
+
+# 内部变量：原实现的单项正则
+_LEGACY_MOBILE = re.compile(r'(?<!\d)(1[3-9]\d{9})(?!\d)', re.IGNORECASE)
+_LEGACY_EMAIL = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', re.IGNORECASE)
+
+
+def build_text(size_kb: int, seed: int = 7) -> str:
+    """
+    函数级注释：生成指定大小的中文文本，约每 2KB 插入一个手机号或邮箱
+    """
+    rng = random.Random(seed)
+    parts: List[str] = []
+    size = 0
+    while size < size_kb * 1024:
+        parts.append(SAMPLE_TEXT)
+        if rng.random() < 0.1:
+            parts.append(f"1{rng.randint(3, 9)}{rng.randint(0, 10 ** 9 - 1):09d}" if rng.random() < 0.5
+                         else f"user{rng.randint(1, 999)}@example.com")
+        size += len(parts[-1].encode("utf-8"))
+    return "".join(parts)
+
+
+def legacy_filter(text: str) -> str:
+    """
+    函数级注释：原实现：手机号、邮箱依次 re.sub
+    """
+    text = _LEGACY_MOBILE.sub("[已隐藏手机号]", text)
+    return _LEGACY_EMAIL.sub("[已隐藏邮箱]", text)
+
+
+def legacy_stream(chunks: Iterable[str], window_size: int = 20) -> str:
+    """
+    函数级注释：原实现：缓冲超过窗口后过滤整个缓冲区，保留末尾窗口再次参与过滤
+    """
+    buffer = ""
+    output: List[str] = []
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) > window_size:
+            filtered = legacy_filter(buffer)
+            output.append(filtered[:len(filtered) - window_size])
+            buffer = filtered[len(filtered) - window_size:]
+    output.append(legacy_filter(buffer))
+    return "".join(output)
+
+
+def new_stream(chunks: Iterable[str], filter_instance: SensitiveDataFilter) -> str:
+    """
+    函数级注释：新实现：只保留可能未完成的后缀
+    """
+    streaming_filter = StreamingSensitiveFilter(filter_instance)
+    output = [streaming_filter.process(chunk) for chunk in chunks]
+    output.append(streaming_filter.flush())
+    return "".join(output)
+
+
+def measure(func: Callable[[], str], size_bytes: int, repeat: int) -> Tuple[float, str]:
+    """
+    函数级注释：多次运行取最快一次，返回吞吐量（MB/s）与输出
+    """
+    best = float("inf")
+    result = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return size_bytes / best / (1024 * 1024), result
+
+
+def main():
+    """
+    函数级注释：解析参数并运行基准测试
+    """
+    parser = argparse.ArgumentParser(description="敏感信息过滤离线基准测试")
+    parser.add_argument("--size-kb", type=int, default=1024, help="整段过滤的文本大小（KB）")
+    parser.add_argument("--stream-kb", type=int, default=128, help="流式过滤的文本大小（KB）")
+    parser.add_argument("--chunk", type=int, default=3, help="流式片段字符数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    args = parser.parse_args()
+
+    # 内部逻辑：关闭过滤日志，避免日志输出计入耗时
+    logger.remove()
+    filter_instance = SensitiveDataFilter()
+
+    text = build_text(args.size_kb)
+    size = len(text.encode("utf-8"))
+    legacy_rate, legacy_result = measure(lambda: legacy_filter(text), size, args.repeat)
+    new_rate, new_result = measure(lambda: filter_instance.filter_all(text)[0], size, args.repeat)
+    print(f"整段过滤 {size / 1024:.0f} KB：two-pass {legacy_rate:.1f} MB/s，single-pass {new_rate:.1f} MB/s，"
+          f"输出一致: {legacy_result == new_result}")
+
+    text = build_text(args.stream_kb)
+    size = len(text.encode("utf-8"))
+    chunks = [text[i:i + args.chunk] for i in range(0, len(text), args.chunk)]
+    expected = filter_instance.filter_all(text)[0]
+    legacy_rate, legacy_result = measure(lambda: legacy_stream(chunks), size, args.repeat)
+    new_rate, new_result = measure(lambda: new_stream(chunks, filter_instance), size, args.repeat)
+    print(f"流式过滤 {size / 1024:.0f} KB（每片 {args.chunk} 字符）：")
+    print(f"  window {legacy_rate:.1f} MB/s，与整段过滤一致: {legacy_result == expected}")
+    print(f"  suffix {new_rate:.1f} MB/s，与整段过滤一致: {new_result == expected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：流式回答帧编码离线基准测试
+内部逻辑：模拟多路并发的大模型逐 Token 输出，分别使用“每个片段一帧 + json.dumps”的原实现与
+         “时间窗口合并 + 预编码模板 + orjson”的新实现生成 SSE 帧，按 StreamingResponse 的方式编码为字节
+         并逐帧写入本地 socket（每帧一次 send 系统调用），统计帧数、帧速率、字节数以及每个 Token 消耗的 CPU 时间
+设计原则：离线运行，不依赖服务进程和大模型
+
+使用方式：
+    python -m benchmarks.sse_benchmark --streams 200 --tokens 400 --interval-ms 2
+    python -m benchmarks.sse_benchmark --interval-ms 0 --windows 0 4 8 16
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+from typing import AsyncIterator, Dict, List
+
+from app.utils.sse import answer_event, coalesce_text
+
+# 内部变量：模拟回答文本（中英文混合）
+SAMPLE_TEXT = "根据参考资料，员工每年享有 5 天带薪年假，入职满一年后可申请。Annual leave requests go through the HR portal。"
+
+
+async def fake_llm(tokens: int, interval: float) -> AsyncIterator[str]:
+    """
+    函数级注释：模拟大模型逐 Token 输出
+    参数：
+        tokens - Token 数
+        interval - 相邻 Token 的间隔（秒，0 表示只让出事件循环）
+    生成值：str - 1~3 个字符的片段
+    """
+    position = 0
+    for index in range(tokens):
+        size = index % 3 + 1
+        yield SAMPLE_TEXT[position:position + size] or "。"
+        position = (position + size) % len(SAMPLE_TEXT)
+        await asyncio.sleep(interval)
+
+
+async def baseline_stream(tokens: int, interval: float) -> AsyncIterator[str]:
+    """
+    函数级注释：原实现：每个片段单独编码为一帧
+    """
+    async for content in fake_llm(tokens, interval):
+        yield f"data: {json.dumps({'answer': content}, ensure_ascii=False)}\n\n"
+
+
+async def coalesced_stream(tokens: int, interval: float, window_ms: float, max_bytes: int) -> AsyncIterator[str]:
+    """
+    函数级注释：新实现：按时间窗口合并片段后使用预编码模板编码
+    """
+    async for content in coalesce_text(fake_llm(tokens, interval), window_ms, max_bytes):
+        yield answer_event(content)
+
+
+class SocketSink:
+    """
+    类级注释：本地 socket 写出端，后台线程持续读取对端数据，模拟每帧一次的网络写出
+    """
+
+    def __init__(self):
+        self.writer, self.reader = socket.socketpair()
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def _drain(self) -> None:
+        while self.reader.recv(1 << 16):
+            pass
+
+    def send(self, data: bytes) -> None:
+        self.writer.sendall(data)
+
+    def close(self) -> None:
+        self.writer.close()
+        self._thread.join()
+        self.reader.close()
+
+
+async def consume(stream: AsyncIterator[str], counters: Dict[str, int], sink: SocketSink) -> None:
+    """
+    函数级注释：消费帧，编码为字节并写入 socket（与 StreamingResponse 逐帧写出一致）
+    """
+    async for frame in stream:
+        data = frame.encode("utf-8")
+        sink.send(data)
+        counters["frames"] += 1
+        counters["bytes"] += len(data)
+
+
+async def run_case(streams: int, tokens: int, interval: float, factory) -> Dict[str, float]:
+    """
+    函数级注释：并发运行多路流并统计指标
+    参数：
+        streams - 并发流数
+        tokens - 每路 Token 数
+        interval - Token 间隔（秒）
+        factory - 创建单路帧流的函数
+    返回值：Dict[str, float] - 帧数、字节数、耗时与 CPU 时间
+    """
+    counters = {"frames": 0, "bytes": 0}
+    sink = SocketSink()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    await asyncio.gather(*(consume(factory(), counters, sink) for _ in range(streams)))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    sink.close()
+    total_tokens = streams * tokens
+    return {
+        "frames": counters["frames"],
+        "bytes": counters["bytes"],
+        "frames_per_s": counters["frames"] / wall,
+        "cpu_us_per_token": cpu / total_tokens * 1e6,
+        "wall_s": wall,
+    }
+
+
+def print_rows(rows: List[tuple]) -> None:
+    """
+    函数级注释：打印结果表格
+    """
+    print(f"{'mode':<16}{'frames':>9}{'frames/s':>11}{'KB':>9}{'cpu us/tok':>12}{'wall(s)':>9}")
+    for name, result in rows:
+        print(
+            f"{name:<16}{result['frames']:>9}{result['frames_per_s']:>11.0f}{result['bytes'] / 1024:>9.0f}"
+            f"{result['cpu_us_per_token']:>12.2f}{result['wall_s']:>9.2f}"
+        )
+
+
+def main():
+    """
+    函数级注释：解析参数并运行基准测试
+    """
+    parser = argparse.ArgumentParser(description="流式回答帧编码离线基准测试")
+    parser.add_argument("--streams", type=int, default=200, help="并发流数")
+    parser.add_argument("--tokens", type=int, default=400, help="每路 Token 数")
+    parser.add_argument("--interval-ms", type=float, default=2.0, help="Token 间隔（毫秒）")
+    parser.add_argument("--windows", type=float, nargs="+", default=[4, 8, 16], help="合并时间窗口（毫秒）")
+    parser.add_argument("--max-bytes", type=int, default=512, help="合并字节数阈值")
+    args = parser.parse_args()
+
+    interval = args.interval_ms / 1000
+    print(f"并发流: {args.streams}，每路 Token: {args.tokens}，Token 间隔: {args.interval_ms} ms")
+
+    rows = [("per-token", asyncio.run(run_case(
+        args.streams, args.tokens, interval, lambda: baseline_stream(args.tokens, interval)
+    )))]
+    for window in args.windows:
+        rows.append((f"coalesce {window:g}ms", asyncio.run(run_case(
+            args.streams, args.tokens, interval,
+            lambda: coalesced_stream(args.tokens, interval, window, args.max_bytes)
+        ))))
+    print_rows(rows)
+
+
+if __name__ == "__main__":
+    main()
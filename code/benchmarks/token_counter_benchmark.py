@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：Token 计数离线基准测试
+内部逻辑：对中文、英文、代码与中英混合等样本，分别使用“逐字符循环”的原估算、“预编译正则”的新估算，
+         以及（传入 --tokenizer 时）本地分词器计数，报告各类样本的计数差异与吞吐量；
+         流式场景下对比“结束后整段重新计数”与“随片段增量计数”在流式结束时刻的耗时，并校验两者结果一致
+设计原则：离线运行，不依赖服务进程和大模型
+
+使用方式：
+    python -m benchmarks.token_counter_benchmark --size-kb 512
+    python -m benchmarks.token_counter_benchmark --tokenizer /models/qwen2.5-7b-instruct/tokenizer.json
+"""
+
+import argparse
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.utils.token_counter import StreamTokenCounter, estimate_tokens
+
+# 内部变量：各类样本（计数差异按类别报告）
+SAMPLES: Dict[str, str] = {
+    "中文": "根据员工手册第三章的规定，员工每年享有带薪年假，入职满一年后可以通过人事系统提交申请，审批通过后生效。",
+    "英文": "Employees are entitled to paid annual leave. Requests must be submitted through the HR portal in advance.",
+    "代码": "def get_user(user_id: int) -> dict:\n    return db.query(User).filter(User.id == user_id).first()\n",
+    "中英混合": "使用 LangChain 的 RetrievalQA 链，将 top_k 设置为 5，并在 config.yaml 中开启 rerank 选项。",
+    "数字与全角": "２０２４年度营收同比增长１２．５％，Q3 revenue reached 3.2B，café 与 naïve 等外来词保持原样。",
+}
+
+
+def legacy_estimate(text: str) -> int:
+    """
+    函数级注释：原实现：逐字符循环区分中文字符与英文单词（TokenPricingCalculator.estimate_tokens 的原逻辑）
+    """
+    chinese_chars = 0
+    english_words = 0
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if '\u4e00' <= char <= '\u9fff':
+            chinese_chars += 1
+            i += 1
+        elif char.isalnum() or char in "_-":
+            word_start = i
+            while i < len(text) and (text[i].isalnum() or text[i] in "_-"):
+                i += 1
+            if i > word_start:
+                english_words += 1
+        else:
+            i += 1
+    return max(int(chinese_chars / 1.5 + english_words / 0.75), 1)
+
+
+def load_tokenizer(path: Optional[str]):
+    """
+    函数级注释：加载本地分词器（未传入路径时返回 None）
+    """
+    if not path:
+        return None
+    from tokenizers import Tokenizer
+    return Tokenizer.from_file(path)
+
+
+def measure(func: Callable[[], int], repeat: int) -> Tuple[float, int]:
+    """
+    函数级注释：多次运行取最快一次，返回耗时（秒）与结果
+    """
+    best = float("inf")
+    result = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def relative_error(value: int, reference: int) -> float:
+    """
+    函数级注释：计算相对误差（百分比）
+    """
+    return (value - reference) / reference * 100 if reference else 0.0
+
+
+def main():
+    """
+    函数级注释：解析参数并运行基准测试
+    """
+    parser = argparse.ArgumentParser(description="Token 计数离线基准测试")
+    parser.add_argument("--size-kb", type=int, default=512, help="吞吐量测试的文本大小（KB）")
+    parser.add_argument("--chunk", type=int, default=3, help="流式片段字符数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    parser.add_argument("--tokenizer", default="", help="本地分词器 tokenizer.json 路径（作为准确度基准）")
+    args = parser.parse_args()
+
+    tokenizer = load_tokenizer(args.tokenizer)
+
+    # 内部逻辑：按类别报告计数差异（有分词器时以分词器为基准，否则以原估算为基准）
+    reference_name = "分词器" if tokenizer else "原估算"
+    print(f"计数差异（基准：{reference_name}）：")
+    for name, sample in SAMPLES.items():
+        text = sample * 20
+        legacy = legacy_estimate(text)
+        new = estimate_tokens(text)
+        line = f"  {name:<6} 原估算 {legacy:>5}  新估算 {new:>5}"
+        if tokenizer:
+            reference = len(tokenizer.encode(text, add_special_tokens=False).ids)
+            line += (f"  分词器 {reference:>5}  原估算误差 {relative_error(legacy, reference):+6.1f}%"
+                     f"  新估算误差 {relative_error(new, reference):+6.1f}%")
+        else:
+            line += f"  差异 {relative_error(new, legacy):+6.1f}%"
+        print(line)
+
+    # 内部逻辑：整段计数吞吐量
+    text = "".join(SAMPLES.values())
+    text = text * (args.size_kb * 1024 // len(text.encode("utf-8")) + 1)
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+    legacy_time, _ = measure(lambda: legacy_estimate(text), args.repeat)
+    new_time, _ = measure(lambda: estimate_tokens(text), args.repeat)
+    print(f"整段计数 {size_mb * 1024:.0f} KB：原估算 {size_mb / legacy_time:.1f} MB/s，新估算 {size_mb / new_time:.1f} MB/s")
+    if tokenizer:
+        tokenizer_time, _ = measure(lambda: len(tokenizer.encode(text, add_special_tokens=False).ids), args.repeat)
+        print(f"  分词器 {size_mb / tokenizer_time:.1f} MB/s")
+
+    # 内部逻辑：流式结束时刻的耗时：整段重新计数 vs 读取增量计数结果
+    chunks: List[str] = [text[i:i + args.chunk] for i in range(0, len(text), args.chunk)]
+    counter = StreamTokenCounter()
+    feed_start = time.perf_counter()
+    for chunk in chunks:
+        counter.feed(chunk)
+    feed_time = time.perf_counter() - feed_start
+    final_time, incremental = measure(lambda: counter.total, args.repeat)
+    recount_time, recount = measure(lambda: estimate_tokens(text), args.repeat)
+    print(f"流式计数（{len(chunks)} 个片段，每片 {args.chunk} 字符）：")
+    print(f"  结束后整段重新计数 {recount_time * 1000:.2f} ms，增量计数结束时读取 {final_time * 1000:.4f} ms"
+          f"（分摊到 {len(chunks)} 个片段共 {feed_time * 1000:.1f} ms），结果一致: {incremental == recount}")
+
+
+if __name__ == "__main__":
+    main()
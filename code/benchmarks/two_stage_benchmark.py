@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：两阶段检索离线基准测试
+内部逻辑：构造文档长度差异较大的合成语料，分别执行单阶段片段检索与“文档质心 -> 片段”两阶段检索，
+         以暴力检索结果为基准计算 recall@k，并统计查询延迟 p50/p99 与 top-k 中的不同文档数
+设计原则：离线运行，不依赖服务进程和嵌入模型
+
+使用方式：
+    python -m benchmarks.two_stage_benchmark --docs 500 --dim 384
+    python -m benchmarks.two_stage_benchmark --top-docs 10 20 50
+"""
+
+import argparse
+import time
+import uuid
+from typing import Dict, List
+
+import numpy as np
+
+
+def synthetic_documents(docs: int, dim: int, topics: int = 40, seed: int = 0):
+    """
+    函数级注释：生成合成文档语料
+    内部逻辑：每个文档属于一个主题，片段围绕文档中心分布；约 5% 的文档为“冗长文档”，
+             片段数是普通文档的 20 倍，用于模拟单个长文档挤占 top-k 的情况
+    参数：
+        docs - 文档数量
+        dim - 向量维度
+        topics - 主题数量
+        seed - 随机种子
+    返回值：(向量矩阵, 每个向量所属的文档ID数组)
+    """
+    rng = np.random.default_rng(seed)
+    topic_centers = rng.normal(size=(topics, dim))
+
+    vectors, doc_ids = [], []
+    for doc_id in range(1, docs + 1):
+        center = topic_centers[rng.integers(0, topics)] + 0.5 * rng.normal(size=dim)
+        chunk_count = 200 if rng.random() < 0.05 else int(rng.integers(3, 12))
+        vectors.append(center + 0.4 * rng.normal(size=(chunk_count, dim)))
+        doc_ids.extend([doc_id] * chunk_count)
+
+    return np.vstack(vectors).astype(np.float32), np.asarray(doc_ids)
+
+
+def brute_force_topk(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """
+    函数级注释：暴力检索精确 top-k（L2 距离）
+    参数：
+        corpus - 语料向量
+        queries - 查询向量
+        k - 返回数量
+    返回值：np.ndarray - (查询数, k) 下标矩阵
+    """
+    distances = (corpus ** 2).sum(axis=1)[None, :] - 2 * queries @ corpus.T
+    top = np.argpartition(distances, k, axis=1)[:, :k]
+    order = np.take_along_axis(distances, top, axis=1).argsort(axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def summarize(latencies: List[float], hits: int, distinct: List[int], queries: int, k: int) -> Dict[str, float]:
+    """
+    函数级注释：汇总测量结果
+    返回值：Dict[str, float] - recall / p50 / p99 / 平均不同文档数
+    """
+    return {
+        "recall": hits / (queries * k),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "distinct_docs": float(np.mean(distinct)),
+    }
+
+
+def run(corpus: np.ndarray, doc_ids: np.ndarray, queries: np.ndarray, k: int, top_docs: List[int]) -> None:
+    """
+    函数级注释：建索引并分别测量单阶段与两阶段检索
+    参数：
+        corpus - 语料向量
+        doc_ids - 每个向量所属的文档ID
+        queries - 查询向量
+        k - 返回数量
+        top_docs - 第一阶段保留文档数的取值列表
+    """
+    import chromadb
+
+    from app.services.retrieval.centroid_index import DocumentCentroidIndex, scope_filter
+
+    client = chromadb.EphemeralClient()
+    name = f"bench_two_stage_{uuid.uuid4().hex[:8]}"
+    collection = client.create_collection(name=name)
+
+    ids = [str(i) for i in range(len(corpus))]
+    metadatas = [{"doc_id": int(doc_id)} for doc_id in doc_ids]
+    for start in range(0, len(corpus), 5000):
+        collection.add(
+            ids=ids[start:start + 5000],
+            embeddings=corpus[start:start + 5000].tolist(),
+            metadatas=metadatas[start:start + 5000]
+        )
+
+    centroid_index = DocumentCentroidIndex(client, name)
+    centroid_index.rebuild(collection, batch_size=5000)
+
+    exact = brute_force_topk(corpus, queries, k)
+    print(f"{'mode':<14}{'top_docs':>9}{'recall@k':>11}{'p50(ms)':>10}{'p99(ms)':>10}{'distinct':>10}")
+
+    def measure(label: str, n_docs: int, search) -> None:
+        hits, latencies, distinct = 0, [], []
+        for query, truth in zip(queries, exact):
+            query_start = time.perf_counter()
+            result_ids = search(query.tolist())
+            latencies.append((time.perf_counter() - query_start) * 1000)
+            hits += len(set(int(i) for i in result_ids) & set(truth.tolist()))
+            distinct.append(len({int(doc_ids[int(i)]) for i in result_ids}))
+        stats = summarize(latencies, hits, distinct, len(queries), k)
+        print(
+            f"{label:<14}{n_docs:>9}{stats['recall']:>11.4f}{stats['p50_ms']:>10.3f}"
+            f"{stats['p99_ms']:>10.3f}{stats['distinct_docs']:>10.2f}"
+        )
+
+    def single_stage(query):
+        return collection.query(query_embeddings=[query], n_results=k, include=[])["ids"][0]
+
+    measure("single-stage", 0, single_stage)
+
+    for n_docs in top_docs:
+        def two_stage(query, n_docs=n_docs):
+            scope = centroid_index.top_documents(query, n_docs)
+            return collection.query(
+                query_embeddings=[query], n_results=k, where=scope_filter(scope), include=[]
+            )["ids"][0]
+
+        measure("two-stage", n_docs, two_stage)
+
+    client.delete_collection(centroid_index.name)
+    client.delete_collection(name)
+
+
+def main():
+    """
+    函数级注释：解析参数并运行基准测试
+    """
+    parser = argparse.ArgumentParser(description="两阶段检索离线基准测试")
+    parser.add_argument("--docs", type=int, default=500, help="合成文档数量")
+    parser.add_argument("--dim", type=int, default=384, help="向量维度")
+    parser.add_argument("--queries", type=int, default=200, help="查询数量")
+    parser.add_argument("--k", type=int, default=10, help="recall@k 中的 k")
+    parser.add_argument("--top-docs", nargs="+", type=int, default=[10, 20, 50], help="第一阶段保留文档数")
+    args = parser.parse_args()
+
+    corpus, doc_ids = synthetic_documents(args.docs, args.dim)
+
+    # 内部逻辑：查询向量取语料样本加扰动，避免与语料完全重合
+    rng = np.random.default_rng(1)
+    sample = rng.choice(len(corpus), size=min(args.queries, len(corpus)), replace=False)
+    queries = corpus[sample] + 0.3 * rng.normal(size=(len(sample), corpus.shape[1])).astype(np.float32)
+
+    print(f"语料: {args.docs} 个文档，{corpus.shape[0]} 个片段 x {corpus.shape[1]} 维，查询: {len(queries)}，k={args.k}")
+    run(corpus, doc_ids, queries, args.k, args.top_docs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+文件级注释：向量集合 HNSW 参数迁移脚本
+内部逻辑：对比已有集合与配置中的 HNSW 参数，按需使用新参数重建集合
+使用方式：
+    python migrate_chroma_hnsw.py          # 仅检查，输出参数差异
+    python migrate_chroma_hnsw.py --apply  # 执行重建，原集合保留为备份
+"""
+
+import argparse
+
+from loguru import logger
+
+from app.core.config import settings
+from app.services.retrieval.hnsw import HNSWParams, ensure_collection, rebuild_collection
+
+
+def migrate(apply: bool = False, batch_size: int = 500):
+    """
+    函数级注释：执行 HNSW 参数迁移
+    内部逻辑：集合不存在时直接按配置创建；参数不一致且指定 --apply 时重建集合
+    参数：
+        apply - 是否执行重建（False 时仅检查）
+        batch_size - 每批复制的条目数
+    """
+    logger.info(f"检查向量集合 {settings.CHROMA_COLLECTION_NAME} 的HNSW参数...")
+
+    result = ensure_collection()
+    if result["created"] or not result["mismatched"]:
+        logger.info(f"无需迁移，当前HNSW参数: {result['params']}")
+        return
+
+    if not apply:
+        logger.info("检查完成（未执行重建），确认后使用 --apply 参数执行迁移")
+        return
+
+    rebuild_collection(params=HNSWParams.from_settings(), batch_size=batch_size)
+    logger.info("向量集合HNSW参数迁移完成，确认无误后可删除备份集合")
+
+
+if __name__ == "__main__":
+    # 内部逻辑：解析命令行参数并运行迁移
+    parser = argparse.ArgumentParser(description="向量集合HNSW参数迁移")
+    parser.add_argument("--apply", action="store_true", help="执行重建（默认仅检查）")
+    parser.add_argument("--batch-size", type=int, default=500, help="每批复制的条目数")
+    args = parser.parse_args()
+
+    migrate(apply=args.apply, batch_size=args.batch_size)
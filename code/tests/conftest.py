@@ -511,3 +511,29 @@ def clean_llm_factory():
     from app.utils.llm_factory import LLMFactory
     LLMFactory._runtime_config = None
     LLMFactory._instance_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limit_state():
+    """
+    函数级注释：重置限流记录
+
+    内部逻辑：RateLimitHandler 的请求记录为类级共享状态，所有 API 测试共用 anonymous 键，
+             测试执行较快时会在 60 秒窗口内累计超限，每个测试前清空以保证测试隔离
+    """
+    from app.core.validation_chain import RateLimitHandler
+    RateLimitHandler._request_counts.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def reset_config_cache():
+    """
+    函数级注释：重置模型配置缓存
+
+    内部逻辑：配置缓存为进程级共享状态，不同测试模拟的启用配置不同，每个测试前清空以保证测试隔离
+    """
+    from app.core.config_cache import config_cache
+    config_cache.clear()
+    yield
+    config_cache.clear()
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：Agent 并发执行测试模块
+内部逻辑：使用按脚本输出工具调用的测试模型，验证并发运行的来源互不串扰、
+         同一步的工具调用并发执行且单独限时，以及编译后的图在多次运行间复用
+测试覆盖范围：
+    - AgentService.run: 并发请求来源隔离
+    - AgentService._execute_tools: 并发执行、超时与异常
+    - AgentService.get_graph: 图缓存，图节点不绑定服务实例
+    - get_agent_service: 按模型配置复用服务实例
+"""
+
+import asyncio
+import gc
+import time
+import weakref
+from unittest.mock import MagicMock
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.tools import tool
+
+from app.services.agent.tool_registry import _create_retrieve_knowledge_tool
+from app.services.agent_service import AgentService, get_agent_service
+from app.utils.llm_factory import LLMFactory
+
+
+class ScriptedModel:
+    """
+    类级注释：测试模型
+    内部逻辑：首轮按用户问题输出预设的工具调用，收到工具结果后返回拼接的工具结果
+    """
+
+    def __init__(self, plan):
+        """
+        参数：
+            plan - 用户问题 -> 工具调用列表 [(工具名, 参数)]
+        """
+        self.plan = plan
+
+    def invoke(self, messages):
+        if isinstance(messages[-1], ToolMessage):
+            results = [message.content for message in messages if isinstance(message, ToolMessage)]
+            return AIMessage(content=" | ".join(results))
+        calls = self.plan[messages[-1].content]
+        return AIMessage(content="", tool_calls=[
+            {"name": name, "args": args, "id": f"call_{index}"} for index, (name, args) in enumerate(calls)
+        ])
+
+
+@tool
+def slow_echo(text: str) -> str:
+    """按原样返回文本（耗时 0.2 秒）"""
+    time.sleep(0.2)
+    return f"echo:{text}"
+
+
+@tool
+def hang(text: str) -> str:
+    """模拟卡住的工具"""
+    time.sleep(1)
+    return "不应返回"
+
+
+@tool
+def broken(text: str) -> str:
+    """总是抛出异常的工具"""
+    raise ValueError("坏了")
+
+
+@pytest.fixture
+def agent():
+    """
+    函数级注释：构造使用测试模型与测试工具的智能体服务
+    """
+    AgentService.clear_graph_cache()
+    service = AgentService()
+    service.tools_map = {
+        "slow_echo": slow_echo,
+        "hang": hang,
+        "broken": broken,
+        "retrieve_knowledge": _create_retrieve_knowledge_tool(),
+    }
+    yield service
+    AgentService.clear_graph_cache()
+
+
+def make_vector_db():
+    """
+    函数级注释：构造按查询返回对应文档ID的模拟向量库（每次检索耗时 0.05 秒）
+    """
+    def search(query, k):
+        time.sleep(0.05)
+        return [(Document(page_content=f"片段{query}", metadata={"doc_id": int(query), "chunk_id": f"{query}_0"}), 0.2)]
+
+    vector_db = MagicMock()
+    vector_db.similarity_search_with_score.side_effect = search
+    return vector_db
+
+
+class TestAgentConcurrency:
+    """
+    类级注释：Agent 并发执行测试类
+    """
+
+    @pytest.mark.asyncio
+    async def test_concurrent_runs_do_not_leak_sources(self, agent):
+        """
+        测试目的：验证同一服务实例上并发运行的请求各自只返回自己检索到的来源
+        """
+        agent.model_with_tools = ScriptedModel({
+            str(doc_id): [("retrieve_knowledge", {"query": str(doc_id)})] for doc_id in range(1, 9)
+        })
+
+        agent.vector_db = make_vector_db()
+        results = await asyncio.gather(*(agent.run(str(doc_id)) for doc_id in range(1, 9)))
+
+        for doc_id, result in enumerate(results, start=1):
+            assert result["sources"] == [doc_id]
+            assert [doc.metadata["chunk_id"] for doc in result["documents"]] == [f"{doc_id}_0"]
+            assert result["answer"] == f"片段{doc_id}"
+
+    @pytest.mark.asyncio
+    async def test_step_tool_calls_run_concurrently(self, agent):
+        """
+        测试目的：验证同一步的多个工具调用并发执行，结果按调用顺序返回
+        """
+        agent.model_with_tools = ScriptedModel({
+            "问题": [("slow_echo", {"text": str(index)}) for index in range(3)]
+        })
+
+        start = time.perf_counter()
+        result = await agent.run("问题")
+        elapsed = time.perf_counter() - start
+
+        assert result["answer"] == "echo:0 | echo:1 | echo:2"
+        assert elapsed < 0.5
+
+    @pytest.mark.asyncio
+    async def test_timeout_and_errors_become_tool_messages(self, agent, monkeypatch):
+        """
+        测试目的：验证超时、异常与未找到的工具都转换为工具消息，不影响其他工具
+        """
+        monkeypatch.setattr("app.core.config.settings.llm_config.AGENT_TOOL_TIMEOUT", 0.3)
+        state = {"messages": [AIMessage(content="", tool_calls=[
+            {"name": "hang", "args": {"text": "x"}, "id": "a"},
+            {"name": "slow_echo", "args": {"text": "ok"}, "id": "b"},
+            {"name": "broken", "args": {"text": "x"}, "id": "c"},
+            {"name": "missing", "args": {}, "id": "d"},
+        ])]}
+
+        start = time.perf_counter()
+        with agent.bind_run_context():
+            result = await agent._execute_tools(state)
+
+        contents = [message.content for message in result["messages"]]
+        assert "超时" in contents[0]
+        assert contents[1] == "echo:ok"
+        assert "坏了" in contents[2]
+        assert contents[3] == "未找到工具: missing"
+        assert [message.tool_call_id for message in result["messages"]] == ["a", "b", "c", "d"]
+        assert time.perf_counter() - start < 0.8
+
+    def test_graph_compiled_once_per_tool_set(self, agent):
+        """
+        测试目的：验证相同工具集的服务实例复用同一个编译后的图，工具集变化时重新编译
+        """
+        other = AgentService()
+        other.tools_map = dict(agent.tools_map)
+
+        assert agent.get_graph() is other.get_graph()
+
+        other.tools_map.pop("hang")
+        assert other.get_graph() is not agent.get_graph()
+
+    def test_graph_nodes_not_bound_to_instance(self, agent):
+        """
+        测试目的：验证缓存的图不持有服务实例，节点在运行上下文之外执行时报错
+        """
+        AgentService.clear_graph_cache()
+        first = AgentService()
+        first_ref = weakref.ref(first)
+        assert first.get_graph() is not None
+        del first
+        gc.collect()
+
+        assert first_ref() is None
+        with pytest.raises(RuntimeError):
+            agent._call_model({"messages": []})
+
+    def test_service_reused_per_model_config(self, monkeypatch):
+        """
+        测试目的：验证相同模型配置复用同一服务实例，配置切换后创建新实例
+        """
+        AgentService.clear_service_cache()
+        monkeypatch.setattr(LLMFactory, "_runtime_config", {})
+
+        first = get_agent_service()
+        assert get_agent_service() is first
+
+        monkeypatch.setattr(LLMFactory, "_runtime_config", {"provider": "ollama", "model": "other-model"})
+        assert get_agent_service() is not first
+        AgentService.clear_service_cache()
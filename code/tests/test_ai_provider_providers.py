@@ -152,8 +152,8 @@ class TestZhipuAIProviderFactory:
             model="glm-4"
         )
 
-        # Mock langchain_community.chat_models.ChatZhipuAI
-        with patch('langchain_community.chat_models.ChatZhipuAI') as mock_chat_zhipuai:
+        # Mock 使用共享连接池的 ChatZhipuAI
+        with patch('app.core.ai_provider.pooled_clients.PooledChatZhipuAI') as mock_chat_zhipuai:
             mock_instance = Mock()
             mock_chat_zhipuai.return_value = mock_instance
 
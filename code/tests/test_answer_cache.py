@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：语义答案缓存测试模块
+内部逻辑：使用按关键词构造向量的测试 Embedding，验证相似问题命中、作用域隔离、文档变更失效，
+         以及编排器在非流式与流式对话中的缓存读写
+测试覆盖范围：
+    - SemanticAnswerCache: 阈值匹配、作用域、代数校验、失效、容量与有效期淘汰、统计
+    - ChatOrchestrator: 命中时跳过策略、流式回放、出错时不写入、未命中时检索复用问题向量
+"""
+
+import json
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.schemas.chat import ChatRequest, SourceInfo
+from app.services.chat.answer_cache import CachedAnswer, SemanticAnswerCache
+from app.services.chat.orchestrator import ChatOrchestrator
+from app.services.chat.strategies import ChatAnswer
+
+# 内部变量：关键词 -> 向量维度
+KEYWORDS = ["年假", "报销", "天数", "流程", "怎么"]
+
+
+class KeywordEmbeddings:
+    """
+    类级注释：测试 Embedding，按关键词出现情况生成向量并统计调用次数
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return [1.0 if keyword in text else 0.0 for keyword in KEYWORDS] + [0.1]
+
+
+def make_entry(answer="每年 5 天年假", doc_ids=(1,)):
+    """
+    函数级注释：构造缓存条目
+    """
+    return CachedAnswer(
+        question="年假天数",
+        answer=answer,
+        sources=[{"doc_id": doc_id, "file_name": "员工手册.pdf", "text_segment": "年假", "score": None}
+                 for doc_id in doc_ids],
+        doc_ids=frozenset(doc_ids),
+        context_tokens=100,
+        completion_tokens=10
+    )
+
+
+class TestSemanticAnswerCache:
+    """
+    类级注释：语义答案缓存测试类
+    """
+
+    def test_similar_question_hits_and_reports_savings(self):
+        """
+        测试目的：验证相似度超过阈值时命中，并统计命中率与节省的 Token 数
+        """
+        embeddings = KeywordEmbeddings()
+        cache = SemanticAnswerCache(threshold=0.9)
+        cache.store(embeddings.embed_query("年假天数"), "llm", make_entry())
+
+        hit = cache.lookup(embeddings.embed_query("年假有多少天数"), "llm")
+        miss = cache.lookup(embeddings.embed_query("报销流程"), "llm")
+
+        assert hit.answer == "每年 5 天年假"
+        assert miss is None
+        stats = cache.get_stats()
+        assert (stats["hits"], stats["misses"], stats["hit_rate"], stats["saved_tokens"]) == (1, 1, 0.5, 110)
+
+    def test_scopes_are_isolated(self):
+        """
+        测试目的：验证不同模型配置的作用域互不命中
+        """
+        embeddings = KeywordEmbeddings()
+        cache = SemanticAnswerCache()
+        cache.store(embeddings.embed_query("年假天数"), "ChatOpenAI:gpt-4o", make_entry())
+
+        assert cache.lookup(embeddings.embed_query("年假天数"), "ChatOpenAI:gpt-4o-mini") is None
+        assert cache.lookup(embeddings.embed_query("年假天数"), "ChatOpenAI:gpt-4o") is not None
+
+    def test_generation_guards_store_and_invalidation(self):
+        """
+        测试目的：验证文档入库清空缓存，且生成期间知识库变化的回答不会写入
+        """
+        embeddings = KeywordEmbeddings()
+        cache = SemanticAnswerCache()
+        vector = embeddings.embed_query("年假天数")
+        generation = cache.generation
+        cache.store(vector, "llm", make_entry(), generation=generation)
+
+        cache.advance_generation()
+
+        assert cache.lookup(vector, "llm") is None
+        assert cache.store(vector, "llm", make_entry(), generation=generation) is False
+        assert cache.store(vector, "llm", make_entry(), generation=cache.generation) is True
+
+    def test_invalidate_documents_evicts_only_citing_entries(self):
+        """
+        测试目的：验证删除文档只淘汰引用该文档的条目
+        """
+        embeddings = KeywordEmbeddings()
+        cache = SemanticAnswerCache()
+        cache.store(embeddings.embed_query("年假天数"), "llm", make_entry(doc_ids=(1, 2)))
+        cache.store(embeddings.embed_query("报销流程"), "llm", make_entry("先填单", doc_ids=(3,)))
+
+        assert cache.invalidate_documents([2]) == 1
+        assert cache.lookup(embeddings.embed_query("年假天数"), "llm") is None
+        assert cache.lookup(embeddings.embed_query("报销流程"), "llm").answer == "先填单"
+
+    def test_lru_and_ttl_eviction(self, monkeypatch):
+        """
+        测试目的：验证超出容量时淘汰最久未命中的条目，过期条目不会命中
+        """
+        embeddings = KeywordEmbeddings()
+        cache = SemanticAnswerCache(max_size=2, ttl_seconds=60)
+        cache.store(embeddings.embed_query("年假"), "llm", make_entry("A"))
+        cache.store(embeddings.embed_query("报销"), "llm", make_entry("B"))
+        cache.lookup(embeddings.embed_query("年假"), "llm")
+        cache.store(embeddings.embed_query("流程"), "llm", make_entry("C"))
+
+        assert cache.lookup(embeddings.embed_query("报销"), "llm") is None
+        assert cache.get_stats()["evictions"] == 1
+
+        now = time.time()
+        monkeypatch.setattr("app.services.chat.answer_cache.time.time", lambda: now + 120)
+        assert cache.lookup(embeddings.embed_query("年假"), "llm") is None
+        assert cache.get_stats()["size"] == 1
+
+
+@pytest.fixture
+def cached_orchestrator(monkeypatch):
+    """
+    函数级注释：构造启用答案缓存的编排器
+    内部逻辑：替换全局缓存实例、Embedding 与模型，策略返回固定回答并记录调用次数
+    返回值：(编排器, 缓存, 策略)
+    """
+    monkeypatch.setattr("app.core.config.settings.retrieval_config.ENABLE_ANSWER_CACHE", True)
+    cache = SemanticAnswerCache()
+    monkeypatch.setattr("app.services.chat.orchestrator.get_answer_cache", lambda: cache)
+    monkeypatch.setattr("app.services.ingest_service.IngestService.get_embeddings", KeywordEmbeddings)
+    monkeypatch.setattr("app.services.chat.orchestrator.llm_provider.get_llm", AsyncMock(return_value=MagicMock()))
+
+    strategy = MagicMock()
+    strategy.execute = AsyncMock(return_value=ChatAnswer("每年 5 天年假", [1], context_tokens=120))
+    monkeypatch.setattr("app.services.chat.orchestrator.ChatStrategyFactory.get_strategy", lambda use_agent: strategy)
+
+    sources_processor = MagicMock()
+    sources_processor.process = AsyncMock(return_value=[
+        SourceInfo(doc_id=1, file_name="员工手册.pdf", text_segment="年假")
+    ])
+    orchestrator = ChatOrchestrator(sources_processor=sources_processor, document_formatter=MagicMock())
+    return orchestrator, cache, strategy
+
+
+class TestOrchestratorAnswerCache:
+    """
+    类级注释：编排器答案缓存测试类
+    """
+
+    @pytest.mark.asyncio
+    async def test_chat_second_similar_question_skips_strategy(self, cached_orchestrator):
+        """
+        测试目的：验证相似问题第二次直接返回缓存回答与来源，不再执行策略
+        """
+        orchestrator, cache, strategy = cached_orchestrator
+
+        first = await orchestrator.chat(MagicMock(), ChatRequest(message="年假天数"))
+        second = await orchestrator.chat(MagicMock(), ChatRequest(message="年假有几天数"))
+
+        assert strategy.execute.await_count == 1
+        assert first.cached is False and second.cached is True
+        assert second.answer == first.answer
+        assert [source.doc_id for source in second.sources] == [1]
+        assert second.context_tokens == 120
+
+    @pytest.mark.asyncio
+    async def test_history_bypasses_cache(self, cached_orchestrator):
+        """
+        测试目的：验证带对话历史的请求不读写缓存
+        """
+        orchestrator, cache, strategy = cached_orchestrator
+        request = ChatRequest(message="年假天数", history=[{"role": "user", "content": "你好"}])
+
+        await orchestrator.chat(MagicMock(), request)
+        await orchestrator.chat(MagicMock(), request)
+
+        assert strategy.execute.await_count == 2
+        assert cache.get_stats()["size"] == 0
+
+    @pytest.mark.asyncio
+    async def test_stream_stores_then_replays(self, cached_orchestrator):
+        """
+        测试目的：验证流式回答完整生成后写入缓存，再次提问时按 SSE 格式回放
+        """
+        orchestrator, cache, _ = cached_orchestrator
+        stream_strategy = MagicMock()
+
+        async def execute(request, db, query_embedding=None):
+            yield f"data: {json.dumps({'sources': [{'doc_id': 1, 'file_name': 'a.pdf', 'text_segment': '年假', 'score': None}], 'context_tokens': 80})}\n\n"
+            for part in ("每年", " 5 天", "年假"):
+                yield f"data: {json.dumps({'answer': part}, ensure_ascii=False)}\n\n"
+        stream_strategy.execute = execute
+
+        with patch("app.services.chat.orchestrator.StreamingStrategyFactory.get_strategy", return_value=stream_strategy):
+            first = [chunk async for chunk in orchestrator.stream_chat(MagicMock(), ChatRequest(message="年假天数"))]
+            second = [chunk async for chunk in orchestrator.stream_chat(MagicMock(), ChatRequest(message="年假天数"))]
+
+        events = [json.loads(chunk[len("data: "):]) for chunk in second]
+        assert events[0]["cached"] is True and events[0]["context_tokens"] == 80
+        assert "".join(event.get("answer", "") for event in events) == "每年 5 天年假"
+        assert events[-1] == {"done": True}
+        assert len(first) == 5
+        assert cache.get_stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_with_error_is_not_cached(self, cached_orchestrator):
+        """
+        测试目的：验证流式生成出现错误事件时不写入缓存
+        """
+        orchestrator, cache, _ = cached_orchestrator
+        stream_strategy = MagicMock()
+
+        async def execute(request, db, query_embedding=None):
+            yield f"data: {json.dumps({'answer': '部分'}, ensure_ascii=False)}\n\n"
+            yield f"data: {json.dumps({'error': 'LLM调用失败'}, ensure_ascii=False)}\n\n"
+        stream_strategy.execute = execute
+
+        with patch("app.services.chat.orchestrator.StreamingStrategyFactory.get_strategy", return_value=stream_strategy):
+            [chunk async for chunk in orchestrator.stream_chat(MagicMock(), ChatRequest(message="年假天数"))]
+
+        assert cache.get_stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cache_miss_embeds_question_once(monkeypatch):
+    """
+    测试目的：验证缓存未命中时 RAG 检索复用查找缓存时的问题向量，整次问答只向量化问题一次
+    """
+    from langchain_core.documents import Document
+    from langchain_core.runnables import RunnableLambda
+
+    embeddings = KeywordEmbeddings()
+    searched = []
+
+    class FakeChroma:
+        def __init__(self, embedding_function, **kwargs):
+            self.embeddings = embedding_function
+
+        def similarity_search_by_vector_with_relevance_scores(self, embedding, k=4, filter=None):
+            searched.append(embedding)
+            return [(Document(page_content="每年 5 天年假", metadata={"doc_id": 1, "chunk_id": "1_0"}), 0.2)]
+
+        def similarity_search_with_score(self, query, k=4, filter=None):
+            return self.similarity_search_by_vector_with_relevance_scores(self.embeddings.embed_query(query), k)
+
+    monkeypatch.setattr("app.core.config.settings.retrieval_config.ENABLE_ANSWER_CACHE", True)
+    monkeypatch.setattr("app.core.config.settings.retrieval_config.ENABLE_TWO_STAGE_RETRIEVAL", False)
+    monkeypatch.setattr("app.services.chat.orchestrator.get_answer_cache", SemanticAnswerCache)
+    monkeypatch.setattr("app.services.ingest_service.IngestService.get_embeddings", lambda: embeddings)
+    monkeypatch.setattr("langchain_community.vectorstores.Chroma", FakeChroma)
+    monkeypatch.setattr(
+        "app.services.chat.orchestrator.llm_provider.get_llm",
+        AsyncMock(return_value=RunnableLambda(lambda prompt: "每年 5 天年假"))
+    )
+    sources_processor = MagicMock()
+    sources_processor.process = AsyncMock(return_value=[])
+    orchestrator = ChatOrchestrator(sources_processor=sources_processor, document_formatter=MagicMock())
+
+    response = await orchestrator.chat(MagicMock(), ChatRequest(message="年假天数"))
+
+    assert response.cached is False
+    assert embeddings.calls == 1
+    assert searched == [embeddings.embed_query("年假天数")]
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：文档质心索引与两阶段检索测试模块
+内部逻辑：使用内存 Chroma 集合构造多主题文档，验证质心维护、文档召回以及两阶段检索只向量化一次
+测试覆盖范围：
+    - DocumentCentroidIndex: 写入、刷新、删除、召回、回填、补齐缺少质心的文档
+    - scope_filter: 过滤条件构造
+    - VectorRetriever 两阶段模式
+    - SearchService.semantic_search: 普通检索同样使用两阶段模式
+"""
+
+import uuid
+from unittest.mock import MagicMock
+
+import chromadb
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from app.services.retrieval.centroid_index import DocumentCentroidIndex, scope_filter
+from app.services.retrieval.mmr import MMROptions
+from app.services.retrieval.vector_retriever import VectorRetriever
+
+
+@pytest.fixture
+def chunk_collection():
+    """
+    函数级注释：构造 8 个文档、4 个主题的内存片段集合
+    内部逻辑：文档 d 的片段围绕主题 (d-1) % 4 的中心分布
+    返回值：(客户端, 片段集合, 主题中心)
+    """
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(4, 16))
+    client = chromadb.EphemeralClient()
+    collection = client.create_collection(f"centroid_{uuid.uuid4().hex[:12]}")
+
+    ids, embeddings, metadatas = [], [], []
+    for doc_id in range(1, 9):
+        for j in range(5):
+            ids.append(f"{doc_id}_{j}")
+            embeddings.append((centers[(doc_id - 1) % 4] + 0.1 * rng.normal(size=16)).tolist())
+            metadatas.append({"doc_id": doc_id})
+    collection.add(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=ids)
+    return client, collection, centers
+
+
+class TestDocumentCentroidIndex:
+    """
+    类级注释：文档质心索引测试类
+    """
+
+    def test_refresh_and_delete(self, chunk_collection):
+        """
+        测试目的：验证刷新写入片段均值，片段删除后刷新会移除质心
+        """
+        client, collection, _ = chunk_collection
+        index = DocumentCentroidIndex(client, collection.name)
+
+        assert index.refresh_document(collection, 1) is True
+        stored = index.collection.get(ids=["1"], include=["embeddings", "metadatas"])
+        expected = np.mean(collection.get(where={"doc_id": 1}, include=["embeddings"])["embeddings"], axis=0)
+        assert np.allclose(stored["embeddings"][0], expected, atol=1e-5)
+        assert stored["metadatas"][0] == {"doc_id": 1, "chunk_count": 5}
+
+        collection.delete(where={"doc_id": 1})
+        assert index.refresh_document(collection, 1) is False
+        assert index.count() == 0
+
+    def test_rebuild_and_top_documents(self, chunk_collection):
+        """
+        测试目的：验证回填覆盖全部文档，按查询向量召回同主题文档
+        """
+        client, collection, centers = chunk_collection
+        index = DocumentCentroidIndex(client, collection.name)
+
+        assert index.rebuild(collection, batch_size=7) == 8
+        assert index.count() == 8
+        assert sorted(index.top_documents(centers[1].tolist(), 2)) == [2, 6]
+        assert len(index.top_documents(centers[0].tolist(), 100)) == 8
+
+    def test_backfill_missing_completes_partial_index(self, chunk_collection):
+        """
+        测试目的：验证索引只覆盖部分文档（如新文档入库后）时补齐其余文档，并移除已无片段的质心
+        """
+        client, collection, centers = chunk_collection
+        index = DocumentCentroidIndex(client, collection.name)
+        index.refresh_document(collection, 8)
+        index.upsert(99, [centers[0].tolist()])
+
+        assert index.backfill_missing(collection, batch_size=7) == 7
+        assert index.indexed_documents() == set(range(1, 9))
+        assert index.backfill_missing(collection) == 0
+        assert sorted(index.top_documents(centers[1].tolist(), 2)) == [2, 6]
+
+    def test_empty_index(self, chunk_collection):
+        """
+        测试目的：验证空索引返回空列表
+        """
+        client, collection, centers = chunk_collection
+        index = DocumentCentroidIndex(client, collection.name)
+        assert index.top_documents(centers[0].tolist(), 5) == []
+
+    def test_scope_filter(self):
+        """
+        测试目的：验证文档范围过滤条件及与已有条件的组合
+        """
+        assert scope_filter([1, 2]) == {"doc_id": {"$in": [1, 2]}}
+        assert scope_filter([1], {"source": "a"}) == {"$and": [{"source": "a"}, {"doc_id": {"$in": [1]}}]}
+
+
+class TestTwoStageRetriever:
+    """
+    类级注释：两阶段检索测试类
+    """
+
+    def _vector_db(self, client, collection, query_vector):
+        """
+        函数级注释：构造模拟的 LangChain Chroma 实例
+        """
+        vector_db = MagicMock()
+        vector_db._client = client
+        vector_db._collection = collection
+        vector_db.embeddings.embed_query.return_value = query_vector
+        vector_db.similarity_search_by_vector_with_relevance_scores.return_value = [
+            (Document(page_content="片段", metadata={"doc_id": 2}), 0.1)
+        ]
+        return vector_db
+
+    def test_scopes_chunk_search_to_top_documents(self, chunk_collection):
+        """
+        测试目的：验证第二阶段按质心选出的文档过滤，且查询只向量化一次
+        """
+        client, collection, centers = chunk_collection
+        DocumentCentroidIndex(client, collection.name).rebuild(collection)
+        vector_db = self._vector_db(client, collection, centers[1].tolist())
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr("app.services.retrieval.vector_retriever.settings.retrieval_config.TWO_STAGE_TOP_DOCS", 2)
+            results = VectorRetriever(vector_db, two_stage=True).search_with_scores("查询", k=3)
+
+        assert results[0][0].metadata["doc_id"] == 2
+        vector_db.embeddings.embed_query.assert_called_once_with("查询")
+        call = vector_db.similarity_search_by_vector_with_relevance_scores.call_args
+        assert sorted(call.kwargs["filter"]["doc_id"]["$in"]) == [2, 6]
+        vector_db.similarity_search_with_score.assert_not_called()
+
+    def test_two_stage_with_mmr(self, chunk_collection):
+        """
+        测试目的：验证两阶段与 MMR 组合时结果限定在选中文档内，且只向量化一次
+        """
+        client, collection, centers = chunk_collection
+        DocumentCentroidIndex(client, collection.name).rebuild(collection)
+        vector_db = self._vector_db(client, collection, centers[2].tolist())
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr("app.services.retrieval.vector_retriever.settings.retrieval_config.TWO_STAGE_TOP_DOCS", 2)
+            docs = VectorRetriever(vector_db, two_stage=True).search(
+                "查询", k=4, mmr_options=MMROptions(enabled=True, lambda_mult=0.5, fetch_k=10)
+            )
+
+        assert len(docs) == 4
+        assert {doc.metadata["doc_id"] for doc in docs} <= {3, 7}
+        vector_db.embeddings.embed_query.assert_called_once()
+
+    def test_falls_back_when_index_empty(self, chunk_collection):
+        """
+        测试目的：验证质心索引为空时回退到全量片段检索（不加范围过滤）
+        """
+        client, collection, centers = chunk_collection
+        vector_db = self._vector_db(client, collection, centers[0].tolist())
+
+        VectorRetriever(vector_db, two_stage=True).search("查询", k=3)
+
+        call = vector_db.similarity_search_by_vector_with_relevance_scores.call_args
+        assert call.kwargs["filter"] is None
+
+    @pytest.mark.asyncio
+    async def test_semantic_search_uses_two_stage_without_mmr(self, chunk_collection, monkeypatch):
+        """
+        测试目的：验证启用两阶段检索后搜索接口的普通检索（未启用 MMR）同样按质心限定文档范围
+        """
+        from app.core.config import settings
+        from app.services.search_service import SearchService
+
+        client, collection, centers = chunk_collection
+        DocumentCentroidIndex(client, collection.name).rebuild(collection)
+        vector_db = self._vector_db(client, collection, centers[1].tolist())
+        monkeypatch.setattr(settings.retrieval_config, "ENABLE_TWO_STAGE_RETRIEVAL", True)
+        monkeypatch.setattr(settings.retrieval_config, "TWO_STAGE_TOP_DOCS", 2)
+        monkeypatch.setattr("app.services.search_service.Chroma", MagicMock(return_value=vector_db))
+
+        results = await SearchService.semantic_search("查询", top_k=3, enable_reranking=False, use_mmr=False)
+
+        assert [result.doc_id for result in results] == [2]
+        call = vector_db.similarity_search_by_vector_with_relevance_scores.call_args
+        assert sorted(call.kwargs["filter"]["doc_id"]["$in"]) == [2, 6]
+        vector_db.similarity_search_with_score.assert_not_called()
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：对话处理管道测试模块
+内部逻辑：使用带延迟的测试处理器验证依赖调度、并发执行、耗时记录与错误语义
+测试覆盖范围：
+    - ChatPipeline: 顺序语义、依赖调度、并发、数据库处理器串行、异常传播与取消
+    - ChatPipelineBuilder: 并发初始化与检索处理器组合
+    - ChatOrchestrator._init_components: 对话与流式对话经管道并发初始化组件
+"""
+
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from langchain_core.documents import Document
+
+from app.schemas.chat import SourceInfo
+from app.services.chat.pipeline import (
+    ChatPipeline,
+    ChatPipelineBuilder,
+    PipelineContext,
+    PipelineHandler,
+)
+
+
+class SleepHandler(PipelineHandler):
+    """
+    类级注释：测试处理器，等待指定时间并记录执行顺序
+    """
+
+    def __init__(self, name, delay=0.0, depends_on=None, uses_db=False, error=None, log=None):
+        self.name = name
+        self.delay = delay
+        self.depends_on = depends_on
+        self.uses_db = uses_db
+        self.error = error
+        self.log = log if log is not None else []
+        self.cancelled = False
+
+    async def _process(self, context):
+        self.log.append(f"start:{self.name}")
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        self.log.append(f"end:{self.name}")
+        context.set(self.name, True)
+        return self.name
+
+
+def make_context():
+    """
+    函数级注释：构造测试用管道上下文
+    """
+    return PipelineContext(request=MagicMock(message="问题", history=[]), db=MagicMock())
+
+
+class TestChatPipeline:
+    """
+    类级注释：对话处理管道测试类
+    """
+
+    @pytest.mark.asyncio
+    async def test_implicit_dependencies_keep_sequential_order(self):
+        """
+        测试目的：验证未声明依赖的处理器按添加顺序依次执行，返回最后一个处理器的结果
+        """
+        log = []
+        pipeline = ChatPipeline()
+        for name in ("a", "b", "c"):
+            pipeline.add_handler(SleepHandler(name, 0.01, log=log))
+
+        result = await pipeline.execute(make_context())
+
+        assert result == "c"
+        assert log == ["start:a", "end:a", "start:b", "end:b", "start:c", "end:c"]
+
+    @pytest.mark.asyncio
+    async def test_independent_handlers_run_concurrently(self):
+        """
+        测试目的：验证互不依赖的处理器并发执行，并记录每个处理器的耗时
+        """
+        pipeline = ChatPipeline()
+        pipeline.add_handler(SleepHandler("llm", 0.1, depends_on=()))
+        pipeline.add_handler(SleepHandler("vector_store", 0.1, depends_on=()))
+        pipeline.add_handler(SleepHandler("retrieval", 0.05, depends_on=("vector_store",)))
+        pipeline.add_handler(SleepHandler("response"))
+        context = make_context()
+
+        start = time.perf_counter()
+        await pipeline.execute(context)
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.22
+        assert set(context.timings) == {"llm", "vector_store", "retrieval", "response"}
+        assert context.timings["llm"] >= 90
+
+    @pytest.mark.asyncio
+    async def test_dependency_order(self):
+        """
+        测试目的：验证处理器在依赖完成后才启动，隐式依赖会等待之前的全部处理器
+        """
+        log = []
+        pipeline = ChatPipeline()
+        pipeline.add_handler(SleepHandler("slow", 0.05, depends_on=(), log=log))
+        pipeline.add_handler(SleepHandler("fast", 0.0, depends_on=(), log=log))
+        pipeline.add_handler(SleepHandler("after_fast", 0.0, depends_on=("fast",), log=log))
+        pipeline.add_handler(SleepHandler("last", log=log))
+
+        await pipeline.execute(make_context())
+
+        assert log.index("start:after_fast") < log.index("end:slow")
+        assert log.index("start:last") > log.index("end:slow")
+
+    @pytest.mark.asyncio
+    async def test_db_handlers_are_serialized(self):
+        """
+        测试目的：验证使用数据库会话的处理器不会并发执行
+        """
+        log = []
+        pipeline = ChatPipeline()
+        pipeline.add_handler(SleepHandler("db1", 0.02, depends_on=(), uses_db=True, log=log))
+        pipeline.add_handler(SleepHandler("db2", 0.02, depends_on=(), uses_db=True, log=log))
+
+        await pipeline.execute(make_context())
+
+        assert log in (
+            ["start:db1", "end:db1", "start:db2", "end:db2"],
+            ["start:db2", "end:db2", "start:db1", "end:db1"],
+        )
+
+    @pytest.mark.asyncio
+    async def test_error_propagates_and_cancels_others(self):
+        """
+        测试目的：验证处理器失败时抛出原异常、取消仍在执行的处理器且不再启动后续处理器
+        """
+        log = []
+        slow = SleepHandler("slow", 1.0, depends_on=(), log=log)
+        pipeline = ChatPipeline()
+        pipeline.add_handler(slow)
+        pipeline.add_handler(SleepHandler("broken", 0.01, depends_on=(), error=RuntimeError("失败"), log=log))
+        pipeline.add_handler(SleepHandler("after", log=log))
+
+        with pytest.raises(RuntimeError, match="失败"):
+            await pipeline.execute(make_context())
+
+        assert slow.cancelled
+        assert "start:after" not in log
+
+    def test_invalid_dependencies(self):
+        """
+        测试目的：验证依赖未添加的处理器或名称重复时抛出 ValueError
+        """
+        pipeline = ChatPipeline().add_handler(SleepHandler("a"))
+
+        with pytest.raises(ValueError):
+            pipeline.add_handler(SleepHandler("b", depends_on=("missing",)))
+        with pytest.raises(ValueError):
+            pipeline.add_handler(SleepHandler("a"))
+
+    @pytest.mark.asyncio
+    async def test_empty_pipeline(self):
+        """
+        测试目的：验证空管道返回 None
+        """
+        assert await ChatPipeline().execute(make_context()) is None
+
+
+class TestChatPipelineBuilder:
+    """
+    类级注释：对话管道建造者测试类
+    """
+
+    @pytest.mark.asyncio
+    async def test_builds_concurrent_rag_pipeline(self):
+        """
+        测试目的：验证建造的管道完成 LLM、向量库、历史、检索与来源处理，并记录各处理器耗时
+        """
+        vector_db = MagicMock()
+        vector_db.similarity_search_with_score.return_value = [
+            (Document(page_content="片段", metadata={"doc_id": 7, "chunk_id": "7_0"}), 0.2)
+        ]
+        sources_processor = MagicMock()
+
+        async def process(doc_ids, db, documents=None):
+            return [
+                SourceInfo(doc_id=doc.metadata["doc_id"], file_name="a.pdf", text_segment=doc.page_content,
+                           score=doc.metadata["score"], chunk_id=doc.metadata["chunk_id"])
+                for doc in documents
+            ]
+        sources_processor.process = process
+
+        async def get_llm(db, streaming=False):
+            return "llm"
+
+        pipeline = (
+            ChatPipelineBuilder()
+            .with_llm_init()
+            .with_history()
+            .with_retrieval()
+            .with_source_processing(sources_processor)
+            .with_response_building()
+            .build()
+        )
+        context = make_context()
+        context.request.use_mmr = False
+        context.request.mmr_lambda = None
+
+        with patch("app.services.llm_provider.llm_provider.get_llm", side_effect=get_llm), \
+             patch("langchain_community.vectorstores.Chroma", return_value=vector_db), \
+             patch("app.services.ingest_service.IngestService.get_embeddings"):
+            response = await pipeline.execute(context)
+
+        assert context.get("llm") == "llm"
+        assert context.get("doc_ids") == [7]
+        assert context.get("history") == []
+        assert [(source.doc_id, source.chunk_id, source.score) for source in context.get("sources")] == [(7, "7_0", 0.8)]
+        assert response is context.get("response")
+        assert set(context.timings) == {
+            "vector_store", "llm", "history", "retrieval",
+            "SourceProcessingHandler", "ResponseBuildingHandler"
+        }
+
+    @pytest.mark.asyncio
+    async def test_orchestrator_initializes_components_concurrently(self):
+        """
+        测试目的：验证编排器通过管道初始化组件，向量库创建与模型获取并发执行
+        """
+        from app.services.chat.orchestrator import ChatOrchestrator
+
+        async def get_llm(db, streaming=False):
+            await asyncio.sleep(0.1)
+            return f"llm:{streaming}"
+
+        def create_chroma(**kwargs):
+            time.sleep(0.1)
+            return "vector_db"
+
+        started = time.perf_counter()
+        with patch("app.services.llm_provider.llm_provider.get_llm", side_effect=get_llm), \
+             patch("langchain_community.vectorstores.Chroma", side_effect=create_chroma), \
+             patch("app.services.ingest_service.IngestService.get_embeddings", return_value="embeddings"):
+            context = await ChatOrchestrator._init_components(MagicMock(), MagicMock(), streaming=True)
+
+        assert time.perf_counter() - started < 0.18
+        assert (context.get("embeddings"), context.get("vector_db"), context.get("llm")) == (
+            "embeddings", "vector_db", "llm:True"
+        )
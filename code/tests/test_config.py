@@ -12,7 +12,8 @@
     5. DatabaseConfig配置
     6. StorageConfig配置
     7. SecurityConfig配置
-    8. 验证器
+    8. TaskConfig配置
+    9. 验证器
 """
 
 import pytest
@@ -28,6 +29,7 @@ from app.core.config import (
     DatabaseConfig,
     StorageConfig,
     SecurityConfig,
+    TaskConfig,
     DatabaseProviderValidator,
     LLMProviderValidator,
     TimezoneValidator,
@@ -77,6 +79,7 @@ class TestSettingsBasic:
         assert isinstance(s.db_config, DatabaseConfig)
         assert isinstance(s.storage_config, StorageConfig)
         assert isinstance(s.security_config, SecurityConfig)
+        assert isinstance(s.task_config, TaskConfig)
 
     def test_use_mock_default(self):
         """
@@ -282,6 +285,44 @@ class TestLLMConfig:
         assert config.ENABLE_RERANKING is True
         assert config.RERANKING_MODEL == "BAAI/bge-reranker-large"
 
+    def test_agent_tool_timeout(self):
+        """
+        函数级注释：测试 Agent 工具调用超时配置
+
+        内部逻辑：验证默认值、Settings 访问器与非正数校验
+        预期结果：默认 30 秒，非正数被拒绝
+        """
+        assert LLMConfig().AGENT_TOOL_TIMEOUT == 30.0
+        assert Settings().AGENT_TOOL_TIMEOUT == 30.0
+        with pytest.raises(ValidationError):
+            LLMConfig(AGENT_TOOL_TIMEOUT=0)
+
+    def test_summary_defaults(self):
+        """
+        函数级注释：测试文档总结配置
+
+        内部逻辑：验证默认值、Settings 访问器与非正数校验
+        预期结果：片段组 4000 字符、并发 4，非正数被拒绝
+        """
+        config = LLMConfig()
+        assert config.SUMMARY_GROUP_CHARS == 4000
+        assert config.SUMMARY_MAX_CONCURRENCY == 4
+        assert Settings().SUMMARY_MAX_CONCURRENCY == 4
+        with pytest.raises(ValidationError):
+            LLMConfig(SUMMARY_MAX_CONCURRENCY=0)
+
+    def test_config_cache_sync_seconds(self):
+        """
+        函数级注释：测试模型配置版本检查间隔
+
+        内部逻辑：验证默认值、Settings 访问器与负数校验
+        预期结果：默认 0（不检查），负数被拒绝
+        """
+        assert LLMConfig().CONFIG_CACHE_SYNC_SECONDS == 0.0
+        assert Settings().CONFIG_CACHE_SYNC_SECONDS == 0.0
+        with pytest.raises(ValidationError):
+            LLMConfig(CONFIG_CACHE_SYNC_SECONDS=-1)
+
 
 # ============================================================================
 # DatabaseConfig测试
@@ -351,6 +392,42 @@ class TestStorageConfig:
         assert config.LOCAL_MODEL_DIR == "./models"
 
 
+# ============================================================================
+# TaskConfig测试
+# ============================================================================
+
+class TestTaskConfig:
+    """
+    类级注释：后台任务配置测试类
+    职责：测试TaskConfig的配置
+    """
+
+    def test_document_insight_defaults(self):
+        """
+        函数级注释：测试文档预生成配置
+
+        内部逻辑：验证默认值、Settings 访问器与负数校验
+        预期结果：默认关闭，节流 5 秒、空闲 10 秒，负数被拒绝
+        """
+        config = TaskConfig()
+        assert config.ENABLE_DOCUMENT_INSIGHTS is False
+        assert config.INSIGHT_THROTTLE_SECONDS == 5.0
+        assert config.INSIGHT_IDLE_SECONDS == 10.0
+        assert Settings().INSIGHT_IDLE_SECONDS == 10.0
+        with pytest.raises(ValidationError):
+            TaskConfig(INSIGHT_THROTTLE_SECONDS=-1)
+
+    def test_request_coalescing_default(self):
+        """
+        函数级注释：测试请求合并开关
+
+        内部逻辑：验证默认值与 Settings 访问器
+        预期结果：默认开启
+        """
+        assert TaskConfig().ENABLE_REQUEST_COALESCING is True
+        assert Settings().ENABLE_REQUEST_COALESCING is True
+
+
 # ============================================================================
 # SecurityConfig测试
 # ============================================================================
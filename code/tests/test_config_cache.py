@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：模型配置缓存测试模块
+内部逻辑：使用测试数据库中的模型配置，统计查询数据库的次数，
+         验证对话读取配置命中缓存、写入配置与配置管理器失效缓存、以及跨进程版本检查
+测试覆盖范围：
+    - ConfigCache: 代次保护、版本检查
+    - BaseConfigService.get_cached_default_config: 缓存副本、写入后失效
+    - LLMProvider.get_llm: 不再每次查询数据库
+    - ConfigManager: 配置变更事件失效缓存
+"""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+import pytest_asyncio
+
+from app.core.config_cache import ConfigCache, config_cache, LLM_CONFIG_CACHE
+from app.core.config_manager import ConfigEventType, ConfigManager
+from app.models.model_config import ModelConfig
+from app.services.llm_provider import llm_provider
+from app.services.model_config_service import ModelConfigService
+
+
+def make_config(config_id: str, model: str, status: int) -> ModelConfig:
+    """
+    函数级注释：构造模型配置
+    """
+    return ModelConfig(
+        id=config_id, provider_id="ollama", provider_name="Ollama", endpoint="http://localhost:11434",
+        model_id=model, model_name=model, status=status,
+    )
+
+
+@pytest_asyncio.fixture
+async def configs(db_session):
+    """
+    函数级注释：写入两个模型配置（第一个启用）
+    返回值：数据库会话
+    """
+    db_session.add_all([make_config("cfg-a", "qwen", 1), make_config("cfg-b", "deepseek", 0)])
+    await db_session.commit()
+    return db_session
+
+
+@pytest.fixture
+def count_queries():
+    """
+    函数级注释：统计 ModelConfigService.get_default_config 的调用次数
+    """
+    original = ModelConfigService.get_default_config
+    with patch.object(ModelConfigService, "get_default_config", side_effect=original) as mock:
+        yield mock
+
+
+@pytest.mark.asyncio
+async def test_chat_requests_read_config_from_memory(configs, count_queries):
+    """
+    测试目的：验证多次对话只查询一次数据库，缓存的是与会话无关的副本
+    """
+    with patch("app.services.llm_provider.LLMFactory") as factory:
+        for _ in range(5):
+            await llm_provider.get_llm(configs, streaming=True)
+
+    assert count_queries.call_count == 1
+    cached = factory.create_from_model_config.call_args[0][0]
+    assert cached.model_name == "qwen"
+    assert cached not in configs
+    assert config_cache.get_stats()["hits"] == 4
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_cache(configs, count_queries):
+    """
+    测试目的：验证启用其他配置、更新密钥后重新读取数据库，得到新的配置
+    """
+    assert (await ModelConfigService.get_cached_default_config(configs)).model_name == "qwen"
+
+    with patch.object(ModelConfigService, "_reload_config"):
+        await ModelConfigService.set_default_config(configs, "cfg-b")
+        assert (await ModelConfigService.get_cached_default_config(configs)).model_name == "deepseek"
+
+        await ModelConfigService.update_api_key(configs, "cfg-b", "sk-new")
+        assert (await ModelConfigService.get_cached_default_config(configs)).api_key == "sk-new"
+
+    assert count_queries.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_config_manager_events_invalidate_cache(configs, count_queries):
+    """
+    测试目的：验证配置管理器发布 LLM 配置变更后缓存失效，其他事件不影响 LLM 配置缓存
+    """
+    await ModelConfigService.get_cached_default_config(configs)
+
+    await ConfigManager().update_config({}, ConfigEventType.EMBEDDING_CHANGED)
+    await ModelConfigService.get_cached_default_config(configs)
+    assert count_queries.call_count == 1
+
+    await ConfigManager().update_config({}, ConfigEventType.LLM_CHANGED)
+    await ModelConfigService.get_cached_default_config(configs)
+    assert count_queries.call_count == 2
+
+
+def test_stale_read_not_cached_after_invalidation():
+    """
+    测试目的：验证读取数据库期间发生写入时，读到的旧配置不写回缓存
+    """
+    cache = ConfigCache()
+    generation = cache.generation(LLM_CONFIG_CACHE)
+
+    cache.invalidate(LLM_CONFIG_CACHE)
+
+    assert cache.set(LLM_CONFIG_CACHE, MagicMock(), generation) is False
+    assert cache.get(LLM_CONFIG_CACHE) == (False, None)
+
+
+@pytest.mark.asyncio
+async def test_version_row_notifies_other_workers(configs, count_queries, monkeypatch):
+    """
+    测试目的：验证启用跨进程版本检查后，其他进程写入配置会使本进程缓存失效
+    """
+    monkeypatch.setattr("app.core.config.settings.llm_config.CONFIG_CACHE_SYNC_SECONDS", 0.001)
+    other_worker = ConfigCache()
+
+    await ModelConfigService.get_cached_default_config(configs)
+    await other_worker.bump(configs, LLM_CONFIG_CACHE)
+
+    # 内部逻辑：其他进程直接修改数据库（本进程的写入路径未经过）
+    config = await configs.get(ModelConfig, "cfg-a")
+    config.model_name = "qwen2"
+    await configs.commit()
+
+    await asyncio.sleep(0.01)
+    assert (await ModelConfigService.get_cached_default_config(configs)).model_name == "qwen2"
+    assert count_queries.call_count == 2
+    assert config_cache.get_stats()["versions"][LLM_CONFIG_CACHE] == 1
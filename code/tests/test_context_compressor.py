@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：参考资料抽取式压缩测试模块
+内部逻辑：验证按与问题的词语重合度保留句子、删除跨片段重复的句子、短片段与未启用时原样保留，
+         以及请求级开关生效并在回答中返回压缩比例
+测试覆盖范围：
+    - ContextCompressor.compress: 句子选择、预算、重复句子、压缩比例
+    - CompressionOptions.resolve: 请求参数覆盖全局配置
+    - RAGStrategy.execute: 压缩后的参考资料进入提示词
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableLambda
+
+from app.schemas.chat import ChatRequest
+from app.services.chat.context_compressor import (
+    CompressionOptions,
+    ContextCompressor,
+    extract_terms,
+    split_sentences,
+)
+from app.services.chat.strategies import RAGStrategy
+
+# 内部变量：每个片段都带有的页眉
+HEADER = "员工手册 2024 版 第三章 休假制度。"
+
+# 内部变量：检索片段
+DOCUMENTS = [
+    Document(
+        page_content=HEADER + "员工每年享有 5 天带薪年假，入职满一年后可申请。病假需提供医院证明。"
+                              "加班应提前在系统中申请并由主管审批。公司每年组织一次团建活动，地点由行政部门确定。",
+        metadata={"doc_id": 1}
+    ),
+    Document(
+        page_content=HEADER + "未休年假可顺延至次年三月底。婚假为三天，产假按国家规定执行。办公用品由行政部统一采购。",
+        metadata={"doc_id": 2}
+    ),
+]
+
+QUESTION = "年假有几天？未休的年假怎么处理"
+
+
+def compressor(ratio: float = 0.5, min_tokens: int = 8) -> ContextCompressor:
+    """
+    函数级注释：创建启用压缩的压缩器
+    """
+    return ContextCompressor(CompressionOptions(enabled=True, ratio=ratio, min_tokens=min_tokens))
+
+
+def test_keeps_relevant_sentences_in_order():
+    """
+    测试目的：验证每个片段只保留与问题相关的句子，删除页眉与无关句子，并报告压缩比例
+    """
+    result = compressor().compress(QUESTION, DOCUMENTS)
+
+    assert [doc.page_content for doc in result.documents] == [
+        "员工每年享有 5 天带薪年假，入职满一年后可申请。",
+        "未休年假可顺延至次年三月底。",
+    ]
+    assert all(doc.metadata["compressed"] for doc in result.documents)
+    assert [doc.metadata["doc_id"] for doc in result.documents] == [1, 2]
+    assert result.compressed_documents == 2
+    assert 0 < result.ratio < 0.5
+    assert result.ratio == round(result.compressed_tokens / result.original_tokens, 4)
+
+
+def test_repeated_sentences_removed_across_chunks():
+    """
+    测试目的：验证在前面片段出现过的句子被删除，只剩重复句子的片段被丢弃
+    """
+    documents = [
+        Document(page_content=HEADER + "年假为 5 天。"),
+        Document(page_content=HEADER),
+        Document(page_content=HEADER + "年假可分次使用。"),
+    ]
+
+    result = compressor(ratio=1.0, min_tokens=64).compress(QUESTION, documents)
+
+    assert [doc.page_content for doc in result.documents] == [
+        HEADER + "年假为 5 天。",
+        "年假可分次使用。",
+    ]
+    assert result.dropped_documents == 1
+
+
+def test_chunk_without_overlap_keeps_leading_sentences():
+    """
+    测试目的：验证片段中没有与问题重合的句子时，按原顺序保留开头的句子
+    """
+    doc = Document(page_content="第一句说明背景情况。第二句补充其他细节。第三句给出最终结论。第四句列出参考链接。")
+
+    result = compressor(ratio=0.5, min_tokens=1).compress("What is the policy", [doc])
+
+    assert result.documents[0].page_content == "第一句说明背景情况。 第二句补充其他细节。"
+
+
+def test_disabled_and_short_chunks_unchanged():
+    """
+    测试目的：验证未启用时原样返回且不报告比例；短片段不压缩
+    """
+    disabled = ContextCompressor(CompressionOptions(enabled=False)).compress(QUESTION, DOCUMENTS)
+    assert disabled.documents == DOCUMENTS and disabled.ratio is None
+
+    short = compressor(min_tokens=1000).compress(QUESTION, DOCUMENTS[:1])
+    assert short.documents[0] is DOCUMENTS[0]
+    assert short.ratio == 1.0
+
+
+def test_sentence_and_term_extraction():
+    """
+    测试目的：验证中英文句子切分与词语提取
+    """
+    assert split_sentences("第一句。Second one. Third?\n第四句") == ["第一句。", "Second one.", "Third?", "第四句"]
+    assert extract_terms("The HR portal 年假") == {"hr", "portal", "年假"}
+
+
+def test_request_overrides_global_config(monkeypatch):
+    """
+    测试目的：验证请求参数优先于全局配置
+    """
+    monkeypatch.setattr("app.core.config.settings.retrieval_config.ENABLE_CONTEXT_COMPRESSION", True)
+    monkeypatch.setattr("app.core.config.settings.retrieval_config.CONTEXT_COMPRESSION_RATIO", 0.4)
+
+    assert CompressionOptions.resolve() == CompressionOptions(enabled=True, ratio=0.4, min_tokens=48)
+    assert CompressionOptions.resolve(False, 0.8).enabled is False
+    assert CompressionOptions.resolve(None, 0.8).ratio == 0.8
+
+
+@pytest.mark.asyncio
+async def test_rag_prompt_uses_compressed_context():
+    """
+    测试目的：验证请求启用压缩后提示词只包含保留的句子，回答中返回压缩比例
+    """
+    prompts = []
+
+    async def async_llm(prompt):
+        prompts.append(prompt.to_string())
+        return "每年 5 天"
+
+    llm = RunnableLambda(lambda prompt: "每年 5 天", afunc=async_llm)
+    request = ChatRequest(message=QUESTION, compress_context=True, compression_ratio=0.5)
+
+    with patch("app.services.chat.strategies.MultiQueryRetriever") as retriever:
+        retriever.return_value.asearch = AsyncMock(return_value=DOCUMENTS)
+        answer = await RAGStrategy(MagicMock(), llm).execute(request, MagicMock())
+
+    assert "入职满一年后可申请" in prompts[0]
+    assert HEADER not in prompts[0] and "团建" not in prompts[0]
+    assert 0 < answer.compression_ratio < 1
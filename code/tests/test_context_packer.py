@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：上下文打包测试模块
+内部逻辑：验证 Token 计数、按预算装入历史消息与检索片段、按模型选择预算以及会话历史取最近消息
+测试覆盖范围：
+    - count_tokens / truncate_to_tokens: 与原估算器一致、按预算截断
+    - ContextPacker: 历史从新到旧装入、片段按相关性截断与丢弃
+    - resolve_budget: 按模型前缀覆盖预算
+    - ConversationService._recent_history: 取最近的历史消息
+"""
+
+import pytest
+from langchain_core.documents import Document
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.token_pricing import TokenPricingCalculator
+from app.schemas.chat import ChatMessage
+from app.services.chat.context_packer import ContextPacker, resolve_budget
+from app.utils.token_counter import count_tokens, truncate_to_tokens
+
+
+class TestTokenCounter:
+    """
+    类级注释：Token 计数测试类
+    """
+
+    @pytest.mark.parametrize("text", [
+        "你好世界，hello world-1 foo_bar!",
+        "中文" * 200 + " mixed English words " * 30,
+        "RAG 检索增强生成 (Retrieval-Augmented Generation) 2024",
+    ])
+    def test_matches_pricing_estimator(self, text):
+        """
+        测试目的：验证与 TokenPricingCalculator.estimate_tokens 的估算结果一致
+        """
+        assert count_tokens(text) == TokenPricingCalculator.estimate_tokens(text)
+
+    def test_empty_text(self):
+        """
+        测试目的：验证空文本计为 0
+        """
+        assert count_tokens("") == 0
+
+    def test_truncate(self):
+        """
+        测试目的：验证截断后不超过预算，未超预算时原样返回
+        """
+        text = "一二三四五六 abc def"
+        assert truncate_to_tokens(text, 4) == "一二三四五六"
+        assert truncate_to_tokens(text, 100) == text
+        assert truncate_to_tokens(text, 0) == ""
+
+
+class TestContextPacker:
+    """
+    类级注释：上下文打包器测试类
+    """
+
+    def test_everything_fits(self):
+        """
+        测试目的：验证预算充足时全部装入并统计 Token 数
+        """
+        docs = [Document(page_content="苹果" * 30, metadata={"doc_id": 1})]
+        history = [ChatMessage(role="user", content="你好"), ChatMessage(role="assistant", content="你好呀")]
+
+        packed = ContextPacker(1000, history_ratio=0.5).pack("问题", docs, history)
+
+        assert packed.documents == docs
+        assert [m["content"] for m in packed.history] == ["你好", "你好呀"]
+        assert packed.total_tokens == count_tokens("问题") + count_tokens("你好") + count_tokens("你好呀") + 40
+        assert "用户: 你好\n助手: 你好呀" in packed.format_history_block()
+
+    def test_history_keeps_most_recent(self):
+        """
+        测试目的：验证历史预算不足时保留最近的消息，丢弃较早的消息
+        """
+        history = [{"role": "user", "content": f"第{i}轮" + "字" * 28} for i in range(10)]
+
+        packed = ContextPacker(200, history_ratio=0.5).pack("", [], history)
+
+        assert [m["content"][:3] for m in packed.history] == ["第6轮", "第7轮", "第8轮", "第9轮"]
+        assert packed.dropped_history == 6
+        assert packed.history_tokens <= 100
+
+    def test_documents_truncated_then_dropped_by_relevance(self):
+        """
+        测试目的：验证片段按相关性装入，超出预算的片段被截断，剩余预算过小时丢弃
+        """
+        docs = [
+            Document(page_content="甲" * 150, metadata={"doc_id": 1}),
+            Document(page_content="乙" * 150, metadata={"doc_id": 2}),
+            Document(page_content="丙" * 150, metadata={"doc_id": 3}),
+        ]
+
+        packed = ContextPacker(170, history_ratio=0).pack("", docs)
+
+        assert [doc.metadata["doc_id"] for doc in packed.documents] == [1, 2]
+        assert packed.documents[1].metadata["truncated"] is True
+        assert packed.truncated_documents == 1
+        assert packed.dropped_documents == 1
+        assert packed.document_tokens <= 170
+
+    def test_smaller_lower_ranked_document_still_fits(self):
+        """
+        测试目的：验证丢弃过长片段后仍会装入后续较短的片段
+        """
+        docs = [
+            Document(page_content="甲" * 60, metadata={"doc_id": 1}),
+            Document(page_content="乙" * 300, metadata={"doc_id": 2}),
+            Document(page_content="丙" * 30, metadata={"doc_id": 3}),
+        ]
+
+        packed = ContextPacker(80, history_ratio=0).pack("", docs)
+
+        assert [doc.metadata["doc_id"] for doc in packed.documents] == [1, 3]
+        assert packed.dropped_documents == 1
+
+
+class TestResolveBudget:
+    """
+    类级注释：按模型选择预算测试类
+    """
+
+    def test_longest_prefix_wins(self, monkeypatch):
+        """
+        测试目的：验证最长前缀匹配，未匹配时使用默认预算
+        """
+        monkeypatch.setattr(
+            "app.core.config.settings.retrieval_config.CONTEXT_MODEL_BUDGETS",
+            "glm:4000, glm-4-plus:8000,bad"
+        )
+        monkeypatch.setattr("app.core.config.settings.retrieval_config.CONTEXT_TOKEN_BUDGET", 3000)
+
+        assert resolve_budget("GLM-4-Plus-0111") == 8000
+        assert resolve_budget("glm-3-turbo") == 4000
+        assert resolve_budget("qwen2") == 3000
+        assert resolve_budget(None) == 3000
+
+
+@pytest.mark.asyncio
+async def test_recent_history_returns_latest_messages(db_session: AsyncSession):
+    """
+    测试目的：验证发送消息时读取的是最近的历史消息（按时间正序），且不含当前消息
+    """
+    from app.models.conversation import Conversation, Message, MessageRole
+    from app.services.conversation_service import ConversationService
+
+    conversation = Conversation(title="历史测试")
+    db_session.add(conversation)
+    await db_session.flush()
+
+    messages = []
+    for i in range(30):
+        message = Message(
+            conversation_id=conversation.id,
+            role=MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+            content=f"消息{i}"
+        )
+        db_session.add(message)
+        await db_session.flush()
+        messages.append(message)
+
+    history = await ConversationService._recent_history(db_session, conversation.id, messages[-1].id, limit=5)
+
+    assert [m.content for m in history] == ["消息24", "消息25", "消息26", "消息27", "消息28"]
@@ -20,6 +20,7 @@ from app.schemas.conversation import (
 )
 from app.models.conversation import Conversation, Message, MessageSource, TokenUsage, MessageRole
 from app.models.models import Document
+from app.utils.stream_events import StreamEvent, as_stream_events
 
 
 class TestConversationServiceCreate:
@@ -540,7 +541,7 @@ class TestConversationServiceSendMessageStream:
     async def test_send_message_stream_with_mock(self, db_session: AsyncSession):
         """
         函数级注释：测试流式发送消息（mock）
-        内部逻辑：mock ChatService.stream_chat_completion
+        内部逻辑：mock ChatService.stream_chat_events
         参数：
             db_session: 测试数据库会话
         """
@@ -551,12 +552,12 @@ class TestConversationServiceSendMessageStream:
 
         # Mock ChatService
         async def mock_stream():
-            yield 'data: {"answer": "你", "sources": []}\n\n'
-            yield 'data: {"answer": "好", "sources": []}\n\n'
-            yield 'data: {"answer": "！", "sources": []}\n\n'
+            yield StreamEvent(answer="你", sources=[])
+            yield StreamEvent(answer="好", sources=[])
+            yield StreamEvent(answer="！", sources=[])
 
         with patch('app.services.conversation_service.ChatService') as mock_chat:
-            mock_chat.stream_chat_completion = lambda db, req: mock_stream()
+            mock_chat.stream_chat_events = lambda db, req: mock_stream()
 
             chunks = []
             async for chunk in ConversationService.send_message_stream(
@@ -826,13 +827,13 @@ class TestConversationServiceMissingCoverage:
         # Mock ChatService流式响应
         async def mock_stream():
             # 内部逻辑：返回包含无效doc_id的sources
-            yield 'data: {"answer": "你好", "sources": [{"doc_id": 99999, "file_name": "不存在的文档.pdf", "text_segment": "内容", "score": 0.85}]}\n\n'
+            yield StreamEvent(answer="你好", sources=[{"doc_id": 99999, "file_name": "不存在的文档.pdf", "text_segment": "内容", "score": 0.85}])
 
         request = CreateConversationRequest(title="流式无效文档测试")
         conv = await ConversationService.create_conversation(db_session, request)
 
         with patch('app.services.conversation_service.ChatService') as mock_chat:
-            mock_chat.stream_chat_completion = lambda db, req: mock_stream()
+            mock_chat.stream_chat_events = lambda db, req: mock_stream()
 
             chunks = []
             async for chunk in ConversationService.send_message_stream(
@@ -849,8 +850,8 @@ class TestConversationServiceMissingCoverage:
     async def test_send_message_stream_json_decode_error(self, db_session: AsyncSession):
         """
         测试目的：覆盖行515-517（JSON解析异常）
-        测试场景：流式数据包含无效JSON
-        预期：应该捕获JSONDecodeError并继续
+        测试场景：策略产出的 SSE 文本包含无效JSON（编排器入口处转换为事件）
+        预期：无效帧被跳过，其余回答片段正常保存
         """
         send_request = SendMessageRequest(content="你好")
 
@@ -864,7 +865,7 @@ class TestConversationServiceMissingCoverage:
         conv = await ConversationService.create_conversation(db_session, request)
 
         with patch('app.services.conversation_service.ChatService') as mock_chat:
-            mock_chat.stream_chat_completion = lambda db, req: mock_stream()
+            mock_chat.stream_chat_events = lambda db, req: as_stream_events(mock_stream())
 
             chunks = []
             async for chunk in ConversationService.send_message_stream(
@@ -876,6 +877,11 @@ class TestConversationServiceMissingCoverage:
             assert len(chunks) > 0
             assert any('"done": true' in chunk for chunk in chunks)
 
+        result = await db_session.execute(
+            select(Message).where(Message.conversation_id == conv.id, Message.role == MessageRole.ASSISTANT)
+        )
+        assert result.scalar_one().content == "你好世界"
+
     @pytest.mark.asyncio
     async def test_send_message_stream_exception_handling(self, db_session: AsyncSession):
         """
@@ -887,14 +893,14 @@ class TestConversationServiceMissingCoverage:
 
         # Mock ChatService抛出异常
         async def mock_stream_error():
-            yield 'data: {"answer": "开始"}\n\n'
+            yield StreamEvent(answer="开始")
             raise Exception("流式处理异常")
 
         request = CreateConversationRequest(title="异常处理测试")
         conv = await ConversationService.create_conversation(db_session, request)
 
         with patch('app.services.conversation_service.ChatService') as mock_chat:
-            mock_chat.stream_chat_completion = lambda db, req: mock_stream_error()
+            mock_chat.stream_chat_events = lambda db, req: mock_stream_error()
 
             chunks = []
             async for chunk in ConversationService.send_message_stream(
@@ -972,13 +978,13 @@ class TestConversationServiceMissingCoverage:
 
         # Mock ChatService流式响应，包含sources
         async def mock_stream():
-            yield 'data: {"answer": "你好", "sources": [{"doc_id": null, "file_name": "test.pdf", "text_segment": "内容", "score": 0.9}]}\n\n'
+            yield StreamEvent(answer="你好", sources=[{"doc_id": None, "file_name": "test.pdf", "text_segment": "内容", "score": 0.9}])
 
         request = CreateConversationRequest(title="sources解析测试")
         conv = await ConversationService.create_conversation(db_session, request)
 
         with patch('app.services.conversation_service.ChatService') as mock_chat:
-            mock_chat.stream_chat_completion = lambda db, req: mock_stream()
+            mock_chat.stream_chat_events = lambda db, req: mock_stream()
 
             chunks = []
             async for chunk in ConversationService.send_message_stream(
@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：本地交叉编码器重排序测试模块
+内部逻辑：构造一个极小的本地 ONNX 交叉编码器（WordLevel 分词器 + 词权重求和），
+         验证批量推理、序列截断、分数缓存、超时回退以及搜索服务集成
+测试覆盖范围：
+    - CrossEncoderReranker: 加载、打分、缓存、超时、后台预热
+    - get_cross_encoder_reranker / warm_up_cross_encoder_reranker: 按配置获取实例、启动时预热
+    - quantize_onnx_model: int8 量化导出
+    - SearchService: 交叉编码器重排序集成
+"""
+
+import sys
+import time
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip("onnx")
+from onnx import TensorProto, helper  # noqa: E402
+from tokenizers import Tokenizer  # noqa: E402
+from tokenizers.models import WordLevel  # noqa: E402
+from tokenizers.pre_tokenizers import Whitespace  # noqa: E402
+from tokenizers.processors import TemplateProcessing  # noqa: E402
+
+from app.services.retrieval.cross_encoder import (  # noqa: E402
+    CrossEncoderReranker,
+    get_cross_encoder_reranker,
+    quantize_onnx_model,
+    reset_cross_encoder_reranker,
+    warm_up_cross_encoder_reranker,
+)
+from app.services.search_service import SearchService  # noqa: E402
+
+# 内部变量：极小模型的词表与词权重（仅候选片段一侧的词参与打分）
+VOCAB = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "苹果", "香蕉", "水果", "价格", "天气"]
+WEIGHTS = {"苹果": 3.0, "水果": 1.0, "价格": 0.5, "香蕉": -1.0, "天气": -3.0}
+
+
+def _build_tiny_model(model_dir) -> str:
+    """
+    函数级注释：在目录中生成极小的交叉编码器（tokenizer.json + model.onnx）
+    内部逻辑：logits = Σ 词权重 × attention_mask × token_type_ids
+    参数：
+        model_dir - 模型目录
+    返回值：模型目录路径
+    """
+    vocab = {token: i for i, token in enumerate(VOCAB)}
+    tokenizer = Tokenizer(WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    tokenizer.post_processor = TemplateProcessing(
+        single="[CLS] $A [SEP]",
+        pair="[CLS] $A [SEP] $B:1 [SEP]:1",
+        special_tokens=[("[CLS]", vocab["[CLS]"]), ("[SEP]", vocab["[SEP]"])]
+    )
+    tokenizer.save(str(model_dir / "tokenizer.json"))
+
+    table = np.array([[WEIGHTS.get(token, 0.0)] for token in VOCAB], dtype=np.float32)
+    nodes = [
+        helper.make_node("Gather", ["table", "input_ids"], ["gathered"]),
+        helper.make_node("Squeeze", ["gathered", "squeeze_axes"], ["token_scores"]),
+        helper.make_node("Cast", ["attention_mask"], ["mask_f"], to=TensorProto.FLOAT),
+        helper.make_node("Cast", ["token_type_ids"], ["type_f"], to=TensorProto.FLOAT),
+        helper.make_node("Mul", ["token_scores", "mask_f"], ["masked"]),
+        helper.make_node("Mul", ["masked", "type_f"], ["pair_scores"]),
+        helper.make_node("ReduceSum", ["pair_scores", "sum_axes"], ["logits"], keepdims=1),
+    ]
+    graph = helper.make_graph(
+        nodes,
+        "tiny_cross_encoder",
+        [
+            helper.make_tensor_value_info(name, TensorProto.INT64, ["batch", "seq"])
+            for name in ("input_ids", "attention_mask", "token_type_ids")
+        ],
+        [helper.make_tensor_value_info("logits", TensorProto.FLOAT, ["batch", 1])],
+        initializer=[
+            helper.make_tensor("table", TensorProto.FLOAT, table.shape, table.flatten().tolist()),
+            helper.make_tensor("squeeze_axes", TensorProto.INT64, [1], [2]),
+            helper.make_tensor("sum_axes", TensorProto.INT64, [1], [1]),
+        ]
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, str(model_dir / "model.onnx"))
+    return str(model_dir)
+
+
+@pytest.fixture
+def tiny_model_dir(tmp_path):
+    """
+    函数级注释：提供极小交叉编码器模型目录
+    返回值：模型目录路径
+    """
+    return _build_tiny_model(tmp_path)
+
+
+def _spy_predict(reranker: CrossEncoderReranker) -> list:
+    """
+    函数级注释：加载模型并记录每次前向计算的输入
+    参数：
+        reranker - 重排序器
+    返回值：list - 每次前向计算的 (查询, 片段) 对列表
+    """
+    predict = reranker._ensure_loaded()
+    calls = []
+
+    def spy(pairs):
+        calls.append(list(pairs))
+        return predict(pairs)
+
+    reranker._predict_fn = spy
+    return calls
+
+
+class TestCrossEncoderReranker:
+    """
+    类级注释：交叉编码器重排序器测试类
+    测试场景：
+        1. 打分顺序与模型一致
+        2. 全部候选一次前向计算
+        3. 序列长度截断
+        4. 分数缓存
+        5. 超时回退
+    """
+
+    def test_scores_follow_model(self, tiny_model_dir):
+        """
+        测试目的：验证自动选择 ONNX 后端并按模型输出打分
+        """
+        reranker = CrossEncoderReranker(tiny_model_dir)
+        scores = reranker.score("水果", [("a", "天气"), ("b", "苹果 价格"), ("c", "香蕉")])
+
+        assert reranker._resolve_backend() == "onnx"
+        assert scores[1] > scores[2] > scores[0]
+        assert all(0.0 < s < 1.0 for s in scores)
+        # 内部逻辑：sigmoid(3.5)
+        assert scores[1] == pytest.approx(1 / (1 + np.exp(-3.5)), rel=1e-5)
+
+    def test_all_pairs_in_one_forward_pass(self, tiny_model_dir):
+        """
+        测试目的：验证所有候选在一次前向计算中完成
+        """
+        reranker = CrossEncoderReranker(tiny_model_dir)
+        calls = _spy_predict(reranker)
+
+        reranker.score("水果", [(str(i), "苹果 " * (i + 1)) for i in range(8)])
+
+        assert len(calls) == 1
+        assert len(calls[0]) == 8
+
+    def test_sequence_length_is_capped(self, tiny_model_dir):
+        """
+        测试目的：验证超出最大长度的片段内容被截断，不参与打分
+        """
+        reranker = CrossEncoderReranker(tiny_model_dir, max_length=6)
+        long_text = "价格 " * 20 + "苹果"
+
+        score = reranker.score("水果", [("a", long_text)])[0]
+
+        # 内部逻辑：截断后不包含末尾的"苹果"，分数低于 sigmoid(3)
+        assert score < 1 / (1 + np.exp(-3.0))
+
+    def test_scores_are_cached_by_query_and_chunk(self, tiny_model_dir):
+        """
+        测试目的：验证相同 (查询, 片段ID) 命中缓存，只对未命中的片段推理
+        """
+        reranker = CrossEncoderReranker(tiny_model_dir)
+        calls = _spy_predict(reranker)
+
+        first = reranker.score("水果", [("a", "苹果"), ("b", "香蕉")])
+        second = reranker.score("水果", [("b", "香蕉"), ("a", "苹果"), ("c", "天气")])
+        reranker.score("价格", [("a", "苹果")])
+
+        assert second[:2] == [first[1], first[0]]
+        assert [len(pairs) for pairs in calls] == [2, 1, 1]
+        assert reranker.cache_size() == 4
+
+    @pytest.mark.asyncio
+    async def test_timeout_returns_none(self, tiny_model_dir):
+        """
+        测试目的：验证推理超时时返回 None
+        """
+        reranker = CrossEncoderReranker(tiny_model_dir, timeout_ms=20)
+        reranker._predict_fn = lambda pairs: time.sleep(0.2) or np.zeros((len(pairs), 1))
+
+        assert await reranker.rerank("水果", [("a", "苹果")]) is None
+
+    @pytest.mark.asyncio
+    async def test_rerank_empty_candidates(self, tiny_model_dir):
+        """
+        测试目的：验证无候选时直接返回空列表且不加载模型
+        """
+        reranker = CrossEncoderReranker(tiny_model_dir)
+
+        assert await reranker.rerank("水果", []) == []
+        assert reranker._predict_fn is None
+
+    @pytest.mark.asyncio
+    async def test_model_loads_in_background_outside_timeout(self, tiny_model_dir):
+        """
+        测试目的：验证模型未加载时请求不等待加载（保持向量检索顺序），并发请求只启动一次后台预热，
+                 加载耗时超过超时时间也不影响加载完成后的重排序
+        """
+        reranker = CrossEncoderReranker(tiny_model_dir, timeout_ms=20)
+        loads = []
+        load_onnx = reranker._load_onnx
+
+        def slow_load():
+            loads.append(1)
+            time.sleep(0.1)
+            return load_onnx()
+
+        reranker._load_onnx = slow_load
+        first = await reranker.rerank("水果", [("a", "天气"), ("b", "苹果")])
+        second = await reranker.rerank("水果", [("a", "天气"), ("b", "苹果")])
+        assert first is None and second is None
+
+        await reranker.start_warm_up()
+        scores = await reranker.rerank("水果", [("a", "天气"), ("b", "苹果")])
+
+        assert loads == [1]
+        assert scores[1] > scores[0]
+
+    @pytest.mark.asyncio
+    async def test_warm_up_failure_keeps_vector_order(self, tmp_path):
+        """
+        测试目的：验证后台加载失败时只记录日志，重排序持续回退到向量检索顺序
+        """
+        reranker = CrossEncoderReranker(str(tmp_path), backend="onnx")
+
+        await reranker.start_warm_up()
+
+        assert reranker.is_loaded is False
+        assert await reranker.rerank("水果", [("a", "苹果")]) is None
+
+    def test_missing_dependency_names_extra(self, tiny_model_dir, monkeypatch):
+        """
+        测试目的：验证缺少 ONNX 推理依赖时，错误日志给出需要安装的 rerank 可选依赖
+        """
+        monkeypatch.setitem(sys.modules, "onnxruntime", None)
+        reranker = CrossEncoderReranker(tiny_model_dir)
+
+        with patch("app.services.retrieval.cross_encoder.logger") as mock_logger:
+            reranker._warm_up_in_background()
+
+        message = mock_logger.error.call_args[0][0]
+        assert "onnxruntime" in message
+        assert "knowledge-agentic[rerank]" in message
+        assert reranker.is_loaded is False
+
+    def test_int8_quantized_model(self, tiny_model_dir):
+        """
+        测试目的：验证 int8 量化导出可被加载，且打分顺序保持一致
+        """
+        pytest.importorskip("onnxruntime.quantization")
+        quantize_onnx_model(tiny_model_dir)
+        reranker = CrossEncoderReranker(tiny_model_dir, onnx_file="model_int8.onnx")
+
+        scores = reranker.score("水果", [("a", "天气"), ("b", "苹果")])
+
+        assert scores[1] > scores[0]
+
+
+class TestGetCrossEncoderReranker:
+    """
+    类级注释：全局重排序器获取测试类
+    """
+
+    def setup_method(self):
+        """
+        函数级注释：每个测试前清除全局实例
+        """
+        reset_cross_encoder_reranker()
+
+    def teardown_method(self):
+        """
+        函数级注释：每个测试后清除全局实例
+        """
+        reset_cross_encoder_reranker()
+
+    def test_returns_none_without_model_path(self):
+        """
+        测试目的：验证未配置模型目录时返回 None
+        """
+        with patch('app.core.config.settings') as mock_settings:
+            mock_settings.RERANKER_MODEL_PATH = ""
+            assert get_cross_encoder_reranker() is None
+
+            mock_settings.RERANKER_MODEL_PATH = "/not/exists"
+            assert get_cross_encoder_reranker() is None
+
+    @pytest.mark.asyncio
+    async def test_startup_warm_up_only_when_reranking_enabled(self, tiny_model_dir):
+        """
+        测试目的：验证启用重排序且配置模型目录时启动后台预热，关闭重排序时不加载模型
+        """
+        with patch('app.core.config.settings.retrieval_config.RERANKER_MODEL_PATH', tiny_model_dir), \
+             patch('app.core.config.settings.llm_config.ENABLE_RERANKING', False):
+            assert warm_up_cross_encoder_reranker() is None
+
+        with patch('app.core.config.settings.retrieval_config.RERANKER_MODEL_PATH', tiny_model_dir), \
+             patch('app.core.config.settings.llm_config.ENABLE_RERANKING', True):
+            await warm_up_cross_encoder_reranker()
+            assert get_cross_encoder_reranker().is_loaded
+
+    def test_instance_reused_until_config_changes(self, tiny_model_dir):
+        """
+        测试目的：验证配置不变时复用实例，配置变化时重建
+        """
+        with patch('app.core.config.settings') as mock_settings:
+            mock_settings.RERANKER_MODEL_PATH = tiny_model_dir
+            mock_settings.RERANKER_BACKEND = "auto"
+            mock_settings.RERANKER_ONNX_FILE = "model.onnx"
+            mock_settings.RERANKER_MAX_LENGTH = 128
+            mock_settings.RERANKER_TIMEOUT_MS = 500
+            mock_settings.RERANKER_CACHE_SIZE = 100
+            mock_settings.RERANKER_NUM_THREADS = 1
+
+            first = get_cross_encoder_reranker()
+            assert get_cross_encoder_reranker() is first
+            assert first.max_length == 128
+
+            mock_settings.RERANKER_MAX_LENGTH = 64
+            assert get_cross_encoder_reranker() is not first
+
+
+class TestSearchServiceCrossEncoder:
+    """
+    类级注释：搜索服务交叉编码器重排序集成测试类
+    """
+
+    @pytest.mark.asyncio
+    async def test_semantic_search_reranks_with_cross_encoder(self, tiny_model_dir):
+        """
+        测试目的：验证启用重排序时使用交叉编码器分数排序并截取 top_k
+        """
+        from langchain_core.documents import Document
+
+        mock_db = MagicMock()
+        mock_db.similarity_search_with_score.return_value = [
+            (Document(page_content="天气", metadata={"doc_id": 1}), 0.1),
+            (Document(page_content="香蕉", metadata={"doc_id": 2}), 0.2),
+            (Document(page_content="苹果", metadata={"doc_id": 3}), 0.3),
+            (Document(page_content="价格", metadata={"doc_id": 4}), 0.4),
+        ]
+        reranker = CrossEncoderReranker(tiny_model_dir)
+        reranker.warm_up()
+
+        with patch('app.services.search_service.Chroma', return_value=mock_db), \
+             patch.object(SearchService, '_get_reranker', return_value=reranker), \
+             patch.object(SearchService, '_should_use_reranking') as mock_embedding_rerank:
+            results = await SearchService.semantic_search("水果", top_k=2, enable_reranking=True)
+
+        assert [r.doc_id for r in results] == [3, 4]
+        assert results[0].score > results[1].score
+        mock_embedding_rerank.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_timeout_keeps_vector_order(self, tiny_model_dir):
+        """
+        测试目的：验证交叉编码器超时时保持向量检索顺序
+        """
+        reranker = CrossEncoderReranker(tiny_model_dir, timeout_ms=20)
+        reranker._predict_fn = lambda pairs: time.sleep(0.2) or np.zeros((len(pairs), 1))
+        results = [
+            {"doc": MagicMock(metadata={}), "content": text, "doc_id": i, "score": 0.9 - i * 0.1}
+            for i, text in enumerate(["天气", "苹果"])
+        ]
+
+        reranked = await SearchService._rerank_with_cross_encoder("水果", results, reranker)
+
+        assert [r["doc_id"] for r in reranked] == [0, 1]
+        assert "rerank_score" not in reranked[0]
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：文档预生成测试模块
+内部逻辑：使用本地测试模型与内存数据库，验证简介与关键词的生成、复用与过期判断，
+         以及后台队列在对话进行中暂停、去重并按顺序处理
+测试覆盖范围：
+    - parse_insight: 模型输出解析
+    - DocumentInsightService: 生成、过期扫描
+    - DocumentInsightQueue: 对话空闲等待、去重、模型切换后重新扫描
+    - IngestService.get_documents: 列表返回简介与关键词
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from app.models.models import Document, DocumentInsight, VectorMapping
+from app.services.chat.document_summarizer import DocumentSummarizer
+from app.services.document_insight_service import (
+    DocumentInsightQueue,
+    DocumentInsightService,
+    parse_insight,
+)
+from app.services.ingest_service import IngestService
+from app.utils.interactive_activity import interactive_activity
+
+
+class InsightLLM:
+    """
+    类级注释：本地测试模型
+    内部逻辑：简介与关键词提示词按约定格式输出，其余提示词返回固定摘要
+    """
+
+    model_name = "test-model"
+
+    def __init__(self):
+        self.prompts = []
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        if prompt.startswith("请根据下面的文档摘要"):
+            return AIMessage(content="简介：介绍年假与报销规定。\n关键词：年假，报销、制度")
+        return AIMessage(content="员工手册摘要")
+
+
+async def add_document(db, name, chunks):
+    """
+    函数级注释：写入文档与片段映射
+    """
+    doc = Document(file_name=name, file_path=f"/tmp/{name}", file_hash=f"hash-{name}", source_type="FILE")
+    db.add(doc)
+    await db.flush()
+    db.add_all([
+        VectorMapping(document_id=doc.id, chunk_id=f"{doc.id}_{i}", chunk_content=text)
+        for i, text in enumerate(chunks)
+    ])
+    await db.flush()
+    return doc.id
+
+
+@pytest.fixture
+def insights_enabled(monkeypatch):
+    """
+    函数级注释：启用文档预生成并取消节流等待
+    """
+    monkeypatch.setattr("app.core.config.settings.task_config.ENABLE_DOCUMENT_INSIGHTS", True)
+    monkeypatch.setattr("app.core.config.settings.task_config.INSIGHT_THROTTLE_SECONDS", 0.0)
+    monkeypatch.setattr("app.core.config.settings.task_config.INSIGHT_IDLE_SECONDS", 0.0)
+
+
+def test_parse_insight_with_fallback():
+    """
+    测试目的：验证按格式解析简介与关键词（去重、限制数量），缺少简介时从摘要截取
+    """
+    abstract, keywords = parse_insight("简介: 一句话简介\n关键词：甲，乙、甲 丙;丁，戊，己", "摘要")
+    assert abstract == "一句话简介"
+    assert keywords == ["甲", "乙", "丙", "丁", "戊"]
+
+    abstract, keywords = parse_insight("无法按格式输出", "很长的摘要" * 50)
+    assert abstract == ("很长的摘要" * 50)[:100]
+    assert keywords == []
+
+
+class TestDocumentInsightService:
+    """
+    类级注释：文档预生成服务测试类
+    """
+
+    @pytest.mark.asyncio
+    async def test_generate_persists_insight_and_summary(self, db_session):
+        """
+        测试目的：验证生成后简介与关键词入库，之后的文档总结直接复用已生成的全文摘要
+        """
+        doc_id = await add_document(db_session, "员工手册.pdf", ["年假规定", "报销规定"])
+        llm = InsightLLM()
+
+        insight = await DocumentInsightService.generate(db_session, doc_id, llm)
+
+        assert insight.abstract == "介绍年假与报销规定。"
+        assert insight.keywords == '["年假", "报销", "制度"]'
+        assert insight.model_key == "InsightLLM:test-model"
+
+        calls = len(llm.prompts)
+        assert await DocumentSummarizer(llm).summarize(db_session, doc_id) == "员工手册摘要"
+        assert len(llm.prompts) == calls
+
+    @pytest.mark.asyncio
+    async def test_find_stale_after_model_change(self, db_session):
+        """
+        测试目的：验证没有预生成记录或由其他模型生成的文档需要重新生成，无内容的文档被忽略
+        """
+        current = await add_document(db_session, "甲.pdf", ["甲"])
+        outdated = await add_document(db_session, "乙.pdf", ["乙"])
+        missing = await add_document(db_session, "丙.pdf", ["丙"])
+        await add_document(db_session, "空.pdf", [])
+        db_session.add_all([
+            DocumentInsight(document_id=current, abstract="甲", keywords="[]", model_key="新模型"),
+            DocumentInsight(document_id=outdated, abstract="乙", keywords="[]", model_key="旧模型"),
+        ])
+        await db_session.flush()
+
+        assert await DocumentInsightService.find_stale(db_session, "新模型") == [outdated, missing]
+
+    @pytest.mark.asyncio
+    async def test_document_list_includes_insight(self, db_session):
+        """
+        测试目的：验证文档列表返回预生成的简介与关键词，未生成的文档为空
+        """
+        with_insight = await add_document(db_session, "甲.pdf", ["甲"])
+        await add_document(db_session, "乙.pdf", ["乙"])
+        db_session.add(DocumentInsight(
+            document_id=with_insight, abstract="甲文档简介", keywords='["甲", "制度"]', model_key="模型"
+        ))
+        await db_session.flush()
+
+        result = await IngestService.get_documents(db_session, 0, 10)
+
+        items = {item.id: item for item in result.items}
+        assert items[with_insight].abstract == "甲文档简介"
+        assert items[with_insight].keywords == ["甲", "制度"]
+        assert [item.abstract for item in result.items if item.id != with_insight] == [None]
+
+
+class TestDocumentInsightQueue:
+    """
+    类级注释：文档预生成后台队列测试类
+    """
+
+    @staticmethod
+    def make_queue():
+        """
+        函数级注释：构造使用虚拟会话的队列
+        """
+        @asynccontextmanager
+        async def session_factory():
+            yield "db"
+
+        return DocumentInsightQueue(session_factory=session_factory)
+
+    @pytest.mark.asyncio
+    async def test_queue_waits_for_interactive_requests(self, insights_enabled):
+        """
+        测试目的：验证对话进行中队列暂停，结束后按入队顺序逐个处理且重复入队只处理一次
+        """
+        queue = self.make_queue()
+        with patch.object(DocumentInsightService, "generate", new_callable=AsyncMock) as generate:
+            with interactive_activity.track():
+                queue.enqueue(3)
+                queue.enqueue(1)
+                queue.enqueue(3)
+                await asyncio.sleep(0.3)
+                assert generate.await_count == 0
+                assert queue.pending == [3, 1]
+
+            await asyncio.wait_for(queue._worker, timeout=2)
+
+        assert [call.args[1] for call in generate.await_args_list] == [3, 1]
+        assert queue.pending == []
+
+    @pytest.mark.asyncio
+    async def test_refresh_queues_stale_documents(self, insights_enabled):
+        """
+        测试目的：验证重新扫描请求（模型切换后触发）将过期文档加入队列，单个文档失败不影响后续文档
+        """
+        queue = self.make_queue()
+        with patch.object(DocumentInsightService, "find_stale", new=AsyncMock(return_value=[5, 6])), \
+                patch.object(DocumentInsightService, "generate",
+                             new=AsyncMock(side_effect=[RuntimeError("模型不可用"), None])) as generate:
+            queue.request_refresh()
+            await asyncio.wait_for(queue._worker, timeout=2)
+
+        assert [call.args[1] for call in generate.await_args_list] == [5, 6]
+
+    @pytest.mark.asyncio
+    async def test_disabled_queue_ignores_documents(self):
+        """
+        测试目的：验证未启用预生成时不入队、不启动工作协程
+        """
+        queue = self.make_queue()
+
+        queue.enqueue(1)
+        queue.request_refresh()
+
+        assert queue.pending == []
+        assert queue._worker is None
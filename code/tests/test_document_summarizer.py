@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：文档总结引擎测试模块
+内部逻辑：使用记录调用次数与并发数的本地测试模型，验证片段组并行总结、并发上限、
+         逐层归并以及摘要持久化后的复用
+测试覆盖范围：
+    - group_chunks: 片段组划分
+    - DocumentSummarizer.summarize: 映射-归约与持久化复用
+    - DocumentSummarizer.summarize_many: 多文档共享并发上限与复用
+"""
+
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+from sqlalchemy.future import select
+
+from app.models.models import Document, DocumentSummary, VectorMapping
+from app.services.chat.document_summarizer import DocumentSummarizer, group_chunks
+
+
+class CountingLLM:
+    """
+    类级注释：本地测试模型
+    内部逻辑：每次调用耗时 0.05 秒，记录提示词与同时进行的最大调用数
+    """
+
+    def __init__(self):
+        self.prompts = []
+        self.active = 0
+        self.max_active = 0
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.05)
+        self.active -= 1
+        return AIMessage(content=f"摘要{len(self.prompts)}")
+
+
+class VerboseLLM(CountingLLM):
+    """
+    类级注释：输出超过半个片段组长度的本地测试模型
+    """
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        return AIMessage(content="要" * 150)
+
+
+async def add_document(db, name, chunks):
+    """
+    函数级注释：写入文档与片段映射
+    """
+    doc = Document(file_name=name, file_path=f"/tmp/{name}", file_hash=f"hash-{name}", source_type="FILE")
+    db.add(doc)
+    await db.flush()
+    db.add_all([
+        VectorMapping(document_id=doc.id, chunk_id=f"{doc.id}_{i}", chunk_content=text)
+        for i, text in enumerate(chunks)
+    ])
+    await db.flush()
+    return doc.id
+
+
+def test_group_chunks_respects_limit():
+    """
+    测试目的：验证片段按顺序合并为不超过上限的片段组，超长片段单独成组并截断
+    """
+    groups = group_chunks(["a" * 40, "b" * 40, "c" * 40, "d" * 200], 100)
+
+    assert groups == ["a" * 40 + "\n" + "b" * 40, "c" * 40, "d" * 100]
+
+
+class TestDocumentSummarizer:
+    """
+    类级注释：文档总结引擎测试类
+    """
+
+    @pytest.mark.asyncio
+    async def test_long_document_is_summarized_in_parallel_groups(self, db_session):
+        """
+        测试目的：验证长文档按片段组并行总结（不超过并发上限），再归并为全文摘要
+        """
+        doc_id = await add_document(db_session, "长文档.pdf", [f"第{i}段" + "内容" * 40 for i in range(12)])
+        llm = CountingLLM()
+
+        summary = await DocumentSummarizer(llm, group_chars=200, max_concurrency=3).summarize(db_session, doc_id)
+
+        group_prompts = [p for p in llm.prompts if p.startswith("请提炼")]
+        assert len(group_prompts) == 6
+        assert any("第11段" in p for p in group_prompts)
+        assert llm.max_active == 3
+        assert llm.prompts[-1].startswith("帅哥，请帮我总结")
+        assert summary == f"摘要{len(llm.prompts)}"
+
+    @pytest.mark.asyncio
+    async def test_long_outputs_still_converge(self, db_session):
+        """
+        测试目的：验证模型输出超过半个片段组长度时归并仍逐层减少摘要数并结束
+        """
+        doc_id = await add_document(db_session, "长输出.pdf", ["段" * 190 for _ in range(8)])
+        llm = VerboseLLM()
+
+        await DocumentSummarizer(llm, group_chars=200, max_concurrency=4).summarize(db_session, doc_id)
+
+        reduce_prompts = [p for p in llm.prompts if p.startswith("下面是")]
+        assert len(reduce_prompts) == 4 + 2
+        assert len(llm.prompts) == 8 + 4 + 2 + 1
+        assert llm.prompts[-1].startswith("帅哥，请帮我总结")
+
+    @pytest.mark.asyncio
+    async def test_repeat_requests_reuse_persisted_summaries(self, db_session):
+        """
+        测试目的：验证全文摘要持久化后重复总结不再调用模型，内容变化后只重新总结变化的片段组
+        """
+        doc_id = await add_document(db_session, "手册.docx", ["甲" * 150, "乙" * 150, "丙" * 150])
+        llm = CountingLLM()
+        summarizer = DocumentSummarizer(llm, group_chars=200, max_concurrency=4)
+
+        first = await summarizer.summarize(db_session, doc_id)
+        calls = len(llm.prompts)
+        second = await summarizer.summarize(db_session, doc_id)
+
+        assert second == first
+        assert len(llm.prompts) == calls
+
+        # 内部逻辑：修改最后一个片段，只有对应片段组与全文摘要需要重新生成
+        mapping = (await db_session.execute(
+            select(VectorMapping).where(VectorMapping.document_id == doc_id).order_by(VectorMapping.id.desc())
+        )).scalars().first()
+        mapping.chunk_content = "丁" * 150
+        await db_session.flush()
+
+        await summarizer.summarize(db_session, doc_id)
+
+        new_prompts = llm.prompts[calls:]
+        assert [p[:3] for p in new_prompts] == ["请提炼", "帅哥，"]
+        levels = (await db_session.execute(
+            select(DocumentSummary.level).where(DocumentSummary.document_id == doc_id)
+        )).scalars().all()
+        assert sorted(levels) == ["document", "group", "group", "group"]
+
+    @pytest.mark.asyncio
+    async def test_short_document_uses_single_call(self, db_session):
+        """
+        测试目的：验证只有一个片段组的文档只调用一次模型
+        """
+        doc_id = await add_document(db_session, "短文.txt", ["简短内容"])
+        llm = CountingLLM()
+
+        await DocumentSummarizer(llm, group_chars=200).summarize(db_session, doc_id)
+
+        assert len(llm.prompts) == 1
+        assert "简短内容" in llm.prompts[0]
+
+    @pytest.mark.asyncio
+    async def test_summarize_many_shares_limit_and_reuses_summaries(self, db_session):
+        """
+        测试目的：验证多文档总结共享并发上限，单文档已有摘要时对比直接复用，无内容的文档被忽略
+        """
+        first = await add_document(db_session, "甲.pdf", ["甲" * 150, "乙" * 150])
+        second = await add_document(db_session, "乙.pdf", ["丙" * 150, "丁" * 150])
+        llm = CountingLLM()
+        summarizer = DocumentSummarizer(llm, group_chars=200, max_concurrency=2)
+
+        single = await summarizer.summarize(db_session, first)
+        calls = len(llm.prompts)
+        summaries = await summarizer.summarize_many(db_session, [second, first, 99999])
+
+        assert list(summaries) == [second, first]
+        assert summaries[first] == ("甲.pdf", single)
+        assert len(llm.prompts) - calls == 3
+        assert llm.max_active == 2
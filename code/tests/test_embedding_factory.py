@@ -113,11 +113,13 @@ class TestEmbeddingFactory:
 
     def test_set_runtime_config_clears_cache(self):
         """
-        函数级注释：测试设置运行时配置清除缓存
+        函数级注释：测试设置运行时配置只清除旧配置的缓存
         """
         EmbeddingFactory._instance_cache.clear()
-        EmbeddingFactory._instance_cache["test"] = MagicMock()
-        assert len(EmbeddingFactory._instance_cache) == 1
+        previous_key = EmbeddingFactory._get_cache_key(EmbeddingFactory._resolve_config())
+        EmbeddingFactory._instance_cache[previous_key] = MagicMock()
+        EmbeddingFactory._instance_cache["other_model"] = MagicMock()
+        assert len(EmbeddingFactory._instance_cache) == 2
 
         new_config = {
             "provider": "zhipuai",
@@ -125,7 +127,8 @@ class TestEmbeddingFactory:
         }
         EmbeddingFactory.set_runtime_config(new_config)
 
-        assert len(EmbeddingFactory._instance_cache) == 0
+        assert previous_key not in EmbeddingFactory._instance_cache
+        assert "other_model" in EmbeddingFactory._instance_cache
         assert EmbeddingFactory._runtime_config == new_config
 
     def test_set_runtime_config_updates_provider(self):
@@ -386,7 +389,8 @@ class TestEmbeddingFactoryHotSwitch:
 
         assert EmbeddingFactory.get_current_provider() == "ollama"
 
-        EmbeddingFactory._instance_cache["test"] = MagicMock()
+        EmbeddingFactory._instance_cache.clear()
+        EmbeddingFactory._instance_cache[EmbeddingFactory._get_cache_key(ollama_config)] = MagicMock()
 
         zhipuai_config = {
             "provider": "zhipuai",
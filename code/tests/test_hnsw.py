@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：HNSW 索引参数管理测试模块
+内部逻辑：验证 HNSW 参数配置、集合创建时参数生效、已有集合的安全重建迁移
+测试覆盖范围：
+    - StorageConfig: HNSW 参数配置与校验
+    - HNSWParams: 参数与集合元数据互相转换
+    - ensure_collection: 创建集合 / 参数不一致告警
+    - rebuild_collection: 重建迁移
+"""
+
+import uuid
+
+import chromadb
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from app.core.config.storage_config import StorageConfig
+from app.services.retrieval.hnsw import HNSWParams, ensure_collection, rebuild_collection
+
+
+@pytest.fixture
+def chroma_client():
+    """
+    函数级注释：提供内存中的 Chroma 客户端
+    返回值：Chroma 客户端
+    """
+    return chromadb.EphemeralClient()
+
+
+@pytest.fixture
+def collection_name():
+    """
+    函数级注释：生成唯一的集合名称，避免内存客户端之间互相影响
+    返回值：集合名称
+    """
+    return f"kb_{uuid.uuid4().hex[:12]}"
+
+
+class TestStorageConfigHNSW:
+    """
+    类级注释：HNSW 配置测试类
+    """
+
+    def test_defaults_match_chroma_defaults(self):
+        """
+        测试目的：验证默认配置与 Chroma 内置默认值一致，升级后已有集合无参数差异
+        """
+        config = StorageConfig()
+        params = HNSWParams(
+            space=config.CHROMA_HNSW_SPACE,
+            M=config.CHROMA_HNSW_M,
+            construction_ef=config.CHROMA_HNSW_CONSTRUCTION_EF,
+            search_ef=config.CHROMA_HNSW_SEARCH_EF
+        )
+        assert params == HNSWParams.from_metadata({})
+
+    def test_invalid_values_rejected(self):
+        """
+        测试目的：验证非法距离度量与非正整数参数被拒绝
+        """
+        with pytest.raises(ValidationError):
+            StorageConfig(CHROMA_HNSW_SPACE="manhattan")
+        with pytest.raises(ValidationError):
+            StorageConfig(CHROMA_HNSW_M=0)
+
+    def test_space_is_case_insensitive(self):
+        """
+        测试目的：验证距离度量大小写不敏感
+        """
+        assert StorageConfig(CHROMA_HNSW_SPACE="COSINE").CHROMA_HNSW_SPACE == "cosine"
+
+
+class TestHNSWParams:
+    """
+    类级注释：HNSW 参数值对象测试类
+    """
+
+    def test_metadata_round_trip(self):
+        """
+        测试目的：验证参数与集合元数据可互相转换
+        """
+        params = HNSWParams(space="cosine", M=32, construction_ef=200, search_ef=64)
+        metadata = params.to_metadata()
+
+        assert metadata["hnsw:space"] == "cosine"
+        assert HNSWParams.from_metadata(metadata) == params
+
+    def test_diff(self):
+        """
+        测试目的：验证参数差异对比
+        """
+        current = HNSWParams()
+        target = HNSWParams(search_ef=50)
+
+        assert current.diff(target) == {"search_ef": (10, 50)}
+        assert current.diff(HNSWParams()) == {}
+
+
+class TestEnsureCollection:
+    """
+    类级注释：集合创建检查测试类
+    """
+
+    def test_creates_collection_with_params(self, chroma_client, collection_name):
+        """
+        测试目的：验证集合不存在时按配置参数创建
+        """
+        params = HNSWParams(space="cosine", M=8, search_ef=40)
+
+        result = ensure_collection(chroma_client, collection_name, params)
+
+        assert result["created"] is True
+        collection = chroma_client.get_collection(collection_name)
+        assert HNSWParams.from_metadata(collection.metadata) == params
+
+    def test_existing_collection_not_modified(self, chroma_client, collection_name):
+        """
+        测试目的：验证已有集合参数不一致时只报告差异，不修改集合元数据
+        """
+        chroma_client.create_collection(collection_name)
+
+        result = ensure_collection(chroma_client, collection_name, HNSWParams(space="cosine"))
+
+        assert result["created"] is False
+        assert result["mismatched"] == {"space": ("l2", "cosine")}
+        assert HNSWParams.from_metadata(chroma_client.get_collection(collection_name).metadata).space == "l2"
+
+
+class TestRebuildCollection:
+    """
+    类级注释：集合重建迁移测试类
+    """
+
+    def test_rebuild_preserves_data_and_keeps_backup(self, chroma_client, collection_name):
+        """
+        测试目的：验证重建后数据完整、参数生效、原集合保留为备份
+        """
+        rng = np.random.default_rng(0)
+        source = chroma_client.create_collection(collection_name)
+        source.add(
+            ids=[f"id{i}" for i in range(25)],
+            embeddings=rng.normal(size=(25, 8)).tolist(),
+            documents=[f"文档{i}" for i in range(25)],
+            metadatas=[{"doc_id": i % 3} for i in range(25)]
+        )
+        params = HNSWParams(space="cosine", search_ef=32)
+
+        result = rebuild_collection(chroma_client, collection_name, params, batch_size=10)
+
+        assert result["count"] == 25
+        rebuilt = chroma_client.get_collection(collection_name)
+        assert HNSWParams.from_metadata(rebuilt.metadata) == params
+        assert rebuilt.count() == 25
+        copied = rebuilt.get(ids=["id7"], include=["documents", "metadatas"])
+        assert copied["documents"] == ["文档7"]
+        assert copied["metadatas"] == [{"doc_id": 1}]
+        assert chroma_client.get_collection(result["backup_name"]).count() == 25
+
+    def test_rebuild_missing_collection(self, chroma_client, collection_name):
+        """
+        测试目的：验证集合不存在时抛出异常
+        """
+        with pytest.raises(ValueError):
+            rebuild_collection(chroma_client, collection_name, HNSWParams())
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：模型提供商HTTP连接池测试模块
+内部逻辑：启动本地 HTTP/1.1 桩服务器并统计服务端接受的连接数，
+         验证多个模型实例、多次调用（包括切换模型配置）复用同一端点的连接
+测试覆盖范围：
+    - HttpClientPool: 按端点共享客户端、连接统计、HTTP/2 开关
+    - PooledOllamaEmbeddings / PooledChatOllama / PooledChatZhipuAI: 通过共享连接发送请求
+    - 提供商工厂: 创建使用共享连接池的实例
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core.ai_provider import AIProviderConfig, AIProviderType
+from app.core.ai_provider.pooled_clients import PooledChatOllama, PooledChatZhipuAI, PooledOllamaEmbeddings
+from app.core.ai_provider.providers.ollama import OllamaProviderFactory
+from app.core.http_pool import HttpClientPool
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    类级注释：模型接口桩处理器（保持连接，按路径返回 Ollama / 智谱AI 格式的响应）
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.paths.append(self.path)
+
+        if self.path == "/api/embeddings":
+            self._send("application/json", json.dumps({"embedding": [0.5, float(len(self.server.paths))]}))
+        elif self.path == "/api/chat":
+            lines = [
+                {"message": {"role": "assistant", "content": "你好"}, "done": False},
+                {"message": {"role": "assistant", "content": ""}, "done": True},
+            ]
+            self._send("application/x-ndjson", "".join(json.dumps(line) + "\n" for line in lines))
+        elif request.get("stream"):
+            events = [
+                {"choices": [{"delta": {"role": "assistant", "content": "年假"}}]},
+                {"choices": [{"delta": {"content": "5天"}, "finish_reason": "stop"}]},
+            ]
+            self._send("text/event-stream", "".join(f"data: {json.dumps(e)}\n\n" for e in events))
+        else:
+            self._send("application/json", json.dumps({
+                "choices": [{"message": {"role": "assistant", "content": "年假5天"}, "finish_reason": "stop"}],
+                "usage": {}, "model": "glm-4",
+            }))
+
+    def _send(self, content_type, body):
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    """
+    函数级注释：启动本地桩服务器
+    返回值：(服务器, 基础地址)
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.connections = 0
+    server.paths = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """
+    函数级注释：替换全局连接池为独立实例
+    """
+    pool = HttpClientPool()
+    monkeypatch.setattr("app.core.ai_provider.pooled_clients.http_client_pool", pool)
+    monkeypatch.setattr("app.core.http_pool.http_client_pool", pool)
+    yield pool
+    pool.close()
+
+
+def test_clients_shared_per_endpoint():
+    """
+    测试目的：验证同一端点（不同路径、默认端口写法）共享客户端，不同端点使用不同客户端
+    """
+    pool = HttpClientPool()
+
+    assert pool.endpoint_of("https://open.bigmodel.cn/api/paas/v4") == "https://open.bigmodel.cn:443"
+    assert pool.get_client("http://localhost:11434") is pool.get_client("http://localhost:11434/api/chat")
+    assert pool.get_client("http://localhost:11434") is not pool.get_client("http://localhost:8000")
+    pool.close()
+
+
+def test_embeddings_reuse_connection_across_instances(stub_server, pool):
+    """
+    测试目的：验证多个 Embedding 实例（模拟切换模型配置）的多次调用只建立一个连接
+    """
+    server, base_url = stub_server
+
+    first = PooledOllamaEmbeddings(base_url=base_url, model="模型A")
+    second = PooledOllamaEmbeddings(base_url=base_url, model="模型B")
+
+    assert first.embed_documents(["年假", "报销制度"]) == [[0.5, 1.0], [0.5, 2.0]]
+    assert second.embed_query("请假") == [0.5, 3.0]
+
+    assert server.connections == 1
+    stats = pool.get_stats()[pool.endpoint_of(base_url)]
+    assert (stats["requests"], stats["connections_opened"], stats["reused_requests"]) == (3, 1, 2)
+
+
+@pytest.mark.asyncio
+async def test_chat_ollama_reuses_async_connection(stub_server, pool):
+    """
+    测试目的：验证 ChatOllama 的多次异步调用复用同一连接，回答解析与原实现一致
+    """
+    server, base_url = stub_server
+    llm = PooledChatOllama(base_url=base_url, model="qwen")
+
+    for _ in range(3):
+        response = await llm.ainvoke("年假有几天？")
+        assert response.content == "你好"
+
+    assert server.connections == 1
+    assert server.paths == ["/api/chat"] * 3
+
+
+@pytest.mark.asyncio
+async def test_chat_zhipuai_uses_shared_connection(stub_server, pool):
+    """
+    测试目的：验证 ChatZhipuAI 的同步、异步与流式调用都通过连接池发送请求
+    """
+    server, base_url = stub_server
+    llm = PooledChatZhipuAI(api_key="id.secret", api_base=f"{base_url}/chat/completions", model="glm-4")
+
+    assert llm.invoke("年假").content == "年假5天"
+    assert "".join(chunk.content for chunk in llm.stream("年假")) == "年假5天"
+    assert (await llm.ainvoke("年假")).content == "年假5天"
+    assert "".join([chunk.content async for chunk in llm.astream("年假")]) == "年假5天"
+
+    # 内部逻辑：同步与异步客户端各一个连接
+    assert server.connections == 2
+    assert pool.get_stats()[pool.endpoint_of(base_url)]["requests"] == 4
+
+
+def test_provider_factory_creates_pooled_instances():
+    """
+    测试目的：验证提供商工厂创建的 Ollama 实例使用共享连接池
+    """
+    factory = OllamaProviderFactory()
+    config = AIProviderConfig(provider_type=AIProviderType.OLLAMA, base_url="http://localhost:11434/api", model="qwen")
+
+    assert isinstance(factory.create_llm(config), PooledChatOllama)
+    assert isinstance(factory.create_embeddings(config), PooledOllamaEmbeddings)
+
+
+def test_http2_requires_h2(monkeypatch):
+    """
+    测试目的：验证 HTTP/2 默认关闭；开启但未安装 h2 时回退到 HTTP/1.1 且只提示一次
+    """
+    from app.core.config import settings
+    from app.core.config.llm_config import LLMConfig
+
+    warnings = []
+    monkeypatch.setattr("app.core.http_pool.logger.warning", warnings.append)
+    monkeypatch.setattr(HttpClientPool, "_h2_missing_logged", False)
+    assert LLMConfig.model_fields["HTTP_POOL_HTTP2"].default is False
+
+    monkeypatch.setattr(settings.llm_config, "HTTP_POOL_HTTP2", True)
+    monkeypatch.setattr("app.core.http_pool.importlib.util.find_spec", lambda name: None)
+    assert HttpClientPool.http2_enabled() is False
+    assert HttpClientPool.http2_enabled() is False
+    assert len(warnings) == 1
+
+    monkeypatch.setattr("app.core.http_pool.importlib.util.find_spec", lambda name: object())
+    assert HttpClientPool.http2_enabled() is True
@@ -187,12 +187,15 @@ class TestLLMFactoryHotSwitch:
 
     def test_set_runtime_config_clears_cache(self, reset_factory_state):
         """
-        函数级注释：测试设置运行时配置清除缓存
-        内部逻辑：添加缓存 -> 设置新配置 -> 验证缓存被清除
+        函数级注释：测试设置运行时配置清除旧配置的缓存
+        内部逻辑：添加缓存 -> 设置新配置 -> 验证旧配置的流式与非流式实例被清除，其他实例保留
         """
         # 内部逻辑：预先添加缓存
-        LLMFactory._instance_cache["ollama_deepseek-r1:8b"] = MagicMock()
-        assert len(LLMFactory._instance_cache) == 1
+        previous_key = LLMFactory._get_cache_key(LLMFactory._resolve_config())
+        LLMFactory._instance_cache[previous_key] = MagicMock()
+        LLMFactory._instance_cache[previous_key + "#streaming"] = MagicMock()
+        LLMFactory._instance_cache["other_model"] = MagicMock()
+        assert len(LLMFactory._instance_cache) == 3
 
         # 内部逻辑：设置运行时配置
         new_config = {
@@ -204,8 +207,8 @@ class TestLLMFactoryHotSwitch:
         }
         LLMFactory.set_runtime_config(new_config)
 
-        # 内部逻辑：验证缓存被清除
-        assert len(LLMFactory._instance_cache) == 0
+        # 内部逻辑：验证旧配置的缓存被清除
+        assert list(LLMFactory._instance_cache) == ["other_model"]
         # 内部逻辑：验证运行时配置已更新
         assert LLMFactory._runtime_config == new_config
 
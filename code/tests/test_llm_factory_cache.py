@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：模型实例缓存测试模块
+内部逻辑：替换工厂的实例创建方法并统计调用次数，验证缓存命中、容量淘汰、失效范围与并发创建
+测试覆盖范围：
+    - InstanceCache: 最近最少使用淘汰、统计
+    - LLMFactory: 流式实例缓存、相同配置不重建、并发只创建一次
+    - LLMFactory / EmbeddingFactory: 缓存相互独立，失效只影响本工厂
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core.base_factory import InstanceCache
+from app.utils.embedding_factory import EmbeddingFactory
+from app.utils.llm_factory import LLMFactory
+
+# 内部变量：测试使用的 LLM 运行时配置
+LLM_CONFIG = {
+    "provider": "ollama",
+    "model": "qwen",
+    "endpoint": "http://localhost:11434",
+    "api_key": None,
+    "temperature": 0.7,
+    "max_tokens": None,
+    "top_p": None,
+}
+
+
+@pytest.fixture(autouse=True)
+def reset_factories():
+    """
+    函数级注释：测试前后重置两个工厂的运行时配置与缓存
+    """
+    for factory in (LLMFactory, EmbeddingFactory):
+        factory._runtime_config = None
+        factory._instance_cache.clear()
+    yield
+    for factory in (LLMFactory, EmbeddingFactory):
+        factory._runtime_config = None
+        factory._instance_cache.clear()
+
+
+@pytest.fixture
+def create_by_provider():
+    """
+    函数级注释：替换 LLMFactory 的实例创建方法，每次调用返回新的模拟实例
+    """
+    with patch.object(LLMFactory, "_create_by_provider", side_effect=lambda *args, **kwargs: MagicMock()) as mock:
+        yield mock
+
+
+def test_instance_cache_evicts_least_recently_used():
+    """
+    测试目的：验证超出容量时淘汰最久未使用的实例，访问会刷新顺序
+    """
+    cache = InstanceCache("test", max_size=2)
+    cache.get_or_create("a", lambda: "A")
+    cache.get_or_create("b", lambda: "B")
+    assert cache.get_or_create("a", lambda: "新A") == "A"
+
+    cache.get_or_create("c", lambda: "C")
+
+    assert list(cache) == ["a", "c"]
+    stats = cache.get_stats()
+    assert (stats["size"], stats["hits"], stats["constructions"], stats["evictions"]) == (2, 1, 3, 1)
+
+
+def test_streaming_instances_are_cached(create_by_provider):
+    """
+    测试目的：验证流式实例与非流式实例分别缓存，重复创建不再构建
+    """
+    LLMFactory.set_runtime_config(LLM_CONFIG)
+    constructions = LLMFactory.get_cache_stats()["constructions"]
+
+    streaming = [LLMFactory.create_llm(streaming=True) for _ in range(3)]
+    plain = LLMFactory.create_llm()
+
+    assert streaming[0] is streaming[1] is streaming[2]
+    assert plain is not streaming[0]
+    assert create_by_provider.call_count == 2
+    assert LLMFactory.get_cache_stats()["constructions"] - constructions == 2
+
+
+def test_same_runtime_config_keeps_cache(create_by_provider):
+    """
+    测试目的：验证每次请求重复注入相同配置不清除缓存，配置变化后重新构建
+    """
+    model_config = MagicMock(
+        provider_id="ollama", model_name="qwen", endpoint="http://localhost:11434",
+        api_key=None, temperature=0.7, max_tokens=None, top_p=None,
+    )
+    invalidations = LLMFactory.get_cache_stats()["invalidations"]
+
+    first = LLMFactory.create_from_model_config(model_config, streaming=True)
+    second = LLMFactory.create_from_model_config(model_config, streaming=True)
+    assert first is second
+
+    model_config.temperature = 0.2
+    third = LLMFactory.create_from_model_config(model_config, streaming=True)
+
+    assert third is not first
+    assert create_by_provider.call_count == 2
+    assert LLMFactory.get_cache_stats()["invalidations"] - invalidations == 1
+
+
+def test_factory_caches_are_independent(create_by_provider):
+    """
+    测试目的：验证两个工厂的缓存相互独立，切换 Embedding 配置不影响 LLM 实例
+    """
+    assert LLMFactory._instance_cache is not EmbeddingFactory._instance_cache
+
+    LLMFactory.set_runtime_config(LLM_CONFIG)
+    llm = LLMFactory.create_llm()
+    EmbeddingFactory._instance_cache["ollama_bge-m3"] = MagicMock()
+
+    EmbeddingFactory.set_runtime_config({"provider": "zhipuai", "model": "embedding-3"})
+    EmbeddingFactory.clear_cache()
+
+    assert LLMFactory.create_llm() is llm
+    assert len(EmbeddingFactory._instance_cache) == 0
+    assert create_by_provider.call_count == 1
+
+
+def test_concurrent_creation_builds_once():
+    """
+    测试目的：验证多个线程并发获取相同实例时只构建一次
+    """
+    LLMFactory.set_runtime_config(LLM_CONFIG)
+    calls = []
+    barrier = threading.Barrier(8)
+
+    def slow_create(*args, **kwargs):
+        calls.append(1)
+        time.sleep(0.05)
+        return MagicMock()
+
+    def create():
+        barrier.wait()
+        return LLMFactory.create_llm(streaming=True)
+
+    with patch.object(LLMFactory, "_create_by_provider", side_effect=slow_create):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            instances = list(pool.map(lambda _: create(), range(8)))
+
+    assert len(calls) == 1
+    assert all(instance is instances[0] for instance in instances)
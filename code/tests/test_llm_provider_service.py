@@ -82,8 +82,8 @@ class TestLLMProviderGetLLM:
         provider = LLMProvider()
         mock_db = Mock(spec=AsyncSession)
 
-        # Mock ModelConfigService.get_default_config返回None
-        with patch('app.services.llm_provider.ModelConfigService.get_default_config') as mock_get_config:
+        # Mock ModelConfigService.get_cached_default_config返回None
+        with patch('app.services.llm_provider.ModelConfigService.get_cached_default_config') as mock_get_config:
             mock_get_config.return_value = None
 
             with patch('app.services.llm_provider.LLMFactory') as mock_factory:
@@ -106,7 +106,7 @@ class TestLLMProviderGetLLM:
         mock_config.provider_name = "ollama"
         mock_config.model_name = "llama2"
 
-        with patch('app.services.llm_provider.ModelConfigService.get_default_config') as mock_get_config:
+        with patch('app.services.llm_provider.ModelConfigService.get_cached_default_config') as mock_get_config:
             mock_get_config.return_value = mock_config
 
             with patch('app.services.llm_provider.LLMFactory') as mock_factory:
@@ -126,7 +126,7 @@ class TestLLMProviderGetLLM:
         provider = LLMProvider()
         mock_db = Mock(spec=AsyncSession)
 
-        with patch('app.services.llm_provider.ModelConfigService.get_default_config') as mock_get_config:
+        with patch('app.services.llm_provider.ModelConfigService.get_cached_default_config') as mock_get_config:
             mock_get_config.return_value = None
 
             with patch('app.services.llm_provider.LLMFactory') as mock_factory:
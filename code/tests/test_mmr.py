@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：MMR 多样化检索测试模块
+内部逻辑：验证向量化 MMR 选择的正确性与耗时、选项合并逻辑、检索器的普通/MMR 两条路径
+测试覆盖范围：
+    - maximal_marginal_relevance: 向量化 MMR 选择
+    - MMROptions: 请求参数与全局配置合并
+    - VectorRetriever: 统一向量检索入口
+    - retrieve_knowledge 工具: 请求级 MMR 选项传递
+"""
+
+import time
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from app.services.retrieval import MMROptions, VectorRetriever, maximal_marginal_relevance
+
+
+def _reference_mmr(query, embeddings, k, lambda_mult):
+    """
+    函数级注释：逐对计算的朴素 MMR 实现，作为向量化版本的对照
+    参数：
+        query - 查询向量
+        embeddings - 候选向量
+        k - 选择数量
+        lambda_mult - 权衡系数
+    返回值：选择的下标列表
+    """
+    def cos(a, b):
+        return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+    remaining = list(range(len(embeddings)))
+    selected = []
+    while remaining and len(selected) < k:
+        best, best_score = None, -np.inf
+        for i in remaining:
+            redundancy = max((cos(embeddings[i], embeddings[j]) for j in selected), default=0.0)
+            score = lambda_mult * cos(query, embeddings[i]) - (1 - lambda_mult) * redundancy
+            if not selected:
+                score = cos(query, embeddings[i])
+            if score > best_score:
+                best, best_score = i, score
+        selected.append(best)
+        remaining.remove(best)
+    return selected
+
+
+# ============================================================================
+# maximal_marginal_relevance 测试
+# ============================================================================
+
+
+class TestMaximalMarginalRelevance:
+    """
+    类级注释：向量化 MMR 选择测试类
+    测试场景：
+        1. 首个结果为最相关候选
+        2. 多样性权衡生效
+        3. 与朴素实现结果一致
+        4. 边界条件
+        5. 50 个候选的选择耗时
+    """
+
+    def test_first_pick_is_most_relevant(self):
+        """
+        测试目的：验证第一个结果总是与查询最相关的候选
+        """
+        query = [1.0, 0.0]
+        embeddings = [[0.0, 1.0], [0.9, 0.1], [0.5, 0.5]]
+
+        assert maximal_marginal_relevance(query, embeddings, k=1)[0] == 1
+
+    def test_lambda_controls_diversity(self):
+        """
+        测试目的：验证 λ 控制相关性与多样性的权衡
+        测试场景：两个近似重复的高相关片段 + 一个不同方向的片段
+        """
+        query = [1.0, 0.0]
+        embeddings = [[1.0, 0.0], [0.99, 0.01], [0.6, 0.8]]
+
+        # 内部逻辑：λ=1 只看相关性，选中近似重复片段
+        assert maximal_marginal_relevance(query, embeddings, k=2, lambda_mult=1.0) == [0, 1]
+        # 内部逻辑：λ 较小时优先选择不同方向的片段
+        assert maximal_marginal_relevance(query, embeddings, k=2, lambda_mult=0.3) == [0, 2]
+
+    def test_matches_reference_implementation(self):
+        """
+        测试目的：验证向量化实现与朴素实现的选择结果一致
+        """
+        rng = np.random.default_rng(7)
+        query = rng.normal(size=32)
+        embeddings = rng.normal(size=(40, 32))
+
+        for lambda_mult in (0.0, 0.3, 0.5, 0.8, 1.0):
+            expected = _reference_mmr(query, embeddings, 8, lambda_mult)
+            assert maximal_marginal_relevance(query, embeddings, k=8, lambda_mult=lambda_mult) == expected
+
+    def test_accepts_nested_lists(self):
+        """
+        测试目的：验证支持 Chroma 返回的嵌套列表格式
+        """
+        rng = np.random.default_rng(1)
+        query = rng.normal(size=16)
+        embeddings = rng.normal(size=(10, 16))
+
+        assert maximal_marginal_relevance(query, embeddings.tolist(), k=4) == \
+            maximal_marginal_relevance(query, embeddings, k=4)
+
+    def test_k_larger_than_candidates(self):
+        """
+        测试目的：验证 k 大于候选数时返回全部候选且不重复
+        """
+        result = maximal_marginal_relevance([1.0, 0.0], [[1.0, 0.0], [0.0, 1.0]], k=5)
+        assert sorted(result) == [0, 1]
+
+    def test_empty_candidates(self):
+        """
+        测试目的：验证无候选或 k<=0 时返回空列表
+        """
+        assert maximal_marginal_relevance([1.0, 0.0], [], k=3) == []
+        assert maximal_marginal_relevance([1.0, 0.0], [[1.0, 0.0]], k=0) == []
+
+    def test_zero_vector_candidate(self):
+        """
+        测试目的：验证零向量候选不会导致除零错误
+        """
+        result = maximal_marginal_relevance([1.0, 0.0], [[0.0, 0.0], [1.0, 0.0]], k=2)
+        assert result[0] == 1
+        assert sorted(result) == [0, 1]
+
+    def test_selection_latency_for_50_candidates(self):
+        """
+        测试目的：验证 50 个候选片段的 MMR 选择耗时在亚毫秒级
+        测试场景：取多次运行的中位数，降低调度抖动的影响
+        """
+        rng = np.random.default_rng(0)
+        query = rng.normal(size=384)
+        embeddings = rng.normal(size=(50, 384)).astype(np.float32)
+
+        timings = []
+        for _ in range(50):
+            start = time.perf_counter()
+            maximal_marginal_relevance(query, embeddings, k=5, lambda_mult=0.5)
+            timings.append(time.perf_counter() - start)
+
+        assert sorted(timings)[len(timings) // 2] < 0.001
+
+
+# ============================================================================
+# MMROptions 测试
+# ============================================================================
+
+
+class TestMMROptions:
+    """
+    类级注释：MMR 选项测试类
+    """
+
+    def test_resolve_uses_settings_defaults(self):
+        """
+        测试目的：验证请求未指定时回退到全局配置
+        """
+        with patch('app.core.config.settings') as mock_settings:
+            mock_settings.ENABLE_MMR = True
+            mock_settings.MMR_LAMBDA = 0.7
+            mock_settings.MMR_FETCH_K = 30
+
+            options = MMROptions.resolve()
+
+        assert options == MMROptions(enabled=True, lambda_mult=0.7, fetch_k=30)
+
+    def test_resolve_request_overrides(self):
+        """
+        测试目的：验证请求参数优先于全局配置（包括显式关闭）
+        """
+        with patch('app.core.config.settings') as mock_settings:
+            mock_settings.ENABLE_MMR = True
+            mock_settings.MMR_LAMBDA = 0.7
+            mock_settings.MMR_FETCH_K = 30
+
+            options = MMROptions.resolve(use_mmr=False, mmr_lambda=0.0)
+
+        assert options.enabled is False
+        assert options.lambda_mult == 0.0
+        assert options.fetch_k == 30
+
+
+# ============================================================================
+# VectorRetriever 测试
+# ============================================================================
+
+
+def _mock_vector_db():
+    """
+    函数级注释：构造带候选向量查询结果的模拟向量库
+    返回值：模拟向量库
+    """
+    vector_db = MagicMock()
+    vector_db.embeddings.embed_query.return_value = [1.0, 0.0]
+    vector_db._collection.query.return_value = {
+        "ids": [["c1", "c2", "c3"]],
+        "documents": [["A", "A'", "B"]],
+        "metadatas": [[{"doc_id": 1}, {"doc_id": 1}, None]],
+        "distances": [[0.1, 0.11, 0.5]],
+        "embeddings": [[[1.0, 0.0], [0.99, 0.01], [0.6, 0.8]]],
+    }
+    return vector_db
+
+
+class TestVectorRetriever:
+    """
+    类级注释：向量检索器测试类
+    测试场景：
+        1. 未启用 MMR 时走原有相似度搜索
+        2. 启用 MMR 时复用已存储向量进行多样化选择
+        3. 无候选与元数据过滤
+    """
+
+    def test_plain_search_delegates_to_similarity_search(self):
+        """
+        测试目的：验证未启用 MMR 时走相似度搜索，且返回的文档带真实相关度
+        """
+        vector_db = _mock_vector_db()
+        vector_db.similarity_search_with_score.return_value = [
+            (Document(page_content="A", metadata={"doc_id": 1, "chunk_id": "1_0"}), 0.25)
+        ]
+        retriever = VectorRetriever(vector_db)
+
+        docs = retriever.search("q", k=3, mmr_options=MMROptions(enabled=False))
+
+        vector_db.similarity_search_with_score.assert_called_once_with("q", k=3)
+        vector_db.similarity_search.assert_not_called()
+        vector_db._collection.query.assert_not_called()
+        assert docs[0].metadata == {"doc_id": 1, "chunk_id": "1_0", "score": 0.75}
+
+    def test_mmr_search_returns_diverse_results(self):
+        """
+        测试目的：验证 MMR 检索按选择顺序返回文档与原始距离
+        """
+        vector_db = _mock_vector_db()
+        retriever = VectorRetriever(vector_db)
+
+        results = retriever.search_with_scores(
+            "q", k=2, mmr_options=MMROptions(enabled=True, lambda_mult=0.3, fetch_k=20)
+        )
+
+        assert [doc.page_content for doc, _ in results] == ["A", "B"]
+        assert [score for _, score in results] == [0.1, 0.5]
+        assert results[1][0].metadata == {"chunk_id": "c3"}
+
+        # 内部逻辑：只做一次查询向量化，候选向量来自向量库
+        vector_db.embeddings.embed_query.assert_called_once_with("q")
+        call_kwargs = vector_db._collection.query.call_args.kwargs
+        assert call_kwargs["n_results"] == 20
+        assert "embeddings" in call_kwargs["include"]
+        vector_db.similarity_search_with_score.assert_not_called()
+
+    def test_mmr_search_fetch_k_at_least_k(self):
+        """
+        测试目的：验证候选集大小不小于返回数量，且透传过滤条件
+        """
+        vector_db = _mock_vector_db()
+        retriever = VectorRetriever(vector_db)
+
+        docs = retriever.search(
+            "q", k=3, mmr_options=MMROptions(enabled=True, fetch_k=1), filter={"doc_id": 1}
+        )
+
+        assert len(docs) == 3
+        call_kwargs = vector_db._collection.query.call_args.kwargs
+        assert call_kwargs["n_results"] == 3
+        assert call_kwargs["where"] == {"doc_id": 1}
+
+    def test_mmr_search_empty_collection(self):
+        """
+        测试目的：验证向量库无候选时返回空列表
+        """
+        vector_db = MagicMock()
+        vector_db.embeddings.embed_query.return_value = [1.0, 0.0]
+        vector_db._collection.query.return_value = {
+            "documents": [[]], "metadatas": [[]], "distances": [[]], "embeddings": [[]]
+        }
+
+        assert VectorRetriever(vector_db).search("q", mmr_options=MMROptions(enabled=True)) == []
+
+
+# ============================================================================
+# retrieve_knowledge 工具测试
+# ============================================================================
+
+
+class TestRetrieveKnowledgeMMR:
+    """
+    类级注释：Agent 检索工具的 MMR 选项传递测试类
+    """
+
+    @pytest.mark.asyncio
+    async def test_tool_reads_request_scoped_options(self):
+        """
+        测试目的：验证工具在执行器线程中仍能读取当前请求的 MMR 选项
+        """
+        from app.services.agent.tool_registry import (
+            _create_retrieve_knowledge_tool,
+            retrieval_options_context,
+            tool_registry,
+        )
+
+        vector_db = _mock_vector_db()
+        retrieve_tool = _create_retrieve_knowledge_tool()
+
+        with patch.dict(tool_registry._dependencies, {'vector_db': vector_db}):
+            token = retrieval_options_context.set(MMROptions(enabled=True, lambda_mult=0.3))
+            try:
+                result = await retrieve_tool.ainvoke({"query": "q"})
+            finally:
+                retrieval_options_context.reset(token)
+
+        assert result == "A\n\nB\n\nA'"
+        vector_db._collection.query.assert_called_once()
+        vector_db.similarity_search.assert_not_called()
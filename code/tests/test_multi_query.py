@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：多查询检索测试模块
+内部逻辑：以假大模型、计数嵌入模型与内存向量库验证查询变体生成、批量向量化、并发检索、
+         延迟预算与倒数排名融合
+测试覆盖范围：
+    - QueryExpander.expand: 规则改写、大模型改写、对话上下文、失败回退与去重
+    - reciprocal_rank_fusion: 融合顺序与去重
+    - MultiQueryRetriever.asearch: 额外开销只有一次批量向量化、超出预算的变体被丢弃、未启用时走单查询检索、复用已计算的问题向量
+    - RAGStrategy.execute: 请求级开关生效
+"""
+
+import asyncio
+import time
+from typing import Dict, List
+from unittest.mock import MagicMock
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import RunnableLambda
+
+from app.schemas.chat import ChatMessage, ChatRequest
+from app.services.chat.strategies import RAGStrategy
+from app.services.retrieval.multi_query import (
+    MultiQueryOptions,
+    MultiQueryRetriever,
+    QueryExpander,
+    reciprocal_rank_fusion,
+    rule_variants,
+)
+
+
+class FakeLLM:
+    """
+    类级注释：假大模型，返回预设的改写结果并记录调用次数
+    """
+
+    def __init__(self, text: str = "", delay: float = 0.0, error: Exception = None):
+        self.text = text
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return MagicMock(content=self.text)
+
+
+class CountingEmbeddings(Embeddings):
+    """
+    类级注释：计数嵌入模型，向量的第一维记录文本编号，便于向量库按文本返回预设结果
+    """
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self.document_calls: List[List[str]] = []
+        self.query_calls = 0
+
+    def _vector(self, text: str) -> List[float]:
+        if text not in self.texts:
+            self.texts.append(text)
+        return [float(self.texts.index(text)), 1.0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.document_calls.append(list(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.query_calls += 1
+        return self._vector(text)
+
+
+class FakeVectorStore:
+    """
+    类级注释：内存向量库，按查询文本返回预设的 (片段ID, 距离) 结果
+    """
+
+    def __init__(self, results: Dict[str, List[tuple]], delays: Dict[str, float] = None):
+        self.embeddings = CountingEmbeddings()
+        self.results = results
+        self.delays = delays or {}
+        self.searched: List[str] = []
+
+    def similarity_search_by_vector_with_relevance_scores(self, embedding, k=4, filter=None):
+        text = self.embeddings.texts[int(embedding[0])]
+        self.searched.append(text)
+        time.sleep(self.delays.get(text, 0))
+        return [
+            (Document(page_content=f"片段{chunk_id}", metadata={"doc_id": 1, "chunk_id": chunk_id}), distance)
+            for chunk_id, distance in self.results.get(text, [])[:k]
+        ]
+
+    def similarity_search_with_score(self, query, k=4, filter=None):
+        return self.similarity_search_by_vector_with_relevance_scores(self.embeddings.embed_query(query), k, filter)
+
+
+def options(mode: str = "rule", num_variants: int = 3, budget_ms: int = 1500) -> MultiQueryOptions:
+    """
+    函数级注释：创建启用多查询的选项
+    """
+    return MultiQueryOptions(enabled=True, mode=mode, num_variants=num_variants, budget_ms=budget_ms)
+
+
+@pytest.mark.asyncio
+async def test_rule_variants_strip_question_words_and_split_clauses():
+    """
+    测试目的：验证规则改写去除疑问词，复合问题拆分为子问题，原问题始终位于第一个
+    """
+    question = "请问年假有几天？未休的年假怎么处理"
+    variants = await QueryExpander().expand(question, options(num_variants=5))
+
+    assert variants[0] == question
+    assert "年假有几天 未休的年假处理" in variants
+    assert "年假有几天" in variants and "未休的年假处理" in variants
+    assert rule_variants("What is the leave policy?") == ["leave policy"]
+
+
+@pytest.mark.asyncio
+async def test_llm_variants_and_fallback():
+    """
+    测试目的：验证大模型改写解析每行一个查询（去除编号），失败或超时时回退到规则改写
+    """
+    llm = FakeLLM("1. 带薪年假天数\n2. 年休假规定\n\n- 年假时长")
+    variants = await QueryExpander(llm).expand("年假多少天？", options("llm"))
+    assert variants == ["年假多少天？", "带薪年假天数", "年休假规定", "年假时长"]
+    assert llm.calls == 1
+
+    failing = await QueryExpander(FakeLLM(error=RuntimeError("boom"))).expand("年假多少天？", options("llm"))
+    slow = await QueryExpander(FakeLLM("带薪年假天数", delay=1)).expand("年假多少天？", options("llm"), timeout=0.01)
+    assert failing == slow == ["年假多少天？", "年假天"]
+
+
+@pytest.mark.asyncio
+async def test_history_variants_prefix_recent_questions():
+    """
+    测试目的：验证对话上下文生成方式将最近的用户问题与追问拼接，变体数受配置限制
+    """
+    variants = await QueryExpander().expand(
+        "那它的有效期呢？", options("history", num_variants=2), history=["什么是居住证", "居住证怎么办理"]
+    )
+
+    assert variants == ["那它的有效期呢？", "居住证办理 那它的有效期", "居住证 那它的有效期"]
+
+
+def test_reciprocal_rank_fusion_orders_by_fused_rank():
+    """
+    测试目的：验证多个查询都命中的片段排在前面，重复片段只保留一次且保留最小距离
+    """
+    def doc(chunk_id):
+        return Document(page_content=chunk_id, metadata={"chunk_id": chunk_id})
+
+    fused = reciprocal_rank_fusion([
+        [(doc("a"), 0.1), (doc("b"), 0.2)],
+        [(doc("b"), 0.15), (doc("c"), 0.3)],
+        [(doc("b"), 0.4), (doc("a"), 0.5)],
+    ])
+
+    assert [(d.metadata["chunk_id"], distance) for d, distance in fused] == [("b", 0.15), ("a", 0.1), ("c", 0.3)]
+
+
+@pytest.mark.asyncio
+async def test_extra_cost_is_one_embedding_batch():
+    """
+    测试目的：验证所有变体只进行一次批量向量化（不调用 embed_query），每个变体各检索一次，
+             大模型只调用一次，融合结果带相关度评分
+    """
+    question = "年假多少天？"
+    store = FakeVectorStore({
+        question: [("1_0", 0.2), ("1_1", 0.3)],
+        "带薪年假天数": [("1_2", 0.1), ("1_0", 0.25)],
+        "年休假规定": [("1_2", 0.15), ("1_3", 0.4)],
+    })
+    llm = FakeLLM("带薪年假天数\n年休假规定")
+
+    documents = await MultiQueryRetriever(store, llm, two_stage=False).asearch(
+        question, k=3, options=options("llm", num_variants=2)
+    )
+
+    assert store.embeddings.document_calls == [[question, "带薪年假天数", "年休假规定"]]
+    assert store.embeddings.query_calls == 0
+    assert sorted(store.searched) == sorted([question, "带薪年假天数", "年休假规定"])
+    assert llm.calls == 1
+    assert [doc.metadata["chunk_id"] for doc in documents] == ["1_2", "1_0", "1_1"]
+    assert documents[0].metadata["score"] == 0.9
+
+
+@pytest.mark.asyncio
+async def test_variants_over_budget_are_dropped():
+    """
+    测试目的：验证超出延迟预算的变体检索被丢弃，原问题的检索结果始终保留
+    """
+    question = "年假多少天？"
+    store = FakeVectorStore(
+        {question: [("1_0", 0.2)], "年假天": [("1_9", 0.1)]},
+        delays={"年假天": 0.5}
+    )
+
+    started = time.perf_counter()
+    documents = await MultiQueryRetriever(store, two_stage=False).asearch(
+        question, k=3, options=options(budget_ms=100)
+    )
+
+    assert time.perf_counter() - started < 0.4
+    assert [doc.metadata["chunk_id"] for doc in documents] == ["1_0"]
+
+
+@pytest.mark.asyncio
+async def test_disabled_uses_single_query_search():
+    """
+    测试目的：验证未启用多查询时只执行一次单查询检索
+    """
+    store = FakeVectorStore({"年假": [("1_0", 0.2)]})
+
+    documents = await MultiQueryRetriever(store, two_stage=False).asearch("年假", k=3)
+
+    assert store.embeddings.query_calls == 1
+    assert store.embeddings.document_calls == []
+    assert [doc.metadata["chunk_id"] for doc in documents] == ["1_0"]
+
+
+@pytest.mark.asyncio
+async def test_precomputed_question_embedding_is_reused():
+    """
+    测试目的：验证传入原问题向量后单查询检索不再向量化，多查询检索只批量向量化其余变体
+    """
+    question = "年假多少天？"
+    store = FakeVectorStore({question: [("1_0", 0.2)], "年假天": [("1_1", 0.3)]})
+    query_embedding = store.embeddings.embed_query(question)
+    retriever = MultiQueryRetriever(store, two_stage=False)
+
+    single = await retriever.asearch(question, k=3, query_embedding=query_embedding)
+    fused = await retriever.asearch(question, k=3, options=options(), query_embedding=query_embedding)
+
+    assert store.embeddings.query_calls == 1
+    assert store.embeddings.document_calls == [["年假天"]]
+    assert [doc.metadata["chunk_id"] for doc in single] == ["1_0"]
+    assert [doc.metadata["chunk_id"] for doc in fused] == ["1_0", "1_1"]
+
+
+@pytest.mark.asyncio
+async def test_rag_strategy_uses_multi_query_when_requested(monkeypatch):
+    """
+    测试目的：验证请求启用多查询后 RAG 策略使用对话上下文生成变体，融合结果进入提示词
+    """
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings.retrieval_config, "MULTI_QUERY_MODE", "history")
+    monkeypatch.setattr(settings.retrieval_config, "ENABLE_TWO_STAGE_RETRIEVAL", False)
+    store = FakeVectorStore({"居住证 有效期": [("2_0", 0.1)]})
+    prompts = []
+
+    async def async_llm(prompt):
+        prompts.append(prompt.to_string())
+        return "五年"
+
+    llm = RunnableLambda(lambda prompt: "五年", afunc=async_llm)
+    request = ChatRequest(
+        message="有效期呢？",
+        history=[ChatMessage(role="user", content="居住证"), ChatMessage(role="assistant", content="好的")],
+        multi_query=True
+    )
+
+    answer = await RAGStrategy(store, llm).execute(request, MagicMock())
+
+    assert len(store.embeddings.document_calls) == 1
+    assert "片段2_0" in prompts[0]
+    assert answer.documents[0].metadata["chunk_id"] == "2_0"
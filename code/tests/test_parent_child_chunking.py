@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：父子片段入库与检索测试模块
+内部逻辑：以内存向量库替代 Chroma，验证父子片段模式下向量库只写入子片段、父片段只存储在关系数据库中，
+         检索命中子片段后返回去重的父片段，以及删除与重新入库后映射保持一致
+测试覆盖范围：
+    - split_parent_child: 父子片段切分与ID
+    - IngestService.process_file / delete_document: 父片段持久化与级联删除
+    - expand_to_parents: 去重、顺序、父片段缺失回退
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from langchain_core.documents import Document
+from sqlalchemy.future import select
+
+from app.models.models import ParentChunk, VectorMapping
+from app.services.ingest_service import IngestService
+from app.services.retrieval.parent_child import expand_to_parents, split_parent_child
+
+# 内部变量：由多个段落组成的长文档
+SECTIONS = [f"第{i}节：" + f"本节说明制度条款{i}的适用范围与执行要求。" * 12 for i in range(6)]
+TEXT = "\n\n".join(SECTIONS)
+
+
+class InMemoryVectorStore:
+    """
+    类级注释：内存向量库，替代 Chroma 的入库与删除接口
+    """
+
+    # 内部变量：向量库ID -> 片段
+    records = {}
+
+    def __init__(self, **kwargs):
+        pass
+
+    @classmethod
+    def from_documents(cls, documents, embedding, ids, **kwargs):
+        for chunk_id, doc in zip(ids, documents):
+            cls.records[chunk_id] = doc
+        return cls()
+
+    def persist(self):
+        pass
+
+    def get(self, where):
+        return {"ids": [i for i, doc in self.records.items() if doc.metadata["doc_id"] == where["doc_id"]]}
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            self.records.pop(chunk_id, None)
+
+
+class UploadedFile:
+    """
+    类级注释：上传文件
+    """
+
+    filename = "制度.txt"
+
+    async def read(self):
+        return TEXT.encode()
+
+
+@pytest.fixture
+def parent_child_ingest(tmp_path, monkeypatch):
+    """
+    函数级注释：启用父子片段模式，以内存向量库替代 Chroma
+    """
+    monkeypatch.setattr("app.core.config.settings.retrieval_config.ENABLE_PARENT_CHILD_CHUNKING", True)
+    monkeypatch.setattr("app.core.config.settings.retrieval_config.PARENT_CHUNK_SIZE", 600)
+    monkeypatch.setattr("app.core.config.settings.retrieval_config.CHILD_CHUNK_SIZE", 150)
+    monkeypatch.setattr("app.core.config.settings.storage_config.UPLOAD_FILES_PATH", str(tmp_path))
+    InMemoryVectorStore.records = {}
+
+    loader = MagicMock()
+    loader.load.return_value = [Document(page_content=TEXT, metadata={"source": "制度.txt"})]
+    with patch("app.services.ingest_service.Chroma", InMemoryVectorStore), \
+            patch.object(IngestService, "_get_document_loader", return_value=loader), \
+            patch.object(IngestService, "get_embeddings", return_value=MagicMock()), \
+            patch.object(IngestService, "_refresh_document_centroid"), \
+            patch.object(IngestService, "_schedule_document_insight"):
+        yield InMemoryVectorStore.records
+
+
+async def load_mappings(db_session, doc_id):
+    """
+    函数级注释：读取文档的父片段与向量映射
+    返回值：(父片段ID -> 内容, 向量映射片段ID列表)
+    """
+    parents = (await db_session.execute(
+        select(ParentChunk).where(ParentChunk.document_id == doc_id).order_by(ParentChunk.position)
+    )).scalars().all()
+    chunk_ids = (await db_session.execute(
+        select(VectorMapping.chunk_id).where(VectorMapping.document_id == doc_id)
+    )).scalars().all()
+    return {parent.parent_id: parent.content for parent in parents}, chunk_ids
+
+
+def assert_consistent(records, parents, chunk_ids, doc_id):
+    """
+    函数级注释：校验向量库、向量映射与父片段相互一致
+    """
+    children = {i: doc for i, doc in records.items() if doc.metadata["doc_id"] == doc_id}
+    assert sorted(children) == sorted(chunk_ids)
+    assert {doc.metadata["parent_id"] for doc in children.values()} == set(parents)
+    for doc in children.values():
+        assert doc.page_content in parents[doc.metadata["parent_id"]]
+
+
+def test_split_parent_child():
+    """
+    测试目的：验证子片段不超过子片段长度、片段ID连续，且每个子片段都包含在其父片段中
+    """
+    children, parents = split_parent_child([Document(page_content=TEXT)], 7, 600, 150, 20)
+
+    assert len(parents) > 1 and len(children) > len(parents)
+    assert [parent.parent_id for parent in parents] == [f"7_p{i}" for i in range(len(parents))]
+    assert [child.metadata["chunk_id"] for child in children] == [f"7_{i}" for i in range(len(children))]
+    contents = {parent.parent_id: parent.content for parent in parents}
+    for child in children:
+        assert len(child.page_content) <= 150
+        assert child.page_content in contents[child.metadata["parent_id"]]
+
+
+@pytest.mark.asyncio
+async def test_ingest_stores_parents_in_sql_only(db_session, parent_child_ingest):
+    """
+    测试目的：验证向量库只写入子片段，父片段只存储在关系数据库中，且每个子片段都能找到父片段
+    """
+    response = await IngestService.process_file(db_session, UploadedFile())
+
+    parents, chunk_ids = await load_mappings(db_session, response.document_id)
+    assert response.chunk_count == len(chunk_ids) == len(parent_child_ingest)
+    assert len(parents) > 1
+    assert not set(parents) & set(parent_child_ingest)
+    assert_consistent(parent_child_ingest, parents, chunk_ids, response.document_id)
+
+
+@pytest.mark.asyncio
+async def test_retrieval_returns_deduplicated_parents(db_session, parent_child_ingest):
+    """
+    测试目的：验证命中的子片段替换为去重的父片段，顺序与相关度一致，并保留最相关子片段的元数据
+    """
+    response = await IngestService.process_file(db_session, UploadedFile())
+    parents, chunk_ids = await load_mappings(db_session, response.document_id)
+    first, second = list(parents)[:2]
+    children = {doc.metadata["chunk_id"]: doc for doc in parent_child_ingest.values()}
+    by_parent = {pid: [c for c in children.values() if c.metadata["parent_id"] == pid] for pid in (first, second)}
+
+    hits = [
+        Document(page_content=doc.page_content, metadata={**doc.metadata, "score": score})
+        for doc, score in (
+            (by_parent[second][0], 0.9),
+            (by_parent[first][0], 0.8),
+            (by_parent[second][1], 0.7),
+        )
+    ]
+    plain = Document(page_content="普通片段", metadata={"doc_id": 99, "chunk_id": "99_0", "score": 0.6})
+
+    expanded = await expand_to_parents(db_session, hits + [plain])
+
+    assert [doc.page_content for doc in expanded] == [parents[second], parents[first], "普通片段"]
+    assert expanded[0].metadata["chunk_id"] == by_parent[second][0].metadata["chunk_id"]
+    assert expanded[0].metadata["score"] == 0.9
+    assert expanded[0].metadata["matched_children"] == 2
+    assert expanded[2] is plain
+
+
+@pytest.mark.asyncio
+async def test_missing_parent_and_plain_results_unchanged():
+    """
+    测试目的：验证普通检索结果不访问数据库，父片段缺失时保留子片段
+    """
+    db = MagicMock()
+    documents = [Document(page_content="片段", metadata={"doc_id": 1, "chunk_id": "1_0"})]
+    assert await expand_to_parents(db, documents) == documents
+    db.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_delete_and_reingest_keep_mappings_consistent(db_session, parent_child_ingest):
+    """
+    测试目的：验证删除文档时父片段与子片段向量一并删除，重新入库后映射重新建立且无残留
+    """
+    first = await IngestService.process_file(db_session, UploadedFile())
+
+    assert await IngestService.delete_document(db_session, first.document_id)
+
+    assert parent_child_ingest == {}
+    assert (await db_session.execute(select(ParentChunk))).scalars().all() == []
+    assert (await db_session.execute(select(VectorMapping))).scalars().all() == []
+
+    second = await IngestService.process_file(db_session, UploadedFile())
+
+    parents, chunk_ids = await load_mappings(db_session, second.document_id)
+    assert second.chunk_count == first.chunk_count > 0
+    assert len((await db_session.execute(select(ParentChunk))).scalars().all()) == len(parents)
+    assert_consistent(parent_child_ingest, parents, chunk_ids, second.document_id)
+
+    hit = next(iter(parent_child_ingest.values()))
+    expanded = await expand_to_parents(db_session, [hit])
+    assert expanded[0].page_content == parents[hit.metadata["parent_id"]]
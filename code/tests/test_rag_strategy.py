@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：RAG 对话策略测试模块
+内部逻辑：使用内存 Chroma 与计数嵌入模型，验证非流式 RAG 每次请求只检索一次、只向量化一次，且走异步大模型接口
+测试覆盖范围：
+    - RAGStrategy.execute: 检索次数、嵌入次数、上下文与来源一致性
+    - VectorRetriever.asearch: 异步检索
+"""
+
+import uuid
+from typing import List
+from unittest.mock import MagicMock
+
+import chromadb
+import pytest
+from langchain_community.vectorstores.chroma import Chroma
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import RunnableLambda
+
+from app.schemas.chat import ChatRequest
+from app.services.chat.strategies import RAGStrategy
+
+
+class CountingEmbeddings(Embeddings):
+    """
+    类级注释：计数嵌入模型
+    内部逻辑：按关键词生成确定性向量，并记录调用次数
+    """
+
+    def __init__(self):
+        self.query_calls = 0
+        self.document_calls = 0
+
+    @staticmethod
+    def _vector(text: str) -> List[float]:
+        return [float("苹果" in text), float("香蕉" in text), float("橙子" in text), 0.1]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.document_calls += 1
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.query_calls += 1
+        return self._vector(text)
+
+
+@pytest.fixture
+def vector_db():
+    """
+    函数级注释：构造带计数嵌入模型的内存 Chroma 向量库
+    返回值：(向量库, 嵌入模型)
+    """
+    embeddings = CountingEmbeddings()
+    db = Chroma(
+        client=chromadb.EphemeralClient(),
+        collection_name=f"rag_{uuid.uuid4().hex[:12]}",
+        embedding_function=embeddings
+    )
+    db.add_texts(
+        ["苹果是一种水果", "香蕉富含钾", "橙子含有维生素C", "苹果可以榨汁"],
+        metadatas=[{"doc_id": 1}, {"doc_id": 2}, {"doc_id": 3}, {"doc_id": 4}]
+    )
+    embeddings.query_calls = 0
+    embeddings.document_calls = 0
+    return db, embeddings
+
+
+@pytest.mark.asyncio
+async def test_rag_retrieves_once_and_uses_async_llm(vector_db):
+    """
+    测试目的：验证一次请求只检索一次、只向量化查询一次，提示词上下文与来源来自同一次检索，且只调用异步接口
+    """
+    db, embeddings = vector_db
+    search_spy = MagicMock(wraps=db.similarity_search_with_score)
+    db.similarity_search_with_score = search_spy
+
+    prompts = []
+
+    def sync_llm(prompt):
+        raise AssertionError("不应调用同步接口")
+
+    async def async_llm(prompt):
+        prompts.append(prompt.to_string())
+        return "苹果是水果"
+
+    llm = RunnableLambda(sync_llm, afunc=async_llm)
+    request = ChatRequest(message="苹果", use_agent=False, stream=False, use_mmr=False)
+
+    answer = await RAGStrategy(db, llm).execute(request, MagicMock())
+
+    assert answer.text == "苹果是水果"
+    assert search_spy.call_count == 1
+    assert embeddings.query_calls == 1
+    assert embeddings.document_calls == 0
+
+    # 内部逻辑：来源中的每个片段都出现在提示词上下文中
+    contents = {1: "苹果是一种水果", 2: "香蕉富含钾", 3: "橙子含有维生素C", 4: "苹果可以榨汁"}
+    assert set(answer.sources_data[:2]) == {1, 4}
+    assert all(contents[doc_id] in prompts[0] for doc_id in answer.sources_data)
+
+    # 内部逻辑：片段携带检索阶段的真实相关度，按相关度降序排列
+    scores = [doc.metadata["score"] for doc in answer.documents]
+    assert scores == sorted(scores, reverse=True)
+    assert scores[0] == pytest.approx(1.0, abs=1e-3) and scores[-1] < scores[0]
+
+
+@pytest.mark.asyncio
+async def test_rag_with_mmr_embeds_query_once(vector_db):
+    """
+    测试目的：验证 MMR 模式下同样只向量化查询一次
+    """
+    db, embeddings = vector_db
+
+    async def async_llm(prompt):
+        return "回答"
+
+    llm = RunnableLambda(lambda prompt: "回答", afunc=async_llm)
+    request = ChatRequest(message="香蕉", use_agent=False, stream=False, use_mmr=True)
+
+    answer = await RAGStrategy(db, llm).execute(request, MagicMock())
+
+    assert answer.sources_data[0] == 2
+    assert embeddings.query_calls == 1
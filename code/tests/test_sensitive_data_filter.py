@@ -188,8 +188,9 @@ class TestStreamingSensitiveFilter:
         """
         chunk = "这是普通文本"
         result = self.streaming_filter.process(chunk)
-        # 缓冲区未满，暂不输出
-        assert result == ""
+        # 不可能构成敏感信息的文本立即输出
+        assert result == chunk
+        assert self.streaming_filter.buffer == ""
 
     def test_process_large_chunk(self):
         """
@@ -249,6 +250,86 @@ class TestStreamingSensitiveFilter:
         # 至少验证流式处理逻辑执行了
         assert isinstance(result, str)
 
+    def test_split_mobile_is_masked_with_minimal_hold_back(self):
+        """
+        函数级注释：测试逐字到达的手机号被完整过滤，且只保留可能未完成的后缀
+        """
+        outputs = [self.streaming_filter.process(char) for char in "电话13812345678，好"]
+        outputs.append(self.streaming_filter.flush())
+
+        assert "".join(outputs) == "电话[已隐藏手机号]，好"
+        assert outputs[:2] == ["电", "话"]
+        assert "1" not in "".join(outputs)
+
+    def test_window_never_below_longest_rule(self):
+        """
+        函数级注释：测试保留窗口不小于启用规则的最大匹配长度
+        """
+        filter_instance = SensitiveDataFilter(extra_types=[SensitiveDataType.BANK_CARD])
+        streaming_filter = StreamingSensitiveFilter(filter_instance, window_size=5)
+        card = "6222021234567890128"
+
+        outputs = [streaming_filter.process(card[i:i + 3]) for i in range(0, len(card), 3)]
+        outputs.append(streaming_filter.flush())
+
+        assert streaming_filter.window_size == 64
+        assert "".join(outputs) == "[已隐藏银行卡号]"
+
+
+class TestExtendedRules:
+    """
+    类级注释：身份证号、银行卡号规则与单次扫描测试类
+    """
+
+    def test_id_card_checksum(self):
+        """
+        函数级注释：测试身份证号校验码通过才脱敏，部分脱敏保留地区码与末四位
+        """
+        filter_instance = SensitiveDataFilter(
+            mask_strategy=MaskStrategy.PARTIAL,
+            extra_types=[SensitiveDataType.ID_CARD]
+        )
+
+        result, stats = filter_instance.filter_all("证件11010519491231002X，错误110105194912310021")
+
+        assert result == "证件110105********002X，错误110105194912310021"
+        assert stats[SensitiveDataType.ID_CARD] == 1
+
+    def test_bank_card_luhn(self):
+        """
+        函数级注释：测试银行卡号 Luhn 校验通过才脱敏，普通长数字保留
+        """
+        filter_instance = SensitiveDataFilter(extra_types=[SensitiveDataType.BANK_CARD])
+
+        result, stats = filter_instance.filter_all("卡号4111111111111111，订单号4111111111111112")
+
+        assert result == "卡号[已隐藏银行卡号]，订单号4111111111111112"
+        assert stats[SensitiveDataType.BANK_CARD] == 1
+
+    def test_extra_rules_disabled_by_default(self):
+        """
+        函数级注释：测试默认只过滤手机号与邮箱，统计结构保持不变
+        """
+        text = "卡号4111111111111111"
+        result, stats = SensitiveDataFilter().filter_all(text)
+
+        assert result == text
+        assert set(stats) == {SensitiveDataType.MOBILE, SensitiveDataType.EMAIL}
+
+    def test_single_pass_matches_sequential_filters(self):
+        """
+        函数级注释：测试单次扫描结果与依次过滤手机号、邮箱的结果一致
+        """
+        filter_instance = SensitiveDataFilter(mask_strategy=MaskStrategy.PARTIAL)
+        text = "联系13812345678或a.b@example.com，备用15912345678，邮箱x@qq.com" * 3
+
+        sequential, _ = filter_instance.filter_mobile(text)
+        sequential, _ = filter_instance.filter_email(sequential)
+        result, stats = filter_instance.filter_all(text)
+
+        assert result == sequential
+        assert stats[SensitiveDataType.MOBILE] == 6 and stats[SensitiveDataType.EMAIL] == 6
+
 
 class TestCustomPlaceholder:
     """
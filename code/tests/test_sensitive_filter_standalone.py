@@ -240,8 +240,9 @@ class TestStreamingSensitiveFilter:
         """
         chunk = "这是普通文本"
         result = self.streaming_filter.process(chunk)
-        # 缓冲区未满，暂不输出
-        assert result == ""
+        # 不可能构成敏感信息的文本立即输出
+        assert result == chunk
+        assert self.streaming_filter.buffer == ""
 
     def test_process_large_chunk(self):
         """
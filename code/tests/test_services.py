@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.ingest_service import IngestService
 from app.services.chat_service import ChatService
 from app.services.agent_service import AgentService
+from app.services.agent import AgentRunContext, agent_run_context
 from app.services.search_service import SearchService
 from app.schemas.ingest import DBIngestRequest
 from app.schemas.chat import ChatRequest
@@ -128,7 +129,7 @@ async def test_agent_service_run():
     """测试智能体服务运行逻辑"""
     agent = AgentService()
     # Mock Graph invoke
-    with patch("app.services.agent_service.AgentService.create_graph") as mock_create_graph:
+    with patch("app.services.agent_service.AgentService.get_graph") as mock_create_graph:
         mock_app = MagicMock()
         mock_create_graph.return_value = mock_app
         mock_app.ainvoke = AsyncMock(return_value={
@@ -146,7 +147,7 @@ async def test_agent_service_run_with_history():
     from langchain_core.messages import HumanMessage, AIMessage
     agent = AgentService()
     # Mock Graph invoke
-    with patch("app.services.agent_service.AgentService.create_graph") as mock_create_graph:
+    with patch("app.services.agent_service.AgentService.get_graph") as mock_create_graph:
         mock_app = MagicMock()
         mock_create_graph.return_value = mock_app
         mock_app.ainvoke = AsyncMock(return_value={
@@ -167,17 +168,23 @@ async def test_agent_service_tools():
     # 测试 retrieve_knowledge 工具
     # 这个工具在 AgentService.__init__ 中定义，需要通过图执行来测试
     # 我们通过 mock vector_db 来测试
-    with patch.object(agent.vector_db, "similarity_search") as mock_search:
+    with patch.object(agent.vector_db, "similarity_search_with_score") as mock_search:
         from langchain_core.documents import Document
         doc = Document(page_content="测试内容", metadata={"doc_id": 1})
-        mock_search.return_value = [doc]
+        mock_search.return_value = [(doc, 0.2)]
         
         # 获取工具并调用
         retrieve_tool = agent.tools[0]
-        result = retrieve_tool.invoke({"query": "测试"})
+        run_context = AgentRunContext(model=agent.model_with_tools, tools_map=agent.tools_map, tool_timeout=5)
+        token = agent_run_context.set(run_context)
+        try:
+            result = retrieve_tool.invoke({"query": "测试"})
+        finally:
+            agent_run_context.reset(token)
         assert "测试内容" in result
-        # 内部逻辑：last_retrieved_ids 是类属性
-        assert AgentService._last_retrieved_ids == [1]
+        # 内部逻辑：检索结果记录在请求级运行上下文中
+        assert run_context.sources == [1]
+        assert run_context.documents[0].metadata["score"] == 0.8
     
     # 测试 calculate 工具
     calc_tool = agent.tools[2]
@@ -346,7 +353,8 @@ async def test_agent_service_call_model():
         "messages": [HumanMessage(content="测试消息")],
         "sources": []
     }
-    result = agent._call_model(state)
+    with agent.bind_run_context():
+        result = agent._call_model(state)
     assert "messages" in result
 
 @pytest.mark.asyncio
@@ -360,7 +368,8 @@ async def test_agent_service_execute_tools():
         "messages": [msg],
         "sources": []
     }
-    result = agent._execute_tools(state)
+    with agent.bind_run_context():
+        result = await agent._execute_tools(state)
     assert "messages" in result
     assert "sources" in result
 
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：相似文档检索（More Like This）测试模块
+内部逻辑：使用内存 Chroma 集合构造多主题文档，验证代表向量、排除源文档、文档级聚合以及零嵌入调用
+测试覆盖范围：
+    - representative_vectors: 均值与 k-means 质心
+    - find_similar_documents: 向量检索与文档聚合
+    - SearchService.similar_documents: 服务层集成
+    - GET /api/v1/search/similar/{doc_id}: 接口
+"""
+
+import uuid
+from unittest.mock import MagicMock, patch
+
+import chromadb
+import numpy as np
+import pytest
+from httpx import AsyncClient
+
+from app.services.retrieval.similar_documents import find_similar_documents, representative_vectors
+from app.services.search_service import SearchService
+
+
+@pytest.fixture
+def topic_collection():
+    """
+    函数级注释：构造 8 个文档、4 个主题的内存集合
+    内部逻辑：文档 d 的片段围绕主题 (d-1) % 4 的中心分布，因此文档 1 与文档 5 同主题
+    返回值：Chroma 集合
+    """
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(4, 16))
+    collection = chromadb.EphemeralClient().create_collection(f"mlt_{uuid.uuid4().hex[:12]}")
+
+    ids, embeddings, metadatas, documents = [], [], [], []
+    for doc_id in range(1, 9):
+        for j in range(5):
+            ids.append(f"{doc_id}_{j}")
+            embeddings.append((centers[(doc_id - 1) % 4] + 0.1 * rng.normal(size=16)).tolist())
+            metadatas.append({"doc_id": doc_id})
+            documents.append(f"文档{doc_id}片段{j}")
+    collection.add(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+    return collection
+
+
+class TestRepresentativeVectors:
+    """
+    类级注释：代表向量构建测试类
+    """
+
+    def test_mean_vector(self):
+        """
+        测试目的：验证单个代表向量为片段均值
+        """
+        result = representative_vectors([[0.0, 2.0], [2.0, 0.0]])
+        assert result.shape == (1, 2)
+        assert np.allclose(result[0], [1.0, 1.0])
+
+    def test_centroids_separate_topics(self):
+        """
+        测试目的：验证多质心能区分文档中的不同主题
+        """
+        vectors = [[0.0, 0.0], [0.1, 0.0], [10.0, 10.0], [10.1, 10.0]]
+        result = representative_vectors(vectors, n_centroids=2)
+
+        centers = sorted(result.tolist())
+        assert np.allclose(centers[0], [0.05, 0.0])
+        assert np.allclose(centers[1], [10.05, 10.0])
+
+    def test_fewer_chunks_than_centroids(self):
+        """
+        测试目的：验证片段数不超过质心数时直接使用片段向量
+        """
+        result = representative_vectors([[1.0, 0.0], [0.0, 1.0]], n_centroids=3)
+        assert result.shape == (2, 2)
+
+
+class TestFindSimilarDocuments:
+    """
+    类级注释：相似文档检索测试类
+    """
+
+    def test_excludes_source_and_ranks_same_topic_first(self, topic_collection):
+        """
+        测试目的：验证结果不包含源文档，且同主题文档排在第一位
+        """
+        hits = find_similar_documents(topic_collection, 1, top_k=3)
+
+        assert 1 not in [hit.doc_id for hit in hits]
+        assert hits[0].doc_id == 5
+        assert hits[0].matched_chunks == 5
+        assert hits[0].best_chunk.startswith("文档5")
+        assert len(hits) == 3
+        assert [hit.score for hit in hits] == sorted([hit.score for hit in hits], reverse=True)
+
+    def test_multiple_centroids(self, topic_collection):
+        """
+        测试目的：验证多质心检索时同一片段只计一次
+        """
+        hits = find_similar_documents(topic_collection, 2, top_k=8, n_centroids=3, chunks_per_query=35)
+
+        assert hits[0].doc_id == 6
+        assert all(hit.matched_chunks <= 5 for hit in hits)
+        assert len(hits) == 7
+
+    def test_missing_document(self, topic_collection):
+        """
+        测试目的：验证源文档没有片段时抛出 ValueError
+        """
+        with pytest.raises(ValueError):
+            find_similar_documents(topic_collection, 999)
+
+
+class TestSearchServiceSimilarDocuments:
+    """
+    类级注释：搜索服务相似文档测试类
+    """
+
+    @pytest.mark.asyncio
+    async def test_no_embedding_calls(self, topic_collection):
+        """
+        测试目的：验证相似文档检索不调用嵌入模型，并补充文件名
+        """
+        mock_db_vector = MagicMock()
+        mock_db_vector._collection = topic_collection
+        mock_embeddings = MagicMock()
+
+        document = MagicMock(id=5, file_name="同主题.pdf", source_type="FILE")
+        db = MagicMock()
+        db_result = MagicMock()
+        db_result.scalars.return_value.all.return_value = [document]
+
+        async def execute(*args, **kwargs):
+            return db_result
+        db.execute = execute
+
+        with patch('app.services.search_service.Chroma', return_value=mock_db_vector) as mock_chroma, \
+             patch('app.services.search_service.IngestService.get_embeddings', return_value=mock_embeddings):
+            results = await SearchService.similar_documents(1, top_k=2, db=db)
+
+        assert [r.doc_id for r in results][0] == 5
+        assert results[0].file_name == "同主题.pdf"
+        assert "embedding_function" not in mock_chroma.call_args.kwargs
+        mock_embeddings.embed_query.assert_not_called()
+        mock_embeddings.embed_documents.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_similar_documents_api_not_found(client: AsyncClient):
+    """
+    测试目的：验证源文档没有向量时返回 404
+    """
+    with patch.object(SearchService, 'similar_documents', side_effect=ValueError("未找到")):
+        response = await client.get("/api/v1/search/similar/12345")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_similar_documents_api(client: AsyncClient):
+    """
+    测试目的：验证接口参数透传与返回格式
+    """
+    from app.schemas.search import SimilarDocumentResult
+
+    result = SimilarDocumentResult(doc_id=2, score=0.9, matched_chunks=3, best_chunk="片段")
+    with patch.object(SearchService, 'similar_documents', return_value=[result]) as mock_similar:
+        response = await client.get("/api/v1/search/similar/1?top_k=3&centroids=2")
+
+    assert response.status_code == 200
+    assert response.json()["data"][0]["doc_id"] == 2
+    assert mock_similar.call_args.kwargs["top_k"] == 3
+    assert mock_similar.call_args.kwargs["n_centroids"] == 2
@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：请求合并测试模块
+内部逻辑：使用带延迟并统计调用次数的测试函数，验证 N 个并发的相同请求只触发一次底层调用，
+         流式请求广播给所有订阅者，以及在查询向量、语义搜索与问答中的应用
+测试覆盖范围：
+    - SingleFlight: do / do_sync / stream、异常传递、取消、统计
+    - SingleFlightEmbeddings: 查询向量合并
+    - SearchService.semantic_search、ChatOrchestrator.chat / stream_chat: 相同请求合并、合并执行使用独立会话
+"""
+
+import asyncio
+import json
+import threading
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.schemas.chat import ChatRequest, SourceInfo
+from app.schemas.search import SearchResult
+from app.services.chat.orchestrator import ChatOrchestrator
+from app.services.chat.strategies import ChatAnswer
+from app.services.search_service import SearchService
+from app.utils.singleflight import SingleFlight, SingleFlightEmbeddings, get_singleflight
+
+
+class TestSingleFlight:
+    """
+    类级注释：请求合并器测试类
+    """
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        """
+        测试目的：验证 N 个并发的相同调用只执行一次，统计被合并的调用次数
+        """
+        flight = SingleFlight("test")
+        calls = []
+
+        async def provider():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "结果"
+
+        results = await asyncio.gather(*(flight.do("key", provider) for _ in range(10)))
+
+        assert results == ["结果"] * 10
+        assert len(calls) == 1
+        stats = flight.get_stats()
+        assert (stats["executions"], stats["coalesced"], stats["in_flight"]) == (1, 9, 0)
+
+        # 内部逻辑：执行完成后不缓存结果，后续调用重新执行
+        await flight.do("key", provider)
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_all_callers_and_cancel_is_isolated(self):
+        """
+        测试目的：验证异常传递给所有调用方，单个调用方取消不影响其他调用方
+        """
+        flight = SingleFlight("test")
+
+        async def failing():
+            await asyncio.sleep(0.05)
+            raise ValueError("提供方不可用")
+
+        results = await asyncio.gather(*(flight.do("bad", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+
+        async def slow():
+            await asyncio.sleep(0.1)
+            return 42
+
+        first = asyncio.ensure_future(flight.do("slow", slow))
+        second = asyncio.ensure_future(flight.do("slow", slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert await second == 42
+        assert first.cancelled()
+
+    @pytest.mark.asyncio
+    async def test_stream_broadcasts_to_all_subscribers(self):
+        """
+        测试目的：验证并发的相同流式调用只创建一次数据源，中途加入的订阅者也收到完整数据
+        """
+        flight = SingleFlight("test")
+        opened = []
+
+        async def source():
+            opened.append(1)
+            for index in range(4):
+                await asyncio.sleep(0.02)
+                yield index
+
+        async def consume(delay=0.0):
+            await asyncio.sleep(delay)
+            return [item async for item in flight.stream("key", source)]
+
+        results = await asyncio.gather(consume(), consume(), consume(0.05))
+
+        assert results == [[0, 1, 2, 3]] * 3
+        assert len(opened) == 1
+        assert flight.get_stats()["coalesced"] == 2
+
+    @pytest.mark.asyncio
+    async def test_stream_source_closed_when_all_subscribers_leave(self):
+        """
+        测试目的：验证所有订阅者离开后停止读取数据源
+        """
+        flight = SingleFlight("test")
+        closed = asyncio.Event()
+
+        async def source():
+            try:
+                for index in range(100):
+                    await asyncio.sleep(0.01)
+                    yield index
+            finally:
+                closed.set()
+
+        async for item in flight.stream("key", source):
+            if item == 1:
+                break
+
+        await asyncio.wait_for(closed.wait(), timeout=1)
+        await asyncio.sleep(0)
+        assert flight.get_stats()["in_flight"] == 0
+
+    def test_do_sync_across_threads(self):
+        """
+        测试目的：验证多个线程中并发的相同同步调用只执行一次
+        """
+        flight = SingleFlight("test")
+        calls = []
+        barrier = threading.Barrier(8)
+
+        def provider():
+            calls.append(1)
+            time.sleep(0.1)
+            return [0.5]
+
+        def call():
+            barrier.wait()
+            return flight.do_sync("key", provider)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: call(), range(8)))
+
+        assert results == [[0.5]] * 8
+        assert len(calls) == 1
+
+
+class CountingEmbeddings:
+    """
+    类级注释：统计调用次数的测试 Embedding
+    """
+
+    model = "test-embedding"
+
+    def __init__(self):
+        self.query_calls = 0
+
+    def embed_query(self, text):
+        self.query_calls += 1
+        time.sleep(0.1)
+        return [float(len(text))]
+
+    def embed_documents(self, texts):
+        return [[float(len(text))] for text in texts]
+
+
+def test_embeddings_coalesce_concurrent_queries():
+    """
+    测试目的：验证并发计算相同查询向量只调用一次底层模型，其他方法与属性透传
+    """
+    inner = CountingEmbeddings()
+    embeddings = SingleFlightEmbeddings(inner)
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        vectors = list(pool.map(embeddings.embed_query, ["年假天数"] * 6))
+
+    assert vectors == [[4.0]] * 6
+    assert inner.query_calls == 1
+    assert embeddings.embed_documents(["ab"]) == [[2.0]]
+    assert embeddings.model == "test-embedding"
+
+
+@pytest.mark.asyncio
+async def test_semantic_search_coalesces_identical_queries():
+    """
+    测试目的：验证并发的相同语义搜索只执行一次，每个调用方得到独立的结果副本
+    """
+    async def search(*args):
+        await asyncio.sleep(0.05)
+        return [SearchResult(doc_id=1, file_name="a.pdf", content="年假", score=0.9)]
+
+    with patch.object(SearchService, "_semantic_search", new=AsyncMock(side_effect=search)) as provider:
+        results = await asyncio.gather(*(SearchService.semantic_search("年假", top_k=3) for _ in range(5)))
+        await SearchService.semantic_search("报销", top_k=3)
+
+    assert provider.await_count == 2
+    assert all(result[0].content == "年假" for result in results)
+    assert results[0][0] is not results[1][0]
+
+
+def tracked_sessions(monkeypatch, module: str) -> list:
+    """
+    函数级注释：替换模块中的独立会话工厂，记录创建的会话及其关闭状态
+    参数：
+        module - 使用 open_session 的模块路径
+    返回值：list - 创建的会话
+    """
+    sessions = []
+
+    @asynccontextmanager
+    async def open_session(like=None):
+        session = MagicMock(closed=False, like=like)
+        sessions.append(session)
+        try:
+            yield session
+        finally:
+            session.closed = True
+
+    monkeypatch.setattr(f"{module}.open_session", open_session)
+    return sessions
+
+
+@pytest.mark.asyncio
+async def test_coalesced_search_uses_own_session(monkeypatch):
+    """
+    测试目的：验证合并执行的语义搜索使用独立会话查询文件名，而不是发起请求的会话
+    """
+    sessions = tracked_sessions(monkeypatch, "app.services.search_service")
+    used = []
+
+    async def search(query, top_k, enable_reranking, db, *args):
+        used.append(db)
+        return []
+
+    request_db = MagicMock()
+    with patch.object(SearchService, "_semantic_search", new=AsyncMock(side_effect=search)):
+        await SearchService.semantic_search("年假", top_k=3, db=request_db)
+        await SearchService.semantic_search("年假", top_k=3)
+
+    assert used == [sessions[0], None]
+    assert len(sessions) == 1 and sessions[0].closed and sessions[0].like is request_db
+
+
+@pytest.fixture
+def orchestrator(monkeypatch):
+    """
+    函数级注释：构造策略带延迟并统计调用次数的编排器
+    返回值：(编排器, 策略)
+    """
+    monkeypatch.setattr("app.services.ingest_service.IngestService.get_embeddings", MagicMock)
+    monkeypatch.setattr("app.services.chat.orchestrator.llm_provider.get_llm", AsyncMock(return_value=MagicMock()))
+
+    async def execute(request, db, query_embedding=None):
+        await asyncio.sleep(0.05)
+        return ChatAnswer("每年 5 天年假", [1], context_tokens=120)
+
+    strategy = MagicMock()
+    strategy.execute = AsyncMock(side_effect=execute)
+    monkeypatch.setattr("app.services.chat.orchestrator.ChatStrategyFactory.get_strategy", lambda use_agent: strategy)
+
+    sources_processor = MagicMock()
+    sources_processor.process = AsyncMock(return_value=[
+        SourceInfo(doc_id=1, file_name="员工手册.pdf", text_segment="年假")
+    ])
+    return ChatOrchestrator(sources_processor=sources_processor, document_formatter=MagicMock()), strategy
+
+
+class TestChatCoalescing:
+    """
+    类级注释：问答请求合并测试类
+    """
+
+    @pytest.mark.asyncio
+    async def test_identical_questions_trigger_one_llm_call(self, orchestrator):
+        """
+        测试目的：验证 N 个并发的相同问题只执行一次策略，带对话历史或属于不同会话的请求不合并
+        """
+        orchestrator, strategy = orchestrator
+        get_singleflight("chat").reset_stats()
+
+        responses = await asyncio.gather(*(
+            orchestrator.chat(MagicMock(), ChatRequest(message="年假天数")) for _ in range(5)
+        ))
+        assert strategy.execute.await_count == 1
+        assert [response.answer for response in responses] == ["每年 5 天年假"] * 5
+        assert responses[0] is not responses[1]
+        assert get_singleflight("chat").get_stats()["coalesced"] == 4
+
+        history = [{"role": "user", "content": "你好"}]
+        await asyncio.gather(*(
+            orchestrator.chat(MagicMock(), ChatRequest(message="年假天数", history=history)) for _ in range(2)
+        ))
+        assert strategy.execute.await_count == 3
+
+        await asyncio.gather(*(
+            orchestrator.chat(MagicMock(), ChatRequest(message="年假天数", conversation_id=conversation_id))
+            for conversation_id in (1, 2)
+        ))
+        assert strategy.execute.await_count == 5
+
+    @pytest.mark.asyncio
+    async def test_identical_streams_share_one_generation(self, orchestrator, monkeypatch):
+        """
+        测试目的：验证并发的相同流式问答只生成一次，所有请求方收到相同的数据块
+        """
+        orchestrator, _ = orchestrator
+        generations = []
+
+        async def execute(request, db, query_embedding=None):
+            generations.append(1)
+            for part in ("每年", " 5 天"):
+                await asyncio.sleep(0.02)
+                yield f"data: {json.dumps({'answer': part}, ensure_ascii=False)}\n\n"
+
+        stream_strategy = MagicMock()
+        stream_strategy.execute = execute
+
+        async def consume():
+            return [chunk async for chunk in orchestrator.stream_chat(MagicMock(), ChatRequest(message="年假天数"))]
+
+        with patch("app.services.chat.orchestrator.StreamingStrategyFactory.get_strategy", return_value=stream_strategy):
+            results = await asyncio.gather(*(consume() for _ in range(4)))
+
+        assert len(generations) == 1
+        assert all(result == results[0] for result in results)
+        assert len(results[0]) == 3
+
+    @pytest.mark.asyncio
+    async def test_coalescing_can_be_disabled(self, orchestrator, monkeypatch):
+        """
+        测试目的：验证关闭请求合并后每个请求独立执行
+        """
+        orchestrator, strategy = orchestrator
+        monkeypatch.setattr("app.core.config.settings.task_config.ENABLE_REQUEST_COALESCING", False)
+
+        await asyncio.gather(*(orchestrator.chat(MagicMock(), ChatRequest(message="年假天数")) for _ in range(3)))
+
+        assert strategy.execute.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_shared_answer_outlives_leader_session(self, orchestrator, monkeypatch):
+        """
+        测试目的：验证合并执行的问答使用独立会话，发起请求被取消后其余请求方仍得到回答
+        """
+        orchestrator, strategy = orchestrator
+        sessions = tracked_sessions(monkeypatch, "app.services.chat.orchestrator")
+        release = asyncio.Event()
+
+        async def execute(request, db, query_embedding=None):
+            await release.wait()
+            return ChatAnswer("每年 5 天年假", [1], context_tokens=120)
+
+        strategy.execute.side_effect = execute
+        get_singleflight("chat").reset_stats()
+        request_db = MagicMock()
+
+        leader = asyncio.create_task(orchestrator.chat(request_db, ChatRequest(message="年假天数")))
+        while not strategy.execute.await_count:
+            await asyncio.sleep(0.005)
+        follower = asyncio.create_task(orchestrator.chat(MagicMock(), ChatRequest(message="年假天数")))
+        while not get_singleflight("chat").get_stats()["coalesced"]:
+            await asyncio.sleep(0.005)
+
+        leader.cancel()
+        release.set()
+        response = await follower
+
+        assert response.answer == "每年 5 天年假"
+        assert strategy.execute.await_args.args[1] is sessions[0]
+        assert len(sessions) == 1 and sessions[0].closed
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：来源信息处理器测试模块
+内部逻辑：使用模拟数据库会话记录执行的查询，验证来源按实际使用的片段构建，
+         评分与片段ID来自检索阶段，且每次请求只执行一次文件名查询
+测试覆盖范围：
+    - SourcesProcessor.process: 片段来源、已删除文档过滤、仅文档ID时的文档级来源
+    - _merge_documents: Agent 多次检索的片段去重
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from langchain_core.documents import Document
+
+from app.services.agent_service import _merge_documents
+from app.services.chat.sources_processor import SourcesProcessor
+
+
+def make_db(rows):
+    """
+    函数级注释：构造返回固定 (id, file_name) 行的模拟数据库会话
+    """
+    result = MagicMock()
+    result.all.return_value = rows
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+    return db
+
+
+def make_chunk(doc_id, chunk_id, score, text="片段内容"):
+    """
+    函数级注释：构造带检索元数据的片段
+    """
+    return Document(page_content=text, metadata={"doc_id": doc_id, "chunk_id": chunk_id, "score": score})
+
+
+class TestSourcesProcessor:
+    """
+    类级注释：来源信息处理器测试类
+    """
+
+    @pytest.mark.asyncio
+    async def test_sources_carry_chunk_ids_and_real_scores(self):
+        """
+        测试目的：验证每个实际使用的片段对应一条来源，评分与片段ID来自检索结果，且只执行一次查询
+        """
+        db = make_db([(1, "员工手册.pdf"), (2, "报销制度.docx")])
+        documents = [make_chunk(1, "1_3", 0.82), make_chunk(2, "2_0", 0.61), make_chunk(1, "1_7", 0.55)]
+
+        sources = await SourcesProcessor().process([1, 2, 1], db, documents)
+
+        assert [(s.doc_id, s.chunk_id, s.score) for s in sources] == [
+            (1, "1_3", 0.82), (2, "2_0", 0.61), (1, "1_7", 0.55)
+        ]
+        assert sources[1].file_name == "报销制度.docx"
+        assert db.execute.await_count == 1
+        assert "vector_mappings" not in str(db.execute.await_args.args[0])
+
+    @pytest.mark.asyncio
+    async def test_deleted_documents_are_skipped(self):
+        """
+        测试目的：验证已删除文档的片段被过滤
+        """
+        db = make_db([(1, "员工手册.pdf")])
+
+        sources = await SourcesProcessor().process([], db, [make_chunk(9, "9_0", 0.9), make_chunk(1, "1_0", 0.7)])
+
+        assert [s.chunk_id for s in sources] == ["1_0"]
+
+    @pytest.mark.asyncio
+    async def test_doc_ids_only_returns_document_level_sources(self):
+        """
+        测试目的：验证只有文档ID时返回去重的文档级来源，不加载文档片段、不伪造评分
+        """
+        db = make_db([(1, "员工手册.pdf"), (2, "报销制度.docx")])
+
+        sources = await SourcesProcessor().process([2, 1, 2], db)
+
+        assert [(s.doc_id, s.score, s.chunk_id) for s in sources] == [(2, None, None), (1, None, None)]
+        assert db.execute.await_count == 1
+
+
+def test_merge_documents_deduplicates_by_chunk():
+    """
+    测试目的：验证 Agent 多次检索的片段按片段ID去重并保持首次顺序
+    """
+    first = [make_chunk(1, "1_0", 0.9), make_chunk(2, "2_0", 0.8)]
+    second = [make_chunk(2, "2_0", 0.8), make_chunk(3, "3_1", 0.7)]
+
+    merged = _merge_documents(first, second)
+
+    assert [doc.metadata["chunk_id"] for doc in merged] == ["1_0", "2_0", "3_1"]
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：SSE 数据帧编码测试模块
+内部逻辑：验证帧编码与原 json.dumps 格式兼容，以及回答片段按时间窗口与字节阈值合并
+测试覆盖范围：
+    - sse_event / answer_event / parse_event / DONE_EVENT: 编码与解析
+    - coalesce_text: 首片段立即输出、窗口合并、字节阈值、按时刷新、异常传播、关闭合并
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.utils.sse import DONE_EVENT, answer_event, coalesce_text, parse_event, sse_event
+
+
+async def timed_source(items):
+    """
+    函数级注释：按指定延迟依次产出片段
+    参数：
+        items - (延迟秒数, 片段) 列表，片段为异常实例时抛出
+    """
+    for delay, item in items:
+        await asyncio.sleep(delay)
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+async def collect(source, window_ms=20, max_bytes=1024):
+    """
+    函数级注释：收集合并后的文本及输出时间
+    """
+    start = time.perf_counter()
+    return [(text, time.perf_counter() - start) async for text in coalesce_text(source, window_ms, max_bytes)]
+
+
+class TestEncoding:
+    """
+    类级注释：帧编码测试类
+    """
+
+    @pytest.mark.parametrize("text", ["你好", 'quote " back\\slash', "换行\n制表\t", ""])
+    def test_answer_event_round_trip(self, text):
+        """
+        测试目的：验证回答帧可被标准 JSON 解析还原
+        """
+        frame = answer_event(text)
+        assert frame.startswith("data: ") and frame.endswith("\n\n")
+        assert json.loads(frame[6:]) == {"answer": text}
+
+    def test_done_event_matches_legacy_format(self):
+        """
+        测试目的：验证完成帧与原 json.dumps 输出逐字节一致
+        """
+        assert DONE_EVENT == f"data: {json.dumps({'done': True}, ensure_ascii=False)}\n\n"
+
+    def test_sse_event_and_parse(self):
+        """
+        测试目的：验证通用帧保留中文并可解析，非 data 帧或格式错误时返回 None
+        """
+        payload = {"sources": [{"doc_id": 1, "file_name": "手册.pdf"}], "context_tokens": 12}
+        frame = sse_event(payload)
+
+        assert "手册.pdf" in frame
+        assert parse_event(frame) == payload
+        assert parse_event(": keep-alive\n\n") is None
+        assert parse_event("data: {broken\n\n") is None
+
+
+class TestCoalesceText:
+    """
+    类级注释：回答片段合并测试类
+    """
+
+    @pytest.mark.asyncio
+    async def test_first_chunk_immediate_then_merged(self):
+        """
+        测试目的：验证首个片段立即输出，窗口内的后续片段合并为一次输出
+        """
+        source = timed_source([(0, "你")] + [(0.001, c) for c in "好世界"])
+
+        result = await collect(source, window_ms=50)
+
+        assert [text for text, _ in result] == ["你", "好世界"]
+        assert result[0][1] < 0.03
+
+    @pytest.mark.asyncio
+    async def test_flushes_on_window_without_next_chunk(self):
+        """
+        测试目的：验证窗口到期时即使没有新片段也立即输出，不等待下一个片段
+        """
+        source = timed_source([(0, "a"), (0.001, "b"), (0.3, "c")])
+
+        result = await collect(source, window_ms=20)
+
+        assert [text for text, _ in result] == ["a", "b", "c"]
+        assert result[1][1] < 0.15
+
+    @pytest.mark.asyncio
+    async def test_byte_threshold(self):
+        """
+        测试目的：验证累积字节数达到阈值时立即输出
+        """
+        source = timed_source([(0, "x")] + [(0, "中文") for _ in range(4)])
+
+        result = await collect(source, window_ms=1000, max_bytes=12)
+
+        texts = [text for text, _ in result]
+        assert "".join(texts) == "x" + "中文" * 4
+        assert texts[1] == "中文中文"
+        assert result[-1][1] < 0.5
+
+    @pytest.mark.asyncio
+    async def test_error_flushes_buffer_then_raises(self):
+        """
+        测试目的：验证源抛出异常时先输出已缓冲的文本再抛出原异常
+        """
+        source = timed_source([(0, "a"), (0.001, "b"), (0.001, RuntimeError("断开"))])
+        received = []
+
+        with pytest.raises(RuntimeError, match="断开"):
+            async for text in coalesce_text(source, 200, 1024):
+                received.append(text)
+
+        assert "".join(received) == "ab"
+
+    @pytest.mark.asyncio
+    async def test_disabled_passes_through(self):
+        """
+        测试目的：验证窗口为 0 时逐片段透传并跳过空片段
+        """
+        source = timed_source([(0, "a"), (0, ""), (0, "b")])
+
+        assert [text for text, _ in await collect(source, window_ms=0)] == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_close_cancels_reader(self):
+        """
+        测试目的：验证消费方提前关闭时后台读取任务被取消
+        """
+        cancelled = asyncio.Event()
+
+        async def endless():
+            try:
+                while True:
+                    yield "x"
+                    await asyncio.sleep(0.001)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        stream = coalesce_text(endless(), 5, 1024)
+        assert await stream.__anext__() == "x"
+        await stream.aclose()
+
+        await asyncio.wait_for(cancelled.wait(), 1)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：流式对话事件测试模块
+内部逻辑：验证事件编码与原 SSE 帧格式一致、SSE 文本可转换为事件，
+         以及会话持久化直接读取事件字段（流式过程中不再解析 SSE 文本）
+测试覆盖范围：
+    - StreamEvent.encode: 回答帧、完成帧、来源帧
+    - to_stream_event / as_stream_events: SSE 文本转换、跳过无效帧
+    - ConversationService.send_message_events: 按事件持久化回答、来源与上下文 Token
+"""
+
+import json
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.future import select
+
+from app.models.conversation import Message, MessageRole, MessageSource, TokenUsage
+from app.schemas.conversation import CreateConversationRequest, SendMessageRequest
+from app.services.conversation_service import ConversationService
+from app.utils.sse import DONE_EVENT, answer_event
+from app.utils.stream_events import STREAM_DONE, StreamEvent, as_stream_events, to_stream_event
+
+# 内部变量：来源信息
+SOURCES = [{"doc_id": None, "chunk_id": "1_0", "file_name": "手册.pdf", "text_segment": "年假", "score": 0.9}]
+
+
+def test_encode_matches_legacy_frames():
+    """
+    测试目的：验证事件编码结果与原 SSE 帧一致
+    """
+    assert StreamEvent(answer="你好").encode() == answer_event("你好")
+    assert STREAM_DONE.encode() == DONE_EVENT
+    assert StreamEvent(done=True).encode() == DONE_EVENT
+
+    frame = StreamEvent(sources=SOURCES, context_tokens=80, cached=True).encode()
+    assert json.loads(frame[6:]) == {"sources": SOURCES, "context_tokens": 80, "cached": True}
+    assert json.loads(StreamEvent(answer="", sources=[]).encode()[6:]) == {"answer": "", "sources": []}
+
+
+@pytest.mark.asyncio
+async def test_sse_text_converted_once():
+    """
+    测试目的：验证策略产出的 SSE 文本转换为事件，无效帧被跳过，事件原样透传
+    """
+    event = StreamEvent(answer="片段")
+
+    async def items():
+        yield 'data: {"warning": "降级"}\n\n'
+        yield "data: {broken\n\n"
+        yield event
+
+    converted = [item async for item in as_stream_events(items())]
+
+    assert converted == [StreamEvent(warning="降级"), event]
+    assert converted[1] is event
+    assert to_stream_event(": keep-alive\n\n") is None
+
+
+@pytest.mark.asyncio
+async def test_persistence_reads_event_fields(db_session):
+    """
+    测试目的：验证会话持久化直接读取事件字段，流式过程中不解析 SSE 文本
+    """
+    conv = await ConversationService.create_conversation(db_session, CreateConversationRequest(title="事件"))
+
+    async def events(db, request):
+        yield StreamEvent(sources=SOURCES, context_tokens=120)
+        for part in ("每年", " 5 天", "年假"):
+            yield StreamEvent(answer=part)
+        yield STREAM_DONE
+
+    with patch("app.services.conversation_service.ChatService") as chat_service, \
+            patch("app.utils.stream_events.parse_event", side_effect=AssertionError("不应解析 SSE 文本")):
+        chat_service.stream_chat_events = events
+        received = [
+            event async for event in ConversationService.send_message_events(
+                db_session, conv.id, SendMessageRequest(content="年假几天")
+            )
+        ]
+
+    assert all(isinstance(event, StreamEvent) for event in received)
+    assert received[-1] == STREAM_DONE
+
+    message = (await db_session.execute(
+        select(Message).where(Message.conversation_id == conv.id, Message.role == MessageRole.ASSISTANT)
+    )).scalar_one()
+    assert message.content == "每年 5 天年假"
+    usage = (await db_session.execute(select(TokenUsage).where(TokenUsage.message_id == message.id))).scalar_one()
+    assert usage.prompt_tokens == 120
+    source = (await db_session.execute(select(MessageSource).where(MessageSource.message_id == message.id))).scalar_one()
+    assert source.chunk_id == "1_0"
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：Token 计数测试模块
+内部逻辑：验证流式增量计数与整段计数一致、计数结果按文本缓存，
+         以及配置本地分词器（测试中生成的按空白切分的极小分词器）后计数与截断使用分词结果
+测试覆盖范围：
+    - StreamTokenCounter: 估算模式与分词器模式
+    - count_tokens: 按文本缓存、分词器计数
+    - truncate_to_tokens: 分词器模式按 Token 偏移截断
+    - TokenPricingCalculator.estimate_tokens: 委托 count_tokens
+"""
+
+import random
+
+import pytest
+from tokenizers import Tokenizer
+from tokenizers.models import WordLevel
+from tokenizers.pre_tokenizers import Whitespace
+
+from app.core.token_pricing import TokenPricingCalculator
+from app.utils import token_counter
+from app.utils.token_counter import StreamTokenCounter, count_tokens, reset_tokenizer, truncate_to_tokens
+
+# 内部变量：中英混合的回答文本
+ANSWER = "根据员工手册，员工每年享有 5 天带薪年假（annual_leave），入职满一年后可通过 HR-portal 申请。" * 5
+
+
+@pytest.fixture(autouse=True)
+def clean_tokenizer():
+    """
+    函数级注释：测试前后重置分词器与计数缓存
+    """
+    reset_tokenizer()
+    yield
+    reset_tokenizer()
+
+
+@pytest.fixture
+def word_tokenizer(tmp_path, monkeypatch):
+    """
+    函数级注释：生成按空白与标点切分、每个词一个 Token 的分词器，并配置为 TOKENIZER_PATH
+    """
+    tokenizer = Tokenizer(WordLevel({"[UNK]": 0}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    tokenizer.save(str(tmp_path / "tokenizer.json"))
+    monkeypatch.setattr("app.core.config.settings.retrieval_config.TOKENIZER_PATH", str(tmp_path))
+    reset_tokenizer()
+    return tokenizer
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_stream_counter_matches_full_count(seed):
+    """
+    测试目的：验证任意切分的流式片段增量计数结果与整段计数一致（包括单词被切开的情况）
+    """
+    rng = random.Random(seed)
+    counter = StreamTokenCounter()
+    position = 0
+    while position < len(ANSWER):
+        size = rng.randint(1, 6)
+        counter.feed(ANSWER[position:position + size])
+        position += size
+
+    assert counter.total == count_tokens(ANSWER)
+    assert TokenPricingCalculator.estimate_tokens(ANSWER) == counter.total
+
+
+def test_counts_are_cached_per_message():
+    """
+    测试目的：验证同一消息重复计数时命中缓存
+    """
+    count_tokens(ANSWER)
+    hits = token_counter._count_cached.cache_info().hits
+
+    count_tokens(ANSWER)
+
+    assert token_counter._count_cached.cache_info().hits == hits + 1
+
+
+def test_tokenizer_used_when_configured(word_tokenizer):
+    """
+    测试目的：验证配置本地分词器后按分词结果计数与截断
+    """
+    text = "annual leave requests go through the HR portal"
+
+    assert count_tokens(text) == 8
+    assert truncate_to_tokens(text, 3) == "annual leave requests"
+    assert truncate_to_tokens(text, 8) == text
+
+
+def test_stream_counter_with_tokenizer(word_tokenizer):
+    """
+    测试目的：验证分词器模式下流式增量计数与整段计数一致
+    """
+    text = "annual leave requests go through the HR portal " * 3
+    counter = StreamTokenCounter()
+    for position in range(0, len(text), 4):
+        counter.feed(text[position:position + 4])
+
+    assert counter.total == count_tokens(text) == 24
+
+
+def test_missing_tokenizer_falls_back_to_estimate(tmp_path, monkeypatch):
+    """
+    测试目的：验证分词器文件不存在时回退为估算
+    """
+    monkeypatch.setattr("app.core.config.settings.retrieval_config.TOKENIZER_PATH", str(tmp_path / "missing.json"))
+    reset_tokenizer()
+
+    assert token_counter.get_tokenizer() is None
+    assert count_tokens(ANSWER) == token_counter.estimate_tokens(ANSWER)
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+上海宇羲伏天智能科技有限公司出品
+
+文件级注释：会话检索工作集测试模块
+内部逻辑：使用内存 Chroma 与关键词嵌入模型，验证追问优先命中会话工作集、低于阈值时回退到全量检索，
+         以及会话删除、过期、文档变更时工作集被淘汰
+测试覆盖范围：
+    - RetrievalWorkingSets.asearch / lookup: 命中、回退、MMR、统计、命中评分与全量检索同尺度
+    - RetrievalWorkingSets: 容量、过期、文档失效
+    - MultiQueryRetriever.asearch: 只有会话内的对话使用工作集
+    - ConversationService.delete_conversation: 删除会话时淘汰工作集
+"""
+
+import uuid
+from typing import List
+from unittest.mock import MagicMock
+
+import chromadb
+import numpy as np
+import pytest
+from langchain_community.vectorstores.chroma import Chroma
+from langchain_core.embeddings import Embeddings
+
+from app.schemas.conversation import CreateConversationRequest
+from app.services.conversation_service import ConversationService
+from app.services.retrieval import MMROptions, MultiQueryRetriever, VectorRetriever
+from app.services.retrieval.working_set import RetrievalWorkingSets, get_working_sets
+
+# 内部变量：关键词（向量的每一维对应一个关键词）
+KEYWORDS = ["年假", "病假", "报销", "差旅"]
+
+
+class KeywordEmbeddings(Embeddings):
+    """
+    类级注释：关键词嵌入模型，按关键词出现情况生成确定性向量，并记录查询向量化次数
+    """
+
+    def __init__(self):
+        self.query_calls = 0
+
+    @staticmethod
+    def _vector(text: str) -> List[float]:
+        return [float(keyword in text) for keyword in KEYWORDS] + [0.2]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.query_calls += 1
+        return self._vector(text)
+
+
+@pytest.fixture
+def vector_db():
+    """
+    函数级注释：构造内存 Chroma 向量库（向量库ID与片段ID一致），并监视全量检索调用
+    """
+    db = Chroma(
+        client=chromadb.EphemeralClient(),
+        collection_name=f"ws_{uuid.uuid4().hex[:12]}",
+        embedding_function=KeywordEmbeddings()
+    )
+    texts = ["年假每年五天", "年假可以顺延", "病假需要证明", "报销需要发票", "差旅报销标准"]
+    ids = [f"{i + 1}_0" for i in range(len(texts))]
+    db.add_texts(texts, ids=ids, metadatas=[{"doc_id": i + 1, "chunk_id": chunk_id} for i, chunk_id in enumerate(ids)])
+    db.similarity_search_by_vector_with_relevance_scores = MagicMock(
+        wraps=db.similarity_search_by_vector_with_relevance_scores
+    )
+    return db
+
+
+def chunk_ids(documents) -> List[str]:
+    return [doc.metadata["chunk_id"] for doc in documents]
+
+
+@pytest.mark.asyncio
+async def test_follow_up_is_served_from_working_set(vector_db):
+    """
+    测试目的：验证首轮执行全量检索并记住片段，相似的追问直接由工作集返回，每轮只向量化查询一次
+    """
+    working_sets = RetrievalWorkingSets(threshold=0.9)
+    retriever = VectorRetriever(vector_db, two_stage=False)
+
+    first = await working_sets.asearch(retriever, 1, "年假有几天", k=2)
+    follow_up = await working_sets.asearch(retriever, 1, "年假怎么算", k=2)
+
+    assert vector_db.similarity_search_by_vector_with_relevance_scores.call_count == 1
+    assert vector_db.embeddings.query_calls == 2
+    assert sorted(chunk_ids(follow_up)) == sorted(chunk_ids(first)) == ["1_0", "2_0"]
+    assert follow_up[0].metadata["score"] == pytest.approx(1.0)
+    assert working_sets.get_stats()["hits"] == 1
+
+
+class UnitKeywordEmbeddings(KeywordEmbeddings):
+    """
+    类级注释：输出单位向量的关键词嵌入模型（工作集与向量库的评分可精确对齐）
+    """
+
+    @staticmethod
+    def _vector(text: str) -> List[float]:
+        vector = np.asarray(KeywordEmbeddings._vector(text))
+        return (vector / np.linalg.norm(vector)).tolist()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("space", ["l2", "cosine"])
+async def test_hit_scores_match_full_search_scale(space):
+    """
+    测试目的：验证工作集命中时的评分与全量检索同为 1 - 距离，不随命中与否跳变
+    """
+    db = Chroma(
+        client=chromadb.EphemeralClient(),
+        collection_name=f"ws_{uuid.uuid4().hex[:12]}",
+        embedding_function=UnitKeywordEmbeddings(),
+        collection_metadata={"hnsw:space": space}
+    )
+    texts = ["年假每年五天", "年假和病假", "报销需要发票"]
+    ids = [f"{i + 1}_0" for i in range(len(texts))]
+    db.add_texts(texts, ids=ids, metadatas=[{"doc_id": i + 1, "chunk_id": chunk_id} for i, chunk_id in enumerate(ids)])
+    working_sets = RetrievalWorkingSets(threshold=0.5, space=space)
+    retriever = VectorRetriever(db, two_stage=False)
+
+    missed = await working_sets.asearch(retriever, 1, "年假病假", k=2)
+    hit = await working_sets.asearch(retriever, 1, "年假病假", k=2)
+
+    assert working_sets.get_stats()["hits"] == 1
+    assert chunk_ids(hit) == chunk_ids(missed)
+    for cached, searched in zip(hit, missed):
+        assert cached.metadata["score"] == pytest.approx(searched.metadata["score"], abs=1e-3)
+
+
+@pytest.mark.asyncio
+async def test_falls_back_below_threshold_and_extends_working_set(vector_db):
+    """
+    测试目的：验证工作集最高相似度低于阈值时回退到全量检索，新片段加入工作集；其他会话互不影响
+    """
+    working_sets = RetrievalWorkingSets(threshold=0.9)
+    retriever = VectorRetriever(vector_db, two_stage=False)
+
+    await working_sets.asearch(retriever, 1, "年假有几天", k=2)
+    switched = await working_sets.asearch(retriever, 1, "报销要什么", k=1)
+    again = await working_sets.asearch(retriever, 1, "报销流程", k=1)
+    other = await working_sets.asearch(retriever, 2, "报销流程", k=1)
+
+    assert chunk_ids(switched) == chunk_ids(again) == chunk_ids(other) == ["4_0"]
+    assert vector_db.similarity_search_by_vector_with_relevance_scores.call_count == 3
+    assert working_sets.get_stats()["chunks"] == 4
+
+
+@pytest.mark.asyncio
+async def test_mmr_selection_within_working_set(vector_db):
+    """
+    测试目的：验证启用 MMR 时在工作集内以已保存的向量完成多样化选择
+    """
+    working_sets = RetrievalWorkingSets(threshold=0.5)
+    retriever = VectorRetriever(vector_db, two_stage=False)
+    await working_sets.asearch(retriever, 1, "年假和病假", k=3)
+
+    hits = working_sets.lookup(1, KeywordEmbeddings._vector("年假和病假"), 2, MMROptions(enabled=True, lambda_mult=0.3))
+
+    assert len(hits) == 2
+    assert "3_0" in chunk_ids(hits)
+
+
+def test_capacity_expiry_and_document_invalidation():
+    """
+    测试目的：验证会话数超出上限时淘汰最久未访问的会话、过期会话被淘汰、文档删除时移除其片段
+    """
+    from langchain_core.documents import Document
+
+    def doc(chunk_id, doc_id):
+        return Document(page_content=chunk_id, metadata={"chunk_id": chunk_id, "doc_id": doc_id})
+
+    working_sets = RetrievalWorkingSets(threshold=0.5, max_conversations=2, ttl_seconds=3600)
+    working_sets.remember(1, [doc("1_0", 1), doc("2_0", 2)], [[1, 0], [0, 1]])
+    working_sets.remember(2, [doc("1_0", 1)], [[1, 0]])
+    working_sets.remember(3, [doc("2_0", 2)], [[0, 1]])
+
+    assert working_sets.lookup(1, [1, 0], 1) is None
+    assert working_sets.get_stats()["evictions"] == 1
+
+    working_sets.invalidate_documents([1])
+    assert working_sets.lookup(2, [1, 0], 1) is None
+    assert chunk_ids(working_sets.lookup(3, [0, 1], 1)) == ["2_0"]
+
+    working_sets.ttl_seconds = -1
+    assert working_sets.lookup(3, [0, 1], 1) is None
+    assert working_sets.get_stats()["conversations"] == 0
+
+
+@pytest.mark.asyncio
+async def test_only_conversation_requests_use_working_set(vector_db, monkeypatch):
+    """
+    测试目的：验证启用后只有携带会话ID的检索使用工作集，未启用时始终执行全量检索
+    """
+    from app.core.config import settings
+
+    working_sets = RetrievalWorkingSets(threshold=0.9)
+    monkeypatch.setattr("app.services.retrieval.multi_query.get_working_sets", lambda: working_sets)
+    retriever = MultiQueryRetriever(vector_db, two_stage=False)
+
+    monkeypatch.setattr(settings.retrieval_config, "ENABLE_CONVERSATION_CACHE", False)
+    await retriever.asearch("年假有几天", k=2, conversation_id=7)
+    assert working_sets.get_stats()["conversations"] == 0
+
+    monkeypatch.setattr(settings.retrieval_config, "ENABLE_CONVERSATION_CACHE", True)
+    await retriever.asearch("年假有几天", k=2)
+    await retriever.asearch("年假有几天", k=2, conversation_id=7)
+    await retriever.asearch("年假怎么算", k=2, conversation_id=7)
+
+    assert working_sets.get_stats()["conversations"] == 1
+    assert working_sets.get_stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_working_set_evicted_with_conversation(db_session):
+    """
+    测试目的：验证删除会话时淘汰其工作集
+    """
+    from langchain_core.documents import Document
+
+    conversation = await ConversationService.create_conversation(db_session, CreateConversationRequest(title="工作集"))
+    get_working_sets().remember(conversation.id, [Document(page_content="片段", metadata={"chunk_id": "1_0"})], [[1.0, 0.0]])
+
+    assert await ConversationService.delete_conversation(db_session, conversation.id)
+    assert get_working_sets().evict(conversation.id) is False
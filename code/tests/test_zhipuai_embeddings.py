@@ -20,7 +20,7 @@ from app.utils.zhipuai_embeddings import ZhipuAIEmbeddings
 
 
 class MockResponse:
-    """Mock响应类，用于模拟requests.Response"""
+    """Mock响应类，用于模拟HTTP响应"""
 
     def __init__(self, json_data: dict, status_code: int = 200):
         """
@@ -197,7 +197,7 @@ class TestZhipuAIEmbeddingsEmbedDocuments:
                 mock_resp.raise_for_status = Mock()
                 return mock_resp
 
-            with patch("requests.post", side_effect=mock_post_func) as mock_post:
+            with patch("httpx.Client.post", side_effect=mock_post_func) as mock_post:
                 embeddings = ZhipuAIEmbeddings()
                 result = embeddings.embed_documents(["text1", "text2"])
 
@@ -222,7 +222,7 @@ class TestZhipuAIEmbeddingsEmbedDocuments:
             mock_response = Mock()
             mock_response.raise_for_status.side_effect = Exception("API Error")
 
-            with patch("requests.post", return_value=mock_response):
+            with patch("httpx.Client.post", return_value=mock_response):
                 embeddings = ZhipuAIEmbeddings()
 
                 with pytest.raises(Exception) as exc_info:
@@ -245,7 +245,7 @@ class TestZhipuAIEmbeddingsEmbedDocuments:
             mock_response.json.return_value = {"error": "Invalid request"}
             mock_response.raise_for_status = Mock()
 
-            with patch("requests.post", return_value=mock_response):
+            with patch("httpx.Client.post", return_value=mock_response):
                 embeddings = ZhipuAIEmbeddings()
 
                 with pytest.raises(ValueError) as exc_info:
@@ -267,7 +267,7 @@ class TestZhipuAIEmbeddingsEmbedDocuments:
             mock_response.json.return_value = {"data": []}
             mock_response.raise_for_status = Mock()
 
-            with patch("requests.post", return_value=mock_response):
+            with patch("httpx.Client.post", return_value=mock_response):
                 embeddings = ZhipuAIEmbeddings()
 
                 with pytest.raises(ValueError) as exc_info:
@@ -291,7 +291,7 @@ class TestZhipuAIEmbeddingsEmbedDocuments:
             }
             mock_response.raise_for_status = Mock()
 
-            with patch("requests.post", return_value=mock_response):
+            with patch("httpx.Client.post", return_value=mock_response):
                 embeddings = ZhipuAIEmbeddings()
                 result = embeddings.embed_documents(["single text"])
 
@@ -328,7 +328,7 @@ class TestZhipuAIEmbeddingsEmbedQuery:
             }
             mock_response.raise_for_status = Mock()
 
-            with patch("requests.post", return_value=mock_response):
+            with patch("httpx.Client.post", return_value=mock_response):
                 embeddings = ZhipuAIEmbeddings()
                 result = embeddings.embed_query("query text")
 
@@ -352,7 +352,7 @@ class TestZhipuAIEmbeddingsEmbedQuery:
             }
             mock_response.raise_for_status = Mock()
 
-            with patch("requests.post", return_value=mock_response):
+            with patch("httpx.Client.post", return_value=mock_response):
                 embeddings = ZhipuAIEmbeddings()
 
                 # 内部逻辑：使用_embed_documents方法
@@ -383,16 +383,16 @@ class TestZhipuAIEmbeddingsEdgeCases:
         测试目的：验证超时处理
         测试场景：API调用超时
         """
-        import requests
+        import httpx
 
         with patch("app.utils.zhipuai_embeddings.settings") as mock_settings:
             mock_settings.zhipuai_embedding_api_key = "test_key"
             mock_settings.zhipuai_embedding_base_url = "https://api.example.com"
 
-            with patch("requests.post", side_effect=requests.Timeout("Connection timeout")):
+            with patch("httpx.Client.post", side_effect=httpx.TimeoutException("Connection timeout")):
                 embeddings = ZhipuAIEmbeddings()
 
-                with pytest.raises(requests.Timeout):
+                with pytest.raises(httpx.TimeoutException):
                     embeddings.embed_documents(["test"])
 
     @pytest.mark.asyncio
@@ -418,7 +418,7 @@ class TestZhipuAIEmbeddingsEdgeCases:
                 mock_resp.raise_for_status = Mock()
                 return mock_resp
 
-            with patch("requests.post", side_effect=mock_post_func) as mock_post:
+            with patch("httpx.Client.post", side_effect=mock_post_func) as mock_post:
                 embeddings = ZhipuAIEmbeddings()
                 result = embeddings.embed_documents(["中文\n\t\r", "emoji \U0001f600"])
 
@@ -446,7 +446,7 @@ class TestZhipuAIEmbeddingsEdgeCases:
             }
             mock_response.raise_for_status = Mock()
 
-            with patch("requests.post", return_value=mock_response):
+            with patch("httpx.Client.post", return_value=mock_response):
                 embeddings = ZhipuAIEmbeddings()
                 result = embeddings.embed_documents([""])
 
@@ -475,7 +475,7 @@ class TestZhipuAIEmbeddingsEdgeCases:
                 mock_resp.raise_for_status = Mock()
                 return mock_resp
 
-            with patch("requests.post", side_effect=mock_post_func) as mock_post:
+            with patch("httpx.Client.post", side_effect=mock_post_func) as mock_post:
                 embeddings = ZhipuAIEmbeddings()
                 texts = ["first", "second", "third", "fourth", "fifth"]
                 result = embeddings.embed_documents(texts)